@@ -0,0 +1,490 @@
+"""
+Headless benchmarks of the table operations users wait on.
+
+Synthetic tables of several shapes and sizes are loaded into a TableView or
+TableWidget under the offscreen Qt platform, and every operation is timed
+through the same entry points the UI uses:
+
+    load     handle_data_loaded until the last row is shown
+    find     FindDialogLogic._find_text_logic until the search finishes
+    replace  ReplaceDialogLogic.change_all_text
+    move     drop_event_logic with a scattered row selection
+    save     snapshot_dataframe and a BackgroundSaver write, as FileMenuBar does
+
+Wall time and peak memory of each operation are written as JSON, together
+with a comparison against a stored baseline. The exit status is 1 when an
+operation got slower or hungrier than the baseline allows.
+
+Usage:
+    python -m benchmarks.bench                      # full matrix, compare with baseline.json
+    python -m benchmarks.bench --rows 1000 10000    # smaller run
+    python -m benchmarks.bench --save-baseline      # store this run as the new baseline
+"""
+from __future__ import annotations
+
+import argparse
+import ctypes
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from PyQt6.QtCore import (
+    PYQT_VERSION_STR,
+    QT_VERSION_STR,
+    QEvent,
+    QEventLoop,
+    QItemSelection,
+    QItemSelectionModel,
+    QPointF,
+    QTimer,
+)
+from PyQt6.QtWidgets import QApplication
+
+from blackbox.app.table import TableView, TableWidget
+from blackbox.app.table.saver import BackgroundSaver
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+RESULTS_PATH = os.path.join(HERE, 'results.json')
+
+ROWS = (1_000, 10_000, 100_000, 1_000_000)
+SHAPES = ('narrow', 'wide', 'mixed')
+TABLES = {'view': TableView, 'widget': TableWidget}
+OPERATIONS = ('load', 'find', 'replace', 'move', 'save')
+
+# Larger cases are skipped; TableWidget creates one item per cell
+MAX_CELLS = {'view': 10_000_000, 'widget': 1_000_000}
+# Rows picked up by the benchmarked drag, spread over the whole table
+MOVED_ROWS = 10_000
+
+
+@dataclass
+class Result:
+    """
+    Measurement of one operation on one table.
+
+    Attributes:
+        case (str): `<table>/<shape>/<rows>/<operation>`, the key used for comparisons.
+        seconds (float): Best wall time over the repeats.
+        peak_bytes (int): Highest memory the operation needed on top of what was in use before it.
+    """
+    case: str
+    table: str
+    shape: str
+    rows: int
+    columns: int
+    operation: str
+    seconds: float
+    peak_bytes: int
+
+
+# --- Synthetic data ---
+
+def make_frame(shape: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds a table with text the find and replace benchmarks will hit.
+
+    Args:
+        shape (str): 'narrow' (4 text columns), 'wide' (40 text columns) or
+                     'mixed' (8 columns of numbers, dates, repeated labels,
+                     free text and empty cells).
+        rows (int): Number of rows.
+        seed (int, optional): Seed of the generator. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed)
+
+    def words(prefix: str, high: int) -> np.ndarray:
+        return np.char.add(prefix, rng.integers(0, high, rows).astype(str)).astype(object)
+
+    if shape == 'narrow':
+        return pd.DataFrame({f'text_{j}': words('v', 1000) for j in range(4)})
+    if shape == 'wide':
+        return pd.DataFrame({f'text_{j}': words('v', 1000) for j in range(40)})
+    if shape == 'mixed':
+        notes = words('note v', 100_000)
+        notes[rng.random(rows) < 0.1] = ''
+        return pd.DataFrame({
+            'id': np.arange(rows),
+            'amount': rng.normal(100, 25, rows).round(2),
+            'count': rng.integers(0, 1000, rows),
+            'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, rows), unit='D'),
+            'category': np.array(['v1', 'v2', 'v3', 'alpha', 'beta'], dtype=object)[rng.integers(0, 5, rows)],
+            'code': words('v', 1000),
+            'note': notes,
+            'flag': rng.random(rows) < 0.5,
+        })
+    raise ValueError(f"Unknown shape: {shape}")
+
+
+# --- Measurement ---
+
+class PeakMemory:
+    """
+    Measures the peak memory used inside a `with` block above what was in use before it.
+
+    On Linux the resident set high-water mark is reset through /proc, so
+    allocations made by NumPy, pandas and Qt all count and timing is not
+    affected. Memory freed by earlier operations is handed back to the system
+    first, otherwise reusing it would not show up. Elsewhere Python allocations
+    are traced with tracemalloc.
+    """
+
+    def __init__(self):
+        self.peak_bytes = 0
+        self._use_proc = self.__reset_proc()
+
+    def __enter__(self) -> PeakMemory:
+        if self._use_proc:
+            _trim_heap()
+            self.__reset_proc()
+            self._start = self.__proc_status('VmRSS')
+        else:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._use_proc:
+            self.peak_bytes = max(self.__proc_status('VmHWM') - self._start, 0)
+        else:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.peak_bytes = peak
+
+    @staticmethod
+    def __reset_proc() -> bool:
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def __proc_status(key: str) -> int:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+
+def _trim_heap() -> None:
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def run_until(signals, start, timeout_ms: int = 600_000):
+    """
+    Calls `start` and runs the event loop until one of `signals` is emitted.
+    The signals are connected first, so a result that arrives right away is not missed.
+
+    Returns:
+        The return value of `start`.
+    """
+    loop = QEventLoop()
+    for signal in signals:
+        signal.connect(loop.quit)
+    timer = QTimer(loop)
+    timer.setSingleShot(True)
+    timer.timeout.connect(loop.quit)
+    timer.start(timeout_ms)
+    try:
+        value = start()
+        loop.exec()
+    finally:
+        for signal in signals:
+            signal.disconnect(loop.quit)
+    return value
+
+
+class _Drop:
+    """
+    The parts of a QDropEvent that drop_event_logic reads. A synthetic
+    QDropEvent has no drag source, so the table would ignore it.
+    """
+
+    def __init__(self, table, pos: QPointF):
+        self._table = table
+        self._pos = pos
+
+    def source(self):
+        return self._table
+
+    def position(self) -> QPointF:
+        return self._pos
+
+    def accept(self) -> None:
+        pass
+
+
+class TableBenchmark:
+    """
+    Runs the operations in OPERATIONS, in order, on one synthetic table.
+
+    Args:
+        table (str): Key of TABLES.
+        shape (str): Shape passed to make_frame.
+        rows (int): Number of rows.
+        workdir (str): Directory the save benchmark writes to.
+        save_format (str): Extension of the saved file.
+    """
+
+    def __init__(self, table: str, shape: str, rows: int, workdir: str, save_format: str = '.csv'):
+        self.table_name = table
+        self.shape = shape
+        self.rows = rows
+        self.workdir = workdir
+        self.save_format = save_format
+        self.df = make_frame(shape, rows)
+        self.table = TABLES[table]()
+        self.table.resize(1024, 768)
+        self.table.show()
+
+    def run(self, operations=OPERATIONS) -> list[Result]:
+        results = []
+        for operation in OPERATIONS:
+            if operation not in operations and operation != 'load':
+                continue
+            # Every later operation works on the loaded table
+            setup = getattr(self, f'setup_{operation}', None)
+            if setup is not None:
+                setup()
+            gc.collect()
+            with PeakMemory() as memory:
+                started = time.perf_counter()
+                getattr(self, f'bench_{operation}')()
+                seconds = time.perf_counter() - started
+            if operation in operations:
+                results.append(Result(
+                    case=f'{self.table_name}/{self.shape}/{self.rows}/{operation}',
+                    table=self.table_name, shape=self.shape, rows=self.rows,
+                    columns=self.df.shape[1], operation=operation,
+                    seconds=seconds, peak_bytes=memory.peak_bytes,
+                ))
+        # Delete the table now, not inside the event loop of the next benchmark
+        self.table.close()
+        self.table.deleteLater()
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+        self.table = None
+        return results
+
+    def bench_load(self) -> None:
+        self.table.handle_data_loaded(self.df)
+        self.table.logic.finish_loading()
+        QApplication.processEvents()
+
+    def setup_find(self) -> None:
+        self.finder = self.table.logic.finder_logic
+        # Searches only when asked to, not in the background of the other operations
+        self.finder.dialog.as_you_type.setChecked(False)
+        # A substring search scans every cell instead of using the find index
+        self.finder.dialog.search_options.whole_cell.setChecked(False)
+
+    def bench_find(self) -> None:
+        engine = self.finder.search_engine
+        run_until([engine.search_finished, engine.search_failed], lambda: self.finder._find_text_logic('v1'))
+
+    def setup_replace(self) -> None:
+        self.replacer = self.table.logic.replace_logic
+        self.replacer.dialog.as_you_type.setChecked(False)
+        self.replacer.dialog.search_options.whole_cell.setChecked(False)
+        self.replacer.dialog.search_value.setText('v1')
+        self.replacer.dialog.new_value_edit.setText('w1')
+
+    def bench_replace(self) -> None:
+        self.replacer.change_all_text(selection_only=False)
+
+    def setup_move(self) -> None:
+        table = self.table
+        count = table.rowCount()
+        step = max(count // MOVED_ROWS, 2)
+        model = table.model()
+        last_column = table.columnCount() - 1
+        selection = QItemSelection()
+        for row in range(step, count, step):
+            selection.select(model.index(row, 0), model.index(row, last_column))
+        table.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        table.scrollToTop()
+        self.drop = _Drop(table, QPointF(table.visualRect(model.index(1, 0)).center()))
+
+    def bench_move(self) -> None:
+        self.table.logic.drop_event_logic(self.drop)
+        QApplication.processEvents()
+
+    def setup_save(self) -> None:
+        self.saver = BackgroundSaver()
+        self.path = os.path.join(self.workdir, f'{self.table_name}_{self.shape}_{self.rows}{self.save_format}')
+
+    def bench_save(self) -> None:
+        df = self.table.snapshot_dataframe()
+        run_until([self.saver.save_finished, self.saver.save_failed], lambda: self.saver.save(df, self.path))
+        # Let the saver release its thread before the next benchmark starts
+        self.saver.wait()
+        while self.saver.is_saving():
+            QApplication.processEvents()
+        os.remove(self.path)
+
+
+def run_benchmarks(rows=ROWS, shapes=SHAPES, tables=TABLES, operations=OPERATIONS,
+                   repeat: int = 1, save_format: str = '.csv') -> list[Result]:
+    """
+    Runs every combination of table, shape and size that fits into MAX_CELLS.
+
+    Args:
+        repeat (int, optional): Runs per case; the fastest time and the highest
+                                memory peak are kept. Defaults to 1.
+
+    Returns:
+        list[Result]: One result per case and operation.
+    """
+    results: dict[str, Result] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        # Lazy imports, dialogs and thread pools are set up by a throwaway run
+        for table in tables:
+            TableBenchmark(table, 'mixed', 100, workdir, save_format).run(operations)
+
+        for table in tables:
+            for shape in shapes:
+                for count in rows:
+                    cells = count * make_frame(shape, 1).shape[1]
+                    if cells > MAX_CELLS[table]:
+                        logger.info(f"Skipping {table}/{shape}/{count}: {cells} cells")
+                        continue
+                    for _ in range(repeat):
+                        bench = TableBenchmark(table, shape, count, workdir, save_format)
+                        for result in bench.run(operations):
+                            best = results.setdefault(result.case, result)
+                            best.seconds = min(best.seconds, result.seconds)
+                            best.peak_bytes = max(best.peak_bytes, result.peak_bytes)
+                            logger.info(f"{result.case}: {result.seconds:.4f}s, "
+                                        f"{result.peak_bytes / 2 ** 20:.1f} MB")
+                        del bench
+    return list(results.values())
+
+
+# --- Baseline comparison ---
+
+def compare(results: list[Result], baseline: dict, tolerance: float = 0.25,
+            min_seconds: float = 0.05, min_bytes: int = 16 * 2 ** 20) -> list[dict]:
+    """
+    Compares results with a baseline written by `--save-baseline`.
+
+    An operation regresses when it is more than `tolerance` slower, or needs
+    more than `tolerance` extra memory, than in the baseline. Differences
+    below `min_seconds` and `min_bytes` are treated as noise.
+
+    Returns:
+        list[dict]: One entry per case found in both runs.
+    """
+    previous = {r['case']: r for r in baseline.get('results', [])}
+    comparison = []
+    for result in results:
+        base = previous.get(result.case)
+        if base is None:
+            continue
+        time_ratio = result.seconds / base['seconds'] if base['seconds'] else None
+        memory_ratio = result.peak_bytes / base['peak_bytes'] if base['peak_bytes'] else None
+        slower = (result.seconds - base['seconds'] > min_seconds
+                  and result.seconds > base['seconds'] * (1 + tolerance))
+        hungrier = (result.peak_bytes - base['peak_bytes'] > min_bytes
+                    and result.peak_bytes > base['peak_bytes'] * (1 + tolerance))
+        comparison.append({
+            'case': result.case,
+            'seconds': result.seconds,
+            'baseline_seconds': base['seconds'],
+            'time_ratio': time_ratio,
+            'peak_bytes': result.peak_bytes,
+            'baseline_peak_bytes': base['peak_bytes'],
+            'memory_ratio': memory_ratio,
+            'regression': slower or hungrier,
+        })
+    return comparison
+
+
+def environment() -> dict:
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def print_report(results: list[Result], comparison: list[dict]) -> None:
+    compared = {c['case']: c for c in comparison}
+    print(f"{'case':<40} {'seconds':>10} {'peak MB':>9} {'vs base':>9}")
+    for result in results:
+        entry = compared.get(result.case)
+        ratio = f"{entry['time_ratio']:.2f}x" if entry and entry['time_ratio'] else '-'
+        mark = '  REGRESSION' if entry and entry['regression'] else ''
+        print(f"{result.case:<40} {result.seconds:>10.4f} {result.peak_bytes / 2 ** 20:>9.1f} {ratio:>9}{mark}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=list(ROWS))
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=list(SHAPES))
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), default=list(TABLES))
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest time is kept')
+    parser.add_argument('--save-format', default='.csv', help='extension of the file written by the save benchmark')
+    parser.add_argument('--output', default=RESULTS_PATH, help='where to write the results JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='also store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--verbose', action='store_true', help='show the table log output')
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level='DEBUG' if args.verbose else 'WARNING')
+    logger.add(sys.stderr, level='INFO', filter=__name__)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = run_benchmarks(args.rows, args.shapes, args.tables, args.operations,
+                             args.repeat, args.save_format)
+
+    comparison = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+
+    report = {
+        'environment': environment(),
+        'results': [asdict(r) for r in results],
+        'comparison': comparison,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': report['environment'], 'results': report['results']}, f, indent=2)
+
+    print_report(results, comparison)
+    app.quit()
+    regressions = [c['case'] for c in comparison if c['regression']]
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+from blackbox.cli import main
+
+raise SystemExit(main())
@@ -1,15 +1,26 @@
-import pandas as pd
+from __future__ import annotations
+
+import re
+
 from loguru import logger
 from PyQt6.QtGui import QAction, QKeySequence
-from PyQt6.QtWidgets import QFileDialog, QMenuBar, QTableWidgetItem
+from PyQt6.QtWidgets import QFileDialog, QMenuBar, QMessageBox
 
 from blackbox.app.static import label, shortcut
+from blackbox.app.table.saver import SAVE_FILTER, BackgroundSaver
+from blackbox.core.io import SAVE_EXTENSIONS
+from blackbox.core.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 
 class FileMenuBar(QMenuBar):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        self.saver = BackgroundSaver(self)
+        self.saver.save_finished.connect(self.__on_saved)
+        self.saver.save_failed.connect(self.__on_save_failed)
         self.__setup()
 
     def __setup(self):
@@ -53,39 +64,42 @@ class FileMenuBar(QMenuBar):
         return self.parent.loader_menu_widget.load_from_menu()
 
     def __save(self):
-        path, _ = QFileDialog.getSaveFileName(self.parent,
-                                              "Save", "",
-                                              "Excel Files (*.xlsx *.xls);;All Files (*)")
+        path, selected_filter = QFileDialog.getSaveFileName(self.parent,
+                                                            "Save", "",
+                                                            SAVE_FILTER)
         if not path:
-            return 
+            return
 
-        columns = [self.parent.table_widget.horizontalHeaderItem(j).text()
-                   for j in range(self.parent.table_widget.model().columnCount())]
+        # A workbook keeps its other sheets, only the edited ones are rewritten.
+        # Windows without sheet tabs save their single table.
+        sheet_tabs = getattr(self.parent, 'sheet_tabs', None)
+        if sheet_tabs is not None and sheet_tabs.can_save(path):
+            sheet_tabs.save(self.saver, path)
+            return
 
-        df = pd.DataFrame(columns=columns)
+        if not path.lower().endswith(SAVE_EXTENSIONS):
+            ext = re.search(r'\*(\.\w+)', selected_filter)
+            path += ext.group(1) if ext and ext.group(1) in SAVE_EXTENSIONS else '.xlsx'
 
-        for row in range(self.parent.table_widget.rowCount()):
-            for col in range(self.parent.table_widget.columnCount()):
-                item = self.parent.table_widget.item(row, col)
-                df.at[row, columns[col]] = item.text() if item is not None else ""
-        df.fillna("", inplace=True)
-        df.to_excel(path, index=False)
-        logger.success(f'file was saved on path {path}')
+        # Snapshot on the GUI thread, write on a worker thread
+        df = self.parent.table_widget.snapshot_dataframe()
+        self.saver.save(df, path)
+
+    def __on_saved(self, path: str):
+        logger.success('file was saved on path {}', path)
+
+    def __on_save_failed(self, path: str, message: str):
+        QMessageBox.critical(self.parent, label('bar.file_menu.save_error'), f'{path}\n{message}')
 
     def __create_new_table(self):
         """
         Clears the current table and sets up an empty one with default headers.
         """
-        self.parent.table_widget.clear()
-        self.parent.table_widget.setRowCount(0)
-        self.parent.table_widget.setColumnCount(3)  # Default to 3 columns
-        headers = ['Column 1', 'Column 2', 'Column 3']
-        self.parent.table_widget.setHorizontalHeaderLabels(headers)
+        headers = ['Column 1', 'Column 2', 'Column 3']  # Default to 3 columns
 
         # Add an initial empty row for convenience
-        self.parent.table_widget.insertRow(0)
-        for col in range(3):
-            self.parent.table_widget.setItem(0, col, QTableWidgetItem(""))
-
-        self.parent.table_widget.update()
-        self.parent.table_widget.repaint()
+        df = pd.DataFrame([[''] * len(headers)], columns=headers, dtype=object)
+        sheet_tabs = getattr(self.parent, 'sheet_tabs', None)
+        if sheet_tabs is not None:
+            sheet_tabs.close_workbook()
+        self.parent.table_widget.set_dataframe(df)
@@ -1,8 +1,20 @@
+import glob
 import os
-from json import load
+import threading
+from json import JSONDecodeError, load
 
+from loguru import logger
 
-__all__ = ['action_connect', 'shortcut', 'label']
+
+__all__ = ['shortcut', 'label', 'set_locale', 'get_locale', 'available_locales', 'reload_namespace', 'watch_namespaces']
+
+DEFAULT_LOCALE: str = 'en'
+
+# Parsed namespace files, keyed by file name, as flat dot.notation dicts
+_NAMESPACES: dict[str, dict[str, str]] = {}
+_lock = threading.Lock()
+_locale: str = DEFAULT_LOCALE
+_watcher = None
 
 
 def __get_path(fname):
@@ -16,24 +28,143 @@ def __load(f: str) -> dict:
         return load(file)
 
 
+def _flatten(data: dict, prefix: str = '') -> dict[str, str]:
+    """
+    Turns nested namespace sections into one dict keyed by dot.notation paths.
+    Only string leaves are kept.
+    """
+    flat = {}
+    for key, value in data.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{path}.'))
+        elif isinstance(value, str):
+            flat[path] = value
+    return flat
+
+
+def _namespace(fname: str) -> dict[str, str]:
+    """
+    Returns the flattened content of a namespace file, parsing it on first use only.
+    """
+    values = _NAMESPACES.get(fname)
+    if values is None:
+        with _lock:
+            values = _NAMESPACES.get(fname)
+            if values is None:
+                values = _NAMESPACES[fname] = _flatten(__load(fname))
+    return values
+
+
+def reload_namespace(fname: str) -> bool:
+    """
+    Parses a namespace file again. A file that is missing or not valid JSON,
+    e.g. while an editor is still writing it, keeps its previous values.
+
+    Args:
+        fname (str): The file name inside blackbox/app/static/namespace.
+
+    Returns:
+        bool: True if the new content was loaded.
+    """
+    fname = f'./namespace/{os.path.basename(fname)}'
+    try:
+        values = _flatten(__load(fname))
+    except (OSError, JSONDecodeError) as e:
+        logger.warning("Keeping previous values of {}: {}", fname, e)
+        return False
+    with _lock:
+        _NAMESPACES[fname] = values
+    logger.info("Reloaded {}", fname)
+    return True
+
+
+def _labels_file(locale: str) -> str:
+    return f'./namespace/{locale}_labels.json'
+
+
 def _get_key(key_: str, data: dict) -> str:
-    keys = key_.split('.')
-    value = data
-    for k in keys:
-        value = value.get(k, {})
-    if not isinstance(value, str):
+    value = data.get(key_)
+    if value is None:
         raise KeyError(f"Invalid key path: {key_}")
     return value
 
 
 def shortcut(key_: str) -> str:
-    SHORTCUTS: dict =  __load('./namespace/shortcuts.json')
-    return _get_key(key_, SHORTCUTS)
+    return _get_key(key_, _namespace('./namespace/shortcuts.json'))
 
 
 def label(key_: str) -> str:
-    LABELS: dict = __load('./namespace/en_labels.json')
-    return _get_key(key_, LABELS)
+    """
+    Returns a label of the current locale, falling back to DEFAULT_LOCALE
+    for keys the locale does not translate.
+    """
+    value = _namespace(_labels_file(_locale)).get(key_)
+    if value is None:
+        return _get_key(key_, _namespace(_labels_file(DEFAULT_LOCALE)))
+    return value
+
+
+def available_locales() -> list[str]:
+    """
+    Returns the locales that have a `<locale>_labels.json` namespace file.
+    """
+    pattern = os.path.join(__get_path('./namespace'), '*_labels.json')
+    return sorted(os.path.basename(path)[:-len('_labels.json')] for path in glob.glob(pattern))
+
+
+def get_locale() -> str:
+    return _locale
+
+
+def set_locale(locale: str) -> None:
+    """
+    Switches the locale used by label(). Widgets created afterwards use it.
+
+    Raises:
+        ValueError: If there is no labels file for `locale`.
+    """
+    global _locale
+    if not os.path.exists(__get_path(_labels_file(locale))):
+        raise ValueError(f"No labels for locale: {locale}")
+    _locale = locale
+
+
+def watch_namespaces() -> None:
+    """
+    Reloads namespace files as soon as they change on disk, so edits to labels
+    and shortcuts show up without restarting. Needs a Qt application; lookups
+    keep reading the in-memory values and never touch the disk.
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+    from PyQt6.QtCore import QCoreApplication, QFileSystemWatcher
+
+    directory = __get_path('./namespace')
+    files = glob.glob(os.path.join(directory, '*.json'))
+    _watcher = QFileSystemWatcher(files + [directory], QCoreApplication.instance())
+    _watcher.fileChanged.connect(__on_namespace_changed)
+    # Editors that save by replacing the file drop it from the watch list
+    _watcher.directoryChanged.connect(lambda _: __rewatch(directory))
+    logger.debug("Watching {} namespace files", len(files))
+
+
+def __on_namespace_changed(path: str) -> None:
+    fname = f'./namespace/{os.path.basename(path)}'
+    if fname in _NAMESPACES:
+        reload_namespace(fname)
+    __rewatch(os.path.dirname(path))
+
+
+def __rewatch(directory: str) -> None:
+    watched = set(_watcher.files())
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if path not in watched:
+            _watcher.addPath(path)
+            fname = f'./namespace/{os.path.basename(path)}'
+            if fname in _NAMESPACES:
+                reload_namespace(fname)
 
 
 LOGO: str = __get_path('./imgs/logo.png')
@@ -1,4 +1,11 @@
+from blackbox.app.table.journal import EditJournal
 from blackbox.app.table.loader import LoaderFromMenuWidget
+from blackbox.app.table.model import DataFrameModel
+from blackbox.app.table.stats import StatsBar
 from blackbox.app.table.table import TableWidget
+from blackbox.app.table.view import TableView
+from blackbox.app.table.workbook import SheetTabBar
+from blackbox.app.table.writeback import SqliteWriteBack
 
-__all__ = ['TableWidget', 'LoaderFromMenuWidget']
+__all__ = ['TableWidget', 'TableView', 'DataFrameModel', 'LoaderFromMenuWidget', 'SheetTabBar', 'EditJournal',
+           'SqliteWriteBack', 'StatsBar']
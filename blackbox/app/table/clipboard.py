@@ -0,0 +1,117 @@
+"""
+Clipboard exchange of cell blocks with spreadsheets.
+
+Blocks are copied as tab-separated text, the format spreadsheets put on the
+clipboard, and pasted from tab- or comma-separated text. Cells with tabs,
+line breaks or a leading quote are quoted the way spreadsheets quote them.
+
+Copies of more than `CellsMimeData.lazy_cells` cells keep only the cell
+arrays and build the text when another application asks for it. A paste
+into a table of the same application takes the arrays without going
+through text at all.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+
+from PyQt6.QtCore import QMimeData, QVariant
+
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+TEXT_FORMATS = ('text/plain', 'text/tab-separated-values')
+
+
+def _quoted(text: str) -> str:
+    if '\t' in text or '\n' in text or '\r' in text or text.startswith('"'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def to_tsv(columns: list[np.ndarray]) -> str:
+    """
+    Joins a block of cells, given column by column, into tab-separated text.
+    """
+    columns = [[_quoted(text) for text in np.asarray(column, dtype=object).tolist()] for column in columns]
+    return '\n'.join(map('\t'.join, zip(*columns))) + '\n' if columns else ''
+
+
+def parse_cells(text: str) -> list[list[str]]:
+    """
+    Splits tab- or comma-separated text into rows of cells.
+
+    Text with a tab is read as tab-separated. Otherwise, text of several
+    lines is read as CSV if every line has the same number of fields, more
+    than one; anything else is one cell per line.
+
+    Returns:
+        list[list[str]]: The rows; they may differ in length.
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if text.endswith('\n'):
+        text = text[:-1]
+    if not text:
+        return []
+    if '\t' in text:
+        return _split(text, '\t')
+    if ',' in text and '\n' in text:
+        rows = _split(text, ',')
+        if len({len(row) for row in rows}) == 1 and len(rows[0]) > 1:
+            return rows
+    return [[line] for line in text.split('\n')]
+
+
+def cell_columns(rows: list[list[str]]) -> list[np.ndarray]:
+    """
+    Turns rows of cells into one text array per column, padding short rows with ''.
+    """
+    columns = []
+    for column in itertools.zip_longest(*rows, fillvalue=''):
+        texts = np.empty(len(column), dtype=object)
+        texts[:] = column
+        columns.append(texts)
+    return columns
+
+
+def _split(text: str, delimiter: str) -> list[list[str]]:
+    if '"' not in text:
+        # Nothing is quoted: plain splitting is several times faster than the csv module
+        return [line.split(delimiter) for line in text.split('\n')]
+    return list(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+
+class CellsMimeData(QMimeData):
+    """
+    A copied block of cells, offered as tab-separated text.
+
+    Args:
+        columns (list[np.ndarray]): Text of the copied cells, column by column.
+    """
+
+    # Blocks up to this size are turned into text right away
+    lazy_cells: int = 100_000
+
+    def __init__(self, columns: list[np.ndarray]):
+        super().__init__()
+        self.columns = columns
+        self._text: str = None
+        if sum(map(len, columns)) <= self.lazy_cells:
+            self._text = to_tsv(columns)
+
+    def formats(self) -> list[str]:
+        return list(TEXT_FORMATS)
+
+    def hasFormat(self, mime_type: str) -> bool:
+        return mime_type in TEXT_FORMATS
+
+    def retrieveData(self, mime_type: str, preferred_type) -> QVariant:
+        if mime_type not in TEXT_FORMATS:
+            return QVariant()
+        if self._text is None:
+            self._text = to_tsv(self.columns)
+        if mime_type == 'text/plain':
+            return QVariant(self._text)
+        return QVariant(self._text.encode('utf-8'))
@@ -1,4 +1,9 @@
+from __future__ import annotations
+
+from loguru import logger
+from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
+    QCheckBox,
     QDialog,
     QHBoxLayout,
     QLineEdit,
@@ -8,6 +13,57 @@ from PyQt6.QtWidgets import (
 )
 
 from blackbox.app.static import label
+from blackbox.app.table.search import ColumnTexts, Matches, SearchEngine
+from blackbox.core import telemetry
+from blackbox.core.lazy import lazy_import
+from blackbox.core.search import SearchQuery
+
+np = lazy_import('numpy')
+
+
+class SearchOptions(QWidget):
+    """
+    A row of check boxes that controls how the search text is matched.
+
+    Signals:
+        changed: One of the boxes was toggled.
+
+    Attributes:
+        match_case (QCheckBox): Compare case-sensitively.
+        whole_cell (QCheckBox): The whole cell must match, not just a part of it.
+        whole_word (QCheckBox): Only match at word boundaries.
+        regex (QCheckBox): Treat the search text as a regular expression.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent)
+
+        self.match_case = QCheckBox(label("search_options.match_case"), self)
+        self.whole_cell = QCheckBox(label("search_options.whole_cell"), self)
+        self.whole_word = QCheckBox(label("search_options.whole_word"), self)
+        self.regex = QCheckBox(label("search_options.regex"), self)
+
+        # Defaults reproduce the plain exact-match search
+        self.match_case.setChecked(True)
+        self.whole_cell.setChecked(True)
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        for box in (self.match_case, self.whole_cell, self.whole_word, self.regex):
+            box.toggled.connect(self.changed)
+            layout.addWidget(box)
+        self.setLayout(layout)
+
+    def query(self, text: str) -> SearchQuery:
+        return SearchQuery(
+            text,
+            match_case=self.match_case.isChecked(),
+            whole_cell=self.whole_cell.isChecked(),
+            whole_word=self.whole_word.isChecked(),
+            regex=self.regex.isChecked(),
+        )
 
 
 class FinderDialogBase(QDialog):
@@ -19,11 +75,15 @@ class FinderDialogBase(QDialog):
         label_find = label("finder_dialog.find")
         label_arrow_up = label("finder_dialog.arrow_up")
         label_arrow_down = label("finder_dialog.arrow_down")
+        label_as_you_type = label("finder_dialog.as_you_type")
 
         self.setWindowTitle(label_window)
 
         self.search_value = QLineEdit(self)
         self.search_value.setPlaceholderText(label_value)
+        self.search_options = SearchOptions(self)
+        self.as_you_type = QCheckBox(label_as_you_type, self)
+        self.as_you_type.setChecked(True)
 
         self.find_button = QPushButton(label_find, self)
         self.arrow_up_button = QPushButton(label_arrow_up, self)
@@ -36,6 +96,8 @@ class FinderDialogBase(QDialog):
         button_layout = QHBoxLayout()
 
         layout.addWidget(self.search_value)
+        layout.addWidget(self.search_options)
+        layout.addWidget(self.as_you_type)
         button_layout.addWidget(self.find_button)
         button_layout.addWidget(self.arrow_up_button)
         button_layout.addWidget(self.arrow_down_button)
@@ -47,14 +109,41 @@ class FinderDialogBase(QDialog):
 class FindDialogLogic:
     """
     Abstract class encapsulating the logic for finding text in a table.
+
+    Plain exact-match searches are answered by the table's find index when it
+    is enabled. Every other search runs on the SearchEngine thread pool and
+    its matches arrive in batches; navigation works on the matches found so
+    far and they are put in row order once the search finishes.
+
+    With the dialog's "as you type" box checked, a search starts `debounce_ms`
+    after the search text or an option last changed, and every keystroke
+    cancels the search in progress. The cell texts those searches read are
+    collected once in the background and shared by every keystroke until the
+    table changes or the dialog is closed. The matches are kept as a Matches object,
+    follow the edits made to the table meanwhile and are highlighted in the
+    cells the table paints while the dialog is open.
+
+    Matches are kept as data cells. Rows hidden by a filter are skipped and
+    the order follows the rows as the view shows them.
     """
 
+    # Pause in typing after which an incremental search starts
+    debounce_ms: int = 150
+
     def __init__(self, dialog, table_logic) -> None:
-        self.found_items = []
-        self.current_index = -1
+        self.matches = Matches()
+        self.search_id = 0
+        self._searching = False
+        self._awaiting_texts = False
+        self._find_span: telemetry.Span = None
 
         self.dialog = dialog
         self.table_logic = table_logic
+        self.search_engine = SearchEngine(self.dialog)
+        self.column_texts = ColumnTexts(self.table_logic, self.dialog)
+        self._search_timer = QTimer(self.dialog)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.debounce_ms)
         self.setup_connections()
 
     def setup_connections(self):
@@ -65,21 +154,41 @@ class FindDialogLogic:
         self.dialog.arrow_down_button.clicked.connect(self._find_next)
         self.dialog.arrow_up_button.clicked.connect(self._find_previous)
 
+        self.dialog.search_value.textChanged.connect(self.search_engine.cancel)
+        self.dialog.search_value.textChanged.connect(self._schedule_search)
+        self.dialog.search_options.changed.connect(self._schedule_search)
+        self.dialog.as_you_type.toggled.connect(self._schedule_search)
+        self.dialog.finished.connect(self._on_dialog_finished)
+        self._search_timer.timeout.connect(self._find_text)
+
+        self.search_engine.matches_found.connect(self._on_matches_found)
+        self.search_engine.search_finished.connect(self._on_search_finished)
+        self.search_engine.search_failed.connect(self._on_search_failed)
+        self.column_texts.ready.connect(self._on_column_texts_ready)
+        self.table_logic.table_widget.table_changed.connect(self._on_table_changed)
+
     def _find_text(self):
         """
         Finds the text in the table using TableWidgetLogic.
         """
         search_text = self.dialog.search_value.text()
-        if self._find_text_logic(search_text):
-            self.table_logic.select_current_item()
+        self._find_text_logic(search_text)
+
+    def _schedule_search(self, *_):
+        """
+        Restarts the debounce of an incremental search, if the dialog asks for one.
+        """
+        if self.dialog.as_you_type.isChecked():
+            self._search_timer.start()
 
     def _find_next(self):
         """
         Navigates to the next occurrence of the found text.
         """
-        if not self.found_items:
+        if not len(self.matches):
             return False
-        self.current_index = (self.current_index + 1) % len(self.found_items)
+        self.__in_view_order()
+        self.matches.current = (self.matches.current + 1) % len(self.matches)
         self.__select_current_item()
         return True
 
@@ -87,34 +196,165 @@ class FindDialogLogic:
         """
         Navigates to the previous occurrence of the found text.
         """
-        if not self.found_items:
+        if not len(self.matches):
             return False
-        self.current_index = (self.current_index - 1) % len(self.found_items)
+        self.__in_view_order()
+        self.matches.current = (self.matches.current - 1) % len(self.matches)
         self.__select_current_item()
         return True
 
     def __select_current_item(self):
+        if self.matches.current != -1:
+            self.table_logic.highlight_matches(self.matches)
+            self.table_logic.show_cell(*self.matches.cell(self.matches.current))
+
+    def query(self, text) -> SearchQuery:
+        return self.dialog.search_options.query(text)
+
+    def count_matches(self, text) -> int:
+        """
+        Counts the cells whose text equals `text`, using the find index if it is enabled.
+        """
+        index = self.table_logic.find_index()
+        if index is not None:
+            return index.count(text)
         tw = self.table_logic.table_widget
-        if self.current_index != -1:
-            row, column = self.found_items[self.current_index]
-            tw.setCurrentCell(row, column)
+        return sum(text == self.table_logic.cell_text(row, col)
+                   for row in range(tw.rowCount())
+                   for col in range(tw.columnCount()))
 
     def _find_text_logic(self, text):
         """
         Searches the table for occurrences of the specified text.
         """
-        self.found_items = []
-        self.current_index = -1
-        tw = self.table_logic.table_widget
+        self.search_engine.cancel()
+        self._search_timer.stop()
+        self._searching = self._awaiting_texts = False
+        self.matches = Matches(self.query(text) if text else None)
+        self.table_logic.highlight_matches(self.matches)
+        self._update_buttons()
+        if not text:
+            return
 
-        for row in range(tw.rowCount()):
-            for col in range(tw.columnCount()):
-                item = tw.item(row, col)
-                if item and text == item.text():
-                    self.found_items.append((row, col))
+        # Finished when the last match arrives, which may be on a later event
+        self._find_span = telemetry.span('find').start()
+        query = self.matches.query
+        index = self.table_logic.find_index() if query.is_exact() else None
 
-        if self.found_items:
-            self.dialog.arrow_down_button.setEnabled(True)
-            self.dialog.arrow_up_button.setEnabled(True)
+        if index is not None:
+            rows, cols = index.lookup(text)
+            self.matches.extend(*self.__shown(rows, cols))
+            self.__in_view_order()
+            self.__finish_span(len(self.matches))
+            self._update_buttons()
             self._find_next()
+            return
+
+        self._searching = True
+        if self.column_texts.columns() is None:
+            # Started by _on_column_texts_ready once the texts are collected
+            self._awaiting_texts = True
+            self.column_texts.request()
+            return
+        self.search_id = self.search_engine.start(query, self.column_texts.columns())
+
+    def _on_column_texts_ready(self):
+        if self._awaiting_texts:
+            self._awaiting_texts = False
+            self.search_id = self.search_engine.start(self.matches.query, self.column_texts.columns())
+
+    def _on_matches_found(self, search_id, rows, cols):
+        if not self.search_engine.is_current(search_id):
+            return
+        first_batch = not len(self.matches)
+        self.matches.extend(*self.__shown(rows, cols))
+        self.__repaint()
+        if first_batch and len(self.matches):
+            self._update_buttons()
+            self._find_next()
+
+    def _on_search_finished(self, search_id, count):
+        if search_id != self.search_id:
+            return
+        self._searching = False
+        self.__finish_span(count)
+        if not len(self.matches):
+            return
+        self.__in_view_order()
+        logger.info("Search finished with {} matches", count)
+
+    def _on_table_changed(self, change):
+        """
+        Moves the matches along with a change of the table. A search still
+        running, or a reset table, is searched again instead. While the dialog
+        is closed the matches are dropped. The collected cell texts are
+        dropped either way.
+        """
+        self.column_texts.invalidate()
+        if self.matches.query is None:
+            return
+        if not self.dialog.isVisible():
+            # Nothing shows them, so they are dropped rather than kept up to date
+            self.matches = Matches()
+            self._update_buttons()
+        elif self._searching or not self.matches.apply(change):
+            self.search_engine.cancel()
+            self._search_timer.start()
+        else:
+            self.__repaint()
+            self._update_buttons()
 
+    def _on_dialog_finished(self, *_):
+        """
+        Stops searching and removes the highlight once the dialog is closed.
+        The matches are kept for navigation when it is opened again, unless
+        the table changes meanwhile.
+        """
+        self.search_engine.cancel()
+        self._search_timer.stop()
+        # Holding a copy of every cell is only worth it while the dialog searches
+        self.column_texts.invalidate()
+        self._awaiting_texts = False
+        if self._searching:
+            self._searching = False
+            self._find_span = None
+        if self.table_logic.highlighted_matches is self.matches:
+            self.table_logic.highlight_matches(None)
+
+    def __shown(self, rows, cols) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the matches whose rows are shown.
+        """
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        shown = self.table_logic.view_rows(rows) >= 0
+        return rows[shown], cols[shown]
+
+    def __in_view_order(self) -> None:
+        # Skipped while batches still arrive, the order is settled once the search finishes
+        if not self.matches.ordered and not self._searching:
+            self.matches.sort(self.table_logic.view_rows(self.matches.rows))
+
+    def __repaint(self) -> None:
+        if self.table_logic.highlighted_matches is self.matches:
+            self.table_logic.table_widget.viewport().update()
+
+    def _on_search_failed(self, search_id, message):
+        if search_id == self.search_id:
+            self._searching = False
+            self._find_span = None
+            self.matches.query = None
+            telemetry.count('find.failed')
+            logger.warning("Search failed: {}", message)
+
+    def __finish_span(self, matches: int) -> None:
+        if self._find_span is not None:
+            self._find_span.finish()
+            self._find_span = None
+            telemetry.count('find.matches', matches)
+
+    def _update_buttons(self):
+        """
+        Enables navigation only when there is something to navigate to.
+        """
+        self.dialog.arrow_down_button.setEnabled(bool(len(self.matches)))
+        self.dialog.arrow_up_button.setEnabled(bool(len(self.matches)))
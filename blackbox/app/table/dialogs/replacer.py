@@ -1,6 +1,11 @@
+from __future__ import annotations
+
+from loguru import logger
 from PyQt6.QtWidgets import (
+    QCheckBox,
     QDialog,
     QHBoxLayout,
+    QLabel,
     QLineEdit,
     QPushButton,
     QVBoxLayout,
@@ -8,7 +13,9 @@ from PyQt6.QtWidgets import (
 )
 
 from blackbox.app.static import label
-from blackbox.app.table.dialogs.finder import FindDialogLogic
+from blackbox.app.table.dialogs.finder import FindDialogLogic, SearchOptions
+from blackbox.core import telemetry
+from blackbox.core.search import replacements
 
 
 class ReplaceDialogBase(QDialog):
@@ -22,6 +29,10 @@ class ReplaceDialogBase(QDialog):
     Attributes:
         search_value (QLineEdit): Input field for the text to find.
         new_value_edit (QLineEdit): Input field for the text to replace with.
+        search_options (SearchOptions): Match case, whole cell, whole word and regex switches.
+        as_you_type (QCheckBox): Searches while the text to find is typed.
+        in_selection (QCheckBox): Limits 'Replace All' to the selected cells.
+        replaced_label (QLabel): Shows how many cells the last 'Replace All' changed.
     
         change_button (QPushButton): Button to change the current occurrence of the old text to the new text.
         change_all_button (QPushButton): Button to change all occurrences of the old text to the new text.
@@ -41,11 +52,18 @@ class ReplaceDialogBase(QDialog):
         label_arrow_up = label("replace_dialog.arrow_up")
         label_change_all = label("replace_dialog.change_all")
         label_arrow_down = label("replace_dialog.arrow_down")
+        label_in_selection = label("replace_dialog.in_selection")
+        label_as_you_type = label("replace_dialog.as_you_type")
 
         self.setWindowTitle(label_window)
 
         self.search_value = QLineEdit(self)
         self.search_value.setPlaceholderText(label_old)
+        self.search_options = SearchOptions(self)
+        self.as_you_type = QCheckBox(label_as_you_type, self)
+        self.as_you_type.setChecked(True)
+        self.in_selection = QCheckBox(label_in_selection, self)
+        self.replaced_label = QLabel(self)
 
         self.new_value_edit = QLineEdit(self)
         self.new_value_edit.setPlaceholderText(label_new)
@@ -57,12 +75,6 @@ class ReplaceDialogBase(QDialog):
         self.arrow_up_button = QPushButton(label_arrow_up, self)
         self.arrow_down_button = QPushButton(label_arrow_down, self)
 
-        # TODO: add radio buttons
-        # self.radio_button_match_case = QRadioButton("--", self)
-        # self.radio_button_match_whole_word = QRadioButton("---", self)
-        # self.radio_button_match_case.setEnabled(False)
-        # self.radio_button_match_whole_word.setEnabled(False)
-
         self.change_button.setEnabled(False)
         self.arrow_up_button.setEnabled(False)
         self.arrow_down_button.setEnabled(False)
@@ -73,6 +85,9 @@ class ReplaceDialogBase(QDialog):
 
         layout.addWidget(self.search_value)
         layout.addWidget(self.new_value_edit)
+        layout.addWidget(self.search_options)
+        layout.addWidget(self.as_you_type)
+        layout.addWidget(self.in_selection)
 
         button_layout.addWidget(self.find_button)
         button_layout.addWidget(self.change_button)
@@ -81,6 +96,7 @@ class ReplaceDialogBase(QDialog):
         button_layout.addWidget(self.arrow_up_button)
 
         layout.addLayout(button_layout)
+        layout.addWidget(self.replaced_label)
         self.setLayout(layout)
 
 
@@ -103,43 +119,66 @@ class ReplaceDialogLogic(FindDialogLogic):
         """
         old = self.dialog.search_value.text()
         new = self.dialog.new_value_edit.text()
-        tw = self.table_logic.table_widget
 
-        if self.current_index == -1:
+        if self.matches.current == -1:
             return False
 
-        row, col = self.found_items[self.current_index]
-        item = tw.item(row, col)
+        query = self.query(old)
+        row, col = self.matches.cell(self.matches.current)
+        text = self.table_logic.cell_text(row, col)
 
-        if item and item.text() == old:
-            item.setText(new)
+        if query.match([text])[0]:
+            self.table_logic.set_cell_text(row, col, query.sub(text, new))
             self._find_next()
             return True
         return False
 
-    def change_all_text(self):
+    def change_all_text(self, columns: list[int] = None, selection_only: bool = None) -> int:
         """
         Changes all occurrences of the old text to the new text.
+
+        Matches and replacements are computed one column at a time with
+        vectorized string operations and written back as a single transaction,
+        so the view refreshes once and `table_changed` carries one CellsChanged.
+
+        Args:
+            columns (list[int], optional): Restrict the replacement to these columns.
+                                           Defaults to every column.
+            selection_only (bool, optional): Restrict the replacement to the selected
+                                             cells. Defaults to the dialog's check box.
+
+        Returns:
+            int: The number of cells changed.
         """
         old = self.dialog.search_value.text()
         new = self.dialog.new_value_edit.text()
-        tw = self.table_logic.table_widget
+        if not old:
+            return 0
 
-        for row in range(tw.rowCount()):
-            for col in range(tw.columnCount()):
-                item = tw.item(row, col)
-                if item and item.text() == old:
-                    item.setText(new)
-
-    def _find_text_logic(self, text):
+        tw = self.table_logic.table_widget
+        query = self.query(old)
+        if selection_only is None:
+            selection_only = self.dialog.in_selection.isChecked()
+        ranges = self.table_logic.selected_ranges() if selection_only else None
+        if columns is None:
+            columns = range(tw.columnCount())
+
+        with telemetry.span('replace'):
+            logic = self.table_logic
+            rows, cols, old_texts, new_texts = replacements(
+                query, new, ((col, logic.column_texts(col)) for col in columns),
+                None if ranges is None else lambda col: logic.selection_mask(col, ranges))
+            count = logic.set_cells(rows, cols, new_texts, old_texts) if len(rows) else 0
+        telemetry.count('replace.cells', count)
+
+        self.dialog.replaced_label.setText(label("replace_dialog.replaced").format(count=count))
+        logger.info("Replaced {} cells", count)
+        return count
+
+    def _update_buttons(self):
         """
-        Extends the find logic to also enable 'replace' and 'replace_all' buttons.
+        Extends the navigation buttons to also enable 'replace' and 'replace_all'.
         """
-        super()._find_text_logic(text)
-
-        if self.found_items:
-            self.dialog.change_button.setEnabled(True)
-            self.dialog.change_all_button.setEnabled(True)
-        else:
-            self.dialog.change_button.setEnabled(False)
-            self.dialog.change_all_button.setEnabled(False)
+        super()._update_buttons()
+        self.dialog.change_button.setEnabled(bool(len(self.matches)))
+        self.dialog.change_all_button.setEnabled(bool(len(self.matches)))
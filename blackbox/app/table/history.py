@@ -0,0 +1,169 @@
+import sys
+from collections import deque
+
+from loguru import logger
+
+from blackbox.core.changes import (
+    CellsChanged,
+    ChangeGroup,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableChange,
+    TableReset,
+)
+
+
+def change_size(change: TableChange) -> int:
+    """
+    Estimates the memory held by a change in bytes.
+    """
+    size = sys.getsizeof(change)
+    if isinstance(change, ChangeGroup):
+        size += sum(map(change_size, change.changes))
+    elif isinstance(change, CellsChanged):
+        size += change.rows.nbytes + change.cols.nbytes
+        size += _texts_size(change.old) + _texts_size(change.new)
+    elif isinstance(change, RowsMoved):
+        size += change.order.nbytes
+    elif isinstance(change, (RowsInserted, RowsRemoved, ColumnsInserted, ColumnsRemoved)):
+        for texts in change.values or ():
+            size += texts.nbytes + _texts_size(texts)
+        size += _texts_size(getattr(change, 'labels', None) or ())
+    return size
+
+
+def _texts_size(texts) -> int:
+    # Interned and shared strings are counted every time they are referenced,
+    # which errs on the safe side of the cap
+    return sum(map(sys.getsizeof, texts)) + 8 * len(texts)
+
+
+class UndoHistory:
+    """
+    Undo and redo stacks of table changes.
+
+    Changes are kept as the compact deltas emitted through `table_changed`
+    instead of table snapshots: a Replace All is stored as its cells with old
+    and new text, a row move as one permutation and a removed column as the
+    column's texts. The memory used by the stacks is capped at `max_bytes`;
+    when a new change does not fit, the oldest changes are dropped first.
+
+    Changes recorded between begin_group() and end_group() are undone and
+    redone as one step.
+
+    Args:
+        max_bytes (int, optional): Memory cap of the history. 0 disables it.
+                                   Defaults to 256 MB.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._undo: deque[tuple[TableChange, int]] = deque()
+        self._redo: list[tuple[TableChange, int]] = []
+        self._bytes = 0
+        self._group: list[TableChange] = None
+        self._group_depth = 0
+
+    def begin_group(self) -> None:
+        """
+        Starts collecting changes into one undo step; groups may be nested.
+        """
+        self._group_depth += 1
+        if self._group_depth == 1:
+            self._group = []
+
+    def end_group(self) -> None:
+        """
+        Ends the outermost group and records its changes as one step.
+        """
+        self._group_depth -= 1
+        if self._group_depth:
+            return
+        changes, self._group = self._group, None
+        if len(changes) == 1:
+            self.record(changes[0])
+        elif changes:
+            self.record(ChangeGroup(changes))
+
+    def record(self, change: TableChange) -> None:
+        """
+        Pushes a change made to the table and clears the redo stack.
+        A TableReset clears the whole history, as nothing before it can be reverted.
+        """
+        if isinstance(change, TableReset):
+            self.clear()
+            if self._group is not None:
+                self._group = []
+            return
+        if self._group is not None:
+            self._group.append(change)
+            return
+
+        self._bytes -= sum(size for _, size in self._redo)
+        self._redo.clear()
+
+        size = change_size(change)
+        if size > self.max_bytes:
+            if self.max_bytes:
+                logger.info("Change of {:.1f} MB exceeds the undo limit, history cleared", size / 2 ** 20)
+            self.clear()
+            return
+
+        self._undo.append((change, size))
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._undo.popleft()
+            self._bytes -= evicted
+
+    def undo(self) -> TableChange:
+        """
+        Pops the latest change and returns the change that reverts it,
+        or None if there is nothing to undo.
+        """
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return entry[0].inverted()
+
+    def redo(self) -> TableChange:
+        """
+        Pops the latest undone change and returns it to be applied again,
+        or None if there is nothing to redo.
+        """
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return entry[0]
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """
+        Changes the memory cap, dropping the oldest changes that no longer fit.
+        """
+        self.max_bytes = max_bytes
+        while self._bytes > self.max_bytes and self._undo:
+            _, evicted = self._undo.popleft()
+            self._bytes -= evicted
+        if self._bytes > self.max_bytes:
+            self.clear()
+
+    def memory_usage(self) -> int:
+        """
+        Returns the estimated memory held by the history in bytes.
+        """
+        return self._bytes
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import sys
+
+from blackbox.core.changes import (
+    CellsChanged,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableChange,
+)
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Cells are keyed as row_id * _COL_STRIDE + col_id
+_COL_STRIDE = 1 << 20
+
+
+class CellIndex:
+    """
+    An inverted index from cell text to the cells holding it, for exact-match find.
+
+    Rows and columns are identified by ids that never change, while two small
+    arrays map ids to current positions. Inserting, removing or moving rows and
+    columns therefore only updates those arrays with one vectorized operation
+    and never rewrites the postings.
+
+    Postings built from the whole table are stored as sorted NumPy arrays per
+    value. Later edits go to small `added` / `removed` overlay sets, so an edit
+    costs O(1) and a lookup costs O(matches). Empty cells are not indexed.
+    """
+
+    def __init__(self):
+        self._base: dict[str, np.ndarray] = {}
+        self._added: dict[str, set[int]] = {}
+        self._removed: dict[str, set[int]] = {}
+        self._row_ids = np.empty(0, dtype=np.int64)
+        self._row_pos = np.empty(0, dtype=np.int64)
+        self._col_ids = np.empty(0, dtype=np.int64)
+        self._col_pos = np.empty(0, dtype=np.int64)
+
+    # --- Building ---
+
+    def build(self, columns: list[np.ndarray]) -> None:
+        """
+        Indexes a whole table.
+
+        Args:
+            columns (list[np.ndarray]): The text of every column, top to bottom.
+        """
+        rows = len(columns[0]) if columns else 0
+        self._row_ids = np.arange(rows, dtype=np.int64)
+        self._row_pos = np.arange(rows, dtype=np.int64)
+        self._col_ids = np.arange(len(columns), dtype=np.int64)
+        self._col_pos = np.arange(len(columns), dtype=np.int64)
+        self._added.clear()
+        self._removed.clear()
+
+        postings: dict[str, list[np.ndarray]] = {}
+        for col_id, texts in enumerate(columns):
+            codes, uniques = pd.factorize(np.asarray(texts, dtype=object))
+            order = np.argsort(codes, kind='stable')
+            bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+            keys = order.astype(np.int64) * _COL_STRIDE + col_id
+            for value, cells in zip(uniques, np.split(keys, bounds)):
+                if value != '':
+                    postings.setdefault(value, []).append(cells)
+
+        self._base = {value: np.sort(np.concatenate(parts)) for value, parts in postings.items()}
+
+    # --- Queries ---
+
+    def lookup(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds every cell whose text equals `text`.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row and column of every match,
+                                           ordered row by row.
+        """
+        keys = self.__keys(text)
+        if not len(keys):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        rows = self._row_pos[keys // _COL_STRIDE]
+        cols = self._col_pos[keys % _COL_STRIDE]
+        alive = (rows >= 0) & (cols >= 0)
+        rows, cols = rows[alive], cols[alive]
+
+        order = np.lexsort((cols, rows))
+        return rows[order], cols[order]
+
+    def count(self, text: str) -> int:
+        return len(self.lookup(text)[0])
+
+    def __keys(self, text: str) -> np.ndarray:
+        base = self._base.get(text)
+        removed = self._removed.get(text)
+        added = self._added.get(text)
+
+        if base is None:
+            base = np.empty(0, dtype=np.int64)
+        elif removed:
+            base = base[~np.isin(base, np.fromiter(removed, dtype=np.int64, count=len(removed)))]
+        if added:
+            base = np.concatenate([base, np.fromiter(added, dtype=np.int64, count=len(added))])
+        return base
+
+    def memory_usage(self) -> int:
+        """
+        Estimates the memory held by the index in bytes.
+        """
+        total = sys.getsizeof(self._base) + sys.getsizeof(self._added) + sys.getsizeof(self._removed)
+        total += sum(sys.getsizeof(value) + postings.nbytes for value, postings in self._base.items())
+        for overlay in (self._added, self._removed):
+            total += sum(sys.getsizeof(value) + sys.getsizeof(keys) + 32 * len(keys) for value, keys in overlay.items())
+        for ids in (self._row_ids, self._row_pos, self._col_ids, self._col_pos):
+            total += ids.nbytes
+        return total
+
+    # --- Maintenance ---
+
+    def apply(self, change: TableChange) -> None:
+        """
+        Updates the index after a table change.
+
+        Args:
+            change (TableChange): A change emitted through `table_changed`.
+                                  TableReset must be handled with build().
+        """
+        if isinstance(change, CellsChanged):
+            for row, col, old, new in zip(change.rows.tolist(), change.cols.tolist(), change.old, change.new):
+                self.update_cell(row, col, old, new)
+        elif isinstance(change, RowsInserted):
+            self._row_ids, self._row_pos = self.__insert_ids(self._row_ids, self._row_pos, change.at, change.count)
+            if change.values is not None:
+                for col, texts in enumerate(change.values):
+                    self.__add_cells(np.arange(change.at, change.at + change.count), col, texts)
+        elif isinstance(change, RowsRemoved):
+            self._row_ids = self.__remove_ids(self._row_ids, self._row_pos, change.at, change.count)
+        elif isinstance(change, ColumnsInserted):
+            self._col_ids, self._col_pos = self.__insert_ids(self._col_ids, self._col_pos, change.at, change.count)
+            if change.values is not None:
+                for offset, texts in enumerate(change.values):
+                    self.__add_cells(np.arange(len(texts)), change.at + offset, texts)
+        elif isinstance(change, ColumnsRemoved):
+            self._col_ids = self.__remove_ids(self._col_ids, self._col_pos, change.at, change.count)
+        elif isinstance(change, RowsMoved):
+            self._row_ids = self._row_ids[change.order]
+            self._row_pos[self._row_ids] = np.arange(len(self._row_ids))
+
+    def update_cell(self, row: int, col: int, old: str, new: str) -> None:
+        if old == new:
+            return
+        key = int(self._row_ids[row]) * _COL_STRIDE + int(self._col_ids[col])
+        if old != '':
+            added = self._added.get(old)
+            if added is not None and key in added:
+                added.discard(key)
+            else:
+                self._removed.setdefault(old, set()).add(key)
+        if new != '':
+            removed = self._removed.get(new)
+            if removed is not None and key in removed:
+                removed.discard(key)
+            else:
+                self._added.setdefault(new, set()).add(key)
+
+    def __add_cells(self, rows: np.ndarray, col: int, texts: np.ndarray) -> None:
+        # Inserted rows and columns get fresh ids, so their keys are in no overlay yet
+        keys = self._row_ids[rows] * _COL_STRIDE + int(self._col_ids[col])
+        codes, uniques = pd.factorize(np.asarray(texts, dtype=object))
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+        for value, cells in zip(uniques, np.split(keys[order], bounds)):
+            if value != '':
+                self._added.setdefault(value, set()).update(cells.tolist())
+
+    @staticmethod
+    def __insert_ids(ids: np.ndarray, pos: np.ndarray, at: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        new_ids = np.arange(len(pos), len(pos) + count, dtype=np.int64)
+        ids = np.concatenate([ids[:at], new_ids, ids[at:]])
+        pos = np.concatenate([pos, np.empty(count, dtype=np.int64)])
+        pos[ids[at:]] = np.arange(at, len(ids))
+        return ids, pos
+
+    @staticmethod
+    def __remove_ids(ids: np.ndarray, pos: np.ndarray, at: int, count: int) -> np.ndarray:
+        pos[ids[at:at + count]] = -1
+        ids = np.concatenate([ids[:at], ids[at + count:]])
+        pos[ids[at:]] = np.arange(at, len(ids))
+        return ids
@@ -0,0 +1,570 @@
+"""
+Crash-safe journal of table edits.
+
+Every change a table announces through `table_changed` is appended to a log
+file as one binary record:
+
+    seq (uint64) | length (uint32) | crc32 (uint32) | pickled TableChange
+
+A writer thread batches the records that arrive within `sync_interval` and
+makes them durable with a single fsync, so an edit costs its own bytes instead
+of a full save. A checkpoint is a snapshot of the table written as a `.npz`
+bundle (see blackbox.core.columnar); once it is on disk, the log segments
+it covers are deleted. Recovery opens the newest checkpoint and replays the
+records after it, up to the first torn record.
+
+Several application instances can share the journal directory: each one
+writes its own session, guarded by a lock file it holds while it runs:
+
+    session-<pid>-<time>.lock       locked by the running instance
+    session-<pid>-<time>/
+        checkpoint-<seq>.npz        the table after record <seq>
+        journal-<seq>.log           records from <seq> on
+
+The lock of a crashed instance is free again, so the next instance can tell
+its session from the ones still in use and adopt it.
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+
+from loguru import logger
+from PyQt6.QtCore import QCoreApplication, QLockFile, QObject, QThread, QTimer, pyqtSignal
+
+from blackbox.core import telemetry
+from blackbox.core.changes import TableChange, TableReset
+from blackbox.core.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+_RECORD = struct.Struct('<QII')
+_CHECKPOINT = re.compile(r'checkpoint-(\d+)\.npz$')
+_SEGMENT = re.compile(r'journal-(\d+)\.log$')
+_SESSION = re.compile(r'session-\d+-\d+$')
+_JOURNAL_FILE = re.compile(f'{_CHECKPOINT.pattern}|{_SEGMENT.pattern}')
+
+
+def _checkpoint_name(seq: int) -> str:
+    return f'checkpoint-{seq:012d}.npz'
+
+
+def _segment_name(seq: int) -> str:
+    return f'journal-{seq:012d}.log'
+
+
+def _lock_session(path: str) -> QLockFile:
+    """
+    Takes the lock of the session directory `path` without waiting.
+
+    Returns:
+        QLockFile: The held lock, None if another running instance holds it.
+    """
+    lock = QLockFile(f'{path}.lock')
+    # Only a lock whose process is gone is stale, however old it is
+    lock.setStaleLockTime(0)
+    return lock if lock.tryLock(0) else None
+
+
+def _sync_directory(directory: str) -> None:
+    # Makes created and renamed files durable; not possible on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def encode_record(seq: int, change: TableChange) -> bytes:
+    data = pickle.dumps(change, protocol=pickle.HIGHEST_PROTOCOL)
+    return _RECORD.pack(seq, len(data), zlib.crc32(data)) + data
+
+
+def read_records(path: str):
+    """
+    Reads the records of a log segment.
+
+    Reading stops at the first record that is incomplete or fails its checksum,
+    i.e. the one being written when the application stopped.
+
+    Yields:
+        tuple[int, TableChange]: Sequence number and change of every intact record.
+    """
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            seq, length, crc = _RECORD.unpack(header)
+            data = file.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                logger.warning("Journal {} ends with a torn record at {}", path, seq)
+                return
+            yield seq, pickle.loads(data)
+
+
+class _JournalWriter(threading.Thread):
+    """
+    Appends records to the current log segment and fsyncs them in batches.
+
+    Records queued within `sync_interval` of each other are written and synced
+    together (group commit). Segment switches are queued like records, so every
+    record lands in the segment that was current when it was appended.
+    """
+
+    def __init__(self, sync_interval: float):
+        super().__init__(name='journal-writer', daemon=True)
+        self.sync_interval = sync_interval
+        self.error: Exception = None
+        self._condition = threading.Condition()
+        # Record bytes, or a str naming the segment to continue in
+        self._pending: list = []
+        self._queued = 0
+        self._synced = 0
+        self._urgent = False
+        self._stopping = False
+        self._file = None
+
+    def append(self, item) -> None:
+        with self._condition:
+            self._pending.append(item)
+            self._queued += 1
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        """
+        Blocks until everything appended so far is durable.
+        """
+        with self._condition:
+            target = self._queued
+            self._urgent = True
+            self._condition.notify_all()
+            while self._synced < target and self.error is None and self.is_alive():
+                self._condition.wait(0.1)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self.join()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                # Let the records of a burst of edits pile up into one sync
+                self._condition.wait_for(lambda: self._urgent or self._stopping, self.sync_interval)
+                batch, self._pending = self._pending, []
+                self._urgent = False
+            try:
+                self.__write(batch)
+            except Exception as e:
+                logger.exception("Journal writer failed, edits are no longer journaled")
+                self.error = e
+            with self._condition:
+                self._synced += len(batch)
+                self._condition.notify_all()
+            if self.error is not None:
+                break
+        if self._file is not None:
+            self._file.close()
+
+    def __write(self, batch: list) -> None:
+        chunk = []
+        for item in batch:
+            if isinstance(item, str):
+                self.__sync(chunk)
+                chunk = []
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(item, 'ab')
+                _sync_directory(os.path.dirname(item))
+            else:
+                chunk.append(item)
+        self.__sync(chunk)
+
+    def __sync(self, chunk: list) -> None:
+        if not chunk or self._file is None:
+            return
+        with telemetry.span('journal'):
+            self._file.write(b''.join(chunk))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        telemetry.count('journal.syncs')
+
+
+class _CheckpointWorker(QObject):
+    """
+    Writes one table snapshot as a checkpoint on a background thread.
+    """
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, df: pd.DataFrame, path: str, seq: int):
+        super().__init__()
+        self.df = df
+        self.path = path
+        self.seq = seq
+
+    def run(self) -> None:
+        from blackbox.core.columnar import ColumnarStore
+
+        tmp_path = f'{self.path}.part'
+        try:
+            with telemetry.span('checkpoint'):
+                ColumnarStore().write_bundle(self.df, tmp_path)
+                with open(tmp_path, 'rb') as file:
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.path)
+                _sync_directory(os.path.dirname(self.path))
+        except Exception as e:
+            logger.exception("Error writing checkpoint {}", self.path)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.failed.emit(str(e))
+            return
+        finally:
+            self.df = None
+            self.thread().quit()
+
+        self.finished.emit(self.seq)
+
+
+class EditJournal(QObject):
+    """
+    Journals the changes of a table so they survive a crash.
+
+    Call recover() once at startup, before the table is used: it restores the
+    table from a journal left behind by a crashed session and starts recording.
+    Each instance records into a session directory of its own below `directory`
+    and only recovers or removes sessions whose lock it could take, so instances
+    sharing `directory` never touch each other's files.
+    Every later change is appended to the journal and synced within
+    `sync_interval` seconds. A checkpoint is written shortly after the table
+    content is replaced (e.g. a file is loaded) and whenever the log grows by
+    `checkpoint_bytes`; it replaces the log segments written before it.
+    close() ends the session and, by default, removes the journal.
+
+    A checkpoint that cannot be written leaves the journal as it is: the
+    log keeps growing from the previous checkpoint and the next one is tried
+    with the next trigger.
+
+    Signals:
+        recovered (int): Number of changes replayed by recover().
+        checkpoint_written (int): Sequence number of the last change a new
+                                  checkpoint contains.
+        checkpoint_failed (str): The error a checkpoint could not be written with.
+    """
+    recovered = pyqtSignal(int)
+    checkpoint_written = pyqtSignal(int)
+    checkpoint_failed = pyqtSignal(str)
+
+    def __init__(self, table, directory: str, sync_interval: float = 0.05,
+                 checkpoint_bytes: int = 64 * 2 ** 20, checkpoint_delay: int = 1000, parent=None):
+        """
+        Args:
+            table (TableWidget | TableView): The journaled table.
+            directory (str): Where the journal sessions are kept.
+            sync_interval (float, optional): Seconds records are batched before
+                                             they are synced. Defaults to 0.05.
+            checkpoint_bytes (int, optional): Log size that triggers a checkpoint.
+                                              Defaults to 64 MB.
+            checkpoint_delay (int, optional): Milliseconds between a content
+                                              replacement and its checkpoint, so
+                                              that streamed loads are checkpointed
+                                              once. Defaults to 1000.
+            parent (QObject, optional): Parent object.
+        """
+        super().__init__(parent)
+        self.table = table
+        self.directory = directory
+        # The directory of the session this instance records, set by recover()
+        self.session_directory: str = None
+        self._lock: QLockFile = None
+        self.sync_interval = sync_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self._seq = 0
+        self._segment_seq: int = None
+        # Last change covered by a checkpoint of this session, None before the first one
+        self._checkpoint_seq: int = None
+        # The same for the last checkpoint that made it to disk
+        self._written_seq: int = None
+        self._log_bytes = 0
+        self._writer: _JournalWriter = None
+        self._checkpoint_thread: QThread = None
+        self._checkpoint_pending = False
+
+        self._checkpoint_timer = QTimer(self)
+        self._checkpoint_timer.setSingleShot(True)
+        self._checkpoint_timer.setInterval(checkpoint_delay)
+        self._checkpoint_timer.timeout.connect(self.checkpoint)
+
+        table.table_changed.connect(self.__on_table_changed)
+
+    def is_recording(self) -> bool:
+        return self._writer is not None and self._writer.error is None
+
+    def recover(self) -> int:
+        """
+        Restores the table from the newest session in `directory` that was
+        left behind by a crashed instance, if there is one, then starts
+        recording. The recovered session is continued; empty sessions of
+        crashed instances are removed, others wait for the next instance.
+
+        The replayed changes are recorded in the undo history as usual, so
+        they can be reverted one by one.
+
+        Returns:
+            int: Number of changes replayed on top of the checkpoint; 0 when
+                 there was nothing to recover.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.__claim_session()
+        checkpoints = self.__files(_CHECKPOINT)
+        # Sequence numbers go on from the previous session, so that the first
+        # checkpoint of this one supersedes its files
+        self._seq = max([seq for seq, _ in checkpoints + self.__files(_SEGMENT)], default=0)
+        replayed = 0
+        if checkpoints:
+            seq, path = checkpoints[-1]
+            try:
+                replayed = self.__restore(path, seq)
+            except Exception:
+                # The files stay until the first checkpoint of this session replaces them
+                logger.exception("Could not recover the table from {}", self.session_directory)
+            else:
+                self.recovered.emit(replayed)
+        self.__start(compact=bool(checkpoints))
+        return replayed
+
+    def checkpoint(self) -> None:
+        """
+        Snapshots the table and writes the snapshot in the background. Log
+        segments covered by it are removed once it is on disk.
+        """
+        self._checkpoint_timer.stop()
+        if not self.is_recording():
+            return
+        if self._checkpoint_thread is not None:
+            self._checkpoint_pending = True
+            return
+
+        seq = self._checkpoint_seq = self._seq
+        df = self.table.snapshot_dataframe()
+        if self._segment_seq != seq + 1:
+            self.__open_segment(seq + 1)
+
+        thread = QThread()
+        worker = _CheckpointWorker(df, os.path.join(self.session_directory, _checkpoint_name(seq)), seq)
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        worker.finished.connect(self.__on_checkpoint_written)
+        worker.failed.connect(self.__on_checkpoint_failed)
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+
+        self._checkpoint_thread = thread
+        thread.start()
+        logger.debug("Writing checkpoint {} of {} rows", seq, len(df))
+
+    def flush(self) -> None:
+        """
+        Blocks until every recorded change is durable.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def journal_bytes(self) -> int:
+        """
+        Returns the size of the log written since the last checkpoint.
+        """
+        return self._log_bytes
+
+    def close(self, discard: bool = True) -> None:
+        """
+        Stops recording.
+
+        Args:
+            discard (bool, optional): Remove the journal, so the next session
+                                      starts without recovering. Defaults to True.
+                                      Otherwise the session stays for the next
+                                      instance to recover, like after a crash.
+        """
+        self._checkpoint_timer.stop()
+        self._checkpoint_pending = False
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.wait()
+            # Handles the outcome of the checkpoint now: its queued signals must
+            # not reach a journal the caller may drop right after closing it
+            QCoreApplication.sendPostedEvents()
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+        if self._lock is None:
+            return
+        if discard and os.path.isdir(self.session_directory):
+            for pattern in (_CHECKPOINT, _SEGMENT):
+                for _, path in self.__files(pattern):
+                    self.__remove(path)
+            self.__remove_directory(self.session_directory)
+        self._lock.unlock()
+        self._lock = None
+        logger.debug("Journal closed")
+
+    def __claim_session(self) -> None:
+        sessions = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and _SESSION.match(entry.name):
+                sessions.append((entry.stat().st_mtime, entry.path))
+        # Newest first: a crashed instance left the latest edits there
+        for _, path in sorted(sessions, reverse=True):
+            lock = _lock_session(path)
+            if lock is None:
+                continue
+            names = os.listdir(path)
+            if not any(map(_JOURNAL_FILE.match, names)):
+                # Nothing to recover, at most a checkpoint cut short by the crash
+                for name in names:
+                    if name.endswith('.part'):
+                        self.__remove(os.path.join(path, name))
+                self.__remove_directory(path)
+            elif self._lock is None:
+                self._lock, self.session_directory = lock, path
+                logger.info("Recovering the journal session {}", path)
+                continue
+            lock.unlock()
+
+        while self._lock is None:
+            # The lock is taken before the directory exists, so no other
+            # instance mistakes a starting session for a crashed one
+            path = os.path.join(self.directory, f'session-{os.getpid()}-{time.time_ns()}')
+            self._lock = _lock_session(path)
+            if self._lock is not None:
+                os.makedirs(path, exist_ok=True)
+                self.session_directory = path
+
+    def __start(self, compact: bool) -> None:
+        self._writer = _JournalWriter(self.sync_interval)
+        self._writer.start()
+        self._segment_seq = None
+        self._checkpoint_seq = None
+        self._written_seq = None
+        # A fresh checkpoint makes the previous session's files obsolete. Without
+        # one to replace, it waits for the first change, which keeps startup cheap.
+        if compact:
+            self.checkpoint()
+
+    def __restore(self, path: str, checkpoint_seq: int) -> int:
+        from blackbox.core.columnar import ColumnarStore
+
+        changes = []
+        for _, segment in self.__files(_SEGMENT):
+            for seq, change in read_records(segment):
+                self._seq = max(self._seq, seq)
+                if seq > checkpoint_seq:
+                    changes.append(change)
+
+        # Content replaced after the checkpoint cannot be rebuilt from it
+        reset = next((i for i, change in enumerate(changes) if isinstance(change, TableReset)), None)
+        if reset is not None:
+            logger.warning("Journal: {} changes after a reload are not recoverable", len(changes) - reset)
+            changes = changes[:reset]
+
+        df = ColumnarStore().read_bundle(path)
+        logic = self.table.logic
+        logic.handle_data_loaded(df)
+        logic.finish_loading()
+        for change in changes:
+            logic.apply_change(change)
+        telemetry.count('journal.recovered', len(changes))
+        logger.info("Recovered the table from {} and {} journaled changes", path, len(changes))
+        return len(changes)
+
+    def __open_segment(self, seq: int) -> None:
+        self._segment_seq = seq
+        self._log_bytes = 0
+        self._writer.append(os.path.join(self.session_directory, _segment_name(seq)))
+
+    def __on_table_changed(self, change: TableChange) -> None:
+        if not self.is_recording():
+            return
+        self._seq += 1
+        if self._checkpoint_seq is None:
+            # There is no state to replay the change on yet, the checkpoint includes it
+            self.checkpoint()
+            return
+        if self._segment_seq is None:
+            self.__open_segment(self._seq)
+        record = encode_record(self._seq, change)
+        self._writer.append(record)
+        self._log_bytes += len(record)
+        telemetry.count('journal.bytes', len(record))
+
+        if isinstance(change, TableReset):
+            self._checkpoint_timer.start()
+        elif self._log_bytes >= self.checkpoint_bytes and not self._checkpoint_timer.isActive():
+            QTimer.singleShot(0, self.checkpoint)
+
+    def __on_checkpoint_written(self, seq: int) -> None:
+        if self._writer is None:
+            # Closed while the checkpoint was written; a discarded journal is gone
+            return
+        self._written_seq = seq
+        for old, path in self.__files(_CHECKPOINT):
+            if old < seq:
+                self.__remove(path)
+        for first, path in self.__files(_SEGMENT):
+            if first <= seq:
+                self.__remove(path)
+        self.checkpoint_written.emit(seq)
+
+    def __on_checkpoint_failed(self, error: str) -> None:
+        # The segments since the last written checkpoint stay, so nothing is
+        # lost; without one, the next change triggers another attempt
+        logger.warning("Journal checkpoint failed, keeping the log since the previous one: {}", error)
+        self._checkpoint_seq = self._written_seq
+        self.checkpoint_failed.emit(error)
+
+    def __on_thread_finished(self, thread: QThread, worker: _CheckpointWorker) -> None:
+        self._checkpoint_thread = None
+        worker.deleteLater()
+        thread.deleteLater()
+        if self._checkpoint_pending:
+            self._checkpoint_pending = False
+            self.checkpoint()
+
+    def __files(self, pattern: re.Pattern) -> list[tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.session_directory):
+            match = pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.session_directory, name)))
+        return sorted(found)
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning("Could not remove {}: {}", path, e)
+
+    @staticmethod
+    def __remove_directory(path: str) -> None:
+        # Only empty: files that were not ours to remove stay
+        try:
+            os.rmdir(path)
+        except OSError as e:
+            logger.warning("Could not remove {}: {}", path, e)
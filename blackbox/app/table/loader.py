@@ -1,39 +1,45 @@
+from __future__ import annotations
+
 import os
+import threading
 
-import pandas as pd
-from PyQt6.QtCore import pyqtSignal
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
 from PyQt6.QtWidgets import QFileDialog, QWidget
 
 from blackbox.app.static import label
-
-
-class ExcelLoader:
-
-    def __init__(self, parent=None):
+from blackbox.core import telemetry
+from blackbox.core.io import TableReader
+from blackbox.core.lazy import lazy_import
+from blackbox.core.workbook import is_workbook, sheet_names
+
+pd = lazy_import('pandas')
+
+
+class ExcelLoader(TableReader):
+    """
+    Reads table files chosen in a file dialog, see blackbox.core.io.TableReader.
+    """
+
+    def __init__(self, parent=None, typed: bool = False):
+        """
+        Args:
+            parent (QWidget, optional): Parent of the file dialog.
+            typed (bool, optional): Store numbers and dates natively, repeated text
+                                    dictionary-encoded and empty cells as nulls instead
+                                    of every cell as a string, see blackbox.core.typed.
+                                    Defaults to False.
+        """
+        super().__init__(typed)
         self.parent = parent
 
-    def read_excel(self, path) -> pd.DataFrame:
-        try:
-            # Read Excel with dtype=str, then replace 'nan' strings and actual NaN
-            df = pd.read_excel(
-                path,
-                dtype=str,
-                na_values=['', 'nan', 'NaN', 'N/A', 'NA'],  # Treat these as NaN
-                keep_default_na=True
-            )
-            
-            df = df.fillna('')
-            df = df.replace(['nan', 'NaN'], '')
-            return df
-        except Exception as e:
-            print(f"Error reading Excel file: {e}")
-            return pd.DataFrame()
-
     def load_file_dialog(self) -> str:
         directory: str = os.getcwd()
         initial_filter: str = 'Excel File (*.xlsx *.xls)'
         dialog_label: str = label('table_loader.dialog')
-        file_filter: str = 'Data File (*.xlsx *.csv *.data);; Excel File (*.xlsx *.xls)'
+        file_filter: str = ('Data File (*.xlsx *.csv *.data *.arrow *.feather *.parquet *.npz '
+                            '*.sqlite *.sqlite3 *.db);; '
+                            'Excel File (*.xlsx *.xls)')
 
         path, _ = QFileDialog.getOpenFileName(
             parent=self.parent,
@@ -48,28 +54,198 @@ class ExcelLoader:
     def load(self) -> pd.DataFrame:
         path = self.load_file_dialog()
         if path:
-            return self.read_excel(path)
+            return self.read(path)
         return pd.DataFrame()
 
 
-class LoaderWidgetBase(QWidget):
-    data_loaded = pyqtSignal(pd.DataFrame)
+class _LoadWorker(QObject):
+    """
+    Reads one file on a background thread and streams its row blocks back.
+    """
+    sheets_listed = pyqtSignal(list)
+    chunk_loaded = pyqtSignal(object)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, excel_loader: ExcelLoader, path: str):
+        super().__init__()
+        self.excel_loader = excel_loader
+        self.path = path
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Stops the load at the next chunk boundary.
+        A workbook that is being parsed is dropped once openpyxl returns.
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        rows = 0
+        try:
+            with telemetry.span('load'):
+                # Only the first sheet of a workbook is read, the others are listed
+                self.sheets_listed.emit(sheet_names(self.path) if is_workbook(self.path) else [])
+                chunks = self.excel_loader.read_chunks(self.path, self.progress.emit)
+                while True:
+                    with telemetry.span('parse'):
+                        df = next(chunks, None)
+                    if df is None:
+                        break
+                    if self.is_cancelled():
+                        chunks.close()
+                        telemetry.count('load.cancelled')
+                        logger.info("Loading of {} cancelled", self.path)
+                        return
+                    rows += len(df)
+                    self.chunk_loaded.emit(df)
+            telemetry.count('load.rows', rows)
+        except Exception as e:
+            logger.exception("Error reading file {}", self.path)
+            self.failed.emit(str(e))
+            return
+        finally:
+            self.thread().quit()
+
+        self.finished.emit(rows)
 
-    def __init__(self, parent=None):
+
+class LoaderWidgetBase(QWidget):
+    """
+    Loads files chosen by the user and hands the data to connected tables.
+
+    Files are parsed on a worker thread, so the GUI keeps repainting and
+    accepting input during long loads. Opening another file cancels the load
+    in flight and drops anything it still delivers.
+
+    Of a workbook only the first sheet is read; sheets_listed names all of
+    them, see blackbox.app.table.workbook.SheetTabBar.
+
+    Signals:
+        sheets_listed (str, list): The path and sheet names of a workbook, emitted
+                                   before data_loaded; empty for other files.
+        data_loaded (pd.DataFrame): The first block of a file.
+        data_appended (pd.DataFrame): Every following block of a streamed file.
+        load_progress (int, int): Bytes read so far and the file size.
+        load_finished (int): Total number of rows read.
+        load_failed (str): The error that stopped the load.
+    """
+    sheets_listed = pyqtSignal(str, list)
+    data_loaded = pyqtSignal(object)
+    data_appended = pyqtSignal(object)
+    load_progress = pyqtSignal(int, int)
+    load_finished = pyqtSignal(int)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None, typed: bool = False):
         super().__init__(parent)
-        self.excel_loader = ExcelLoader(self)
+        self.excel_loader = ExcelLoader(self, typed)
+        self._worker: _LoadWorker = None
+        self._threads: set[QThread] = set()
+        self._first_chunk = True
+
+    def load(self) -> str:
+        """
+        Asks for a file and starts loading it in the background.
+
+        Returns:
+            str: The selected path, or an empty string if the dialog was cancelled.
+        """
+        path = self.excel_loader.load_file_dialog()
+        if path:
+            self.load_path(path)
+        return path
 
-    def load(self) -> pd.DataFrame:
-        df = self.excel_loader.load()
-        if not df.empty:
+    def load_path(self, path: str) -> None:
+        """
+        Starts loading a file in the background, cancelling any load in flight.
+
+        Args:
+            path (str): Path to the file.
+        """
+        self.cancel()
+
+        thread = QThread()
+        worker = _LoadWorker(self.excel_loader, path)
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        worker.sheets_listed.connect(self.__on_sheets_listed)
+        worker.chunk_loaded.connect(self.__on_chunk_loaded)
+        worker.progress.connect(self.__on_progress)
+        worker.finished.connect(self.__on_finished)
+        worker.failed.connect(self.__on_failed)
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+
+        self._worker = worker
+        self._first_chunk = True
+        self._threads.add(thread)
+        thread.start()
+        logger.info("Loading {}", path)
+
+    def is_loading(self) -> bool:
+        return self._worker is not None
+
+    def cancel(self, wait: bool = False) -> None:
+        """
+        Cancels the load in flight, if any.
+
+        Args:
+            wait (bool, optional): If True, blocks until every loader thread has
+                                   stopped. Defaults to False.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if wait:
+            for thread in list(self._threads):
+                thread.wait()
+
+    def __is_current(self) -> bool:
+        worker = self.sender()
+        return worker is not None and worker is self._worker and not worker.is_cancelled()
+
+    def __on_sheets_listed(self, names: list) -> None:
+        if self.__is_current():
+            self.sheets_listed.emit(self.sender().path, names)
+
+    def __on_chunk_loaded(self, df: pd.DataFrame) -> None:
+        if not self.__is_current():
+            return
+        if self._first_chunk:
+            self._first_chunk = False
             self.data_loaded.emit(df)
-            return df
-        return pd.DataFrame()
+        elif not df.empty:
+            self.data_appended.emit(df)
+
+    def __on_progress(self, done: int, total: int) -> None:
+        if self.__is_current():
+            self.load_progress.emit(done, total)
+
+    def __on_finished(self, rows: int) -> None:
+        if self.__is_current():
+            self._worker = None
+            self.load_finished.emit(rows)
+            logger.info("Loaded {} rows", rows)
+
+    def __on_failed(self, message: str) -> None:
+        if self.__is_current():
+            self._worker = None
+            self.load_failed.emit(message)
+
+    def __on_thread_finished(self, thread: QThread, worker: _LoadWorker) -> None:
+        self._threads.discard(thread)
+        worker.deleteLater()
+        thread.deleteLater()
 
 
 class LoaderFromMenuWidget(LoaderWidgetBase):
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self, parent=None, typed: bool = False):
+        super().__init__(parent, typed)
 
-    def load_from_menu(self) -> pd.DataFrame:
+    def load_from_menu(self) -> str:
         return self.load()
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+from loguru import logger
+from PyQt6.QtCore import QAbstractItemModel, QAbstractTableModel, QMimeData, QModelIndex, Qt, pyqtSignal
+
+from blackbox.core import frame, typed
+from blackbox.core.changes import move_order
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class DataFrameModel(QAbstractTableModel):
+    """
+    A virtual table model backed by a pandas DataFrame.
+
+    The model never materialises per-cell objects: every column is kept as the
+    NumPy array the DataFrame already holds and cells are formatted only when
+    the view asks for them, which in practice means only the visible viewport.
+
+    Shape-changing operations (row/column insert and remove, row moves) rebind
+    the underlying frame, so always use `get_dataframe()` to read the current
+    state back.
+
+    Signals:
+        rows_permuted (np.ndarray): Emitted by permute_rows() with the order
+                                    applied, so proxies can follow the rows.
+    """
+    rows_permuted = pyqtSignal(object)
+
+    ROWS_MIME_TYPE = 'application/x-blackbox-rows'
+
+    def __init__(self, df: pd.DataFrame = None, parent=None):
+        super().__init__(parent)
+        self._df: pd.DataFrame = pd.DataFrame()
+        self._columns: list[np.ndarray] = []
+        # Display format of every datetime column, None for other columns
+        self._formats: list[str] = []
+        if df is not None:
+            self.set_dataframe(df)
+
+    # --- DataFrame round-trip ---
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the DataFrame backing the model without copying it.
+        """
+        return self._df
+
+    def set_dataframe(self, df: pd.DataFrame, copy: bool = False) -> None:
+        """
+        Replaces the data shown by the model.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to display.
+            copy (bool, optional): If True, the model works on a private copy.
+                                   If False, `df` is used as-is. Defaults to False.
+        """
+        self.beginResetModel()
+        self._df = df.copy() if copy else df
+        self._refresh_columns()
+        self.endResetModel()
+        logger.debug("DataFrame set on model: {} x {}", self._df.shape[0], self._df.shape[1])
+
+    def append_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Appends rows below the current data, matching columns by position.
+
+        Args:
+            df (pd.DataFrame): The rows to append.
+        """
+        if df.empty:
+            return
+        first = self._df.shape[0]
+        self.beginInsertRows(QModelIndex(), first, first + len(df) - 1)
+        self._rebind(frame.append_rows(self._df, df))
+        self.endInsertRows()
+
+    def _refresh_columns(self, col: int = None) -> None:
+        if col is None:
+            self._columns = [self._column_array(j) for j in range(self._df.shape[1])]
+            self._formats = [self._column_format(values) for values in self._columns]
+        else:
+            self._columns[col] = self._column_array(col)
+            self._formats[col] = self._column_format(self._columns[col])
+
+    def _column_array(self, col: int):
+        # Extension arrays (Arrow-backed, memory-mapped or typed columns) and
+        # dates are read cell by cell instead of being converted to a NumPy array up front
+        column = self._df.iloc[:, col]
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind != 'M':
+            return column.to_numpy()
+        return column.array
+
+    @staticmethod
+    def _column_format(values) -> str:
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            return typed.datetime_format(values)
+        return None
+
+    def _rebind(self, df: pd.DataFrame) -> None:
+        self._df = df
+        self._refresh_columns()
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        # len() of the axes is much cheaper than DataFrame.shape, and views ask often
+        return 0 if parent.isValid() else len(self._df.index)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._df.columns)
+
+    @staticmethod
+    def format_value(value) -> str:
+        """
+        Converts a stored value to the text shown in the view.
+        """
+        return typed.format_value(value)
+
+    def cell_text(self, row: int, col: int) -> str:
+        value = self._columns[col][row]
+        date_format = self._formats[col]
+        if date_format is not None and not pd.isna(value):
+            return value.strftime(date_format)
+        return typed.format_value(value)
+
+    def column_texts(self, col: int, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        Returns the display text of the cells `start` to `stop` of a column,
+        by default the whole column. String columns are returned as they are
+        stored, without copying.
+        """
+        return typed.column_texts(self._columns[col][start:stop], self._formats[col])
+
+    def column_values(self, col: int):
+        """
+        Returns a column as stored, a NumPy or extension array, for vectorized sorting and filtering.
+        """
+        return self._columns[col]
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.cell_text(index.row(), index.column())
+        return None
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row, col = index.row(), index.column()
+        if getattr(self._columns[col], 'writes_in_place', False):
+            # Lazily read columns (SQLite) keep edits themselves
+            self._columns[col][row] = value
+        else:
+            if self._df.dtypes.iloc[col] != object:
+                # Typed, read-only (memory-mapped) or immutable columns become plain
+                # object columns instead of pandas guessing a type for the text
+                self._df.isetitem(col, frame.object_column(self._df, col, self._formats[col]))
+            self._df.iat[row, col] = value
+            self._refresh_columns(col)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def set_cells(self, rows: np.ndarray, cols: np.ndarray, values) -> None:
+        """
+        Writes many cells at once, one column array at a time, and emits a
+        single dataChanged covering all of them.
+
+        Args:
+            rows (np.ndarray): Row of every cell.
+            cols (np.ndarray): Column of every cell.
+            values: New value of every cell.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if not len(rows):
+            return
+
+        for col in frame.write_cells(self._df, rows, cols, values):
+            self._refresh_columns(col)
+
+        top_left = self.index(int(rows.min()), int(cols.min()))
+        bottom_right = self.index(int(rows.max()), int(cols.max()))
+        self.dataChanged.emit(top_left, bottom_right, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            if 0 <= section < self._df.shape[1]:
+                return str(self._df.columns[section])
+            return None
+        return str(section + 1)
+
+    def setHeaderData(self, section: int, orientation: Qt.Orientation, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if orientation != Qt.Orientation.Horizontal or not 0 <= section < self._df.shape[1]:
+            return False
+        columns = list(self._df.columns)
+        columns[section] = value
+        self._df.columns = columns
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+    def header_labels(self) -> list[str]:
+        return [str(c) for c in self._df.columns]
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable
+                | Qt.ItemFlag.ItemIsDragEnabled | Qt.ItemFlag.ItemIsDropEnabled)
+
+    # --- Drag and drop ---
+
+    def supportedDropActions(self) -> Qt.DropAction:
+        return Qt.DropAction.MoveAction
+
+    def mimeTypes(self) -> list[str]:
+        return [self.ROWS_MIME_TYPE]
+
+    def mimeData(self, indexes) -> QMimeData:
+        """
+        Rows are moved by the view itself, so the payload only has to identify
+        the drag; encoding every selected cell is skipped on purpose.
+        """
+        mime = QMimeData()
+        mime.setData(self.ROWS_MIME_TYPE, b'')
+        return mime
+
+    # --- Structural changes ---
+
+    def insertRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if count <= 0 or not 0 <= row <= self._df.shape[0]:
+            return False
+        self.beginInsertRows(parent, row, row + count - 1)
+        self._rebind(frame.insert_rows(self._df, row, count))
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if count <= 0 or row < 0 or row + count > self._df.shape[0]:
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self._rebind(frame.remove_rows(self._df, row, count))
+        self.endRemoveRows()
+        return True
+
+    def insertColumns(self, column: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if count <= 0 or not 0 <= column <= self._df.shape[1]:
+            return False
+        self.beginInsertColumns(parent, column, column + count - 1)
+        for offset in range(count):
+            name = f'__new_{len(self._df.columns)}'
+            self._df.insert(column + offset, name, '', allow_duplicates=True)
+            self._df.isetitem(column + offset, self._df.iloc[:, column + offset].astype(object))
+        self._refresh_columns()
+        self.endInsertColumns()
+        return True
+
+    def insert_columns(self, column: int, labels: list[str], values: list[np.ndarray] = None) -> None:
+        """
+        Inserts named columns, blank or filled with the given values.
+
+        Args:
+            column (int): Index of the first inserted column.
+            labels (list[str]): Header label of every inserted column.
+            values (list[np.ndarray], optional): Content of every inserted column.
+        """
+        if not labels:
+            return
+        self.beginInsertColumns(QModelIndex(), column, column + len(labels) - 1)
+        frame.insert_columns(self._df, column, labels, values)
+        self._refresh_columns()
+        self.endInsertColumns()
+
+    def removeColumns(self, column: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if count <= 0 or column < 0 or column + count > self._df.shape[1]:
+            return False
+        self.beginRemoveColumns(parent, column, column + count - 1)
+        self._df = frame.remove_columns(self._df, column, count)
+        self._refresh_columns()
+        self.endRemoveColumns()
+        return True
+
+    def move_rows(self, rows: list[int], target: int) -> None:
+        """
+        Moves the given rows so they are placed before `target`.
+
+        Args:
+            rows (list[int]): Source row indices, in the order they should land.
+            target (int): Insertion point expressed in pre-move row indices.
+        """
+        self.permute_rows(move_order(self._df.shape[0], rows, target))
+
+    def permute_rows(self, order: np.ndarray) -> None:
+        """
+        Reorders the rows so that new row `i` is current row `order[i]`.
+
+        Every column is gathered once with the permutation and the views are
+        told about it with a single layout change; persistent indexes such as
+        the current cell follow their rows.
+        """
+        order = np.asarray(order, dtype=np.int64)
+        self.layoutAboutToBeChanged.emit([], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+
+        persistent = self.persistentIndexList()
+        self._rebind(frame.permute_rows(self._df, order))
+        self.rows_permuted.emit(order)
+
+        if persistent:
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            rows = inverse[[index.row() for index in persistent]].tolist()
+            moved = [self.index(row, index.column()) for row, index in zip(rows, persistent)]
+            self.changePersistentIndexList(persistent, moved)
+
+        self.layoutChanged.emit([], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
@@ -0,0 +1,518 @@
+"""
+Sorting and filtering of table rows without moving the data.
+
+Sort keys and filters are evaluated a whole column at a time with NumPy and
+give an array of row indices: the rows to show, in the order to show them.
+TableView shows that array through SortFilterProxyModel, which only maps view
+rows to rows of its DataFrameModel, so neither the frame nor any cell moves.
+
+Sorting is stable and type-aware: within a column numbers come first in
+numeric order, then text in case-insensitive order, and empty cells always
+come last, in either direction. Dates and other typed columns sort by value.
+
+Filter expressions, one per column; a row is shown if it passes all of them:
+
+    text        the cell contains `text`, ignoring case
+    =text       the cell is `text`, ignoring case; `=` alone keeps empty cells
+    !=text      the cell is not `text`; `!=` alone keeps filled cells
+    >x  >=x     the cell is above x: numerically if x is a number, by date in
+    <x  <=x     a date column and case-insensitively as text otherwise
+    ~regex      the cell contains a match of the regular expression, ignoring case
+    !~regex     the cell does not
+"""
+from __future__ import annotations
+
+import operator
+import re
+
+from PyQt6.QtCore import QAbstractItemModel, QAbstractTableModel, QMimeData, QModelIndex, Qt
+
+from blackbox.core.lazy import lazy_import
+from blackbox.core.typed import column_texts
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Rank of empty cells, which sort last in both directions
+EMPTY_RANK: int = 2 ** 63 - 1
+
+# Longest operators first, so '>=' is not read as '>' followed by '='
+_OPERATORS = ('>=', '<=', '!=', '!~', '>', '<', '=', '~')
+_COMPARISONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+# Code points of the characters a number can start with, see parse_numbers;
+# a tuple rather than an array, so that importing this module needs no NumPy
+_NUMBER_START = tuple(map(ord, '0123456789+-. \t'))
+
+
+def parse_numbers(texts: np.ndarray) -> np.ndarray:
+    """
+    Reads the numbers among cell texts.
+
+    Args:
+        texts (np.ndarray): Non-empty cell texts, as an object or unicode array.
+
+    Returns:
+        np.ndarray: float64 value of every text, NaN where it is not a number.
+    """
+    try:
+        return np.asarray(texts).astype(np.float64)
+    except (TypeError, ValueError):
+        pass
+    # Only texts starting like a number are handed to the slower, forgiving parser
+    chars = np.asarray(texts, dtype=str)
+    first = chars.view(np.uint32).reshape(len(chars), -1)[:, 0]
+    candidates = np.flatnonzero(np.isin(first, _NUMBER_START))
+    numbers = np.full(len(texts), np.nan)
+    if len(candidates):
+        numbers[candidates] = pd.to_numeric(chars[candidates], errors='coerce').astype(np.float64)
+    return numbers
+
+
+def sort_ranks(values) -> np.ndarray:
+    """
+    Ranks the cells of a column in sort order.
+
+    Args:
+        values: The column as stored, a NumPy or extension array, or its cell texts.
+
+    Returns:
+        np.ndarray: int64 rank of every cell; equal cells share a rank and
+                    empty cells get EMPTY_RANK.
+    """
+    array = values.array if isinstance(values, pd.Series) else values
+    dtype = array.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Rank every category once, then look the cells up by code
+        ranks = sort_ranks(array.categories.to_numpy())
+        return np.append(ranks, EMPTY_RANK)[array.codes]
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        stamps = pd.DatetimeIndex(array)
+        return _dense_ranks(stamps.asi8, stamps.isna())
+    if isinstance(array, np.ndarray) and dtype.kind in 'iub':
+        return _dense_ranks(array, np.zeros(len(array), dtype=bool))
+    if isinstance(array, np.ndarray) and dtype.kind == 'f':
+        return _dense_ranks(array, np.isnan(array))
+    if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        numbers = array.to_numpy(dtype=np.float64, na_value=np.nan)
+        return _dense_ranks(numbers, np.isnan(numbers))
+    return _text_ranks(np.asarray(column_texts(array), dtype=object))
+
+
+def _dense_ranks(keys: np.ndarray, empty: np.ndarray) -> np.ndarray:
+    ranks = np.full(len(keys), EMPTY_RANK, dtype=np.int64)
+    filled = ~empty
+    ranks[filled] = np.unique(keys[filled], return_inverse=True)[1]
+    return ranks
+
+
+def _text_ranks(texts: np.ndarray) -> np.ndarray:
+    # Rank every distinct text once; repetitive columns have only a few
+    codes, distinct = pd.factorize(texts)
+    ranks = np.full(len(distinct), EMPTY_RANK, dtype=np.int64)
+    filled = np.flatnonzero(distinct != '')
+    if not len(filled):
+        return ranks[codes]
+
+    numbers = parse_numbers(distinct[filled])
+    is_number = ~np.isnan(numbers)
+    values, ranks[filled[is_number]] = np.unique(numbers[is_number], return_inverse=True)
+
+    words = filled[~is_number]
+    if len(words):
+        lowered = pd.Series(distinct[words], dtype=object, copy=False).str.lower().to_numpy(dtype=str)
+        ranks[words] = np.unique(lowered, return_inverse=True)[1] + len(values)
+    return ranks[codes]
+
+
+def sort_rows(ranks: list[np.ndarray], ascending: list[bool], rows: np.ndarray = None) -> np.ndarray:
+    """
+    Sorts rows by several keys at once. The sort is stable, so rows that tie
+    on every key keep their current order.
+
+    Args:
+        ranks (list[np.ndarray]): sort_ranks() of every key column, most significant first.
+        ascending (list[bool]): Direction of every key.
+        rows (np.ndarray, optional): The rows to sort. Defaults to all rows.
+
+    Returns:
+        np.ndarray: The rows in sorted order.
+    """
+    if rows is None:
+        rows = np.arange(len(ranks[0]) if ranks else 0, dtype=np.int64)
+    keys = []
+    for rank, up in zip(ranks, ascending):
+        key = rank[rows]
+        if not up:
+            key = np.where(key == EMPTY_RANK, EMPTY_RANK, -key)
+        keys.append(key)
+    if not keys:
+        return rows
+    # np.lexsort sorts by its last key first
+    return rows[np.lexsort(keys[::-1])]
+
+
+class ColumnFilter:
+    """
+    A filter expression of one column, see the module docstring.
+
+    Args:
+        expression (str): The expression.
+
+    Raises:
+        ValueError: If the expression holds an invalid regular expression.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        text = expression.strip()
+        self.operator = next((op for op in _OPERATORS if text.startswith(op)), '')
+        self.operand = text[len(self.operator):].strip()
+        self.pattern: re.Pattern = None
+        if self.operator in ('~', '!~'):
+            try:
+                self.pattern = re.compile(self.operand, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}") from e
+
+    def match(self, values) -> np.ndarray:
+        """
+        Tests every cell of a column against the expression.
+
+        Args:
+            values: The column as stored, a NumPy or extension array, or its cell texts.
+
+        Returns:
+            np.ndarray: Boolean mask of the cells that pass.
+        """
+        texts = np.asarray(column_texts(values), dtype=object)
+        op, operand = self.operator, self.operand
+        series = pd.Series(texts, dtype=object, copy=False)
+
+        if not op:
+            if not operand:
+                return np.ones(len(texts), dtype=bool)
+            return series.str.contains(operand, case=False, regex=False).to_numpy(dtype=bool)
+
+        if op in ('~', '!~'):
+            mask = series.str.contains(self.pattern).to_numpy(dtype=bool)
+            return mask if op == '~' else ~mask
+
+        if op in ('=', '!='):
+            if not operand:
+                mask = texts == ''
+            else:
+                mask = (series.str.lower() == operand.lower()).to_numpy(dtype=bool)
+                number = _number(operand)
+                if number is not None:
+                    mask |= _numbers(values, texts) == number
+            return mask if op == '=' else ~mask
+
+        compare = _COMPARISONS[op]
+        number = _number(operand)
+        if number is not None:
+            return compare(_numbers(values, texts), number)
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            try:
+                bound = pd.Timestamp(operand)
+            except ValueError:
+                pass
+            else:
+                stamps = pd.DatetimeIndex(values)
+                return np.asarray(compare(stamps, bound), dtype=bool) & ~stamps.isna()
+        lowered = series.str.lower().to_numpy(dtype=str)
+        return compare(lowered, operand.lower()) & (texts != '')
+
+
+def _number(text: str) -> float:
+    numbers = parse_numbers(np.array([text], dtype=object))
+    return None if np.isnan(numbers[0]) else float(numbers[0])
+
+
+def _numbers(values, texts: np.ndarray) -> np.ndarray:
+    """
+    Returns the number in every cell of a column, NaN for the others.
+    """
+    array = values.array if isinstance(values, pd.Series) else values
+    if isinstance(array, np.ndarray) and array.dtype.kind in 'iufb':
+        return array.astype(np.float64)
+    if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        return array.to_numpy(dtype=np.float64, na_value=np.nan)
+    numbers = np.full(len(texts), np.nan)
+    filled = np.flatnonzero(texts != '')
+    if len(filled):
+        numbers[filled] = parse_numbers(texts[filled])
+    return numbers
+
+
+class SortFilterProxyModel(QAbstractTableModel):
+    """
+    Shows the rows of a DataFrameModel in the order of an index array.
+
+    It is a table model with the mapping methods of QAbstractProxyModel rather
+    than a QAbstractProxyModel, so index() and parent() stay in C++: views call
+    them for every selection range.
+
+    Unlike QSortFilterProxyModel it never compares cells itself: the table
+    logic computes the rows with sort_rows() and ColumnFilter and hands them
+    over with set_rows(). Until then every row is shown in source order
+    without any mapping array.
+
+    Rows inserted into the source show up in front of the row that followed
+    them, removed rows disappear, and edited cells stay where they are until
+    the next sort, as in a spreadsheet. Persistent indexes, such as the
+    selection and the current cell, follow their rows through every change.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # View row -> source row and source row -> view row (-1 if hidden), None while unmapped
+        self._rows: np.ndarray = None
+        self._inverse: np.ndarray = None
+        self._ordered = False
+        self._source = None
+        # Views ask for the counts on every index they build, so they are kept at hand
+        self._row_count = 0
+        self._column_count = 0
+
+    def sourceModel(self):
+        return self._source
+
+    def setSourceModel(self, model) -> None:
+        self.beginResetModel()
+        self._source = model
+        self._rows = self._inverse = None
+        self.__refresh_counts()
+        self.endResetModel()
+        model.dataChanged.connect(self.__on_data_changed)
+        model.headerDataChanged.connect(self.__on_header_changed)
+        model.rowsAboutToBeInserted.connect(self.__on_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self.__on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.__on_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.__on_rows_removed)
+        model.columnsAboutToBeInserted.connect(lambda _, first, last: self.beginInsertColumns(QModelIndex(), first, last))
+        model.columnsInserted.connect(lambda: (self.__refresh_counts(), self.endInsertColumns()))
+        model.columnsAboutToBeRemoved.connect(lambda _, first, last: self.beginRemoveColumns(QModelIndex(), first, last))
+        model.columnsRemoved.connect(lambda: (self.__refresh_counts(), self.endRemoveColumns()))
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.__on_model_reset)
+        model.rows_permuted.connect(self.__on_rows_permuted)
+
+    # --- Mapping ---
+
+    def set_rows(self, rows: np.ndarray = None, ordered: bool = False) -> None:
+        """
+        Shows the given source rows, in the given order.
+
+        Args:
+            rows (np.ndarray, optional): Source rows to show. Defaults to all rows in source order.
+            ordered (bool, optional): True if `rows` is a sort order that rows
+                                      moved in the source should not change. Defaults to False.
+        """
+        self._ordered = ordered and rows is not None
+        if rows is None and self._rows is None:
+            return
+        self.__relayout(None if rows is None else np.array(rows, dtype=np.int64))
+
+    def is_mapped(self) -> bool:
+        return self._rows is not None
+
+    def source_rows(self, rows) -> np.ndarray:
+        """
+        Returns the source row shown at every given view row.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows if self._rows is None else self._rows[rows]
+
+    def view_rows(self, rows) -> np.ndarray:
+        """
+        Returns the view row of every given source row, -1 for hidden rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows if self._rows is None else self._inverse[rows]
+
+    def __refresh_counts(self) -> None:
+        self._column_count = self._source.columnCount()
+        self._row_count = self._source.rowCount() if self._rows is None else len(self._rows)
+
+    def __update_inverse(self, source_count: int) -> None:
+        self.__refresh_counts()
+        if self._rows is None:
+            self._inverse = None
+            return
+        self._inverse = np.full(source_count, -1, dtype=np.int64)
+        self._inverse[self._rows] = np.arange(len(self._rows))
+
+    def __relayout(self, rows: np.ndarray, source_map: np.ndarray = None) -> None:
+        """
+        Replaces the mapping with one layout change; persistent indexes follow
+        their source rows, through `source_map` if the source rows moved.
+        """
+        self.layoutAboutToBeChanged.emit([], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+        persistent = self.persistentIndexList()
+        sources = self.source_rows([index.row() for index in persistent])
+        if source_map is not None:
+            sources = source_map[sources]
+
+        self._rows = rows
+        self.__update_inverse(self._source.rowCount())
+
+        if persistent:
+            views = self.view_rows(sources).tolist()
+            moved = [self.index(row, index.column()) if row >= 0 else QModelIndex()
+                     for row, index in zip(views, persistent)]
+            self.changePersistentIndexList(persistent, moved)
+        self.layoutChanged.emit([], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+
+    # --- Source changes ---
+
+    def __on_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles) -> None:
+        rows = self.view_rows(np.arange(top_left.row(), bottom_right.row() + 1))
+        rows = rows[rows >= 0]
+        if len(rows):
+            self.dataChanged.emit(self.index(int(rows.min()), top_left.column()),
+                                  self.index(int(rows.max()), bottom_right.column()), roles)
+
+    def __on_header_changed(self, orientation: Qt.Orientation, first: int, last: int) -> None:
+        if orientation == Qt.Orientation.Horizontal:
+            self.headerDataChanged.emit(orientation, first, last)
+
+    def __on_rows_about_to_be_inserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def __on_rows_inserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.__refresh_counts()
+            self.endInsertRows()
+            return
+        # New rows go in front of the first shown row that followed them
+        count = last - first + 1
+        following = np.flatnonzero(self._inverse[first:] >= 0)
+        at = int(self._inverse[first + following[0]]) if len(following) else len(self._rows)
+        self._rows[self._rows >= first] += count
+
+        self.beginInsertRows(QModelIndex(), at, at + count - 1)
+        self._rows = np.insert(self._rows, at, np.arange(first, last + 1))
+        self.__update_inverse(self._source.rowCount())
+        self.endInsertRows()
+
+    def __on_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        shown = self._inverse[first:last + 1]
+        shown = np.sort(shown[shown >= 0])
+        count = self._source.rowCount()
+        if not len(shown):
+            return
+        if shown[-1] - shown[0] + 1 == len(shown):
+            self.beginRemoveRows(QModelIndex(), int(shown[0]), int(shown[-1]))
+            self._rows = np.delete(self._rows, slice(int(shown[0]), int(shown[-1]) + 1))
+            self.__update_inverse(count)
+            self.endRemoveRows()
+        else:
+            # Rows scattered over the view are dropped in one layout change
+            self.__relayout(np.delete(self._rows, shown))
+
+    def __on_rows_removed(self, parent: QModelIndex, first: int, last: int) -> None:
+        if self._rows is None:
+            self.__refresh_counts()
+            self.endRemoveRows()
+            return
+        self._rows[self._rows > last] -= last - first + 1
+        self.__update_inverse(self._source.rowCount())
+
+    def __on_model_reset(self) -> None:
+        self._rows = self._inverse = None
+        self._ordered = False
+        self.__refresh_counts()
+        self.endResetModel()
+
+    def __on_rows_permuted(self, order: np.ndarray) -> None:
+        """
+        Source row `order[i]` moved to row `i`. A sorted view keeps showing
+        the same rows in the same order; otherwise the view follows the source.
+        """
+        moved_to = np.empty_like(order)
+        moved_to[order] = np.arange(len(order))
+        rows = None
+        if self._rows is not None:
+            rows = moved_to[self._rows]
+            if not self._ordered:
+                rows.sort()
+        self.__relayout(rows, moved_to)
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._column_count
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self._rows is None else int(self._rows[proxy_index.row()])
+        return self._source.index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row() if self._rows is None else int(self._inverse[source_index.row()])
+        return self.index(row, source_index.column()) if row >= 0 else QModelIndex()
+
+    def insertRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid() or not 0 <= row <= self.rowCount():
+            return False
+        at = self._source.rowCount() if row == self.rowCount() else int(self.source_rows([row])[0])
+        return self._source.insertRows(at, count)
+
+    def removeRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid() or count < 1 or not 0 <= row <= row + count <= self.rowCount():
+            return False
+        rows = np.sort(self.source_rows(np.arange(row, row + count)))
+        # One call per run of consecutive source rows, bottom up so the others stay valid
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+        for run in reversed(runs):
+            self._source.removeRows(int(run[0]), len(run))
+        return True
+
+    def insertColumns(self, column: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._source.insertColumns(column, count)
+
+    def removeColumns(self, column: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._source.removeColumns(column, count)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        # Views ask for a dozen roles per painted cell; a DataFrameModel only has text
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole) or not index.isValid():
+            return None
+        row = index.row() if self._rows is None else int(self._rows[index.row()])
+        return self._source.cell_text(row, index.column())
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        return self._source.setData(self.mapToSource(index), value, role)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        return self._source.flags(self.mapToSource(index))
+
+    def supportedDropActions(self) -> Qt.DropAction:
+        return self._source.supportedDropActions()
+
+    def mimeTypes(self) -> list[str]:
+        return self._source.mimeTypes()
+
+    def mimeData(self, indexes) -> QMimeData:
+        return self._source.mimeData([self.mapToSource(index) for index in indexes])
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Vertical and self._rows is not None:
+            # Rows keep their data row number, so gaps show where a filter hides rows
+            if role != Qt.ItemDataRole.DisplayRole or not 0 <= section < len(self._rows):
+                return None
+            return str(int(self._rows[section]) + 1)
+        return self._source.headerData(section, orientation, role)
+
+    def setHeaderData(self, section: int, orientation: Qt.Orientation, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        return orientation == Qt.Orientation.Horizontal and self._source.setHeaderData(section, orientation, value, role)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from functools import partial
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from blackbox.core import telemetry
+from blackbox.core.io import TableWriter
+from blackbox.core.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+SAVE_FILTER = ('Excel Files (*.xlsx);;CSV Files (*.csv);;Parquet Files (*.parquet);;'
+               'Arrow Files (*.arrow *.feather);;NumPy Bundle (*.npz);;All Files (*)')
+
+
+class ExcelSaver(TableWriter):
+    """
+    Writes DataFrames and edited workbook sheets for the table widgets, see
+    blackbox.core.io.TableWriter.
+    """
+
+
+class _SaveWorker(QObject):
+    """
+    Writes one snapshot on a background thread.
+    """
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, write, path: str, rows: int):
+        """
+        Args:
+            write (callable): Called with `path`, writes the snapshot it holds.
+            path (str): Destination.
+            rows (int): Number of rows written, for telemetry.
+        """
+        super().__init__()
+        self.write = write
+        self.path = path
+        self.rows = rows
+
+    def run(self) -> None:
+        try:
+            with telemetry.span('save'):
+                self.write(self.path)
+            telemetry.count('save.rows', self.rows)
+        except Exception as e:
+            logger.exception("Error saving file {}", self.path)
+            self.failed.emit(self.path, str(e))
+            return
+        finally:
+            self.write = None
+            self.thread().quit()
+
+        self.finished.emit(self.path)
+
+
+class BackgroundSaver(QObject):
+    """
+    Saves table snapshots on worker threads so editing can go on meanwhile.
+
+    Signals:
+        save_finished (str): Path of the file that was written.
+        save_failed (str, str): Path of the file and the error that stopped the save.
+    """
+    save_finished = pyqtSignal(str)
+    save_failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.excel_saver = ExcelSaver()
+        self._threads: set[QThread] = set()
+
+    def save(self, df: pd.DataFrame, path: str) -> None:
+        """
+        Starts writing `df` to `path` in the background.
+
+        Args:
+            df (pd.DataFrame): A snapshot the caller will not modify any more.
+            path (str): Destination; the extension selects the format.
+        """
+        self.__start(_SaveWorker(partial(self.excel_saver.write, df), path, len(df)))
+        logger.info("Saving {} rows to {}", len(df), path)
+
+    def save_workbook(self, source: str, frames: dict[str, pd.DataFrame], path: str) -> None:
+        """
+        Starts writing a copy of the workbook `source` with the sheets in `frames`
+        replaced to `path` in the background, see TableWriter.write_sheets.
+
+        Args:
+            source (str): The workbook the sheets were read from.
+            frames (dict[str, pd.DataFrame]): Snapshots of the edited sheets.
+            path (str): Destination with the extension of `source`.
+        """
+        rows = sum(len(df) for df in frames.values())
+        self.__start(_SaveWorker(partial(self.excel_saver.write_sheets, source, frames), path, rows))
+        logger.info("Saving {} edited sheets of {} to {}", len(frames), source, path)
+
+    def __start(self, worker: _SaveWorker) -> None:
+        thread = QThread()
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        worker.finished.connect(self.save_finished)
+        worker.failed.connect(self.save_failed)
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+
+        self._threads.add(thread)
+        thread.start()
+
+    def is_saving(self) -> bool:
+        return bool(self._threads)
+
+    def wait(self) -> None:
+        """
+        Blocks until every save in flight has been written.
+        """
+        for thread in list(self._threads):
+            thread.wait()
+
+    def __on_thread_finished(self, thread: QThread, worker: _SaveWorker) -> None:
+        self._threads.discard(thread)
+        worker.deleteLater()
+        thread.deleteLater()
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+
+from blackbox.core.changes import (
+    CellsChanged,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableChange,
+    TableReset,
+)
+from blackbox.core.lazy import lazy_import
+from blackbox.core.search import SearchQuery
+
+np = lazy_import('numpy')
+
+# Cells are keyed as row * _COL_STRIDE + col
+_COL_STRIDE = 1 << 32
+
+
+class Matches:
+    """
+    The cells found by a search, as NumPy arrays of rows and columns in the
+    order they are navigated, which costs 16 bytes per match however many
+    millions there are.
+
+    Batches streamed in by SearchEngine are collected as they are and joined
+    on first access. contains() looks a cell up with a binary search over
+    sorted cell keys, so the highlight delegate can ask for every cell it
+    paints. apply() keeps the matches on their cells through table changes:
+    inserted, removed and moved rows and columns shift them with one
+    vectorized operation and edited cells are matched against the query again.
+
+    Args:
+        query (SearchQuery, optional): The query the cells match.
+
+    Attributes:
+        current (int): Position of the match navigated to, -1 before the first one.
+        ordered (bool): False once matches were added or moved out of the
+                        navigation order, see sort().
+    """
+
+    def __init__(self, query: SearchQuery = None):
+        self.query = query
+        self.current = -1
+        self.ordered = True
+        self._rows = np.empty(0, dtype=np.int64)
+        self._cols = np.empty(0, dtype=np.int64)
+        self._batches: list[tuple[np.ndarray, np.ndarray]] = []
+        self._keys: np.ndarray = None
+
+    def __len__(self) -> int:
+        return len(self._rows) + sum(len(rows) for rows, _ in self._batches)
+
+    @property
+    def rows(self) -> np.ndarray:
+        self.__join()
+        return self._rows
+
+    @property
+    def cols(self) -> np.ndarray:
+        self.__join()
+        return self._cols
+
+    def extend(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        """
+        Appends a batch of matches.
+        """
+        if len(rows):
+            self._batches.append((np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)))
+            self._keys = None
+            self.ordered = False
+
+    def cell(self, i: int) -> tuple[int, int]:
+        """
+        Returns the data row and column of match `i`.
+        """
+        return int(self.rows[i]), int(self.cols[i])
+
+    def contains(self, row: int, col: int) -> bool:
+        """
+        Tells whether a data cell is a match.
+        """
+        if self._keys is None:
+            self._keys = np.sort(self.rows * _COL_STRIDE + self.cols)
+        key = row * _COL_STRIDE + col
+        i = int(self._keys.searchsorted(key))
+        return i < len(self._keys) and int(self._keys[i]) == key
+
+    def sort(self, view_rows: np.ndarray) -> None:
+        """
+        Orders the matches as the view shows them, row by row, keeping the current match.
+
+        Args:
+            view_rows (np.ndarray): The view row of every match.
+        """
+        order = np.lexsort((self.cols, view_rows))
+        if self.current != -1:
+            self.current = int(np.flatnonzero(order == self.current)[0])
+        self._rows, self._cols = self._rows[order], self._cols[order]
+        self.ordered = True
+
+    def memory_usage(self) -> int:
+        """
+        Returns the size of the match arrays in bytes.
+        """
+        keys = self._keys.nbytes if self._keys is not None else 0
+        return self.rows.nbytes + self.cols.nbytes + keys
+
+    def apply(self, change: TableChange) -> bool:
+        """
+        Moves the matches along with a table change.
+
+        Args:
+            change (TableChange): A change emitted through `table_changed`.
+
+        Returns:
+            bool: False for a TableReset, after which the search has to run again.
+        """
+        if isinstance(change, TableReset):
+            return False
+        rows, cols = self.rows, self.cols
+        if isinstance(change, CellsChanged):
+            keys = change.rows * _COL_STRIDE + change.cols
+            self.__keep(~np.isin(rows * _COL_STRIDE + cols, keys))
+            hits = self.__hits(change.new)
+            self.__add(change.rows[hits], change.cols[hits])
+        elif isinstance(change, RowsInserted):
+            self.__shift(rows, change.at, change.count)
+            for col, texts in enumerate(change.values or ()):
+                hits = self.__hits(texts)
+                self.__add(hits + change.at, np.full(len(hits), col, dtype=np.int64))
+        elif isinstance(change, RowsRemoved):
+            self.__remove(True, change.at, change.count)
+        elif isinstance(change, ColumnsInserted):
+            self.__shift(cols, change.at, change.count)
+            for offset, texts in enumerate(change.values or ()):
+                hits = self.__hits(texts)
+                self.__add(hits, np.full(len(hits), change.at + offset, dtype=np.int64))
+        elif isinstance(change, ColumnsRemoved):
+            self.__remove(False, change.at, change.count)
+        elif isinstance(change, RowsMoved):
+            positions = np.empty(len(change.order), dtype=np.int64)
+            positions[change.order] = np.arange(len(change.order))
+            self._rows = positions[rows]
+            self.ordered = False
+        self._keys = None
+        return True
+
+    def __join(self) -> None:
+        if self._batches:
+            rows, cols = zip(*self._batches)
+            self._rows = np.concatenate((self._rows, *rows))
+            self._cols = np.concatenate((self._cols, *cols))
+            self._batches.clear()
+
+    def __hits(self, texts) -> np.ndarray:
+        if self.query is None or not len(texts):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.query.match(np.asarray(texts, dtype=object)))
+
+    def __add(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        if len(rows):
+            self._rows = np.concatenate((self._rows, rows))
+            self._cols = np.concatenate((self._cols, cols))
+            self.ordered = False
+
+    def __keep(self, kept: np.ndarray) -> None:
+        # The current match stays current; if it is dropped, the next one follows it
+        if self.current != -1:
+            before = int(np.count_nonzero(kept[:self.current]))
+            self.current = before if kept[self.current] else before - 1
+        self._rows, self._cols = self._rows[kept], self._cols[kept]
+
+    @staticmethod
+    def __shift(indices: np.ndarray, at: int, count: int) -> None:
+        indices[indices >= at] += count
+
+    def __remove(self, rows: bool, at: int, count: int) -> None:
+        indices = self._rows if rows else self._cols
+        self.__keep((indices < at) | (indices >= at + count))
+        indices = self._rows if rows else self._cols
+        indices[indices >= at + count] -= count
+
+
+class ColumnTexts(QObject):
+    """
+    The text of every cell of a table, column by column, as SearchEngine reads it.
+
+    QTableWidget items can only be read on the GUI thread, so the texts are
+    collected in the background of the event loop, `slice_cells` cells per
+    iteration, the way a chunked load fills the table. They are kept until
+    invalidate() is called for a change of the table, so the searches started
+    by successive keystrokes share one collection.
+
+    Signals:
+        ready (): The texts of the table as it is now are complete, see columns().
+
+    Args:
+        table_logic: The logic of the TableWidget or TableView to read.
+        parent (QObject, optional): Parent object.
+    """
+    ready = pyqtSignal()
+
+    # Cells read per event-loop iteration
+    slice_cells: int = 50_000
+
+    def __init__(self, table_logic, parent=None):
+        super().__init__(parent)
+        self.table_logic = table_logic
+        self._columns: list[np.ndarray] = None
+        self._parts: list[list[np.ndarray]] = None
+        self._col = 0
+        self._row = 0
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.__collect_slice)
+
+    def columns(self) -> list[np.ndarray]:
+        """
+        Returns the texts of every column, None until they are complete.
+        """
+        return self._columns
+
+    def request(self) -> None:
+        """
+        Starts collecting the texts, unless they are complete or being collected.
+        """
+        if self._columns is None and not self._timer.isActive():
+            self._parts = [[] for _ in range(self.table_logic.table_widget.columnCount())]
+            self._col = self._row = 0
+            self._timer.start()
+
+    def invalidate(self) -> None:
+        """
+        Drops the texts and stops collecting them.
+        """
+        self._timer.stop()
+        self._columns = self._parts = None
+
+    def __collect_slice(self) -> None:
+        # A chunked load still running ends with a TableReset, which invalidates
+        self.table_logic.finish_loading()
+        if self._parts is None:
+            return
+
+        tw = self.table_logic.table_widget
+        rows = tw.rowCount()
+        budget = self.slice_cells
+        while budget > 0 and self._col < len(self._parts):
+            stop = min(self._row + budget, rows)
+            self._parts[self._col].append(self.table_logic.column_texts(self._col, self._row, stop))
+            budget -= max(stop - self._row, 1)
+            self._row = stop
+            if self._row >= rows:
+                self._col, self._row = self._col + 1, 0
+        if self._col < len(self._parts):
+            return
+
+        self._timer.stop()
+        self._columns = [np.concatenate(parts) if len(parts) > 1 else parts[0] for parts in self._parts]
+        self._parts = None
+        logger.debug("Collected the texts of {} columns of {} rows", len(self._columns), rows)
+        self.ready.emit()
+
+
+class SearchEngine(QObject):
+    """
+    Runs queries on a thread pool and streams the matches back.
+
+    Each column is cut into blocks of `block_rows` rows and every block is a
+    separate task, so long columns are spread over the pool too. Starting a
+    new search, or calling cancel(), makes the tasks of the previous search
+    stop before their next block and its pending batches are ignored.
+
+    Signals:
+        matches_found (int, np.ndarray, np.ndarray): Search id, rows and columns
+                                                     of a batch of matches.
+        search_finished (int, int): Search id and the number of matches.
+        search_failed (int, str): Search id and the error, e.g. an invalid regex.
+    """
+    matches_found = pyqtSignal(int, object, object)
+    search_finished = pyqtSignal(int, int)
+    search_failed = pyqtSignal(int, str)
+
+    block_rows: int = 200_000
+
+    def __init__(self, parent=None, max_workers: int = None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers or os.cpu_count() or 1)
+        self._search_id = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._found = 0
+
+    def start(self, query: SearchQuery, columns: list[np.ndarray]) -> int:
+        """
+        Starts a search, cancelling the one in progress.
+
+        Args:
+            query (SearchQuery): What to look for.
+            columns (list[np.ndarray]): Cell texts of every column; the arrays
+                                        must not be modified while the search runs.
+
+        Returns:
+            int: Id of the search, repeated in every signal it emits.
+        """
+        self.cancel()
+        self._search_id += 1
+        search_id = self._search_id
+        cancelled = self._cancelled = threading.Event()
+
+        try:
+            if not query.is_exact():
+                query.pattern()
+        except re.error as e:
+            self.search_failed.emit(search_id, str(e))
+            return search_id
+
+        blocks = [(col, start, texts)
+                  for col, texts in enumerate(columns)
+                  for start in range(0, len(texts), self.block_rows)]
+        with self._lock:
+            self._pending = len(blocks)
+            self._found = 0
+
+        if not blocks:
+            self.search_finished.emit(search_id, 0)
+            return search_id
+
+        for col, start, texts in blocks:
+            self._pool.start(lambda c=col, s=start, t=texts: self.__run_block(search_id, cancelled, query, c, s, t))
+        logger.debug("Search {} started on {} blocks", search_id, len(blocks))
+        return search_id
+
+    def cancel(self) -> None:
+        """
+        Cancels the search in progress, if any.
+        """
+        self._cancelled.set()
+
+    def is_current(self, search_id: int) -> bool:
+        return search_id == self._search_id and not self._cancelled.is_set()
+
+    def wait(self) -> None:
+        """
+        Blocks until all running tasks are done; their signals are still
+        delivered through the event loop.
+        """
+        self._pool.waitForDone()
+
+    def __run_block(self, search_id, cancelled, query, col, start, texts) -> None:
+        if cancelled.is_set():
+            return
+        try:
+            hits = np.flatnonzero(query.match(texts[start:start + self.block_rows])) + start
+        except Exception as e:
+            logger.exception("Search {} failed", search_id)
+            cancelled.set()
+            self.search_failed.emit(search_id, str(e))
+            return
+
+        if len(hits) and not cancelled.is_set():
+            self.matches_found.emit(search_id, hits.astype(np.int64), np.full(len(hits), col, dtype=np.int64))
+
+        with self._lock:
+            if search_id != self._search_id:
+                return
+            self._found += len(hits)
+            self._pending -= 1
+            done = self._pending == 0
+            found = self._found
+        if done and not cancelled.is_set():
+            self.search_finished.emit(search_id, found)
@@ -0,0 +1,515 @@
+"""
+Column statistics and aggregates of the selected cells.
+
+Aggregates are count (non-empty cells), sum, mean, min and max (of the cells
+holding a number) and distinct (different non-empty texts). They are computed
+a whole column at a time with NumPy.
+
+The aggregates of whole columns are cached in ColumnStats and kept in line
+with the table changes instead of being recomputed: row moves and sorting
+leave them as they are, and an edit, a Replace All or an inserted or removed
+row updates count and sum from the old and new cells alone. Only min and max,
+when the removed cells held them, and distinct are left to be recomputed the
+next time they are asked for.
+
+SelectionStats aggregates the selection for a status bar; selections of more
+than `SelectionStats.background_cells` cells are computed on a worker thread.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QLabel
+
+from blackbox.app.static import label
+from blackbox.app.table.proxy import parse_numbers
+from blackbox.core import telemetry
+from blackbox.core.changes import (
+    CellsChanged,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableChange,
+)
+from blackbox.core.lazy import lazy_import
+from blackbox.core.typed import column_texts
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+@dataclass
+class Aggregates:
+    """
+    Aggregates of a set of cells.
+
+    Attributes:
+        count (int): Non-empty cells.
+        numbers (int): Cells holding a number.
+        sum (float): Sum of the numbers.
+        min (float): Smallest number, None without numbers.
+        max (float): Largest number, None without numbers.
+        distinct (int): Different non-empty texts.
+    """
+    count: int = 0
+    numbers: int = 0
+    sum: float = 0.0
+    min: float = None
+    max: float = None
+    distinct: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.numbers if self.numbers else None
+
+
+@dataclass
+class ColumnSummary:
+    """
+    The cached aggregates of a column.
+
+    Attributes:
+        aggregates (Aggregates): count, numbers and sum are always exact; min,
+                                 max and distinct only while not stale.
+        uniques (np.ndarray): The different non-empty cells, for combining the
+                              distinct count of several columns.
+        extremes_stale (bool): min and max must be recomputed.
+        uniques_stale (bool): uniques and distinct must be recomputed.
+    """
+    aggregates: Aggregates
+    uniques: np.ndarray
+    extremes_stale: bool = False
+    uniques_stale: bool = False
+
+    @property
+    def stale(self) -> bool:
+        return self.extremes_stale or self.uniques_stale
+
+
+def _array(values):
+    array = values.array if isinstance(values, pd.Series) else values
+    if isinstance(array, pd.arrays.NumpyExtensionArray):
+        return array.to_numpy()
+    return array
+
+
+def column_numbers(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the numbers of a column.
+
+    Args:
+        values: The cells, as a Series, an ExtensionArray or a NumPy array.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: float64 value of every cell, NaN where it
+                                       is not a number, and the mask of non-empty cells.
+    """
+    array = _array(values)
+    if isinstance(array, np.ndarray) and array.dtype.kind in 'iufb':
+        numbers = array.astype(np.float64)
+        return numbers, ~np.isnan(numbers)
+    if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        numbers = array.to_numpy(dtype=np.float64, na_value=np.nan)
+        return numbers, ~np.isnan(numbers)
+    if isinstance(array, np.ndarray) and array.dtype == object:
+        try:
+            # Numbers, numeric texts or a mix of both, e.g. a typed column after an edit
+            numbers = array.astype(np.float64)
+            return numbers, ~np.isnan(numbers)
+        except (TypeError, ValueError):
+            pass
+    texts = np.asarray(column_texts(array), dtype=object)
+    filled = texts != ''
+    numbers = np.full(len(texts), np.nan)
+    hits = np.flatnonzero(filled)
+    if len(hits):
+        numbers[hits] = parse_numbers(texts[hits])
+    return numbers, filled
+
+
+def unique_values(values):
+    """
+    Returns the different non-empty cells of a column, each one once.
+
+    Text columns give their texts. Typed columns give their values, which are
+    only formatted when combined with other columns, see unique_texts().
+    """
+    array = _array(values)
+    if isinstance(array, np.ndarray) and array.dtype == object:
+        if pd.api.types.infer_dtype(array, skipna=False) == 'string':
+            texts = pd.unique(array)
+        else:
+            # Values mixed with text: only the different ones are formatted, as format_value() does
+            uniques = pd.unique(array)
+            texts = pd.unique(uniques[~pd.isna(uniques)].astype(str).astype(object))
+        return texts[texts != '']
+    uniques = pd.unique(array)
+    return uniques[~pd.isna(uniques)]
+
+
+def unique_texts(uniques) -> np.ndarray:
+    """
+    Formats the result of unique_values() as display texts.
+    """
+    texts = np.asarray(column_texts(uniques), dtype=object)
+    return texts[texts != '']
+
+
+def _extremes(numbers: np.ndarray) -> tuple[int, float, float, float]:
+    valid = numbers[~np.isnan(numbers)]
+    if not len(valid):
+        return 0, 0.0, None, None
+    return len(valid), float(valid.sum()), float(valid.min()), float(valid.max())
+
+
+def aggregate(values, distinct: bool = True) -> tuple[Aggregates, np.ndarray]:
+    """
+    Computes the aggregates of a column or of some of its cells.
+
+    Args:
+        values: The cells, as a Series, an ExtensionArray or a NumPy array.
+        distinct (bool, optional): Also find the different cells. Defaults to True.
+
+    Returns:
+        tuple[Aggregates, np.ndarray]: The aggregates and the different
+                                       non-empty cells, None if not `distinct`.
+    """
+    numbers, filled = column_numbers(values)
+    count, total, low, high = _extremes(numbers)
+    uniques = unique_values(values) if distinct else None
+    aggregates = Aggregates(int(filled.sum()), count, total, low, high, len(uniques) if distinct else 0)
+    return aggregates, uniques
+
+
+def summarize(values, summary: ColumnSummary = None) -> ColumnSummary:
+    """
+    Returns the up to date summary of a whole column, recomputing only the
+    stale parts of `summary` if one is given.
+    """
+    if summary is None:
+        return ColumnSummary(*aggregate(values))
+    aggregates, uniques = summary.aggregates, summary.uniques
+    if summary.extremes_stale:
+        _, _, low, high = _extremes(column_numbers(values)[0])
+        aggregates = replace(aggregates, min=low, max=high)
+    if summary.uniques_stale:
+        uniques = unique_values(values)
+        aggregates = replace(aggregates, distinct=len(uniques))
+    return ColumnSummary(aggregates, uniques)
+
+
+def combine(parts: list[tuple[Aggregates, np.ndarray]]) -> Aggregates:
+    """
+    Merges the aggregates of disjoint sets of cells.
+
+    Args:
+        parts (list[tuple[Aggregates, np.ndarray]]): Aggregates of every set
+                                                     with its different cells.
+    """
+    if len(parts) == 1:
+        return replace(parts[0][0])
+    result = Aggregates()
+    for aggregates, _ in parts:
+        result.count += aggregates.count
+        result.numbers += aggregates.numbers
+        result.sum += aggregates.sum
+        if aggregates.numbers:
+            result.min = aggregates.min if result.min is None else min(result.min, aggregates.min)
+            result.max = aggregates.max if result.max is None else max(result.max, aggregates.max)
+    result.distinct = _distinct([uniques for _, uniques in parts])
+    return result
+
+
+def _distinct(uniques: list) -> int:
+    """
+    Counts the different cells of several sets given their unique_values().
+    Once number columns are involved, texts that read as numbers are compared as numbers.
+    """
+    numbers, texts = [], []
+    for values in uniques:
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iufb':
+            numbers.append(values.astype(np.float64))
+        elif isinstance(values, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            numbers.append(values.to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            texts.append(unique_texts(values))
+    texts = pd.unique(np.concatenate(texts)) if texts else np.empty(0, dtype=object)
+    if not numbers:
+        return len(texts)
+    if len(texts):
+        parsed = parse_numbers(texts)
+        numeric = ~np.isnan(parsed)
+        numbers.append(parsed[numeric])
+        texts = texts[~numeric]
+    return len(np.unique(np.concatenate(numbers))) + len(texts)
+
+
+class ColumnStats:
+    """
+    A cache of the aggregates of whole columns, kept in line with table changes.
+
+    Only columns whose aggregates were asked for are cached. `version` grows
+    with every change, so a summary computed from an older state of the table,
+    e.g. on a worker thread, is not stored.
+    """
+
+    def __init__(self):
+        self._summaries: dict[int, ColumnSummary] = {}
+        self.version = 0
+
+    def get(self, col: int) -> ColumnSummary:
+        """
+        Returns the cached summary of a column, possibly stale, or None.
+        """
+        return self._summaries.get(col)
+
+    def store(self, col: int, summary: ColumnSummary, version: int = None) -> bool:
+        """
+        Caches the summary of a column computed when the cache was at `version`
+        (by default the current one). Returns False if the table changed since.
+        """
+        if version is not None and version != self.version:
+            return False
+        self._summaries[col] = summary
+        return True
+
+    def apply(self, change: TableChange) -> None:
+        """
+        Updates the cached summaries after a table change.
+
+        Args:
+            change (TableChange): A change emitted through `table_changed`.
+        """
+        self.version += 1
+        if not self._summaries or isinstance(change, RowsMoved):
+            return
+        if isinstance(change, CellsChanged):
+            old = np.asarray(change.old, dtype=object)
+            new = np.asarray(change.new, dtype=object)
+            for col in np.unique(change.cols).tolist():
+                if col in self._summaries:
+                    cells = np.flatnonzero(change.cols == col)
+                    self.__update(col, old[cells], new[cells])
+        elif isinstance(change, RowsInserted):
+            for col, texts in enumerate(change.values or ()):
+                if col in self._summaries:
+                    self.__update(col, None, texts)
+        elif isinstance(change, RowsRemoved):
+            if change.values is None:
+                self._summaries.clear()
+            for col, texts in enumerate(change.values or ()):
+                if col in self._summaries:
+                    self.__update(col, texts, None)
+        elif isinstance(change, (ColumnsInserted, ColumnsRemoved)):
+            end = change.at + change.count
+            shift = change.count if isinstance(change, ColumnsInserted) else -change.count
+            self._summaries = {
+                col if col < change.at else col + shift: summary
+                for col, summary in self._summaries.items()
+                if col < change.at or shift > 0 or col >= end
+            }
+        else:
+            self._summaries.clear()
+
+    def __update(self, col: int, removed: np.ndarray, added: np.ndarray) -> None:
+        # Summaries are replaced, not changed in place: a worker thread may be reading the old one
+        summary = self._summaries[col]
+        aggregates = replace(summary.aggregates)
+        summary = self._summaries[col] = replace(summary, aggregates=aggregates)
+        if removed is not None and len(removed):
+            gone, _ = aggregate(removed, distinct=False)
+            aggregates.count -= gone.count
+            aggregates.numbers -= gone.numbers
+            aggregates.sum -= gone.sum
+            if gone.numbers and (gone.min <= aggregates.min or gone.max >= aggregates.max):
+                summary.extremes_stale = True
+            summary.uniques_stale |= gone.count > 0
+        if added is not None and len(added):
+            new, _ = aggregate(added, distinct=False)
+            aggregates.count += new.count
+            aggregates.numbers += new.numbers
+            aggregates.sum += new.sum
+            if new.numbers and not summary.extremes_stale:
+                aggregates.min = new.min if aggregates.min is None else min(aggregates.min, new.min)
+                aggregates.max = new.max if aggregates.max is None else max(aggregates.max, new.max)
+            summary.uniques_stale |= new.count > 0
+        if not aggregates.numbers:
+            # No rounding error left over in the sum and nothing left to recompute
+            aggregates.sum, aggregates.min, aggregates.max = 0.0, None, None
+            summary.extremes_stale = False
+
+
+def compute(parts: list[tuple]) -> tuple[Aggregates, list[ColumnSummary]]:
+    """
+    Computes the aggregates of a selection split by stats_parts().
+
+    Returns:
+        tuple[Aggregates, list[ColumnSummary]]: The aggregates, and the new
+            summary of every part that is a whole column (None for the others).
+    """
+    results, summaries = [], []
+    with telemetry.span('stats'):
+        for col, values, summary in parts:
+            if col is None:
+                results.append(aggregate(values))
+                summaries.append(None)
+                continue
+            if summary is None or summary.stale:
+                summary = summarize(values, summary)
+            results.append((summary.aggregates, summary.uniques))
+            summaries.append(summary)
+        return combine(results), summaries
+
+
+class _StatsWorker(QObject):
+    """
+    Computes the aggregates of a large selection on a background thread.
+    """
+    finished = pyqtSignal(int, object)
+
+    def __init__(self, generation: int, parts: list[tuple]):
+        super().__init__()
+        self.generation = generation
+        self.parts = parts
+
+    def run(self) -> None:
+        try:
+            results = compute(self.parts)
+        except Exception:
+            logger.exception("Error computing selection statistics")
+            results = None
+        finally:
+            self.thread().quit()
+        self.finished.emit(self.generation, results)
+
+
+class SelectionStats(QObject):
+    """
+    Aggregates of the selected cells of a table, computed on request.
+
+    Small selections are computed right away. Larger ones are computed on a
+    worker thread, one at a time: a request made meanwhile is started once the
+    running one finishes, and only the result of the latest request is emitted.
+
+    Signals:
+        ready (Aggregates): The aggregates of the selection, None if nothing is selected.
+        computing (): A request is being computed on the worker thread.
+    """
+    ready = pyqtSignal(object)
+    computing = pyqtSignal()
+
+    # Selections of more cells than this to compute are handled off the GUI thread
+    background_cells: int = 200_000
+
+    def __init__(self, table, parent=None):
+        """
+        Args:
+            table (TableWidget | TableView): The table whose selection is aggregated.
+            parent (QObject, optional): Parent object.
+        """
+        super().__init__(parent)
+        self.table = table
+        self._generation = 0
+        self._pending = False
+        self._thread: QThread = None
+        self._worker: _StatsWorker = None
+
+    def request(self) -> None:
+        """
+        Aggregates the current selection and emits `ready` with the result.
+        """
+        self._generation += 1
+        if self._thread is not None:
+            self._pending = True
+            return
+
+        logic = self.table.logic
+        version = logic.stats_cache.version
+        parts = logic.stats_parts()
+        if not parts:
+            self.ready.emit(None)
+            return
+        cells = sum(len(values) for _, values, _ in parts if values is not None)
+        if cells <= self.background_cells:
+            aggregates, summaries = compute(parts)
+            logic.cache_stats(parts, summaries, version)
+            self.ready.emit(aggregates)
+            return
+
+        self._thread = thread = QThread()
+        self._worker = worker = _StatsWorker(self._generation, parts)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(lambda generation, results: self.__on_finished(generation, parts, results, version))
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+        thread.start()
+        self.computing.emit()
+        logger.debug("Aggregating {} selected cells in the background", cells)
+
+    def __on_finished(self, generation: int, parts: list[tuple], results: tuple, version: int) -> None:
+        if results is None:
+            return
+        aggregates, summaries = results
+        # The summaries of whole columns are cached even if the selection moved on
+        self.table.logic.cache_stats(parts, summaries, version)
+        if generation == self._generation:
+            self.ready.emit(aggregates)
+
+    def __on_thread_finished(self, thread: QThread, worker: _StatsWorker) -> None:
+        self._thread = self._worker = None
+        worker.deleteLater()
+        thread.deleteLater()
+        if self._pending:
+            self._pending = False
+            self.request()
+
+
+class StatsBar(QLabel):
+    """
+    A status bar label showing the aggregates of the selected cells.
+
+    The aggregates are recomputed shortly after the selection or the table
+    changes, so dragging a selection or typing does not compute on every step.
+
+    Args:
+        table (TableWidget | TableView): The table whose selection is shown.
+        delay (int, optional): Wait after the last change, in milliseconds.
+                               Defaults to 150.
+        parent (QWidget, optional): Parent widget.
+    """
+
+    def __init__(self, table, delay: int = 150, parent=None):
+        super().__init__(parent)
+        self.stats = SelectionStats(table, self)
+        self.stats.ready.connect(self.show_aggregates)
+        self.stats.computing.connect(lambda: self.setText(label('stats_bar.computing')))
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.stats.request)
+
+        table.selectionModel().selectionChanged.connect(self._timer.start)
+        table.table_changed.connect(self._timer.start)
+
+    def show_aggregates(self, aggregates: Aggregates) -> None:
+        """
+        Shows `aggregates`; cells without numbers show only count and distinct.
+        """
+        if aggregates is None or not aggregates.count:
+            self.clear()
+            return
+        parts = [label('stats_bar.count').format(value=aggregates.count)]
+        if aggregates.numbers:
+            for key in ('sum', 'mean', 'min', 'max'):
+                parts.append(label(f'stats_bar.{key}').format(value=_number_text(getattr(aggregates, key))))
+        parts.append(label('stats_bar.distinct').format(value=aggregates.distinct))
+        self.setText('   '.join(parts))
+
+
+def _number_text(value: float) -> str:
+    return f'{value:,.10g}'
@@ -1,16 +1,117 @@
-import pandas as pd
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import replace
+
 from loguru import logger
-from PyQt6.QtCore import QPoint, Qt
-from PyQt6.QtGui import QAction, QKeySequence, QShortcut
-from PyQt6.QtWidgets import QAbstractItemView, QMenu, QTableWidget, QTableWidgetItem
+from PyQt6.QtCore import QItemSelection, QItemSelectionModel, QPoint, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction, QBrush, QKeySequence, QPalette, QShortcut
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QInputDialog,
+    QLineEdit,
+    QMenu,
+    QMessageBox,
+    QStyledItemDelegate,
+    QTableWidget,
+    QTableWidgetItem,
+)
 
 from blackbox.app.static import label, shortcut
+from blackbox.app.table.clipboard import CellsMimeData, cell_columns, parse_cells
 from blackbox.app.table.dialogs import (
     FindDialogLogic,
     FinderDialogBase,
     ReplaceDialogBase,
     ReplaceDialogLogic,
 )
+from blackbox.app.table.history import UndoHistory
+from blackbox.app.table.index import CellIndex
+from blackbox.app.table.proxy import ColumnFilter, sort_ranks, sort_rows
+from blackbox.app.table.search import Matches
+from blackbox.app.table.stats import Aggregates, ColumnStats, compute, summarize
+from blackbox.core import telemetry
+from blackbox.core.changes import (
+    CellsChanged,
+    ChangeGroup,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableChange,
+    TableReset,
+    index_spans,
+    move_order,
+)
+from blackbox.core.frame import new_column_labels
+from blackbox.core.lazy import lazy_import
+from blackbox.core.typed import column_texts
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class _CellEditDelegate(QStyledItemDelegate):
+    """
+    Routes edits typed into a cell through the table logic, so that they are
+    announced through `table_changed` like every other change. The cell is
+    mapped from the row shown to its data row first.
+
+    Cells of the logic's highlighted matches get a translucent highlight
+    background. Only cells being painted are looked up, so the cost follows
+    the viewport and not the number of matches.
+    """
+
+    # Opacity of the highlight colour behind a match
+    highlight_alpha: int = 90
+
+    def __init__(self, logic):
+        super().__init__(logic.table_widget)
+        self.logic = logic
+        self._highlight: QBrush = None
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        matches = self.logic.highlighted_matches
+        if matches is None:
+            return
+        row = int(self.logic.source_rows([index.row()])[0])
+        if matches.contains(row, index.column()):
+            if self._highlight is None:
+                color = self.logic.table_widget.palette().color(QPalette.ColorRole.Highlight)
+                color.setAlpha(self.highlight_alpha)
+                self._highlight = QBrush(color)
+            option.backgroundBrush = self._highlight
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, QLineEdit):
+            row = int(self.logic.source_rows([index.row()])[0])
+            self.logic.set_cell_text(row, index.column(), editor.text())
+        else:
+            super().setModelData(editor, model, index)
+
+
+class _PendingLoad:
+    """
+    Rows queued by a chunked load that still have to be turned into items.
+    Each block is a list of [columns, first_table_row, rows_done, row_count].
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.started = time.perf_counter()
+        self.blocks = deque()
+        self.total = 0
+        self.done = 0
+
+    def add(self, columns: list, first_row: int, rows: int) -> None:
+        if rows:
+            self.blocks.append([columns, first_row, 0, rows])
+            self.total += rows
 
 
 class _TableWidgetInnerLogic:
@@ -24,39 +125,100 @@ class _TableWidgetInnerLogic:
     It acts as a controller, separating the logical operations from the visual representation.
     """
 
+    # Rows populated per event-loop iteration by handle_data_loaded
+    load_chunk_rows: int = 5000
+
     def __init__(self, table_widget: QTableWidget):
         self.table_widget: QTableWidget = table_widget
 
-        self.replace_dialog = ReplaceDialogBase(self.table_widget)
-        self.replace_logic = ReplaceDialogLogic(self.replace_dialog, self)
-
-        self.finder_dialog = FinderDialogBase(self.table_widget)
-        self.finder_logic = FindDialogLogic(self.finder_dialog, self)
+        self._pending_load = None
+        self._load_generation = 0
+        self._sorting_was_enabled = False
+
+        self._find_index: CellIndex = None
+        self._find_index_dirty = True
+        self._find_index_timer = QTimer(self.table_widget)
+        self._find_index_timer.setSingleShot(True)
+        self._find_index_timer.setInterval(200)
+        self._find_index_timer.timeout.connect(self.__build_find_index_when_idle)
+
+        self.history = UndoHistory()
+        self._replaying = False
+        # Aggregates of whole columns, see column_stats()
+        self.stats_cache = ColumnStats()
+        self._batch_depth = 0
+
+        # Sort keys as (column, ascending), most significant first, and filters by column
+        self._sort_keys: list[tuple[int, bool]] = []
+        self._filters: dict[int, ColumnFilter] = {}
+        # sort_ranks() of the columns sorted by, dropped when their cells change
+        self._sort_ranks: dict[int, np.ndarray] = {}
+        self._rows_filtered = False
+
+        # Cells painted highlighted by the delegate, see highlight_matches()
+        self.highlighted_matches: Matches = None
+        self.table_widget.setItemDelegate(_CellEditDelegate(self))
+
+        # The find and replace dialogs are built on first use, see the properties below
+        self._replace_dialog: ReplaceDialogBase = None
+        self._replace_logic: ReplaceDialogLogic = None
+        self._finder_dialog: FinderDialogBase = None
+        self._finder_logic: FindDialogLogic = None
 
         self.__setup_shortcuts()
+        self.__setup_header()
         logger.debug("Initialized _TableWidgetInnerLogic with table_widget")
 
+    @property
+    def replace_dialog(self) -> ReplaceDialogBase:
+        if self._replace_dialog is None:
+            self._replace_dialog = ReplaceDialogBase(self.table_widget)
+            self._replace_logic = ReplaceDialogLogic(self._replace_dialog, self)
+        return self._replace_dialog
+
+    @property
+    def replace_logic(self) -> ReplaceDialogLogic:
+        self.replace_dialog
+        return self._replace_logic
+
+    @property
+    def finder_dialog(self) -> FinderDialogBase:
+        if self._finder_dialog is None:
+            self._finder_dialog = FinderDialogBase(self.table_widget)
+            self._finder_logic = FindDialogLogic(self._finder_dialog, self)
+        return self._finder_dialog
+
+    @property
+    def finder_logic(self) -> FindDialogLogic:
+        self.finder_dialog
+        return self._finder_logic
+
     def drop_event_logic(self, event) -> None:
         """
         Handles the logic for drag and drop events within the table.
 
         Moves selected rows to the target drop location, maintaining
-        the order of the moved rows.
+        the order of the moved rows. The selection may be scattered;
+        the moved rows land next to each other and stay selected.
+        Rows are not moved while a sorted view decides their order.
 
         Args:
             event (QDropEvent): The drop event object.
         """
         logger.debug("Handling drop event")
         if event.source() == self.table_widget:
-            mapping = dict()
-            rows = set([mi.row() for mi in self.table_widget.selectedIndexes()])
+            if self._rows_reordered():
+                logger.info("Rows cannot be moved while the view is sorted")
+                return
+            rows = self.selected_rows()
             pos: QPoint = event.position().toPoint()
             target: int = self.table_widget.indexAt(pos).row()
+            if target != -1:
+                target = int(self.source_rows([target])[0])
 
-            rows.discard(target)
-            rows = sorted(rows)
+            rows = rows[rows != target]
 
-            if not rows:
+            if not len(rows):
                 logger.debug("No rows to move")
                 return
 
@@ -66,27 +228,67 @@ class _TableWidgetInnerLogic:
             if rows[0] < target:
                 target += 1
 
-            for _ in range(len(rows)):
-                self.table_widget.insertRow(target)
+            # Re-selected below; saves the views from remapping a large selection
+            self.table_widget.selectionModel().clearSelection()
+            self.move_rows(rows, target)
+            first = target - int(np.searchsorted(rows, target))
+            self.__select_rows(*self.view_rows([first, first + len(rows) - 1]).tolist())
 
-            for idx, row in enumerate(rows):
-                if row < target:
-                    mapping[row] = target + idx
-                else:
-                    mapping[row + len(rows)] = target + idx
+            event.accept()
+            logger.info("{} rows moved to target {}", len(rows), target)
 
-            for src, tgt in sorted(mapping.items()):
-                for col in range(self.table_widget.columnCount()):
-                    item = self.table_widget.takeItem(src, col)
-                    if item:
-                        self.table_widget.setItem(tgt, col, item)
+    def move_rows(self, rows, target: int) -> np.ndarray:
+        """
+        Moves rows so they are placed before `target`, as one permutation.
 
-            for row in reversed(sorted(mapping.keys())):
-                self.table_widget.removeRow(row)
+        Args:
+            rows (array-like): Sorted source row indices, not necessarily contiguous.
+            target (int): Insertion point expressed in pre-move row indices.
 
-            event.accept()
-            logger.info(f"Rows moved to target {target}")
+        Returns:
+            np.ndarray: The applied permutation, see RowsMoved.
+        """
+        with telemetry.span('move') as span:
+            order = move_order(self.table_widget.rowCount(), rows, target)
+            self.apply_change(RowsMoved(order))
+        telemetry.count('move.rows', len(rows))
+        logger.debug("Moved {} rows in {:.3f}s", len(rows), span.elapsed)
+        return order
+
+    def selected_rows(self) -> np.ndarray:
+        """
+        Returns the sorted data indices of all shown rows touched by the selection.
+        """
+        ranges = [np.arange(top, bottom + 1) for top, bottom, _, _ in self.selected_ranges()]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        rows = self.source_rows(np.unique(np.concatenate(ranges)))
+        return np.sort(rows[self.view_rows(rows) >= 0])
+
+    def selection_mask(self, col: int, ranges: list[tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Marks the data rows whose cell in column `col` is selected and shown.
 
+        Args:
+            col (int): The column.
+            ranges (list, optional): selected_ranges(), if the caller already has them.
+
+        Returns:
+            np.ndarray: Boolean mask over the data rows.
+        """
+        mask = np.zeros(self.table_widget.rowCount(), dtype=bool)
+        for top, bottom, left, right in self.selected_ranges() if ranges is None else ranges:
+            if left <= col <= right:
+                rows = self.source_rows(np.arange(top, bottom + 1))
+                mask[rows[self.view_rows(rows) >= 0]] = True
+        return mask
+
+    def __select_rows(self, first: int, last: int) -> None:
+        tw = self.table_widget
+        model = tw.model()
+        selection = QItemSelection(model.index(first, 0), model.index(last, max(tw.columnCount() - 1, 0)))
+        flags = QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
+        tw.selectionModel().select(selection, flags)
 
     @staticmethod
     def __action_connect(parent, slot, label) -> QAction:
@@ -105,43 +307,235 @@ class _TableWidgetInnerLogic:
         action.triggered.connect(slot)
         return action
 
-    def __add_row(self, row=None, above=True):
+    def __target_rows(self, row: int) -> np.ndarray:
+        """
+        Returns the selected data rows if the shown row `row` is one of them,
+        otherwise the data row shown at `row` alone.
+        """
+        if not 0 <= row < self.table_widget.model().rowCount():
+            return np.empty(0, dtype=np.int64)
+        selected = self.selected_rows()
+        target = self.source_rows([row])
+        return selected if target[0] in selected else target
+
+    def __target_columns(self, col: int) -> list[int]:
+        """
+        Returns the selected columns if `col` is one of them, otherwise `col` alone.
+        Whole selected rows do not select their columns.
+        """
+        count = self.table_widget.columnCount()
+        if not 0 <= col < count:
+            return []
+        selected = {c for _, _, left, right in self.selected_ranges() for c in range(left, right + 1)}
+        if col in selected and len(selected) < count:
+            return sorted(selected)
+        return [col]
+
+    # --- Structural operations ---
+
+    @contextmanager
+    def batch_update(self):
+        """
+        Makes the changes made inside the block one undo step and repaints the
+        table once at the end. Blocks can be nested. Every change is still
+        announced through `table_changed`.
+
+            with table.logic.batch_update():
+                table.logic.remove_rows([3, 4, 10])
+                table.logic.set_cell_text(0, 0, 'total')
+        """
+        self.finish_loading()
+        tw = self.table_widget
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self.history.begin_group()
+            tw.setUpdatesEnabled(False)
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                tw.setUpdatesEnabled(True)
+                self.history.end_group()
+
+    def insert_rows(self, rows, after: bool = False) -> int:
         """
-        Adds a new row to the table.
+        Inserts blank rows next to the given data rows, one per given row, the
+        way spreadsheets insert at a selection: every run of consecutive rows
+        gets a single insert of its length in front of it.
 
         Args:
-            row (int, optional): The index of the row relative to which the new row will be added.
-                                 If None, the row is added at the end. Defaults to None.
-            above (bool, optional): If True, the new row is inserted above the specified row.
-                                   If False, it's inserted below. Defaults to True.
-        """
-        if row is None:
-            rowCount = self.table_widget.rowCount()
-            self.table_widget.insertRow(rowCount)
-            logger.info(f"Added row at end, new row count: {rowCount + 1}")
-        else:
-            if above:
-                self.table_widget.insertRow(row)
-                logger.info(f"Added row above row {row}")
-            else:
-                self.table_widget.insertRow(row + 1)
-                logger.info(f"Added row below row {row}")
+            rows (array-like): Data rows; `rowCount()` appends at the end.
+            after (bool, optional): Insert behind every run instead. Defaults to False.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        self.finish_loading()
+        count = self.table_widget.rowCount()
+        spans = [(first, n) for first, n in index_spans(rows)
+                 if first >= 0 and first + n <= count + (not after)]
+        with self.batch_update():
+            # Bottom-up, so the runs above keep their indices
+            for first, n in reversed(spans):
+                self.apply_change(RowsInserted(first + n if after else first, n))
+        inserted = sum(n for _, n in spans)
+        logger.info("Inserted {} rows in {} blocks", inserted, len(spans))
+        return inserted
+
+    def remove_rows(self, rows) -> int:
+        """
+        Removes the given data rows, one change per run of consecutive rows.
 
-    def __remove_row(self, row=None):
+        Returns:
+            int: The number of rows removed.
+        """
+        self.finish_loading()
+        spans = [(first, n) for first, n in index_spans(rows)
+                 if first >= 0 and first + n <= self.table_widget.rowCount()]
+        with self.batch_update():
+            for first, n in reversed(spans):
+                self.apply_change(RowsRemoved(first, n, self._row_texts(first, n)))
+        removed = sum(n for _, n in spans)
+        logger.info("Removed {} rows in {} blocks, new row count: {}", removed, len(spans),
+                    self.table_widget.rowCount())
+        return removed
+
+    def insert_columns(self, cols, after: bool = False) -> int:
         """
-        Removes a row from the table.
+        Inserts blank columns with unique names next to the given columns, one
+        per given column, like insert_rows().
+
         Args:
-            row (int, optional): The index of the row to remove.
-            If None, the last row is removed. Defaults to None.
+            cols (array-like): Columns; `columnCount()` appends at the end.
+            after (bool, optional): Insert behind every run instead. Defaults to False.
+
+        Returns:
+            int: The number of columns inserted.
         """
-        if row is None:
-            if self.table_widget.rowCount() > 0:
-                self.table_widget.removeRow(self.table_widget.rowCount() - 1)
-                logger.info(f"Removed last row, new row count: {self.table_widget.rowCount()}")
-        else:
-            if self.table_widget.rowCount() > 0:
-                self.table_widget.removeRow(row)
-                logger.info(f"Removed row {row}, new row count: {self.table_widget.rowCount()}")
+        self.finish_loading()
+        count = self.table_widget.columnCount()
+        spans = [(first, n) for first, n in index_spans(cols)
+                 if first >= 0 and first + n <= count + (not after)]
+        labels = self.__new_column_labels(sum(n for _, n in spans))
+        with self.batch_update():
+            for first, n in reversed(spans):
+                self.apply_change(ColumnsInserted(first + n if after else first, n, labels[-n:]))
+                del labels[-n:]
+        inserted = sum(n for _, n in spans)
+        logger.info("Inserted {} columns in {} blocks", inserted, len(spans))
+        return inserted
+
+    def remove_columns(self, cols) -> int:
+        """
+        Removes the given columns, one change per run of consecutive columns.
+
+        Returns:
+            int: The number of columns removed.
+        """
+        self.finish_loading()
+        spans = [(first, n) for first, n in index_spans(cols)
+                 if first >= 0 and first + n <= self.table_widget.columnCount()]
+        labels = self._header_labels()
+        with self.batch_update():
+            for first, n in reversed(spans):
+                values = [self.column_texts(col) for col in range(first, first + n)]
+                self.apply_change(ColumnsRemoved(first, n, labels[first:first + n], values))
+        removed = sum(n for _, n in spans)
+        logger.info("Removed {} columns in {} blocks", removed, len(spans))
+        return removed
+
+    # --- Clipboard ---
+
+    def copy_selection(self) -> int:
+        """
+        Copies the selected cells to the clipboard as tab-separated text, in
+        the order they are shown; rows hidden by a filter are left out. Large
+        blocks are turned into text only when another application asks for it,
+        see blackbox.app.table.clipboard.
+
+        Returns:
+            int: The number of cells copied.
+        """
+        ranges = self.selected_ranges()
+        if not ranges:
+            return 0
+        self.finish_loading()
+        with telemetry.span('copy'):
+            rows = self.source_rows(np.unique(np.concatenate([np.arange(top, bottom + 1)
+                                                              for top, bottom, _, _ in ranges])))
+            rows = rows[self.view_rows(rows) >= 0]
+            cols = sorted({col for _, _, left, right in ranges for col in range(left, right + 1)})
+            QApplication.clipboard().setMimeData(CellsMimeData([self._column_cells(col, rows) for col in cols]))
+        cells = len(rows) * len(cols)
+        telemetry.count('copy.cells', cells)
+        logger.info("Copied {} x {} cells", len(rows), len(cols))
+        return cells
+
+    def paste(self, text: str = None) -> int:
+        """
+        Pastes a block of cells with its top left corner at the current cell.
+
+        The shown rows from the current one on are overwritten, skipping rows
+        hidden by a filter, and the table grows by the rows and columns that do
+        not fit. Everything is applied as one undo step and the table is
+        repainted once.
+
+        Args:
+            text (str, optional): Tab- or comma-separated text to paste instead
+                                  of the clipboard content.
+
+        Returns:
+            int: The number of cells pasted.
+        """
+        columns = None
+        if text is None:
+            mime = QApplication.clipboard().mimeData()
+            if isinstance(mime, CellsMimeData):
+                # Copied in this application: no text to build and parse
+                columns = mime.columns
+            else:
+                text = mime.text() if mime is not None else ''
+        if columns is None:
+            columns = cell_columns(parse_cells(text))
+        if not columns:
+            return 0
+
+        self.finish_loading()
+        tw = self.table_widget
+        height, width = len(columns[0]), len(columns)
+        view_row, col = max(tw.currentRow(), 0), max(tw.currentColumn(), 0)
+        # Only the rows the user sees are written, as copy_selection() only copies those
+        rows = self.source_rows(np.arange(view_row, max(tw.model().rowCount(), view_row)))
+        rows = rows[self.view_rows(rows) >= 0][:height]
+        overwritten = len(rows)
+        added_cols = max(col + width - tw.columnCount(), 0)
+
+        with telemetry.span('paste'), self.batch_update():
+            if added_cols:
+                self.apply_change(ColumnsInserted(tw.columnCount(), added_cols, self.__new_column_labels(added_cols)))
+            if overwritten:
+                texts = np.concatenate([np.asarray(column[:overwritten], dtype=object) for column in columns])
+                self.set_cells(np.tile(rows, width), np.repeat(np.arange(col, col + width), overwritten),
+                               texts.tolist())
+            if overwritten < height:
+                values = [np.full(height - overwritten, '', dtype=object) for _ in range(tw.columnCount())]
+                for offset, column in enumerate(columns):
+                    values[col + offset] = np.asarray(column[overwritten:], dtype=object)
+                self.apply_change(RowsInserted(tw.rowCount(), height - overwritten, values))
+        telemetry.count('paste.cells', height * width)
+        logger.info("Pasted {} x {} cells at row {}, column {}", height, width, view_row, col)
+        return height * width
+
+    def _column_cells(self, col: int, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the text of the cells of a column in the given data rows.
+        """
+        return np.array([self.cell_text(row, col) for row in rows.tolist()], dtype=object)
+
+    def __new_column_labels(self, count: int) -> list[str]:
+        return new_column_labels(self._header_labels(), count)
+
     def __setup_shortcuts(self):
         """
         Configures keyboard shortcuts for table operations.
@@ -161,45 +555,53 @@ class _TableWidgetInnerLogic:
             'table.add_row_above': self._add_row_above,
             'table.add_row_below': self._add_row_below,
             'table.remove_row': self._remove_row,
-            'table.replace': self.replace_dialog.show,
-            'table.find': self.finder_dialog.show
+            'table.undo': self.undo,
+            'table.redo': self.redo,
+            'table.replace': lambda: self.replace_dialog.show(),
+            'table.find': lambda: self.finder_dialog.show(),
+            'table.copy': self.copy_selection,
+            'table.paste': self.paste
         }
+        # Active only while the table itself has focus, so a cell editor keeps its own copy and paste
+        table_focus_only = {'table.copy', 'table.paste'}
 
         # Loop through the mapping and register shortcuts
         for key, method in shortcuts.items():
             shortcut_key = shortcut(key)
             shortcut_instance = QShortcut(QKeySequence(shortcut_key), t)
+            if key in table_focus_only:
+                shortcut_instance.setContext(Qt.ShortcutContext.WidgetShortcut)
             shortcut_instance.activated.connect(method)
 
     def _add_row_above(self):
         current_row = self.table_widget.currentRow()
-        self.__add_row(current_row, above=True)
-        logger.debug(f"Shortcut activated: add row above {current_row}")
+        self.insert_rows(self.__target_rows(current_row))
+        logger.debug("Shortcut activated: add rows above {}", current_row)
 
     def _add_row_below(self):
         current_row = self.table_widget.currentRow()
-        self.__add_row(current_row, above=False)
-        logger.debug(f"Shortcut activated: add row below {current_row}")
+        self.insert_rows(self.__target_rows(current_row), after=True)
+        logger.debug("Shortcut activated: add rows below {}", current_row)
 
     def _remove_row(self):
         current_row = self.table_widget.currentRow()
-        self.__remove_row(current_row)
-        logger.debug(f"Shortcut activated: remove row {current_row}")
+        self.remove_rows(self.__target_rows(current_row))
+        logger.debug("Shortcut activated: remove rows at {}", current_row)
 
     def _add_col_after(self):
         current_col = self.table_widget.currentColumn()
-        self.__add_column(current_col, before=False)
-        logger.debug(f"Shortcut activated: add column after {current_col}")
+        self.insert_columns(self.__target_columns(current_col), after=True)
+        logger.debug("Shortcut activated: add columns after {}", current_col)
 
     def _add_col_before(self):
         current_col = self.table_widget.currentColumn()
-        self.__add_column(current_col)
-        logger.debug(f"Shortcut activated: add column before {current_col}")
+        self.insert_columns(self.__target_columns(current_col))
+        logger.debug("Shortcut activated: add columns before {}", current_col)
 
     def _remove_col(self):
         current_col = self.table_widget.currentColumn()
-        self.__remove_column(current_col)
-        logger.debug(f"Shortcut activated: Removing column {current_col}")
+        self.remove_columns(self.__target_columns(current_col))
+        logger.debug("Shortcut activated: remove columns at {}", current_col)
 
     def handle_data_loaded(self, df: pd.DataFrame):
         """
@@ -207,22 +609,764 @@ class _TableWidgetInnerLogic:
         Sets the row and column counts, headers, and item values based
         on the DataFrame's structure and content.
 
+        Every column is converted to strings in one vectorized step. Items are
+        then created in chunks of `load_chunk_rows` rows; the first chunk is
+        filled right away and the rest are scheduled on the event loop so the
+        UI stays responsive. Repaints, model signals and sorting stay suspended
+        until the last chunk is in, and progress is reported through
+        TableWidget.load_progress.
+
         Args:
             df (pd.DataFrame): The DataFrame containing the data to display.
         """
         logger.debug("Loading data into table")
-        headers = df.columns.values.tolist()
+        tw = self.table_widget
+        headers = [str(h) for h in df.columns.values.tolist()]
 
-        self.table_widget.setRowCount(len(df))
-        self.table_widget.setColumnCount(len(headers))
-        self.table_widget.setHorizontalHeaderLabels(headers)
+        if self._pending_load is not None:
+            self._end_bulk_update()
+            self._pending_load = None
 
-        for i, row in df.iterrows():
-            for j, value in enumerate(row):
-                item = QTableWidgetItem(str(value))
-                self.table_widget.setItem(i, j, item)
+        tw.setRowCount(0)
+        self.reset_sort_and_filters()
+        tw.setRowCount(len(df))
+        tw.setColumnCount(len(headers))
+        tw.setHorizontalHeaderLabels(headers)
 
-        logger.info("Data loaded into table from DataFrame")
+        self._queue_rows(df, 0)
+
+    def handle_data_appended(self, df: pd.DataFrame):
+        """
+        Appends the rows of a DataFrame below the current table contents.
+        Columns are matched by position. Rows are filled the same chunked way
+        as in handle_data_loaded and queue up behind any load still in progress.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the rows to append.
+        """
+        tw = self.table_widget
+        if tw.columnCount() == 0:
+            self.handle_data_loaded(df)
+            return
+        if df.empty:
+            return
+
+        first_row = tw.rowCount()
+        blocked = tw.model().signalsBlocked()
+        tw.model().blockSignals(False)
+        tw.setRowCount(first_row + len(df))
+        tw.model().blockSignals(blocked)
+
+        self._queue_rows(df, first_row)
+
+    def _queue_rows(self, df: pd.DataFrame, first_row: int) -> None:
+        columns = [column_texts(df.iloc[:, j]) for j in range(df.shape[1])]
+        columns = columns[:self.table_widget.columnCount()]
+
+        if self._pending_load is None:
+            self._load_generation += 1
+            self._pending_load = _PendingLoad(self._load_generation)
+            self._begin_bulk_update()
+            self._pending_load.add(columns, first_row, len(df))
+            self._populate_chunk(self._load_generation)
+        else:
+            self._pending_load.add(columns, first_row, len(df))
+
+    def _populate_chunk(self, generation: int) -> None:
+        """
+        Creates the items for the next `load_chunk_rows` queued rows.
+
+        Args:
+            generation (int): Load the chunk belongs to; stale loads are dropped.
+        """
+        pending = self._pending_load
+        if pending is None or pending.generation != generation:
+            return
+
+        tw = self.table_widget
+        budget = self.load_chunk_rows
+        with telemetry.span('populate'):
+            while budget and pending.blocks:
+                block = pending.blocks[0]
+                columns, first_row, offset, rows = block
+                stop = min(offset + budget, rows)
+                for j, values in enumerate(columns):
+                    for i in range(offset, stop):
+                        tw.setItem(first_row + i, j, QTableWidgetItem(values[i]))
+                budget -= stop - offset
+                pending.done += stop - offset
+                block[2] = stop
+                if stop == rows:
+                    pending.blocks.popleft()
+        telemetry.count('populate.rows', self.load_chunk_rows - budget)
+
+        elapsed = max(time.perf_counter() - pending.started, 1e-9)
+        tw.load_progress.emit(pending.done, pending.total, pending.done / elapsed)
+
+        if pending.blocks:
+            QTimer.singleShot(0, lambda: self._populate_chunk(generation))
+            return
+
+        self._pending_load = None
+        self._end_bulk_update()
+        self._notify(TableReset())
+        logger.info("Data loaded into table from DataFrame: {} rows in {:.3f}s", pending.done, elapsed)
+
+    def finish_loading(self) -> None:
+        """
+        Synchronously fills any rows still waiting from a chunked load.
+        """
+        while self._pending_load is not None:
+            self._populate_chunk(self._pending_load.generation)
+
+    def _begin_bulk_update(self) -> None:
+        tw = self.table_widget
+        self._sorting_was_enabled = tw.isSortingEnabled()
+        tw.setSortingEnabled(False)
+        tw.setUpdatesEnabled(False)
+        tw.model().blockSignals(True)
+
+    def _end_bulk_update(self) -> None:
+        tw = self.table_widget
+        tw.model().blockSignals(False)
+        tw.setUpdatesEnabled(True)
+        tw.setSortingEnabled(self._sorting_was_enabled)
+        tw.viewport().update()
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """
+        Builds a DataFrame from the current contents of the table.
+
+        Returns:
+            pd.DataFrame: The table data, one string column per table column.
+        """
+        self.finish_loading()
+        tw = self.table_widget
+        rows = range(tw.rowCount())
+
+        # Read one column at a time and build the frame in a single step
+        data = {}
+        for col in range(tw.columnCount()):
+            items = [tw.item(row, col) for row in rows]
+            data[col] = [item.text() if item is not None else "" for item in items]
+
+        df = pd.DataFrame(data, index=pd.RangeIndex(len(rows)), dtype=object)
+        df.columns = self._header_labels()
+        return df
+
+    def snapshot_dataframe(self) -> pd.DataFrame:
+        """
+        Returns a copy of the table data that later edits do not affect.
+        """
+        return self.get_dataframe()
+
+    def cell_text(self, row: int, col: int) -> str:
+        """
+        Returns the text of a cell, or an empty string if the cell is empty.
+        """
+        item = self.table_widget.item(row, col)
+        return item.text() if item is not None else ""
+
+    def set_cell_text(self, row: int, col: int, text: str) -> None:
+        """
+        Sets the text of a cell and announces the change through `table_changed`.
+        """
+        old = self.cell_text(row, col)
+        if old == text:
+            return
+        self._write_cell(row, col, text)
+        self._notify(CellsChanged([row], [col], [old], [text]))
+
+    def _write_cell(self, row: int, col: int, text: str) -> None:
+        item = self.table_widget.item(row, col)
+        if item is None:
+            self.table_widget.setItem(row, col, QTableWidgetItem(text))
+        else:
+            item.setText(text)
+
+    def set_cells(self, rows: np.ndarray, cols: np.ndarray, texts: list[str], old: list[str] = None) -> int:
+        """
+        Writes many cells as one transaction.
+
+        The view is refreshed once at the end and a single CellsChanged is
+        emitted through `table_changed` instead of one notification per cell.
+
+        Args:
+            rows (np.ndarray): Row of every cell to write.
+            cols (np.ndarray): Column of every cell to write.
+            texts (list[str]): New text of every cell.
+            old (list[str], optional): Current text of every cell, if the caller
+                                       already has it.
+
+        Returns:
+            int: The number of cells written.
+        """
+        if not len(rows):
+            return 0
+        if old is None:
+            old = [self.cell_text(row, col) for row, col in zip(rows.tolist(), cols.tolist())]
+        self.finish_loading()
+        self._write_cells(rows, cols, texts)
+        self._notify(CellsChanged(rows, cols, list(old), list(texts)))
+        return len(rows)
+
+    def _write_cells(self, rows: np.ndarray, cols: np.ndarray, texts: list[str]) -> None:
+        self._begin_bulk_update()
+        try:
+            for row, col, text in zip(rows.tolist(), cols.tolist(), texts):
+                self._write_cell(row, col, text)
+        finally:
+            self._end_bulk_update()
+
+    def selected_ranges(self) -> list[tuple[int, int, int, int]]:
+        """
+        Returns the current selection as (top, bottom, left, right) ranges, bounds included.
+        """
+        return [(r.top(), r.bottom(), r.left(), r.right())
+                for r in self.table_widget.selectionModel().selection()]
+
+    def column_texts(self, col: int, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        Returns the text of the cells `start` to `stop` of a column, top to
+        bottom, by default the whole column.
+        """
+        self.finish_loading()
+        tw = self.table_widget
+        items = [tw.item(row, col) for row in range(*slice(start, stop).indices(tw.rowCount()))]
+        return np.array([item.text() if item is not None else "" for item in items], dtype=object)
+
+    def _notify(self, change: TableChange) -> None:
+        """
+        Keeps derived state in sync and emits `table_changed` on the widget.
+        """
+        if self._find_index is not None:
+            if isinstance(change, TableReset):
+                self._find_index_dirty = True
+                self._find_index_timer.start()
+            elif not self._find_index_dirty:
+                self._find_index.apply(change)
+        self.stats_cache.apply(change)
+        if not self._replaying:
+            self.history.record(change)
+        self.__follow_change(change)
+        self.table_widget.table_changed.emit(change)
+
+    # --- Applying changes ---
+
+    def apply_change(self, change: TableChange) -> None:
+        """
+        Performs the mutation a change describes and announces it through `table_changed`.
+
+        Args:
+            change (TableChange): Any change except TableReset; inserted rows and
+                                  columns are filled from their `values`, if given.
+        """
+        self.finish_loading()
+        if isinstance(change, CellsChanged):
+            self._write_cells(change.rows, change.cols, change.new)
+        elif isinstance(change, RowsInserted):
+            self._insert_rows(change.at, change.count, change.values)
+        elif isinstance(change, RowsRemoved):
+            self._remove_rows(change.at, change.count)
+        elif isinstance(change, ColumnsInserted):
+            labels = change.labels or [str(change.at + i + 1) for i in range(change.count)]
+            self._insert_columns(change.at, labels, change.values)
+        elif isinstance(change, ColumnsRemoved):
+            self._remove_columns(change.at, change.count)
+        elif isinstance(change, RowsMoved):
+            self._permute_rows(change.order)
+        elif isinstance(change, ChangeGroup):
+            # Undone or redone as one step, announced change by change
+            with self.batch_update():
+                for part in change.changes:
+                    self.apply_change(part)
+            return
+        else:
+            raise TypeError(f"Cannot apply {type(change).__name__}")
+        self._notify(change)
+
+    def undo(self) -> bool:
+        """
+        Reverts the latest change recorded in `history`.
+
+        Returns:
+            bool: False if there was nothing to undo.
+        """
+        return self.__replay(self.history.undo())
+
+    def redo(self) -> bool:
+        """
+        Applies the latest undone change again.
+
+        Returns:
+            bool: False if there was nothing to redo.
+        """
+        return self.__replay(self.history.redo())
+
+    def __replay(self, change: TableChange) -> bool:
+        if change is None:
+            return False
+        self._replaying = True
+        try:
+            self.apply_change(change)
+        finally:
+            self._replaying = False
+        logger.debug("Replayed {}", type(change).__name__)
+        return True
+
+    # The model calls below shift the rest of the table once per span, not once per row
+
+    def _insert_rows(self, at: int, count: int, values: list[np.ndarray] = None) -> None:
+        self.table_widget.model().insertRows(at, count)
+        if values is not None:
+            self._write_columns(at, 0, values)
+
+    def _remove_rows(self, at: int, count: int) -> None:
+        self.table_widget.model().removeRows(at, count)
+
+    def _insert_columns(self, at: int, labels: list[str], values: list[np.ndarray] = None) -> None:
+        self.table_widget.model().insertColumns(at, len(labels))
+        for offset, text in enumerate(labels):
+            self._set_header_label(at + offset, text)
+        if values is not None:
+            self._write_columns(0, at, values)
+
+    def _remove_columns(self, at: int, count: int) -> None:
+        self.table_widget.model().removeColumns(at, count)
+
+    def _permute_rows(self, order: np.ndarray) -> None:
+        """
+        Reorders the rows so that new row `i` is current row `order[i]`.
+        Only rows that actually change place are touched; rows hidden by a
+        filter stay hidden.
+        """
+        tw = self.table_widget
+        hidden = self._hidden_rows() if self._rows_filtered else None
+        moved = np.flatnonzero(order != np.arange(len(order))).tolist()
+        columns = range(tw.columnCount())
+        self._begin_bulk_update()
+        try:
+            items = [[tw.takeItem(int(order[row]), col) for col in columns] for row in moved]
+            for row, row_items in zip(moved, items):
+                for col, item in enumerate(row_items):
+                    if item is not None:
+                        tw.setItem(row, col, item)
+        finally:
+            self._end_bulk_update()
+        if hidden is not None:
+            self._set_hidden_rows(hidden[order])
+
+    def _write_columns(self, first_row: int, first_col: int, values: list[np.ndarray]) -> None:
+        """
+        Writes the non-empty texts of a block given column by column.
+        """
+        rows, cols, texts = [], [], []
+        for offset, column in enumerate(values):
+            column = np.asarray(column, dtype=object)
+            hits = np.flatnonzero(column != '')
+            rows.append(hits + first_row)
+            cols.append(np.full(len(hits), first_col + offset, dtype=np.int64))
+            texts.extend(column[hits].tolist())
+        if texts:
+            self._write_cells(np.concatenate(rows), np.concatenate(cols), texts)
+
+    def _row_texts(self, at: int, count: int) -> list[np.ndarray]:
+        """
+        Returns the text of `count` rows starting at `at`, one array per column.
+        """
+        rows = range(at, at + count)
+        return [np.array([self.cell_text(row, col) for row in rows], dtype=object)
+                for col in range(self.table_widget.columnCount())]
+
+    # --- Find index ---
+
+    def enable_find_index(self, enabled: bool = True) -> None:
+        """
+        Turns the exact-match find index on or off.
+
+        The index costs memory roughly proportional to the number of non-empty
+        cells (see find_index_memory_usage()) and makes every exact find,
+        match count and navigation proportional to the number of matches.
+        """
+        if enabled and self._find_index is None:
+            self._find_index = CellIndex()
+            self._find_index_dirty = True
+            self._find_index_timer.start()
+        elif not enabled:
+            self._find_index = None
+            self._find_index_timer.stop()
+
+    def find_index(self) -> CellIndex:
+        """
+        Returns the up to date find index, building it if needed.
+        Returns None if the index is disabled.
+        """
+        if self._find_index is not None and self._find_index_dirty:
+            started = time.perf_counter()
+            columns = [self.column_texts(col) for col in range(self.table_widget.columnCount())]
+            self._find_index.build(columns)
+            self._find_index_dirty = False
+            elapsed = time.perf_counter() - started
+            # Measuring the index walks all of it, so only when the message is shown
+            logger.opt(lazy=True).info("Find index built in {:.3f}s, {:.1f} MB",
+                                       lambda: elapsed, lambda: self._find_index.memory_usage() / 2 ** 20)
+        return self._find_index
+
+    def find_index_memory_usage(self) -> int:
+        """
+        Returns the memory used by the find index in bytes, 0 if it is disabled.
+        """
+        return self._find_index.memory_usage() if self._find_index is not None else 0
+
+    def __build_find_index_when_idle(self) -> None:
+        if self._pending_load is None:
+            self.find_index()
+
+    # --- Statistics ---
+
+    def column_stats(self, col: int) -> Aggregates:
+        """
+        Returns the aggregates of a whole column, including rows hidden by a filter.
+
+        They are cached in `stats_cache` and updated from every change, so asking
+        again after edits only recomputes what the edits may have affected.
+        """
+        self.finish_loading()
+        summary = self.stats_cache.get(col)
+        if summary is None or summary.stale:
+            with telemetry.span('stats'):
+                summary = summarize(self._column_values(col), summary)
+            self.stats_cache.store(col, summary)
+        return replace(summary.aggregates)
+
+    def selection_stats(self) -> Aggregates:
+        """
+        Returns the aggregates of the selected cells that are shown, None if nothing is selected.
+        """
+        version = self.stats_cache.version
+        parts = self.stats_parts()
+        if not parts:
+            return None
+        aggregates, summaries = compute(parts)
+        self.cache_stats(parts, summaries, version)
+        return aggregates
+
+    def stats_parts(self, ranges: list[tuple[int, int, int, int]] = None) -> list[tuple]:
+        """
+        Splits the selection into the parts its aggregates are computed from.
+
+        Args:
+            ranges (list, optional): selected_ranges(), if the caller already has them.
+
+        Returns:
+            list[tuple]: (col, values, summary) for every column selected as a whole:
+                         its cached summary and, if that is missing or stale, its
+                         values. (None, selected cells, None) for the other columns.
+        """
+        self.finish_loading()
+        ranges = self.selected_ranges() if ranges is None else ranges
+        parts = []
+        for col in sorted({col for _, _, left, right in ranges for col in range(left, right + 1)}):
+            mask = self.selection_mask(col, ranges)
+            if mask.all():
+                summary = self.stats_cache.get(col)
+                values = self._column_values(col) if summary is None or summary.stale else None
+                parts.append((col, values, summary))
+            elif mask.any():
+                parts.append((None, self._column_values(col)[mask], None))
+        return parts
+
+    def cache_stats(self, parts: list[tuple], summaries: list, version: int) -> None:
+        """
+        Caches the column summaries computed from stats_parts() taken when
+        `stats_cache` was at `version`; they are dropped if the table changed since.
+        """
+        for (col, _, _), summary in zip(parts, summaries):
+            if col is not None:
+                self.stats_cache.store(col, summary, version)
+
+    # --- Sorting and filtering ---
+
+    def sort_by(self, keys: list[tuple[int, bool]]) -> None:
+        """
+        Sorts the rows by one or more columns, see blackbox.app.table.proxy.
+
+        TableView only changes the order the rows are shown in. QTableWidget
+        cannot show its items through a proxy, so TableWidget moves the rows
+        instead, as one RowsMoved that can be undone.
+
+        Args:
+            keys (list[tuple[int, bool]]): (column, ascending) pairs, most significant first.
+                                           An empty list shows TableView rows in data order again.
+        """
+        self.finish_loading()
+        self._sort_keys = [(int(col), bool(ascending)) for col, ascending in keys]
+        with telemetry.span('sort') as span:
+            self._apply_sort()
+        self.__update_sort_indicator()
+        logger.info("Sorted by {} in {:.3f}s", self._sort_keys, span.elapsed)
+
+    def sort_keys(self) -> list[tuple[int, bool]]:
+        return list(self._sort_keys)
+
+    def toggle_sort(self, col: int, add: bool = False) -> None:
+        """
+        Sorts by a column as a click on its header does: ascending first, the
+        other way round if it already is the primary key.
+
+        Args:
+            col (int): The column.
+            add (bool, optional): If True, the column is added to the current keys
+                                  or flipped in place among them. Defaults to False.
+        """
+        directions = dict(self._sort_keys)
+        if not add:
+            primary = self._sort_keys and self._sort_keys[0][0] == col
+            self.sort_by([(col, not directions[col] if primary else True)])
+        elif col in directions:
+            self.sort_by([(c, not a if c == col else a) for c, a in self._sort_keys])
+        else:
+            self.sort_by(self._sort_keys + [(col, True)])
+
+    def set_filter(self, col: int, expression: str) -> None:
+        """
+        Shows only the rows whose cell in `col` passes a filter expression,
+        see blackbox.app.table.proxy for the syntax.
+
+        Args:
+            col (int): The column.
+            expression (str): The expression; an empty one removes the filter of the column.
+
+        Raises:
+            ValueError: If the expression holds an invalid regular expression.
+        """
+        self.finish_loading()
+        if expression.strip():
+            self._filters[col] = ColumnFilter(expression)
+        elif self._filters.pop(col, None) is None:
+            return
+        with telemetry.span('filter') as span:
+            self._apply_filters()
+        logger.info("Filtered by {} in {:.3f}s", self.filters(), span.elapsed)
+
+    def clear_filters(self) -> None:
+        self._filters = {}
+        with telemetry.span('filter'):
+            self._apply_filters()
+
+    def filters(self) -> dict[int, str]:
+        """
+        Returns the filter expression of every filtered column.
+        """
+        return {col: f.expression for col, f in self._filters.items()}
+
+    def reset_sort_and_filters(self) -> None:
+        """
+        Forgets the sort keys and filters, for a table loaded from scratch.
+        """
+        self._sort_keys, self._filters, self._sort_ranks = [], {}, {}
+        self._apply_filters()
+        self.__update_sort_indicator()
+
+    def source_rows(self, rows) -> np.ndarray:
+        """
+        Returns the data row shown at every given row of the view.
+        """
+        return np.asarray(rows, dtype=np.int64)
+
+    def view_rows(self, rows) -> np.ndarray:
+        """
+        Returns the row of the view showing every given data row, -1 for rows hidden by a filter.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self._rows_filtered:
+            return rows
+        return np.where(self._hidden_rows()[rows], -1, rows)
+
+    def highlight_matches(self, matches: Matches) -> None:
+        """
+        Highlights the cells of `matches` where the table shows them, None
+        removes the highlight. Later changes of `matches` show up with the
+        next repaint of the viewport.
+        """
+        self.highlighted_matches = matches
+        self.table_widget.viewport().update()
+
+    def show_cell(self, row: int, col: int) -> bool:
+        """
+        Makes a data cell the current cell, unless a filter hides its row.
+
+        Returns:
+            bool: False if the row is hidden.
+        """
+        view_row = int(self.view_rows([row])[0])
+        if view_row < 0:
+            return False
+        self.table_widget.setCurrentCell(view_row, col)
+        return True
+
+    def _rows_reordered(self) -> bool:
+        """
+        True while the view shows the rows in an order other than the data order.
+        """
+        return False
+
+    def _column_values(self, col: int):
+        return self.column_texts(col)
+
+    def _sort_order(self, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Returns `rows` (by default all rows) in the order of the sort keys.
+        """
+        ranks = []
+        for col, _ in self._sort_keys:
+            if col not in self._sort_ranks:
+                self._sort_ranks[col] = sort_ranks(self._column_values(col))
+            ranks.append(self._sort_ranks[col])
+        if rows is None:
+            rows = np.arange(self.table_widget.rowCount(), dtype=np.int64)
+        return sort_rows(ranks, [ascending for _, ascending in self._sort_keys], rows)
+
+    def _filter_mask(self) -> np.ndarray:
+        """
+        Returns a boolean mask of the data rows that pass every filter.
+        """
+        mask = np.ones(self.table_widget.rowCount(), dtype=bool)
+        for col, column_filter in self._filters.items():
+            mask &= column_filter.match(self._column_values(col))
+        return mask
+
+    def _apply_sort(self) -> None:
+        if not self._sort_keys:
+            return
+        order = self._sort_order()
+        if (order != np.arange(len(order))).any():
+            self.apply_change(RowsMoved(order))
+
+    def _apply_filters(self) -> None:
+        if not self._filters and not self._rows_filtered:
+            return
+        self._set_hidden_rows(~self._filter_mask())
+
+    def _hidden_rows(self) -> np.ndarray:
+        tw = self.table_widget
+        count = tw.rowCount()
+        return np.fromiter((tw.isRowHidden(row) for row in range(count)), dtype=bool, count=count)
+
+    def _set_hidden_rows(self, hidden: np.ndarray) -> None:
+        tw = self.table_widget
+        changed = np.flatnonzero(self._hidden_rows() != hidden).tolist()
+        tw.setUpdatesEnabled(False)
+        try:
+            for row in changed:
+                tw.setRowHidden(row, bool(hidden[row]))
+        finally:
+            tw.setUpdatesEnabled(True)
+        self._rows_filtered = bool(hidden.any())
+
+    def __follow_change(self, change: TableChange) -> None:
+        """
+        Keeps the cached sort ranks, sort keys and filters in line with a change.
+        """
+        if isinstance(change, CellsChanged):
+            for col in np.unique(change.cols).tolist():
+                self._sort_ranks.pop(col, None)
+        elif isinstance(change, RowsMoved):
+            self._sort_ranks = {col: ranks[change.order] for col, ranks in self._sort_ranks.items()}
+        else:
+            self._sort_ranks.clear()
+
+        if isinstance(change, (ColumnsInserted, ColumnsRemoved)):
+            removed = isinstance(change, ColumnsRemoved)
+
+            def moved(col: int) -> int:
+                if col < change.at:
+                    return col
+                if removed:
+                    return -1 if col < change.at + change.count else col - change.count
+                return col + change.count
+
+            filtered = len(self._filters)
+            self._sort_keys = [(moved(col), a) for col, a in self._sort_keys if moved(col) != -1]
+            self._filters = {moved(col): f for col, f in self._filters.items() if moved(col) != -1}
+            self.__update_sort_indicator()
+            if len(self._filters) != filtered:
+                self._apply_filters()
+
+    def __setup_header(self) -> None:
+        header = self.table_widget.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.sectionClicked.connect(self.__on_header_clicked)
+        header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.show_header_menu)
+
+    def __on_header_clicked(self, col: int) -> None:
+        # Shift+click adds the column as a further sort key
+        add = bool(QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier)
+        self.toggle_sort(col, add)
+
+    def __update_sort_indicator(self) -> None:
+        header = self.table_widget.horizontalHeader()
+        header.setSortIndicatorShown(bool(self._sort_keys))
+        if self._sort_keys:
+            col, ascending = self._sort_keys[0]
+            order = Qt.SortOrder.AscendingOrder if ascending else Qt.SortOrder.DescendingOrder
+            header.setSortIndicator(col, order)
+
+    def show_header_menu(self, pos):
+        """
+        Displays the sort and filter menu of a column header.
+
+        Args:
+            pos (QPoint): The position in the header where the menu is requested.
+        """
+        SEPARATOR_INDEX = 3
+        header = self.table_widget.horizontalHeader()
+        col = header.logicalIndexAt(pos)
+        if col < 0:
+            return
+
+        menu = QMenu(self.table_widget)
+        action_map = {
+            'header_menu.sort_ascending': (lambda: self.sort_by([(col, True)])),
+            'header_menu.sort_descending': (lambda: self.sort_by([(col, False)])),
+            'header_menu.clear_sort': (lambda: self.sort_by([])),
+
+            'header_menu.filter': (lambda: self.__ask_filter(col)),
+            'header_menu.clear_filter': (lambda: self.set_filter(col, '')),
+            'header_menu.clear_all_filters': self.clear_filters,
+        }
+        for idx, action_key in enumerate(action_map.keys()):
+            if idx == SEPARATOR_INDEX:
+                menu.addSeparator()
+            menu.addAction(self.__create_action(action_key, action_map[action_key]))
+
+        menu.exec(header.mapToGlobal(pos))
+
+    def __ask_filter(self, col: int) -> None:
+        current = self._filters.get(col)
+        text, ok = QInputDialog.getText(
+            self.table_widget,
+            label('header_menu.filter_title'),
+            label('header_menu.filter_prompt').format(column=self._header_labels()[col]),
+            text=current.expression if current is not None else '',
+        )
+        if not ok:
+            return
+        try:
+            self.set_filter(col, text)
+        except ValueError as e:
+            QMessageBox.warning(self.table_widget, label('header_menu.filter_title'), str(e))
+
+    def _header_labels(self) -> list[str]:
+        labels = []
+        for i in range(self.table_widget.columnCount()):
+            item = self.table_widget.horizontalHeaderItem(i)
+            labels.append(item.text() if item is not None else str(i + 1))
+        return labels
+
+    def _set_header_label(self, col: int, text: str) -> None:
+        self.table_widget.setHorizontalHeaderItem(col, QTableWidgetItem(text))
 
     def show_context_menu(self, pos):
         """
@@ -243,16 +1387,19 @@ class _TableWidgetInnerLogic:
 
         # Action configuration
         # Use dot.notation for accessing labels from blackbox/app/static/namespace/en_labels.json
+        # Actions apply to the whole selection if the clicked cell is part of it
+        rows = self.__target_rows(index.row())
+        cols = self.__target_columns(index.column())
         action_map = {
             # Row Actions
-            'table_context_menu.remove': (lambda: self.__remove_row(index.row())),
-            'table_context_menu.add_above': (lambda: self.__add_row(index.row(), above=True)),
-            'table_context_menu.add_below': (lambda: self.__add_row(index.row(), above=False)),
+            'table_context_menu.remove': (lambda: self.remove_rows(rows)),
+            'table_context_menu.add_above': (lambda: self.insert_rows(rows)),
+            'table_context_menu.add_below': (lambda: self.insert_rows(rows, after=True)),
 
             # Column Actions
-            'table_context_menu.remove_column': (lambda: self.__remove_column(index.column())),
-            'table_context_menu.add_column_before': (lambda: self.__add_column(index.column(), before=True)),
-            'table_context_menu.add_column_after': (lambda: self.__add_column(index.column(), before=False))
+            'table_context_menu.remove_column': (lambda: self.remove_columns(cols)),
+            'table_context_menu.add_column_before': (lambda: self.insert_columns(cols)),
+            'table_context_menu.add_column_after': (lambda: self.insert_columns(cols, after=True))
         }
 
     # Dynamically create actions and add to menu
@@ -280,60 +1427,6 @@ class _TableWidgetInnerLogic:
 
 
 
-    def __add_column(self, col=None, before=True):
-        """
-        Adds a new column to the table with a unique name.
-
-        Args:
-            col (int, optional): The index of the column relative to which the new column will be added.
-                                If None, the column is added at the end. Defaults to None.
-            before (bool, optional): If True, the new column is inserted before the specified column.
-                                    If False, it's inserted after. Defaults to True.
-        """
-        if col is None:
-            col = self.table_widget.columnCount()
-
-        insert_at = col if before else col + 1
-        self.table_widget.insertColumn(insert_at)
-
-        # Generate a unique column name
-        existing_headers = {
-            self.table_widget.horizontalHeaderItem(i).text()
-            for i in range(self.table_widget.columnCount())
-            if self.table_widget.horizontalHeaderItem(i) is not None
-            }
-
-        base_name = "Column"
-        counter = 1
-
-        # Find the first available name
-        while f"{base_name} {counter}" in existing_headers:
-            counter += 1
-
-        unique_name = f"{base_name} {counter}"
-
-        # Set the unique header label
-        self.table_widget.setHorizontalHeaderItem(insert_at, QTableWidgetItem(unique_name))
-        logger.info(f"Added column at index {insert_at} with label '{unique_name}'")
-
-
-    def __remove_column(self, col=None):
-        """
-        Removes a column from the table.
-
-        Args:
-            col (int, optional): The index of the column to remove.
-                                If None, the last column is removed. Defaults to None.
-        """
-        if col is None:
-            col = self.table_widget.columnCount() - 1
-        
-        if col >= 0 and self.table_widget.columnCount() > 0:
-            self.table_widget.removeColumn(col)
-            logger.info(f"Removed column at index {col}")
-
-
-
 class TableWidget(QTableWidget):
     """
     A custom QTableWidget with enhanced functionalities such as drag-and-drop
@@ -342,7 +1435,16 @@ class TableWidget(QTableWidget):
 
     This widget integrates the logic provided by the _TableWidgetInnerLogic
     to handle these features.
+
+    Signals:
+        load_progress (int, int, float): Rows loaded so far, total rows and
+                                         the load rate in rows per second.
+        table_changed (TableChange): Emitted after every change made through
+                                     the table logic, see blackbox.core.changes.
     """
+    load_progress = pyqtSignal(int, int, float)
+    table_changed = pyqtSignal(object)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -391,3 +1493,68 @@ class TableWidget(QTableWidget):
             df (pd.DataFrame): The DataFrame containing the data to display.
         """
         self.logic.handle_data_loaded(df)
+
+    def handle_data_appended(self, df: pd.DataFrame):
+        """
+        A convenience method to append rows to the table using the internal logic.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the rows to append.
+        """
+        self.logic.handle_data_appended(df)
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the table contents as a DataFrame.
+        """
+        return self.logic.get_dataframe()
+
+    def set_dataframe(self, df: pd.DataFrame, copy: bool = False) -> None:
+        """
+        Replaces the table contents with the given DataFrame.
+        Cell items always hold their own copy of the data, so `copy` is
+        accepted only for API parity with TableView.
+        """
+        self.logic.handle_data_loaded(df)
+
+    def snapshot_dataframe(self) -> pd.DataFrame:
+        """
+        Returns a copy of the table data that later edits do not affect.
+        """
+        return self.logic.snapshot_dataframe()
+
+    def enable_find_index(self, enabled: bool = True) -> None:
+        """
+        Turns the exact-match find index on or off, see _TableWidgetInnerLogic.enable_find_index.
+        """
+        self.logic.enable_find_index(enabled)
+
+    def find_index_memory_usage(self) -> int:
+        """
+        Returns the memory used by the find index in bytes.
+        """
+        return self.logic.find_index_memory_usage()
+
+    def column_stats(self, col: int) -> Aggregates:
+        """
+        Returns the cached aggregates of a whole column, see _TableWidgetInnerLogic.column_stats.
+        """
+        return self.logic.column_stats(col)
+
+    def selection_stats(self) -> Aggregates:
+        """
+        Returns the aggregates of the selected cells, None if nothing is selected.
+        """
+        return self.logic.selection_stats()
+
+    def undo(self) -> bool:
+        """
+        Reverts the latest change, see _TableWidgetInnerLogic.undo.
+        """
+        return self.logic.undo()
+
+    def redo(self) -> bool:
+        """
+        Applies the latest undone change again.
+        """
+        return self.logic.redo()
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+from loguru import logger
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import QAbstractItemView, QHeaderView, QTableView
+
+from blackbox.app.table.model import DataFrameModel
+from blackbox.app.table.proxy import SortFilterProxyModel
+from blackbox.app.table.stats import Aggregates
+from blackbox.app.table.table import _TableWidgetInnerLogic
+from blackbox.core import telemetry
+from blackbox.core.changes import TableReset
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+sqlite = lazy_import('blackbox.core.sqlite')
+
+
+class _TableViewInnerLogic(_TableWidgetInnerLogic):
+    """
+    Table logic for the model/view mode.
+
+    Reuses the context menu, shortcuts, dialogs and drag-and-drop handling of
+    _TableWidgetInnerLogic and redirects every data access to the DataFrameModel
+    behind the TableView instead of per-cell QTableWidgetItems. Sorting and
+    filtering only change the rows the SortFilterProxyModel maps to.
+    """
+
+    @property
+    def model(self) -> DataFrameModel:
+        return self.table_widget.source_model()
+
+    @property
+    def proxy(self) -> SortFilterProxyModel:
+        return self.table_widget.model()
+
+    def source_rows(self, rows) -> np.ndarray:
+        return self.proxy.source_rows(rows)
+
+    def view_rows(self, rows) -> np.ndarray:
+        return self.proxy.view_rows(rows)
+
+    def _rows_reordered(self) -> bool:
+        return bool(self._sort_keys)
+
+    def _column_values(self, col: int):
+        return self.model.column_values(col)
+
+    def _apply_sort(self) -> None:
+        self.__update_proxy()
+
+    def _apply_filters(self) -> None:
+        self.__update_proxy()
+
+    def __update_proxy(self) -> None:
+        if not self._sort_keys and not self._filters:
+            self.proxy.set_rows(None)
+            return
+        rows = np.flatnonzero(self._filter_mask()) if self._filters else None
+        if self._sort_keys:
+            rows = self._sort_order(rows)
+        self.proxy.set_rows(rows, ordered=bool(self._sort_keys))
+
+    def handle_data_loaded(self, df: pd.DataFrame):
+        """
+        Shows the DataFrame in the view without copying it.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the data to display.
+        """
+        logger.debug("Loading data into model")
+        self.reset_sort_and_filters()
+        with telemetry.span('populate') as span:
+            self.model.set_dataframe(df, copy=False)
+        telemetry.count('populate.rows', len(df))
+        elapsed = max(span.elapsed, 1e-9)
+        self.table_widget.load_progress.emit(len(df), len(df), len(df) / elapsed)
+        self._notify(TableReset())
+        logger.info("Data loaded into model from DataFrame")
+
+    def handle_data_appended(self, df: pd.DataFrame):
+        """
+        Appends the rows of a DataFrame below the data shown in the view.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the rows to append.
+        """
+        if self.model.columnCount() == 0:
+            self.handle_data_loaded(df)
+            return
+        with telemetry.span('populate') as span:
+            self.model.append_dataframe(df)
+        telemetry.count('populate.rows', len(df))
+        elapsed = max(span.elapsed, 1e-9)
+        rows = self.model.rowCount()
+        self.table_widget.load_progress.emit(rows, rows, len(df) / elapsed)
+        self._notify(TableReset())
+
+    def finish_loading(self) -> None:
+        """
+        The model shows the whole frame at once, so there is nothing to flush.
+        """
+
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.model.get_dataframe()
+
+    def snapshot_dataframe(self) -> pd.DataFrame:
+        df = self.model.get_dataframe()
+        if any(dtype == 'sqlite' for dtype in df.dtypes):
+            # SQLite columns are only keys; their cells are read now, in step with write-back
+            return sqlite.read_frame(df)
+        # Object columns copy only their pointer arrays, the strings are shared
+        return df.copy()
+
+    def cell_text(self, row: int, col: int) -> str:
+        return self.model.cell_text(row, col)
+
+    def _write_cell(self, row: int, col: int, text: str) -> None:
+        self.model.setData(self.model.index(row, col), text)
+
+    def _write_cells(self, rows: np.ndarray, cols: np.ndarray, texts: list[str]) -> None:
+        self.model.set_cells(rows, cols, texts)
+
+    def column_texts(self, col: int, start: int = 0, stop: int = None) -> np.ndarray:
+        return self.model.column_texts(col, start, stop)
+
+    def _column_cells(self, col: int, rows: np.ndarray) -> np.ndarray:
+        if not len(rows):
+            return np.empty(0, dtype=object)
+        # Formats only the span of the rows, not the whole column
+        first = int(rows.min())
+        return np.asarray(self.model.column_texts(col, first, int(rows.max()) + 1), dtype=object)[rows - first]
+
+    def _row_texts(self, at: int, count: int) -> list[np.ndarray]:
+        # Copy, so the history does not keep whole columns alive through slices
+        return [np.array(self.model.column_texts(col, at, at + count), dtype=object)
+                for col in range(self.model.columnCount())]
+
+    def _insert_rows(self, at: int, count: int, values: list[np.ndarray] = None) -> None:
+        self.model.insertRows(at, count)
+        if values is not None:
+            self._write_columns(at, 0, values)
+
+    def _remove_rows(self, at: int, count: int) -> None:
+        self.model.removeRows(at, count)
+
+    def _insert_columns(self, at: int, labels: list[str], values: list[np.ndarray] = None) -> None:
+        self.model.insert_columns(at, labels, values)
+
+    def _remove_columns(self, at: int, count: int) -> None:
+        self.model.removeColumns(at, count)
+
+    def _permute_rows(self, order: np.ndarray) -> None:
+        self.model.permute_rows(order)
+
+    def _header_labels(self) -> list[str]:
+        return self.model.header_labels()
+
+    def _set_header_label(self, col: int, text: str) -> None:
+        self.model.setHeaderData(col, Qt.Orientation.Horizontal, text)
+
+
+class TableView(QTableView):
+    """
+    A QTableView counterpart of TableWidget for large tables.
+
+    Data lives in a DataFrameModel, so loading a sheet costs one reference to
+    its columns instead of one QTableWidgetItem per cell, and only the cells in
+    the visible viewport are ever formatted. The context menu, shortcuts,
+    find/replace dialogs and row drag-and-drop behave as in TableWidget.
+
+    The view shows the model through a SortFilterProxyModel, so sorting and
+    filtering never move the data. The small set of QTableWidget-style helpers
+    below (rowCount, insertRow, ...) lets the shared table logic drive both
+    widgets; they count data rows, while currentRow() and setCurrentCell()
+    work on the rows as shown.
+
+    Signals:
+        load_progress (int, int, float): Same as TableWidget.load_progress.
+        table_changed (TableChange): Same as TableWidget.table_changed.
+    """
+    load_progress = pyqtSignal(int, int, float)
+    table_changed = pyqtSignal(object)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        proxy = SortFilterProxyModel(self)
+        proxy.setSourceModel(DataFrameModel(parent=self))
+        self.setModel(proxy)
+
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.viewport().setAcceptDrops(True)
+        self.setDragDropOverwriteMode(False)
+        self.setDropIndicatorShown(True)
+
+        _select = QAbstractItemView.SelectionMode.ExtendedSelection
+        _behv = QAbstractItemView.SelectionBehavior.SelectRows
+        _dnd = QAbstractItemView.DragDropMode.InternalMove
+        self.setSelectionMode(_select)
+        self.setSelectionBehavior(_behv)
+        self.setDragDropMode(_dnd)
+
+        # Fixed row heights keep the vertical header from measuring every row
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+
+        self.logic = _TableViewInnerLogic(self)
+
+    def source_model(self) -> DataFrameModel:
+        return self.model().sourceModel()
+
+    def rowCount(self) -> int:
+        return self.source_model().rowCount()
+
+    def columnCount(self) -> int:
+        return self.source_model().columnCount()
+
+    def insertRow(self, row: int) -> None:
+        self.source_model().insertRows(row, 1)
+
+    def removeRow(self, row: int) -> None:
+        self.source_model().removeRows(row, 1)
+
+    def insertColumn(self, col: int) -> None:
+        self.source_model().insertColumns(col, 1)
+
+    def removeColumn(self, col: int) -> None:
+        self.source_model().removeColumns(col, 1)
+
+    def currentRow(self) -> int:
+        return self.currentIndex().row()
+
+    def currentColumn(self) -> int:
+        return self.currentIndex().column()
+
+    def setCurrentCell(self, row: int, col: int) -> None:
+        self.setCurrentIndex(self.model().index(row, col))
+
+    def dropEvent(self, event):
+        """
+        Overrides the default dropEvent to use the custom drag-and-drop logic.
+
+        Args:
+            event (QDropEvent): The drop event object.
+        """
+        self.logic.drop_event_logic(event)
+
+    def show_context_menu(self, pos):
+        """
+        Overrides the default show_context_menu to use the custom context menu logic.
+
+        Args:
+            pos (QPoint): The position where the context menu is requested.
+        """
+        self.logic.show_context_menu(pos)
+
+    def handle_data_loaded(self, df: pd.DataFrame):
+        """
+        A convenience method to load data into the view using the internal logic.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the data to display.
+        """
+        self.logic.handle_data_loaded(df)
+
+    def handle_data_appended(self, df: pd.DataFrame):
+        """
+        A convenience method to append rows to the view using the internal logic.
+
+        Args:
+            df (pd.DataFrame): The DataFrame containing the rows to append.
+        """
+        self.logic.handle_data_appended(df)
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the DataFrame behind the view without copying it.
+        """
+        return self.source_model().get_dataframe()
+
+    def set_dataframe(self, df: pd.DataFrame, copy: bool = False) -> None:
+        """
+        Shows a DataFrame in the view, like a loaded file: the undo history
+        and everything else that follows the table start over.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to display.
+            copy (bool, optional): If True, the view edits a private copy of `df`.
+                                   Defaults to False.
+        """
+        self.logic.handle_data_loaded(df.copy() if copy else df)
+
+    def snapshot_dataframe(self) -> pd.DataFrame:
+        """
+        Returns a copy of the data that later edits in the view do not affect.
+        """
+        return self.logic.snapshot_dataframe()
+
+    def enable_find_index(self, enabled: bool = True) -> None:
+        """
+        Turns the exact-match find index on or off, see _TableWidgetInnerLogic.enable_find_index.
+        """
+        self.logic.enable_find_index(enabled)
+
+    def find_index_memory_usage(self) -> int:
+        """
+        Returns the memory used by the find index in bytes.
+        """
+        return self.logic.find_index_memory_usage()
+
+    def column_stats(self, col: int) -> Aggregates:
+        """
+        Returns the cached aggregates of a whole column, see _TableWidgetInnerLogic.column_stats.
+        """
+        return self.logic.column_stats(col)
+
+    def selection_stats(self) -> Aggregates:
+        """
+        Returns the aggregates of the selected cells, None if nothing is selected.
+        """
+        return self.logic.selection_stats()
+
+    def undo(self) -> bool:
+        """
+        Reverts the latest change, see _TableWidgetInnerLogic.undo.
+        """
+        return self.logic.undo()
+
+    def redo(self) -> bool:
+        """
+        Applies the latest undone change again.
+        """
+        return self.logic.redo()
@@ -0,0 +1,410 @@
+"""
+Multi-sheet workbooks, parsed one sheet at a time.
+
+Only the first sheet of a workbook is read when it is opened. The names of the
+other sheets come from the workbook metadata (`xl/workbook.xml` inside the
+xlsx zip), so listing them costs no sheet parsing. Each sheet is parsed on a
+worker thread when its tab is first activated and kept in a memory-capped LRU
+cache; saving copies the original zip and regenerates only the edited sheets.
+"""
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtWidgets import QTabBar
+
+from blackbox.core import telemetry
+from blackbox.core.changes import TableReset
+from blackbox.core.lazy import lazy_import
+from blackbox.core.workbook import frame_bytes
+
+pd = lazy_import('pandas')
+
+# Parsed sheets that were not edited are dropped, least recently used first,
+# once they take more than this many bytes
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class _SheetWorker(QObject):
+    """
+    Parses one sheet of a workbook on a background thread.
+    """
+    loaded = pyqtSignal(str, object, int)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, excel_loader, path: str, name: str):
+        super().__init__()
+        self.excel_loader = excel_loader
+        self.path = path
+        self.name = name
+
+    def run(self) -> None:
+        try:
+            with telemetry.span('parse'):
+                df = self.excel_loader.read_excel(self.path, sheet_name=self.name)
+            telemetry.count('load.rows', len(df))
+            size = frame_bytes(df)
+        except Exception as e:
+            logger.exception("Error reading sheet {} of {}", self.name, self.path)
+            self.failed.emit(self.name, str(e))
+            return
+        finally:
+            self.thread().quit()
+
+        self.loaded.emit(self.name, df, size)
+
+
+class Workbook(QObject):
+    """
+    The sheets of one workbook file, parsed on demand.
+
+    A sheet is parsed on a worker thread the first time it is requested and
+    then kept in an LRU cache. Once the unedited sheets in the cache take more
+    than `max_bytes`, the least recently used ones are dropped and parsed again
+    when requested. Edited sheets stay in memory until they are saved.
+
+    Signals:
+        sheet_ready (str, pd.DataFrame): A requested sheet is available.
+        sheet_failed (str, str): A sheet could not be parsed, and why.
+    """
+    sheet_ready = pyqtSignal(str, object)
+    sheet_failed = pyqtSignal(str, str)
+
+    def __init__(self, path: str, names: list[str], excel_loader,
+                 max_bytes: int = DEFAULT_MAX_BYTES, parent=None):
+        """
+        Args:
+            path (str): The workbook file.
+            names (list[str]): Its sheets, see blackbox.core.workbook.sheet_names.
+            excel_loader (ExcelLoader): Parses single sheets.
+            max_bytes (int, optional): Cap of the unedited sheets kept in memory.
+                                       Defaults to DEFAULT_MAX_BYTES.
+            parent (QObject, optional): Parent object.
+        """
+        super().__init__(parent)
+        self.path = path
+        self.names = list(names)
+        self.excel_loader = excel_loader
+        self._max_bytes = max_bytes
+        self._frames: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        # Sheet name to the number of edits stored since it was last saved
+        self._versions: dict[str, int] = {}
+        self._workers: dict[str, _SheetWorker] = {}
+        self._threads: set[QThread] = set()
+        self._closed = False
+
+    def request(self, name: str) -> None:
+        """
+        Emits sheet_ready for `name` right away if it is cached, otherwise once
+        a worker thread has parsed it.
+        """
+        if name in self._frames:
+            self._frames.move_to_end(name)
+            telemetry.count('sheets.cache_hits')
+            self.sheet_ready.emit(name, self._frames[name])
+            return
+        if name in self._workers:
+            return
+
+        thread = QThread()
+        worker = _SheetWorker(self.excel_loader, self.path, name)
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        worker.loaded.connect(self.__on_loaded)
+        worker.failed.connect(self.__on_failed)
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+
+        self._workers[name] = worker
+        self._threads.add(thread)
+        thread.start()
+        logger.info("Parsing sheet {} of {}", name, self.path)
+
+    def put(self, name: str, df: pd.DataFrame, size: int = None) -> None:
+        """
+        Caches the unedited content of a sheet, e.g. the first one, read by the loader.
+        """
+        self._frames[name] = df
+        self._frames.move_to_end(name)
+        self._sizes[name] = frame_bytes(df) if size is None else size
+        self.__evict()
+
+    def update(self, name: str, df: pd.DataFrame) -> None:
+        """
+        Stores the edited content of a sheet. It is kept until saved.
+
+        Args:
+            name (str): The sheet.
+            df (pd.DataFrame): A snapshot the caller will not modify any more.
+        """
+        self._versions[name] = self._versions.get(name, 0) + 1
+        self.put(name, df)
+
+    def is_changed(self, name: str) -> bool:
+        return name in self._versions
+
+    def changed_sheets(self) -> list[str]:
+        return [name for name in self.names if name in self._versions]
+
+    def changes(self) -> tuple[dict[str, pd.DataFrame], dict[str, int]]:
+        """
+        Returns the edited sheets to save and their versions, see mark_saved.
+        The frames are shallow copies, so showing a sheet again while it is
+        being written does not change what is written.
+        """
+        frames = {name: self._frames[name].copy() for name in self.changed_sheets()}
+        return frames, dict(self._versions)
+
+    def mark_saved(self, path: str, versions: dict[str, int]) -> None:
+        """
+        Records that the sheets of `versions` were written to `path`, which
+        becomes the file later sheets are parsed from. Sheets edited again
+        since changes() was called stay edited.
+        """
+        self.path = path
+        for name, version in versions.items():
+            if self._versions.get(name) == version:
+                del self._versions[name]
+        self.__evict()
+
+    def is_cached(self, name: str) -> bool:
+        return name in self._frames
+
+    def memory_usage(self) -> int:
+        """
+        Returns the estimated size of the cached sheets in bytes, edited ones included.
+        """
+        return sum(self._sizes.values())
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self.__evict()
+
+    def close(self) -> None:
+        """
+        Drops the cache; sheets still being parsed are discarded when done.
+        The workbook deletes itself once no worker thread is left.
+        """
+        self._closed = True
+        self._frames.clear()
+        self._sizes.clear()
+        self._versions.clear()
+        if not self._threads:
+            self.deleteLater()
+
+    def wait(self) -> None:
+        """
+        Blocks until every sheet being parsed is done.
+        """
+        for thread in list(self._threads):
+            thread.wait()
+
+    def __evict(self) -> None:
+        clean = [name for name in self._frames if name not in self._versions]
+        size = sum(self._sizes[name] for name in clean)
+        # The most recently used sheet is kept even if it alone exceeds the cap
+        for name in clean[:-1]:
+            if size <= self._max_bytes:
+                break
+            size -= self._sizes.pop(name)
+            del self._frames[name]
+            telemetry.count('sheets.evicted')
+            logger.debug("Dropped sheet {} from the cache", name)
+
+    def __on_loaded(self, name: str, df: pd.DataFrame, size: int) -> None:
+        self._workers.pop(name, None)
+        if self._closed:
+            return
+        if name not in self._frames:
+            self.put(name, df, size)
+        self.sheet_ready.emit(name, self._frames[name])
+
+    def __on_failed(self, name: str, message: str) -> None:
+        self._workers.pop(name, None)
+        if not self._closed:
+            self.sheet_failed.emit(name, message)
+
+    def __on_thread_finished(self, thread: QThread, worker: _SheetWorker) -> None:
+        self._threads.discard(thread)
+        worker.deleteLater()
+        thread.deleteLater()
+        if self._closed and not self._threads:
+            self.deleteLater()
+
+
+class SheetTabBar(QTabBar):
+    """
+    Tabs for the sheets of the workbook a loader opened, switching the sheet a table shows.
+
+    The loader reads only the first sheet; the others are parsed when their tab
+    is first activated (see Workbook). Edits made in the table are stored in
+    the workbook when another tab is activated or the workbook is saved. The
+    bar hides itself unless the loaded file has more than one sheet.
+
+    Signals:
+        sheet_failed (str, str): A sheet could not be parsed, and why.
+    """
+    sheet_failed = pyqtSignal(str, str)
+
+    def __init__(self, table, loader, parent=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            table (TableWidget | TableView): The table showing the sheets.
+            loader (LoaderWidgetBase): The loader opening the files.
+            parent (QWidget, optional): Parent widget.
+            max_bytes (int, optional): See Workbook. Defaults to DEFAULT_MAX_BYTES.
+        """
+        super().__init__(parent)
+        self.table = table
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.workbook: Workbook = None
+        # The sheet the table shows; differs from the current tab while that one is parsed
+        self._shown: str = None
+        self._edited = False
+        self._first_pending = False
+        self._saves: dict[str, tuple[Workbook, dict[str, int]]] = {}
+        self._savers: set = set()
+
+        self.setDocumentMode(True)
+        self.setExpanding(False)
+        self.setVisible(False)
+
+        loader.sheets_listed.connect(self.__on_sheets_listed)
+        loader.data_loaded.connect(self.__on_data_loaded)
+        table.table_changed.connect(self.__on_table_changed)
+        self.currentChanged.connect(self.__on_tab_changed)
+
+    def open_workbook(self, path: str, names: list[str]) -> None:
+        """
+        Shows the tabs of a workbook whose first sheet the table is about to show.
+        """
+        self.close_workbook()
+        if not names:
+            return
+
+        self.workbook = Workbook(path, names, self.loader.excel_loader, self.max_bytes, self)
+        self.workbook.sheet_ready.connect(self.__on_sheet_ready)
+        self.workbook.sheet_failed.connect(self.__on_sheet_failed)
+
+        self.blockSignals(True)
+        for index, name in enumerate(names):
+            self.addTab(name.replace('&', '&&'))
+            self.setTabData(index, name)
+        self.setCurrentIndex(0)
+        self.blockSignals(False)
+
+        self._shown = names[0]
+        self._first_pending = True
+        self.setVisible(len(names) > 1)
+
+    def close_workbook(self) -> None:
+        """
+        Forgets the open workbook, e.g. when a new table replaces it.
+        """
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+        self.blockSignals(True)
+        while self.count():
+            self.removeTab(0)
+        self.blockSignals(False)
+        self._shown = None
+        self._edited = False
+        self._first_pending = False
+        self.table.setEnabled(True)
+        self.setVisible(False)
+
+    def current_sheet(self) -> str:
+        return self.tabData(self.currentIndex()) if self.count() else None
+
+    def sync(self) -> None:
+        """
+        Stores the edits of the sheet shown in the table in the workbook.
+        """
+        if self.workbook is not None and self._shown is not None and self._edited:
+            self.workbook.update(self._shown, self.table.snapshot_dataframe())
+            self._edited = False
+
+    def can_save(self, path: str) -> bool:
+        """
+        Tells whether saving to `path` can keep the other sheets of the open
+        workbook, i.e. a workbook is open and `path` has the same format.
+        """
+        if self.workbook is None:
+            return False
+        source_ext = os.path.splitext(self.workbook.path)[1].lower()
+        return os.path.splitext(path)[1].lower() == source_ext
+
+    def save(self, saver, path: str) -> None:
+        """
+        Writes the workbook to `path` in the background, regenerating only the
+        edited sheets, see blackbox.core.workbook.replace_sheets.
+
+        Args:
+            saver (BackgroundSaver): Runs the write.
+            path (str): Destination with the extension of the open workbook.
+        """
+        self.sync()
+        frames, versions = self.workbook.changes()
+        if saver not in self._savers:
+            self._savers.add(saver)
+            saver.save_finished.connect(self.__on_saved)
+        self._saves[path] = (self.workbook, versions)
+        saver.save_workbook(self.workbook.path, frames, path)
+
+    def wait(self) -> None:
+        """
+        Blocks until every sheet being parsed is done, closed workbooks included.
+        """
+        for workbook in self.findChildren(Workbook):
+            workbook.wait()
+
+    def __on_sheets_listed(self, path: str, names: list) -> None:
+        self.open_workbook(path, names)
+
+    def __on_data_loaded(self, df: pd.DataFrame) -> None:
+        if self._first_pending:
+            self._first_pending = False
+            self.workbook.put(self.workbook.names[0], df)
+
+    def __on_table_changed(self, change) -> None:
+        # Loading a sheet resets the table, that is no edit
+        if not isinstance(change, TableReset):
+            self._edited = True
+
+    def __on_tab_changed(self, index: int) -> None:
+        if self.workbook is None or index < 0:
+            return
+        self.sync()
+        self.table.setEnabled(False)
+        self.workbook.request(self.tabData(index))
+
+    def __on_sheet_ready(self, name: str, df: pd.DataFrame) -> None:
+        if name != self.current_sheet():
+            return
+        if name != self._shown:
+            self.table.handle_data_loaded(df)
+            self._shown = name
+            self._edited = False
+        self.table.setEnabled(True)
+
+    def __on_sheet_failed(self, name: str, message: str) -> None:
+        if name == self.current_sheet():
+            # Back to the tab of the sheet the table still shows
+            self.blockSignals(True)
+            self.setCurrentIndex(self.workbook.names.index(self._shown))
+            self.blockSignals(False)
+            self.table.setEnabled(True)
+        self.sheet_failed.emit(name, message)
+
+    def __on_saved(self, path: str) -> None:
+        if path not in self._saves:
+            return
+        workbook, versions = self._saves.pop(path)
+        if workbook is self.workbook:
+            workbook.mark_saved(path, versions)
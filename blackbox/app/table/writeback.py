@@ -0,0 +1,428 @@
+"""
+Batched write-back of table changes to a SQLite source.
+
+SqliteWriteBack follows a table that shows a SQLite table opened by the
+loader (see blackbox.core.sqlite) and turns every change it announces
+through `table_changed` into SQL:
+
+    CellsChanged            UPDATE ... WHERE rowid = ?
+    RowsInserted            INSERT with new rowids after the largest one
+    RowsRemoved             DELETE ... WHERE rowid = ?
+    ColumnsInserted         ALTER TABLE ... ADD COLUMN
+    ColumnsRemoved          ALTER TABLE ... DROP COLUMN (SQLite 3.35+)
+    RowsMoved               nothing, the rows keep their keys
+
+The statements are queued and written in one transaction per batch on a
+worker thread, `flush_delay` milliseconds after the first queued change or
+as soon as `max_batch` rows are queued. A batch that cannot be written stays
+queued in front of the newer ones and is tried again every `retry_delay`
+milliseconds; until then the source keeps showing its edits from the overlay.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+from loguru import logger
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal
+
+from blackbox.core import telemetry
+from blackbox.core.changes import (CellsChanged, ColumnsInserted, ColumnsRemoved, RowsInserted,
+                                        RowsMoved, RowsRemoved, TableChange, TableReset)
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+sqlite = lazy_import('blackbox.core.sqlite')
+
+
+def _sql_value(text):
+    # Cleared cells are stored as NULL, which the table shows as empty
+    return None if text == '' else text
+
+
+class _Batch:
+    """
+    Statements written to one source in one transaction, and what the source learns from them.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        # [sql, list of parameter tuples or None for a statement run once]
+        self.statements: list[list] = []
+        self.rows = 0
+        self.inserted: list = []
+        self.deleted: list = []
+        self.cells: list[tuple[int, str, object]] = []
+        self.added: list[str] = []
+        self.dropped: list[str] = []
+
+    def add(self, sql: str, params: list[tuple] = None) -> None:
+        if params is None:
+            self.statements.append([sql, None])
+            self.rows += 1
+            return
+        if self.statements and self.statements[-1][0] == sql and self.statements[-1][1] is not None:
+            self.statements[-1][1].extend(params)
+        else:
+            self.statements.append([sql, list(params)])
+        self.rows += len(params)
+
+    def write(self) -> None:
+        # Snapshots of the source read it under the same lock, see blackbox.core.sqlite.read_frame
+        with self.source.write_lock:
+            connection = sqlite3.connect(self.source.path, timeout=30)
+            try:
+                with connection:
+                    for sql, params in self.statements:
+                        if params is None:
+                            connection.execute(sql)
+                        else:
+                            connection.executemany(sql, params)
+            finally:
+                connection.close()
+
+
+def _write_batches(batches: list[_Batch]) -> tuple[int, str]:
+    """
+    Writes batches oldest first and stops at the first one that fails.
+
+    Returns:
+        tuple[int, str]: The number of batches written and the error that
+                         stopped the rest, None if all were written.
+    """
+    for written, batch in enumerate(batches):
+        try:
+            with telemetry.span('writeback'):
+                batch.write()
+        except Exception as e:
+            logger.exception("Error writing changes back to {}", batch.source.path)
+            return written, str(e)
+        telemetry.count('writeback.rows', batch.rows)
+    return len(batches), None
+
+
+class _FlushWorker(QObject):
+    """
+    Writes batches on a background thread; the outcome is read once the thread finished.
+    """
+
+    def __init__(self, batches: list[_Batch]):
+        super().__init__()
+        self.batches = batches
+        self.written = 0
+        self.error: str = None
+
+    def run(self) -> None:
+        try:
+            self.written, self.error = _write_batches(self.batches)
+        finally:
+            self.thread().quit()
+
+
+class SqliteWriteBack(QObject):
+    """
+    Writes the changes made in a table back to the SQLite table it shows.
+
+    It starts following the table when `loader` delivers a frame read from a
+    writable SQLite source and stops when the table content is replaced by
+    anything else. Query sources are read-only: their edits stay in memory.
+
+    Signals:
+        written (int): Number of rows a committed batch changed.
+        write_failed (str): The error that rolled back a batch. The batch stays
+                            queued and is retried; the signal comes again only
+                            after a write succeeded in between.
+    """
+    written = pyqtSignal(int)
+    write_failed = pyqtSignal(str)
+
+    def __init__(self, table, loader, flush_delay: int = 500, max_batch: int = 50_000,
+                 retry_delay: int = 5000, parent=None):
+        """
+        Args:
+            table (TableWidget | TableView): The followed table.
+            loader (LoaderWidgetBase): The loader filling the table.
+            flush_delay (int, optional): Milliseconds changes are collected
+                                         before they are written. Defaults to 500.
+            max_batch (int, optional): Queued rows that trigger an immediate
+                                       write. Defaults to 50 000.
+            retry_delay (int, optional): Milliseconds before a batch that could
+                                         not be written is tried again. Defaults to 5000.
+            parent (QObject, optional): Parent object.
+        """
+        super().__init__(parent)
+        self.table = table
+        self.flush_delay = flush_delay
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self._source = None
+        # Key of every table row and source column of every table column
+        self._keys: np.ndarray = None
+        self._columns: list[str] = []
+        self._loaded = None
+        # The batch being filled, and the batches waiting to be written, oldest first
+        self._batch = _Batch()
+        self._queue: list[_Batch] = []
+        self._failing = False
+        self._thread: QThread = None
+        self._worker: _FlushWorker = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        loader.data_loaded.connect(self.__on_data_loaded)
+        table.table_changed.connect(self.__on_table_changed)
+
+    @property
+    def source(self):
+        """
+        The SqliteSource being written to, None while the table shows anything else.
+        """
+        return self._source
+
+    def pending_rows(self) -> int:
+        """
+        Returns the number of rows changed in the table but not written to the file yet.
+        """
+        writing = self._worker.batches if self._worker is not None else []
+        return self._batch.rows + sum(batch.rows for batch in self._queue + writing)
+
+    def flush(self) -> None:
+        """
+        Starts writing the queued changes, or queues them to be written after the running write.
+        """
+        self._timer.stop()
+        self.__close_batch()
+        if self._thread is not None or not self._queue:
+            return
+
+        batches, self._queue = self._queue, []
+        thread = QThread()
+        worker = _FlushWorker(batches)
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        thread.finished.connect(lambda: self.__on_thread_finished(thread, worker))
+
+        self._thread, self._worker = thread, worker
+        thread.start()
+        logger.debug("Writing {} rows back in {} batches", sum(batch.rows for batch in batches), len(batches))
+
+    def close(self) -> bool:
+        """
+        Waits for the running write and writes the queued changes in the calling thread.
+
+        Returns:
+            bool: True if every change is written; otherwise the failed ones stay
+                  queued and are retried, see `write_failed`.
+        """
+        self._timer.stop()
+        self.__wait()
+        return self.__write_now()
+
+    # --- Following the table ---
+
+    def __on_data_loaded(self, df) -> None:
+        self._loaded = df
+
+    def __on_table_changed(self, change: TableChange) -> None:
+        if isinstance(change, TableReset):
+            self.__unbind()
+            # The table may announce the reset before or after data_loaded reaches us
+            QTimer.singleShot(0, self.__bind)
+            return
+        if self._source is None:
+            return
+
+        if isinstance(change, CellsChanged):
+            self.__update(change.rows, change.cols, change.new)
+        elif isinstance(change, RowsInserted):
+            self.__insert(change.at, change.count, change.values)
+        elif isinstance(change, RowsRemoved):
+            self.__delete(change.at, change.count)
+        elif isinstance(change, RowsMoved):
+            self._keys = self._keys[np.asarray(change.order)]
+        elif isinstance(change, ColumnsInserted):
+            self.__add_columns(change.at, change.labels, change.values)
+        elif isinstance(change, ColumnsRemoved):
+            self.__drop_columns(change.at, change.count)
+
+        if self._batch.rows >= self.max_batch:
+            self.flush()
+        elif self._batch.statements and not self._timer.isActive():
+            self._timer.start(self.flush_delay)
+
+    def __unbind(self) -> None:
+        if self._source is None:
+            return
+        # Batches that fail keep their source and are retried after the unbinding
+        self.__wait()
+        self.__write_now()
+        self._source = None
+        self._keys = None
+        logger.debug("Write-back stopped")
+
+    def __bind(self) -> None:
+        df, self._loaded = self._loaded, None
+        source = self.__writable_source(df) if df is not None else None
+        if source is None:
+            return
+        self._source = source
+        self._batch = _Batch(source)
+        self._keys = np.array(df.iloc[:, 0].array.keys)
+        self._columns = [df.iloc[:, j].array.column for j in range(df.shape[1])]
+        logger.info("Writing changes back to {}", source.name)
+
+    @staticmethod
+    def __writable_source(df):
+        arrays = [df.iloc[:, j].array for j in range(df.shape[1])]
+        if not arrays or not all(isinstance(array, sqlite.SqliteArray) for array in arrays):
+            return None
+        source = arrays[0].source
+        if any(array.source is not source for array in arrays) or not source.writable:
+            logger.info("{} is read-only, edits are kept in memory", source.name)
+            return None
+        return source
+
+    # --- Changes to SQL ---
+
+    def __update(self, rows, cols, texts) -> None:
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        texts = np.asarray(texts, dtype=object)
+        table, key = self.__names()
+        for col in np.unique(cols).tolist():
+            mask = cols == col
+            column = self._columns[col]
+            keys = self._keys[rows[mask]].tolist()
+            values = texts[mask].tolist()
+            self._batch.add(f'UPDATE {table} SET {sqlite.quote(column)} = ? WHERE {key} = ?',
+                            [(_sql_value(value), k) for value, k in zip(values, keys)])
+            self._batch.cells.extend((k, column, value) for k, value in zip(keys, values))
+
+    def __insert(self, at: int, count: int, values) -> None:
+        keys = self._source.new_keys(count)
+        self._keys = np.insert(self._keys, at, keys)
+        self.__assign_keys(at, keys)
+        table, key = self.__names()
+        if values is None:
+            self._batch.add(f'INSERT INTO {table} ({key}) VALUES (?)', [(k,) for k in keys.tolist()])
+        else:
+            names = ', '.join(sqlite.quote(column) for column in self._columns)
+            marks = ', '.join('?' * (len(self._columns) + 1))
+            columns = [np.asarray(column, dtype=object).tolist() for column in values]
+            rows = [(k, *(_sql_value(value) for value in row)) for k, row in zip(keys.tolist(), zip(*columns))]
+            self._batch.add(f'INSERT INTO {table} ({key}, {names}) VALUES ({marks})', rows)
+            self._batch.cells.extend((k, column, value) for column, cells in zip(self._columns, columns)
+                                     for k, value in zip(keys.tolist(), cells))
+        self._batch.inserted.extend(keys.tolist())
+
+    def __assign_keys(self, at: int, keys: np.ndarray) -> None:
+        # TableView keeps the rows as SqliteArrays, whose new rows have
+        # placeholder keys and their edits in the overlay under those
+        source_model = getattr(self.table, 'source_model', None)
+        if source_model is None:
+            return
+        df = source_model().get_dataframe()
+        for j in range(df.shape[1]):
+            array = df.iloc[:, j].array
+            if isinstance(array, sqlite.SqliteArray):
+                array.assign_keys(at, keys)
+        self._source.rekey({-1 - i: k for i, k in enumerate(keys.tolist())})
+
+    def __delete(self, at: int, count: int) -> None:
+        keys = self._keys[at:at + count].tolist()
+        self._keys = np.delete(self._keys, np.s_[at:at + count])
+        table, key = self.__names()
+        self._batch.add(f'DELETE FROM {table} WHERE {key} = ?', [(k,) for k in keys])
+        self._batch.deleted.extend(keys)
+
+    def __add_columns(self, at: int, labels: list[str], values) -> None:
+        table, key = self.__names()
+        existing = set(self._source.columns) | set(self._columns) | set(self._batch.added)
+        names = []
+        for label in labels:
+            name, n = label or 'column', 1
+            while name in existing:
+                n += 1
+                name = f'{label or "column"}_{n}'
+            existing.add(name)
+            names.append(name)
+            self._batch.add(f'ALTER TABLE {table} ADD COLUMN {sqlite.quote(name)}')
+        self._columns[at:at] = names
+        self._batch.added.extend(names)
+        if values is not None:
+            keys = self._keys.tolist()
+            for name, column in zip(names, values):
+                self._batch.add(f'UPDATE {table} SET {sqlite.quote(name)} = ? WHERE {key} = ?',
+                                [(_sql_value(value), k) for value, k
+                                 in zip(np.asarray(column, dtype=object).tolist(), keys)])
+
+    def __drop_columns(self, at: int, count: int) -> None:
+        table, _ = self.__names()
+        names = self._columns[at:at + count]
+        del self._columns[at:at + count]
+        if sqlite3.sqlite_version_info < (3, 35):
+            logger.warning("SQLite {} cannot drop columns, {} stay in {}", sqlite3.sqlite_version,
+                           names, self._source.name)
+            return
+        for name in names:
+            self._batch.add(f'ALTER TABLE {table} DROP COLUMN {sqlite.quote(name)}')
+        self._batch.dropped.extend(names)
+
+    def __names(self) -> tuple[str, str]:
+        return sqlite.quote(self._source.table), sqlite.quote(self._source.key)
+
+    # --- Batches ---
+
+    def __close_batch(self) -> None:
+        if self._batch.statements:
+            self._queue.append(self._batch)
+            self._batch = _Batch(self._source)
+
+    def __wait(self) -> None:
+        # Takes the outcome of the running write before anything else is written
+        if self._thread is not None:
+            self._thread.wait()
+            # Delivers the queued `finished` of the thread now; run later, it
+            # would reach a worker and thread already scheduled for deletion
+            QCoreApplication.sendPostedEvents()
+        if self._thread is not None:
+            self.__on_thread_finished(self._thread, self._worker)
+
+    def __write_now(self) -> bool:
+        self._timer.stop()
+        self.__close_batch()
+        batches, self._queue = self._queue, []
+        written, error = _write_batches(batches)
+        self.__on_batches_written(batches, written, error)
+        return error is None
+
+    def __on_batches_written(self, batches: list[_Batch], written: int, error: str) -> None:
+        for batch in batches[:written]:
+            batch.source.committed(np.asarray(batch.inserted, dtype=np.int64),
+                                   np.asarray(batch.deleted, dtype=np.int64),
+                                   batch.cells, batch.added, batch.dropped)
+            self.written.emit(batch.rows)
+            logger.debug("Wrote {} rows back to {}", batch.rows, batch.source.name)
+        if error is None:
+            self._failing = False
+            return
+
+        # In front of the batches queued meanwhile, so the statements keep their order
+        self._queue[:0] = batches[written:]
+        self._timer.start(self.retry_delay)
+        if not self._failing:
+            self._failing = True
+            self.write_failed.emit(error)
+
+    def __on_thread_finished(self, thread: QThread, worker: _FlushWorker) -> None:
+        if thread is not self._thread:
+            # Already taken by __wait()
+            return
+        self._thread, self._worker = None, None
+        worker.deleteLater()
+        thread.deleteLater()
+        self.__on_batches_written(worker.batches, worker.written, worker.error)
+        if worker.error is None and self.pending_rows():
+            self._timer.start(self.flush_delay)
@@ -0,0 +1,325 @@
+"""
+Batch find, replace and convert over many table files, without Qt.
+
+Files and directories (searched recursively for readable files) are
+processed in a pool of worker processes, one file per task. Every sheet of a
+workbook is searched; saving a workbook to its own format rewrites only the
+sheets that changed. Other targets get the first sheet, as the table widgets
+show it.
+
+Usage:
+    python -m blackbox find TEXT PATH... [-i] [--partial] [-w] [-E] [--list]
+    python -m blackbox replace OLD NEW PATH... [-o DIR] [--format EXT]
+    python -m blackbox convert PATH... --format EXT [-o DIR]
+
+Without -o, replace writes the files in place, atomically; text files keep
+the encoding, delimiter and header row they were read with. Every file is
+reported with its size and the seconds spent loading, processing and saving
+it, one JSON object per line with --json. The exit status is 1 if a file failed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+
+from loguru import logger
+
+from blackbox.core import telemetry
+from blackbox.core.io import READ_EXTENSIONS, SAVE_EXTENSIONS, TableReader, TableWriter
+from blackbox.core.lazy import lazy_import
+from blackbox.core.search import SearchQuery
+from blackbox.core.table import Table
+from blackbox.core.workbook import is_workbook
+
+pd = lazy_import('pandas')
+
+
+@dataclass
+class Job:
+    """
+    One file to process, sent to a worker process.
+
+    Attributes:
+        command (str): 'find', 'replace' or 'convert'.
+        path (str): The file to read.
+        destination (str): Where to write the result; None for find.
+        query (SearchQuery): What to find or replace; None for convert.
+        new (str): Replacement text.
+        typed (bool): Read typed columns, see blackbox.core.typed.
+        header (bool): Whether text files have a header row; None detects it.
+        list_cells (bool): Report the location and text of every match.
+    """
+    command: str
+    path: str
+    destination: str = None
+    query: SearchQuery = None
+    new: str = ''
+    typed: bool = False
+    header: bool = None
+    list_cells: bool = False
+
+
+@dataclass
+class FileResult:
+    """
+    What happened to one file. Times are in seconds; `matches` counts the
+    cells found or replaced and `cells` lists them as (sheet, row, column, text)
+    with 0-based indices when they were asked for.
+    """
+    path: str
+    destination: str = None
+    sheets: int = 0
+    rows: int = 0
+    columns: int = 0
+    matches: int = 0
+    load: float = 0.0
+    process: float = 0.0
+    save: float = 0.0
+    error: str = None
+    cells: list = field(default_factory=list)
+
+
+def read_sheets(path: str, typed: bool = False, header: bool = None) -> dict[str, Table]:
+    """
+    Reads every sheet of a workbook, or the single table of any other file,
+    see blackbox.core.io.TableReader for `typed` and `header`.
+
+    Returns:
+        dict[str, Table]: Sheet name to its table; the key is None for files without sheets.
+    """
+    reader = TableReader(typed, header)
+    if is_workbook(path):
+        # One open workbook serves all sheets, its shared strings are parsed once
+        with pd.ExcelFile(path) as book:
+            return {name: Table(reader.read_excel(book, name)) for name in book.sheet_names}
+    return {None: Table(reader.read(path), reader.writer_for(path))}
+
+
+def run_job(job: Job) -> FileResult:
+    """
+    Loads, processes and saves one file. Errors are reported in the result
+    instead of being raised, so one broken file does not stop a batch.
+    """
+    result = FileResult(job.path, job.destination)
+    try:
+        _run(job, result)
+    except Exception as e:
+        logger.opt(exception=True).debug("Processing {} failed", job.path)
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _run(job: Job, result: FileResult) -> None:
+    same_workbook = False
+    if job.destination is not None:
+        ext = os.path.splitext(job.destination)[1].lower()
+        same_workbook = is_workbook(job.path) and ext == os.path.splitext(job.path)[1].lower()
+        if ext not in SAVE_EXTENSIONS and not same_workbook:
+            raise ValueError(f"Cannot write {ext or 'files without extension'}, pick another --format")
+
+    with telemetry.span('load') as span:
+        tables = read_sheets(job.path, job.typed, job.header)
+    result.load = span.elapsed
+    result.sheets = len(tables)
+    result.rows = sum(table.shape[0] for table in tables.values())
+    result.columns = max((table.shape[1] for table in tables.values()), default=0)
+
+    changed = {}
+    if job.command == 'find':
+        with telemetry.span('find') as span:
+            for name, table in tables.items():
+                rows, cols = table.find(job.query)
+                result.matches += len(rows)
+                if job.list_cells:
+                    texts = {col: table.column_texts(col) for col in set(cols.tolist())}
+                    result.cells.extend((name, row, col, texts[col][row])
+                                        for row, col in zip(rows.tolist(), cols.tolist()))
+        result.process = span.elapsed
+    elif job.command == 'replace':
+        with telemetry.span('replace') as span:
+            for name, table in tables.items():
+                count = table.replace(job.query, job.new)
+                if count:
+                    result.matches += count
+                    changed[name] = table.df
+        result.process = span.elapsed
+        telemetry.count('replace.cells', result.matches)
+
+    if job.destination is None or (job.destination == job.path and job.command == 'replace' and not changed):
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(job.destination)), exist_ok=True)
+    with telemetry.span('save') as span:
+        if same_workbook:
+            TableWriter().write_sheets(job.path, changed, job.destination)
+        else:
+            next(iter(tables.values())).save(job.destination)
+    result.save = span.elapsed
+
+
+def collect_files(paths: list[str]) -> Iterator[tuple[str, str]]:
+    """
+    Expands directories into the readable files below them, in name order.
+
+    Yields:
+        tuple[str, str]: A file and the directory argument it was found in,
+                         None for files given directly.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, None
+            continue
+        for folder, subfolders, names in os.walk(path):
+            subfolders.sort()
+            for name in sorted(names):
+                # `~$` files are the lock files Excel keeps next to open workbooks
+                if name.lower().endswith(READ_EXTENSIONS) and not name.startswith('~$'):
+                    yield os.path.join(folder, name), path
+
+
+def destination(path: str, root: str, output: str = None, ext: str = None) -> str:
+    """
+    Returns where the result of `path` goes: the file itself, or the same
+    path relative to `root` below `output`, with the extension `ext`.
+    """
+    target = path
+    if output is not None:
+        target = os.path.join(output, os.path.relpath(path, root) if root else os.path.basename(path))
+    if ext:
+        target = os.path.splitext(target)[0] + ext
+    return target
+
+
+def _init_worker(verbose: bool) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level='DEBUG' if verbose else 'WARNING')
+    # Imported up front, so the load time of the first file does not include it
+    import pandas  # noqa: F401
+
+
+def run_jobs(jobs: list[Job], workers: int, verbose: bool = False) -> Iterator[FileResult]:
+    """
+    Runs jobs in a pool of `workers` processes, or in this process for a
+    single worker or job, and yields the results as they finish.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(run_job, jobs)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(verbose,)) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _format_result(result: FileResult, command: str) -> str:
+    if result.error is not None:
+        return f"{result.path}: error: {result.error}"
+    line = f"{result.path}  {result.rows} rows x {result.columns} cols"
+    if result.sheets > 1:
+        line += f" in {result.sheets} sheets"
+    if command != 'convert':
+        line += f"  {result.matches} {'matches' if command == 'find' else 'replaced'}"
+    line += f"  load {result.load:.3f}s"
+    if command != 'convert':
+        line += f"  {command} {result.process:.3f}s"
+    if result.destination is not None and result.save:
+        line += f"  save {result.save:.3f}s -> {result.destination}"
+    return line
+
+
+def _format_cell(result: FileResult, cell: tuple) -> str:
+    # Rows and columns are shown 1-based, as in the table
+    sheet, row, col, text = cell
+    where = result.path if sheet is None else f"{result.path}[{sheet}]"
+    return f"{where}:{row + 1}:{col + 1}: {text}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='blackbox', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='worker processes, defaults to the number of CPUs')
+    common.add_argument('--typed', action='store_true', help='read numbers and dates as typed columns')
+    common.add_argument('--no-header', dest='header', action='store_false', default=None,
+                        help='text files have no header row; detected by default')
+    common.add_argument('--json', action='store_true', help='print one JSON object per file')
+    common.add_argument('-v', '--verbose', action='store_true', help='show the log output')
+
+    query = argparse.ArgumentParser(add_help=False)
+    query.add_argument('-i', '--ignore-case', action='store_true', help='compare case-insensitively')
+    query.add_argument('--partial', action='store_true', help='match a part of a cell instead of the whole cell')
+    query.add_argument('-w', '--word', action='store_true', help='match at word boundaries only')
+    query.add_argument('-E', '--regex', action='store_true', help='the text is a regular expression')
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('-o', '--output', help='directory for the results, mirroring the input directories')
+
+    find = commands.add_parser('find', parents=[common, query], help='count the cells matching a text')
+    find.add_argument('text')
+    find.add_argument('paths', nargs='+', metavar='PATH')
+    find.add_argument('--list', action='store_true', help='print every matching cell')
+
+    replace = commands.add_parser('replace', parents=[common, query, output], help='replace a text in every cell')
+    replace.add_argument('text')
+    replace.add_argument('new')
+    replace.add_argument('paths', nargs='+', metavar='PATH')
+    replace.add_argument('--format', choices=SAVE_EXTENSIONS, help='write the results in this format')
+
+    convert = commands.add_parser('convert', parents=[common, output], help='write the files in another format')
+    convert.add_argument('paths', nargs='+', metavar='PATH')
+    convert.add_argument('--format', choices=SAVE_EXTENSIONS, required=True, help='format to write')
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # Forked workers inherit the configured logger and pandas
+    _init_worker(args.verbose)
+
+    query = None
+    if args.command != 'convert':
+        query = SearchQuery(args.text, match_case=not args.ignore_case, whole_cell=not args.partial,
+                            whole_word=args.word, regex=args.regex)
+    jobs = []
+    for path, root in collect_files(args.paths):
+        target = None
+        if args.command != 'find':
+            target = destination(path, root, args.output, args.format)
+        jobs.append(Job(args.command, path, target, query, getattr(args, 'new', ''), args.typed,
+                        args.header, getattr(args, 'list', False)))
+
+    started = time.perf_counter()
+    failed, rows, matches = 0, 0, 0
+    for result in run_jobs(jobs, args.jobs, args.verbose):
+        failed += result.error is not None
+        rows += result.rows
+        matches += result.matches
+        if args.json:
+            print(json.dumps(asdict(result), default=str), flush=True)
+            continue
+        print(_format_result(result, args.command), file=sys.stderr if result.error else sys.stdout, flush=True)
+        for cell in result.cells:
+            print(_format_cell(result, cell))
+
+    summary = {'files': len(jobs), 'failed': failed, 'rows': rows, 'matches': matches,
+               'seconds': time.perf_counter() - started}
+    if args.json:
+        print(json.dumps({'summary': summary}))
+    else:
+        line = f"{len(jobs)} files, {rows} rows"
+        if args.command != 'convert':
+            line += f", {matches} {'matches' if args.command == 'find' else 'replaced'}"
+        line += f" in {summary['seconds']:.2f}s" + (f", {failed} failed" if failed else '')
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+from blackbox.core.io import TableReader, TableWriter
+from blackbox.core.search import SearchQuery
+from blackbox.core.table import Table
+
+__all__ = ['Table', 'TableReader', 'TableWriter', 'SearchQuery']
@@ -0,0 +1,199 @@
+"""
+Descriptions of table mutations.
+
+The table logic emits one of these objects through the `table_changed` signal
+of TableWidget / TableView after every change it makes, so derived state such
+as the find index can follow the table without rescanning it.
+
+Every change except TableReset carries enough data to be reverted, see
+`inverted()`, which is what the undo history is built on.
+"""
+from __future__ import annotations
+
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+class TableChange:
+    """
+    Base class of all table mutations.
+    """
+
+    def inverted(self) -> 'TableChange':
+        """
+        Returns the change that reverts this one.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be inverted")
+
+
+class TableReset(TableChange):
+    """
+    The whole content of the table was replaced, e.g. by loading a file.
+    """
+
+
+class CellsChanged(TableChange):
+    """
+    Cell values were overwritten.
+
+    Attributes:
+        rows (np.ndarray): Row index of every changed cell.
+        cols (np.ndarray): Column index of every changed cell.
+        old (list[str]): Previous text of every changed cell.
+        new (list[str]): New text of every changed cell.
+    """
+
+    def __init__(self, rows, cols, old: list[str], new: list[str]):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.old = old
+        self.new = new
+
+    def inverted(self) -> 'CellsChanged':
+        return CellsChanged(self.rows, self.cols, self.new, self.old)
+
+
+class RowsInserted(TableChange):
+    """
+    `count` rows were inserted so that the first one is at index `at`.
+
+    Attributes:
+        values (list[np.ndarray]): Text of the inserted rows, one array of
+                                   `count` texts per column, or None for blank rows.
+    """
+
+    def __init__(self, at: int, count: int, values: list[np.ndarray] = None):
+        self.at = at
+        self.count = count
+        self.values = values
+
+    def inverted(self) -> 'RowsRemoved':
+        return RowsRemoved(self.at, self.count, self.values)
+
+
+class RowsRemoved(TableChange):
+    """
+    `count` rows starting at index `at` were removed.
+
+    Attributes:
+        values (list[np.ndarray]): Text of the removed rows, one array of
+                                   `count` texts per column.
+    """
+
+    def __init__(self, at: int, count: int, values: list[np.ndarray] = None):
+        self.at = at
+        self.count = count
+        self.values = values
+
+    def inverted(self) -> RowsInserted:
+        return RowsInserted(self.at, self.count, self.values)
+
+
+class ColumnsInserted(TableChange):
+    """
+    `count` columns were inserted so that the first one is at index `at`.
+
+    Attributes:
+        labels (list[str]): Header labels of the inserted columns.
+        values (list[np.ndarray]): Text of every inserted column, or None for blank columns.
+    """
+
+    def __init__(self, at: int, count: int, labels: list[str] = None, values: list[np.ndarray] = None):
+        self.at = at
+        self.count = count
+        self.labels = labels
+        self.values = values
+
+    def inverted(self) -> 'ColumnsRemoved':
+        return ColumnsRemoved(self.at, self.count, self.labels, self.values)
+
+
+class ColumnsRemoved(TableChange):
+    """
+    `count` columns starting at index `at` were removed.
+
+    Attributes:
+        labels (list[str]): Header labels of the removed columns.
+        values (list[np.ndarray]): Text of every removed column.
+    """
+
+    def __init__(self, at: int, count: int, labels: list[str] = None, values: list[np.ndarray] = None):
+        self.at = at
+        self.count = count
+        self.labels = labels
+        self.values = values
+
+    def inverted(self) -> ColumnsInserted:
+        return ColumnsInserted(self.at, self.count, self.labels, self.values)
+
+
+class RowsMoved(TableChange):
+    """
+    Rows were reordered: the row now at index `i` was at index `order[i]`.
+    """
+
+    def __init__(self, order: np.ndarray):
+        self.order = np.asarray(order, dtype=np.int64)
+
+    def inverted(self) -> 'RowsMoved':
+        inverse = np.empty_like(self.order)
+        inverse[self.order] = np.arange(len(self.order))
+        return RowsMoved(inverse)
+
+
+class ChangeGroup(TableChange):
+    """
+    Changes made as one step, such as removing several separate blocks of rows.
+
+    Groups only live in the undo history: the table announces the changes of
+    a group one by one, so followers never see a ChangeGroup.
+
+    Attributes:
+        changes (list[TableChange]): The changes in the order they were made.
+    """
+
+    def __init__(self, changes: list[TableChange]):
+        self.changes = changes
+
+    def inverted(self) -> 'ChangeGroup':
+        return ChangeGroup([change.inverted() for change in reversed(self.changes)])
+
+
+def index_spans(indices) -> list[tuple[int, int]]:
+    """
+    Merges row or column indices into runs of consecutive indices.
+
+    Args:
+        indices (array-like): Indices in any order; duplicates are ignored.
+
+    Returns:
+        list[tuple[int, int]]: (first, count) of every run, in ascending order.
+    """
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    firsts = indices[np.r_[0, breaks]]
+    lasts = indices[np.r_[breaks - 1, len(indices) - 1]]
+    return list(zip(firsts.tolist(), (lasts - firsts + 1).tolist()))
+
+
+def move_order(row_count: int, rows: list[int], target: int) -> np.ndarray:
+    """
+    Builds the permutation that moves `rows` in front of `target`.
+
+    Args:
+        row_count (int): Number of rows in the table.
+        rows (list[int]): Rows to move, in the order they should land.
+        target (int): Insertion point expressed in pre-move row indices.
+
+    Returns:
+        np.ndarray: `order` such that new row `i` is old row `order[i]`.
+    """
+    moving = np.asarray(rows, dtype=np.int64)
+    keep = np.ones(row_count, dtype=bool)
+    keep[moving] = False
+    remaining = np.flatnonzero(keep)
+    split = np.searchsorted(remaining, target)
+    return np.concatenate([remaining[:split], moving, remaining[split:]])
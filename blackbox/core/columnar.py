@@ -0,0 +1,384 @@
+"""
+Memory-mapped columnar table files.
+
+Arrow IPC / Feather files (`.arrow`, `.feather`) are mapped with pyarrow and
+shown through pandas' Arrow-backed dtypes, so opening one costs little more
+than reading its schema. Parquet (`.parquet`) is read through pyarrow too,
+into the same dtypes, but it is compressed and has to be decoded.
+
+Without pyarrow, tables can be stored as an uncompressed `.npz` bundle with one
+`.npy` member per numeric column and a UTF-8 buffer plus an offsets array per
+text column. The members are mapped straight out of the zip file and text is
+decoded cell by cell, only when a cell is shown.
+"""
+from __future__ import annotations
+
+import json
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from pandas.api.extensions import ExtensionArray, ExtensionDtype
+from pandas.api.indexers import check_array_indexer
+
+from blackbox.core.typed import dense_frame
+
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+COLUMNAR_EXTENSIONS = ARROW_EXTENSIONS + ('.parquet', '.npz')
+
+# Kinds of NumPy dtypes stored as plain arrays in a bundle
+_NATIVE_KINDS = 'biufcmM'
+# Rows re-packed at once when a permuted text column is written to a bundle
+_GATHER_ROWS = 1_000_000
+
+
+class MappedStringDtype(ExtensionDtype):
+    """
+    The dtype of MappedStringArray.
+    """
+    name = 'mapped_string'
+    type = str
+    kind = 'O'
+    na_value = ''
+
+    @classmethod
+    def construct_array_type(cls):
+        return MappedStringArray
+
+
+class MappedStringArray(ExtensionArray):
+    """
+    A read-only column of texts kept as one UTF-8 buffer and an offsets array,
+    usually memory-mapped from a bundle file.
+
+    Cells are decoded one at a time when they are read. Slicing, taking and
+    concatenating parts of the same buffer only build a new array of row
+    positions, so row moves and removals never touch the text itself.
+
+    Args:
+        data (np.ndarray): The UTF-8 encoded texts, back to back (uint8).
+        offsets (np.ndarray): Start of every text in `data` plus the end of the last one.
+        rows (np.ndarray, optional): Position in `data` of every row; -1 for an
+                                     empty cell. Defaults to all texts in order.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, rows: np.ndarray = None):
+        self._data = data
+        self._offsets = offsets
+        self._rows = rows
+
+    # --- Construction ---
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        values = np.asarray(scalars, dtype=object)
+        texts = values.copy()
+        texts[pd.isna(values)] = ''
+        if pd.api.types.infer_dtype(texts, skipna=False) != 'string':
+            texts = np.array([str(s) for s in texts], dtype=object)
+
+        joined = ''.join(texts)
+        if joined.isascii():
+            # One character is one byte, so lengths need no per-text encoding
+            data = joined.encode('ascii')
+            lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        else:
+            encoded = [s.encode('utf-8') for s in texts]
+            data = b''.join(encoded)
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.frombuffer(data, dtype=np.uint8), offsets)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls._from_sequence(values)
+
+    # --- Access ---
+
+    @property
+    def dtype(self) -> MappedStringDtype:
+        return MappedStringDtype()
+
+    def __len__(self) -> int:
+        return len(self._rows) if self._rows is not None else len(self._offsets) - 1
+
+    def positions(self) -> np.ndarray:
+        """
+        Returns the position in the buffer of every row, -1 for empty cells.
+        """
+        if self._rows is not None:
+            return self._rows
+        return np.arange(len(self._offsets) - 1, dtype=np.int64)
+
+    def text(self, position: int) -> str:
+        if position < 0:
+            return MappedStringDtype.na_value
+        start, stop = self._offsets[position], self._offsets[position + 1]
+        return str(memoryview(self._data[start:stop]), 'utf-8')
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            row = int(key)
+            if row < 0:
+                row += len(self)
+            if not 0 <= row < len(self):
+                raise IndexError(f"Index {key} out of bounds for length {len(self)}")
+            return self.text(int(self._rows[row]) if self._rows is not None else row)
+        if isinstance(key, tuple) and len(key) == 1:
+            key = key[0]
+        if not isinstance(key, slice):
+            key = check_array_indexer(self, key)
+        return type(self)(self._data, self._offsets, self.positions()[key])
+
+    def __iter__(self):
+        for position in self.positions().tolist():
+            yield self.text(position)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        texts = np.array(list(self), dtype=object)
+        return texts if dtype is None or dtype == object else texts.astype(dtype)
+
+    def __eq__(self, other):
+        return np.asarray(self, dtype=object) == other
+
+    @property
+    def nbytes(self) -> int:
+        rows = self._rows.nbytes if self._rows is not None else 0
+        return self._data.nbytes + self._offsets.nbytes + rows
+
+    def isna(self) -> np.ndarray:
+        if self._rows is None:
+            return np.zeros(len(self), dtype=bool)
+        return self._rows < 0
+
+    # --- Reordering ---
+
+    def take(self, indices, *, allow_fill: bool = False, fill_value=None) -> MappedStringArray:
+        indices = np.asarray(indices, dtype=np.int64)
+        if allow_fill:
+            if not _is_empty(fill_value):
+                return type(self)._from_sequence(
+                    pd.api.extensions.take(np.asarray(self, dtype=object), indices,
+                                           allow_fill=True, fill_value=fill_value))
+            if (indices < -1).any():
+                raise ValueError("Invalid value in 'indices'; must be >= -1 with allow_fill")
+            positions = np.where(indices >= 0, self.positions()[np.maximum(indices, 0)], -1)
+        else:
+            positions = self.positions()[indices]
+        return type(self)(self._data, self._offsets, positions)
+
+    def copy(self) -> MappedStringArray:
+        # The buffers are never written to, only the row positions are owned
+        rows = self._rows.copy() if self._rows is not None else None
+        return type(self)(self._data, self._offsets, rows)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat) -> MappedStringArray:
+        first = to_concat[0]
+        if all(a._data is first._data and a._offsets is first._offsets for a in to_concat):
+            return cls(first._data, first._offsets, np.concatenate([a.positions() for a in to_concat]))
+        return cls._from_sequence(np.concatenate([np.asarray(a, dtype=object) for a in to_concat]))
+
+    # --- Storage ---
+
+    def packed(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the buffer and offsets holding exactly the rows of this array,
+        in order. Arrays that were never reordered return their own buffers.
+        """
+        if self._rows is None:
+            return self._data, self._offsets
+
+        positions = self._rows
+        valid = positions >= 0
+        starts = np.where(valid, self._offsets[np.maximum(positions, 0)], 0)
+        lengths = np.where(valid, self._offsets[np.maximum(positions, 0) + 1] - starts, 0)
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        data = np.empty(int(offsets[-1]), dtype=np.uint8)
+        for first in range(0, len(positions), _GATHER_ROWS):
+            block = slice(first, first + _GATHER_ROWS)
+            count = int(lengths[block].sum())
+            if not count:
+                continue
+            # Byte i of the block comes from its cell start plus its rank within the cell
+            shift = np.repeat(starts[block] - offsets[:-1][block], lengths[block])
+            target = np.arange(offsets[first], offsets[first] + count)
+            data[target] = self._data[target + shift]
+        return data, offsets
+
+
+def _is_empty(value) -> bool:
+    return value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)) or value == ''
+
+
+class ColumnarStore:
+    """
+    Reads and writes the columnar formats listed in COLUMNAR_EXTENSIONS.
+    """
+
+    def read(self, path: str) -> pd.DataFrame:
+        """
+        Opens a columnar file, mapping it into memory where the format allows.
+
+        Raises:
+            ValueError: If the extension is not one of COLUMNAR_EXTENSIONS.
+            ImportError: If an Arrow or Parquet file is opened without pyarrow.
+        """
+        ext = _extension(path)
+        if ext in ARROW_EXTENSIONS:
+            return self.read_arrow(path)
+        if ext == '.parquet':
+            return self.read_parquet(path)
+        if ext == '.npz':
+            return self.read_bundle(path)
+        raise ValueError(f"Unsupported file type: {ext or path}")
+
+    def write(self, df: pd.DataFrame, path: str, ext: str = None) -> None:
+        """
+        Writes a DataFrame to a columnar file.
+
+        Args:
+            df (pd.DataFrame): The data to write.
+            path (str): Destination.
+            ext (str, optional): Format to write, by default the extension of `path`.
+
+        Raises:
+            ValueError: If the format is not `.arrow`, `.feather` or `.npz`.
+        """
+        ext = (ext or _extension(path)).lower()
+        if ext in ARROW_EXTENSIONS:
+            self.write_arrow(df, path)
+        elif ext == '.npz':
+            self.write_bundle(df, path)
+        else:
+            raise ValueError(f"Unsupported file type: {ext or path}")
+
+    # --- Arrow ---
+
+    def read_arrow(self, path: str) -> pd.DataFrame:
+        """
+        Maps an Arrow IPC / Feather v2 file. Uncompressed files are used in
+        place, without copying any column into memory.
+        """
+        import pyarrow as pa
+
+        # The mapping stays open for as long as the table's buffers are referenced
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def write_arrow(self, df: pd.DataFrame, path: str) -> None:
+        """
+        Writes an uncompressed Arrow IPC file, which read_arrow() can map again.
+        Columns that are already Arrow-backed are written without conversion.
+        """
+        import pyarrow as pa
+
+        table = self._arrow_table(df)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def read_parquet(self, path: str) -> pd.DataFrame:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True).to_pandas(types_mapper=pd.ArrowDtype)
+
+    @staticmethod
+    def _arrow_table(df: pd.DataFrame):
+        import pyarrow as pa
+
+        df = dense_frame(df).set_axis([str(c) for c in df.columns], axis=1)
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed object columns are stored as their display text
+            mixed = [c for c, dtype in df.dtypes.items() if dtype == object]
+            df = df.astype({c: str for c in mixed}).where(df.notna(), '')
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+    # --- NumPy bundle ---
+
+    def read_bundle(self, path: str) -> pd.DataFrame:
+        """
+        Maps every column of a `.npz` bundle written by write_bundle().
+        """
+        with zipfile.ZipFile(path) as archive, open(path, 'rb') as handle:
+            meta = json.loads(archive.read('columns.json'))
+            members = {info.filename: info for info in archive.infolist()}
+
+            def mapped(name: str) -> np.ndarray:
+                return _map_member(path, handle, members[f'{name}.npy'])
+
+            columns = {}
+            for i, column in enumerate(meta['columns']):
+                if column['kind'] == 'text':
+                    values = MappedStringArray(mapped(f'{i}.data'), mapped(f'{i}.offsets'))
+                else:
+                    values = mapped(str(i))
+                columns[i] = pd.Series(values, copy=False)
+
+        df = pd.concat(columns, axis=1, copy=False) if columns else pd.DataFrame(index=range(meta['rows']))
+        df.columns = [column['name'] for column in meta['columns']]
+        logger.debug("Mapped {} x {} bundle {}", df.shape[0], df.shape[1], path)
+        return df
+
+    def write_bundle(self, df: pd.DataFrame, path: str) -> None:
+        """
+        Writes an uncompressed `.npz` bundle. Numeric, boolean and datetime
+        columns are stored as they are; everything else as UTF-8 text.
+        """
+        meta = {'rows': int(df.shape[0]), 'columns': []}
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for i in range(df.shape[1]):
+                column = df.iloc[:, i]
+                values = column.array
+                # NumPy-backed columns report their np.dtype on the Series only
+                if isinstance(column.dtype, np.dtype) and column.dtype.kind in _NATIVE_KINDS:
+                    _write_member(archive, str(i), np.asarray(values))
+                    kind = 'array'
+                else:
+                    if not isinstance(values, MappedStringArray):
+                        values = MappedStringArray._from_sequence(np.asarray(values, dtype=object))
+                    data, offsets = values.packed()
+                    _write_member(archive, f'{i}.data', data)
+                    _write_member(archive, f'{i}.offsets', offsets)
+                    kind = 'text'
+                meta['columns'].append({'name': str(df.columns[i]), 'kind': kind})
+            archive.writestr('columns.json', json.dumps(meta))
+
+
+def _extension(path: str) -> str:
+    dot = path.rfind('.')
+    return path[dot:].lower() if dot >= 0 else ''
+
+
+def _write_member(archive: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+        np.lib.format.write_array(member, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _map_member(path: str, handle, info: zipfile.ZipInfo) -> np.ndarray:
+    """
+    Maps the array stored in an uncompressed zip member, read-only.
+    """
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"Bundle member {info.filename} is compressed and cannot be mapped")
+
+    # The local header is 30 bytes followed by the file name and an extra field
+    handle.seek(info.header_offset + 26)
+    name_length, extra_length = struct.unpack('<HH', handle.read(4))
+    handle.seek(info.header_offset + 30 + name_length + extra_length)
+
+    version = np.lib.format.read_magic(handle)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(handle)
+    if not shape or 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    order = 'F' if fortran_order else 'C'
+    return np.memmap(path, dtype=dtype, mode='r', offset=handle.tell(), shape=shape, order=order)
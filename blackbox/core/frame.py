@@ -0,0 +1,137 @@
+"""
+Structural operations on the DataFrame behind a table.
+
+Shape-changing operations return a new frame with a fresh RangeIndex; cell
+writes and column inserts change the frame in place. DataFrameModel wraps
+these with the Qt model notifications, blackbox.core.table.Table uses them as
+they are.
+"""
+from __future__ import annotations
+
+from blackbox.core import typed
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+def _reindexed(df: pd.DataFrame) -> pd.DataFrame:
+    # `df` is always a fresh frame here, so its index can be replaced in place
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+
+def blank_frame(df: pd.DataFrame, count: int) -> pd.DataFrame:
+    """
+    Returns `count` empty rows with the columns of `df`.
+    """
+    blank = pd.DataFrame([[''] * df.shape[1]] * count, columns=df.columns, dtype=object)
+    for j, dtype in enumerate(df.dtypes):
+        # Typed columns that can hold nulls get null cells and keep their type
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) or dtype.kind in 'fmM':
+            blank.isetitem(j, df.iloc[:0, j].reindex(pd.RangeIndex(count)))
+    return blank
+
+
+def insert_rows(df: pd.DataFrame, at: int, count: int) -> pd.DataFrame:
+    """
+    Returns `df` with `count` empty rows inserted in front of row `at`.
+    """
+    return _reindexed(pd.concat([df.iloc[:at], blank_frame(df, count), df.iloc[at:]]))
+
+
+def remove_rows(df: pd.DataFrame, at: int, count: int) -> pd.DataFrame:
+    """
+    Returns `df` without the `count` rows starting at `at`.
+    """
+    return _reindexed(pd.concat([df.iloc[:at], df.iloc[at + count:]]))
+
+
+def append_rows(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns `df` with `rows` below it, matching columns by position.
+    """
+    block = rows.iloc[:, :df.shape[1]].set_axis(df.columns, axis=1)
+    return _reindexed(typed.concat_frames([df, block]))
+
+
+def permute_rows(df: pd.DataFrame, order: np.ndarray) -> pd.DataFrame:
+    """
+    Returns `df` with new row `i` being current row `order[i]`.
+    """
+    return _reindexed(df.take(np.asarray(order, dtype=np.int64)))
+
+
+def insert_columns(df: pd.DataFrame, at: int, labels: list[str], values: list[np.ndarray] = None) -> None:
+    """
+    Inserts named columns in front of column `at`, blank or filled with `values`.
+    """
+    for offset, name in enumerate(labels):
+        data = values[offset] if values is not None else np.full(df.shape[0], '', dtype=object)
+        df.insert(at + offset, name, data, allow_duplicates=True)
+
+
+def remove_columns(df: pd.DataFrame, at: int, count: int) -> pd.DataFrame:
+    """
+    Returns `df` without the `count` columns starting at `at`.
+    """
+    keep = [j for j in range(df.shape[1]) if not at <= j < at + count]
+    return df.iloc[:, keep]
+
+
+def new_column_labels(existing: list[str], count: int) -> list[str]:
+    """
+    Returns `count` labels "Column <n>" not in `existing`, lowest numbers first.
+    """
+    existing = set(existing)
+    labels, counter = [], 1
+    while len(labels) < count:
+        name = f"Column {counter}"
+        if name not in existing:
+            labels.append(name)
+        counter += 1
+    return labels
+
+
+def object_column(df: pd.DataFrame, col: int, date_format: str = None) -> np.ndarray:
+    """
+    Returns a writable object copy of a column. Dates are converted to
+    their display text, which would otherwise change once they are mixed with text.
+    """
+    values = df.iloc[:, col]
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return np.array(typed.column_texts(values, date_format), dtype=object)
+    return values.to_numpy(dtype=object, copy=True)
+
+
+def write_cells(df: pd.DataFrame, rows: np.ndarray, cols: np.ndarray, values) -> list[int]:
+    """
+    Writes many cells at once, one column array at a time.
+
+    Typed, read-only (memory-mapped) or immutable columns become plain object
+    columns instead of pandas guessing a type for the written text. Columns
+    that keep edits themselves (SQLite) are written in place.
+
+    Args:
+        df (pd.DataFrame): The frame, changed in place.
+        rows (np.ndarray): Row of every cell.
+        cols (np.ndarray): Column of every cell.
+        values: New value of every cell.
+
+    Returns:
+        list[int]: The columns written.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    values = np.asarray(values, dtype=object)
+    written = np.unique(cols).tolist()
+    for col in written:
+        mask = cols == col
+        array = df.iloc[:, col].array
+        if getattr(array, 'writes_in_place', False):
+            array[rows[mask]] = values[mask]
+            continue
+        column = object_column(df, col)
+        column[rows[mask]] = values[mask]
+        df.isetitem(col, column)
+    return written
@@ -0,0 +1,363 @@
+"""
+Reading and writing table files without Qt.
+
+TableReader and TableWriter hold the file formats: the table widgets wrap
+them in blackbox.app.table.loader.ExcelLoader and
+blackbox.app.table.saver.ExcelSaver, the batch command line in
+blackbox.cli uses them as they are.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import os
+from collections.abc import Callable, Iterator
+from functools import partial
+
+from blackbox.core import typed as typed_columns
+from blackbox.core.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+NA_VALUES = ['', 'nan', 'NaN', 'N/A', 'NA']
+CSV_EXTENSIONS = ('.csv', '.data')
+# Opened through blackbox.core.columnar, memory-mapped where the format allows
+COLUMNAR_EXTENSIONS = ('.arrow', '.feather', '.parquet', '.npz')
+# Opened through blackbox.core.sqlite, read in blocks as the view scrolls
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+READ_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + COLUMNAR_EXTENSIONS + SQLITE_EXTENSIONS
+SAVE_EXTENSIONS = ('.xlsx', '.csv', '.parquet', '.arrow', '.feather', '.npz')
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+class TableReader:
+    """
+    Reads xlsx, csv, columnar and SQLite files into DataFrames.
+
+    Args:
+        typed (bool, optional): Store numbers and dates natively, repeated text
+                                dictionary-encoded and empty cells as nulls instead
+                                of every cell as a string, see blackbox.core.typed.
+                                Defaults to False.
+        header (bool, optional): Whether delimited text files start with a header
+                                 row. None reads the first row as the header unless
+                                 it holds nothing but numbers, like the rows below it.
+                                 Defaults to None.
+    """
+
+    # Size of the sample used to sniff the encoding and delimiter of text files
+    sniff_bytes: int = 64 * 1024
+    # The first chunk is kept small so the first screen shows up quickly,
+    # every next chunk doubles in size up to `max_chunk_rows`
+    first_chunk_rows: int = 1_000
+    max_chunk_rows: int = 1_000_000
+
+    def __init__(self, typed: bool = False, header: bool = None):
+        self.typed = typed
+        self.header = header
+
+    def read_excel(self, path, sheet_name: str | int = 0) -> pd.DataFrame:
+        # Read Excel with dtype=str, then replace 'nan' strings and actual NaN
+        df = pd.read_excel(
+            path,
+            sheet_name=sheet_name,
+            dtype=str,
+            na_values=NA_VALUES,  # Treat these as NaN
+            keep_default_na=True
+        )
+        if self.typed:
+            return typed_columns.encode_frame(df)
+
+        df = df.fillna('')
+        df = df.replace(['nan', 'NaN'], '')
+        return df
+
+    def read_columnar(self, path) -> pd.DataFrame:
+        """
+        Opens an Arrow, Feather, Parquet or `.npz` bundle file without copying
+        its columns into memory where the format allows, see blackbox.core.columnar.
+        """
+        from blackbox.core.columnar import ColumnarStore
+
+        return ColumnarStore().read(path)
+
+    def read_sqlite(self, path) -> pd.DataFrame:
+        """
+        Opens the first table of a SQLite file. Only the row keys are read;
+        cells are fetched in pages when shown, see blackbox.core.sqlite.
+        """
+        from blackbox.core.sqlite import SqliteSource
+
+        return SqliteSource(path).frame()
+
+    def sniff_csv(self, path) -> tuple[str, str, bool]:
+        """
+        Guesses how a delimited text file is encoded and laid out from a sample.
+
+        Args:
+            path (str): Path to the text file.
+
+        Returns:
+            tuple[str, str, bool]: The encoding, the delimiter and whether the
+                                   first line is a header, see `header`.
+        """
+        with open(path, 'rb') as file:
+            sample = file.read(self.sniff_bytes)
+
+        if sample.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+        elif sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            encoding = 'utf-16'
+        else:
+            encoding = 'utf-8'
+
+        try:
+            # An incremental decoder tolerates a character cut at the end of the sample
+            text = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            encoding = 'latin-1'
+            text = sample.decode(encoding)
+
+        # Only complete lines are representative
+        text = text[:text.rfind('\n') + 1] or text
+        sniffer = csv.Sniffer()
+        try:
+            delimiter = sniffer.sniff(text, delimiters=',;\t|').delimiter
+        except csv.Error:
+            delimiter = ','
+
+        if self.header is not None:
+            return encoding, delimiter, self.header
+        return encoding, delimiter, not self.__first_row_is_data(sniffer, text, delimiter)
+
+    @staticmethod
+    def __first_row_is_data(sniffer: csv.Sniffer, text: str, delimiter: str) -> bool:
+        # Sniffer.has_header() votes against a header for every text column, so
+        # files of text columns would lose their header row to the data. A row
+        # of names may hold a year or two, a first row of numbers only is data.
+        fields = [field for field in next(csv.reader(io.StringIO(text), delimiter=delimiter), []) if field]
+        if not fields or not all(map(_is_number, fields)):
+            return False
+        try:
+            return not sniffer.has_header(text)
+        except csv.Error:
+            return False
+
+    def read_csv_chunks(self, path, progress: Callable[[int, int], None] = None) -> Iterator[pd.DataFrame]:
+        """
+        Parses a delimited text file (*.csv, *.data) chunk by chunk.
+
+        The first chunk holds `first_chunk_rows` rows and each following one
+        twice as many as the previous, capped at `max_chunk_rows`, so the first
+        rows are available almost immediately while the number of chunks for
+        a large file stays small.
+
+        Args:
+            path (str): Path to the text file.
+            progress (callable, optional): Called with (bytes_read, file_size)
+                                           after every chunk.
+
+        Yields:
+            pd.DataFrame: Consecutive row blocks with string values, or typed
+                          columns in the typed mode.
+        """
+        encoding, delimiter, has_header = self.sniff_csv(path)
+        total = os.path.getsize(path)
+
+        with open(path, 'rb') as handle, pd.read_csv(
+            handle,
+            sep=delimiter,
+            encoding=encoding,
+            header=0 if has_header else None,
+            dtype=str,
+            na_values=NA_VALUES,
+            keep_default_na=True,
+            iterator=True,
+        ) as reader:
+            size = self.first_chunk_rows
+            while True:
+                try:
+                    chunk = reader.get_chunk(size)
+                except StopIteration:
+                    break
+                if not has_header:
+                    chunk.columns = [f'Column {i + 1}' for i in range(chunk.shape[1])]
+                if progress is not None:
+                    progress(min(handle.tell(), total), total)
+                yield typed_columns.encode_frame(chunk) if self.typed else chunk.fillna('')
+                size = min(size * 2, self.max_chunk_rows)
+
+        if progress is not None:
+            progress(total, total)
+
+    def read_chunks(self, path, progress: Callable[[int, int], None] = None) -> Iterator[pd.DataFrame]:
+        """
+        Reads a supported file as a sequence of row blocks.
+        Delimited text files are streamed, workbooks come as a single block
+        and columnar and SQLite files as one lazily read block.
+
+        Args:
+            path (str): Path to the file.
+            progress (callable, optional): Called with (bytes_read, file_size).
+
+        Yields:
+            pd.DataFrame: Consecutive row blocks of the file.
+        """
+        if path.lower().endswith(CSV_EXTENSIONS):
+            yield from self.read_csv_chunks(path, progress)
+            return
+
+        total = os.path.getsize(path)
+        if progress is not None:
+            progress(0, total)
+        if path.lower().endswith(COLUMNAR_EXTENSIONS):
+            df = self.read_columnar(path)
+        elif path.lower().endswith(SQLITE_EXTENSIONS):
+            df = self.read_sqlite(path)
+        else:
+            df = self.read_excel(path)
+        if progress is not None:
+            progress(total, total)
+        yield df
+
+    def read(self, path) -> pd.DataFrame:
+        chunks = list(self.read_chunks(path))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    def writer_for(self, path) -> TableWriter:
+        """
+        Returns a TableWriter that writes delimited text files in the encoding,
+        delimiter and header layout `path` is read with, so a file written back
+        in place keeps its layout. Other formats get the default writer.
+        """
+        if not path.lower().endswith(CSV_EXTENSIONS):
+            return TableWriter()
+        return TableWriter(*self.sniff_csv(path))
+
+
+class TableWriter:
+    """
+    Writes DataFrames to xlsx, csv, parquet, Arrow or .npz bundle files, picked by file extension.
+    Edited sheets of a workbook are written into a copy of the original with write_sheets().
+
+    Every target is written to a temporary file next to the destination and
+    moved into place once complete, so an interrupted save never leaves a
+    truncated file behind.
+
+    Args:
+        encoding (str, optional): Encoding of CSV files. Defaults to 'utf-8'.
+        delimiter (str, optional): Field delimiter of CSV files. Defaults to ','.
+        header (bool, optional): Write the column names as the first line of CSV files.
+                                 Defaults to True.
+    """
+
+    # Rows handed to the CSV writer at once
+    csv_chunk_rows: int = 100_000
+
+    def __init__(self, encoding: str = 'utf-8', delimiter: str = ',', header: bool = True):
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.header = header
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        """
+        Writes a DataFrame to `path`.
+
+        Args:
+            df (pd.DataFrame): The data to write.
+            path (str): Destination; the extension selects the format.
+
+        Raises:
+            ValueError: If the extension is not one of SAVE_EXTENSIONS.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        writers = {
+            '.xlsx': self.write_excel,
+            '.csv': self.write_csv,
+            '.parquet': self.write_parquet,
+            # The temporary file has no meaningful extension, so the format is passed on
+            '.arrow': partial(self.write_columnar, ext='.arrow'),
+            '.feather': partial(self.write_columnar, ext='.feather'),
+            '.npz': partial(self.write_columnar, ext='.npz'),
+        }
+        if ext not in writers:
+            raise ValueError(f"Unsupported file type: {ext or path}")
+
+        self._write_atomic(partial(writers[ext], df), path)
+
+    def write_sheets(self, source: str, frames: dict[str, pd.DataFrame], path: str) -> None:
+        """
+        Writes a copy of the workbook `source` in which only the sheets in `frames`
+        are replaced, see blackbox.core.workbook.replace_sheets.
+
+        Args:
+            source (str): The workbook the sheets were read from; may equal `path`.
+            frames (dict[str, pd.DataFrame]): Sheet name to its edited content.
+            path (str): Destination with the extension of `source`.
+        """
+        from blackbox.core.workbook import replace_sheets
+
+        self._write_atomic(partial(replace_sheets, source, frames), path)
+
+    @staticmethod
+    def _write_atomic(write, path: str) -> None:
+        tmp_path = f'{path}.part'
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def write_excel(self, df: pd.DataFrame, path: str) -> None:
+        """
+        Streams rows into a write-only openpyxl workbook, which keeps memory
+        flat instead of building a cell object for every value first.
+        """
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append([str(c) for c in df.columns])
+
+        # Dates and decimals are written as shown: Excel would add a time to
+        # date-only values and read 2.0 back as 2
+        shown = [j for j, dtype in enumerate(df.dtypes) if dtype.kind in 'fM']
+        if shown:
+            df = df.copy(deep=False)
+            for j in shown:
+                df.isetitem(j, typed_columns.column_texts(df.iloc[:, j]))
+
+        values = typed_columns.dense_frame(df).astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+        wb.save(path)
+
+    def write_csv(self, df: pd.DataFrame, path: str) -> None:
+        df.to_csv(path, index=False, sep=self.delimiter, encoding=self.encoding, header=self.header,
+                  chunksize=self.csv_chunk_rows)
+
+    def write_parquet(self, df: pd.DataFrame, path: str) -> None:
+        df = typed_columns.dense_frame(df).set_axis([str(c) for c in df.columns], axis=1)
+        df.to_parquet(path, index=False)
+
+    def write_columnar(self, df: pd.DataFrame, path: str, ext: str = None) -> None:
+        """
+        Writes a memory-mappable Arrow file or NumPy bundle, see blackbox.core.columnar.
+        Columns opened from such a file are written back without converting them to text.
+        """
+        from blackbox.core.columnar import ColumnarStore
+
+        ColumnarStore().write(df, path, ext)
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns a module that is executed only when one of its attributes is first used.
+
+    Heavy dependencies such as pandas are imported this way, so that importing
+    the widgets stays cheap and the cost is paid by the first load or save.
+    Annotations mentioning the module must not be evaluated at import time,
+    hence the `from __future__ import annotations` in the modules using it.
+
+    Args:
+        name (str): Absolute name of the module.
+
+    Returns:
+        ModuleType: The module, loaded or not yet.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
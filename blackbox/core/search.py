@@ -0,0 +1,165 @@
+"""
+Text search and replacement over whole columns of cell texts.
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Iterable
+
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class SearchQuery:
+    """
+    Describes what to look for in the table and matches whole columns at once.
+
+    Args:
+        text (str): The text or regular expression to look for.
+        match_case (bool, optional): Compare case-sensitively. Defaults to True.
+        whole_cell (bool, optional): The cell must match entirely; otherwise
+                                     matching a part of it is enough. Defaults to True.
+        whole_word (bool, optional): Only match at word boundaries. Defaults to False.
+        regex (bool, optional): Treat `text` as a regular expression. Defaults to False.
+    """
+
+    def __init__(self, text: str, match_case: bool = True, whole_cell: bool = True,
+                 whole_word: bool = False, regex: bool = False):
+        self.text = text
+        self.match_case = match_case
+        self.whole_cell = whole_cell
+        self.whole_word = whole_word
+        self.regex = regex
+
+    def is_exact(self) -> bool:
+        """
+        True for a plain case-sensitive whole-cell comparison, which is what
+        the find index answers.
+        """
+        return self.match_case and self.whole_cell and not self.whole_word and not self.regex
+
+    def pattern(self) -> re.Pattern:
+        """
+        Returns the query as a compiled regular expression.
+
+        Raises:
+            re.error: If `text` is not a valid regular expression.
+        """
+        pattern = self.text if self.regex else re.escape(self.text)
+        if self.whole_word:
+            pattern = rf'\b(?:{pattern})\b'
+        if self.whole_cell:
+            pattern = rf'(?:{pattern})\Z'
+        return re.compile(pattern, 0 if self.match_case else re.IGNORECASE)
+
+    def match(self, texts: np.ndarray) -> np.ndarray:
+        """
+        Tests every text of a column against the query.
+
+        Args:
+            texts (np.ndarray): Cell texts, or a list of them.
+
+        Returns:
+            np.ndarray: Boolean mask of matching cells.
+        """
+        if self.is_exact():
+            return np.asarray(np.asarray(texts, dtype=object) == self.text, dtype=bool)
+
+        series = pd.Series(texts, dtype=object, copy=False)
+        if not self.regex and not self.whole_word:
+            if self.whole_cell:
+                return (series.str.casefold() == self.text.casefold()).to_numpy(dtype=bool)
+            return series.str.contains(self.text, case=self.match_case, regex=False).to_numpy(dtype=bool)
+
+        pattern = self.pattern()
+        if self.whole_cell:
+            return series.str.match(pattern).to_numpy(dtype=bool)
+        return series.str.contains(pattern).to_numpy(dtype=bool)
+
+    def replace(self, texts: np.ndarray, new: str) -> np.ndarray:
+        """
+        Replaces the matching part of many matching cell texts at once.
+
+        Args:
+            texts (np.ndarray): Texts that all match the query.
+            new (str): Replacement text; backreferences are honoured in regex mode.
+
+        Returns:
+            np.ndarray: The replaced texts.
+        """
+        if self.whole_cell and not self.regex:
+            return np.full(len(texts), new, dtype=object)
+        repl = new if self.regex else new.replace('\\', '\\\\')
+        series = pd.Series(texts, dtype=object, copy=False)
+        # A whole-cell match starts at the first character; one replacement keeps
+        # patterns that also match the empty end of the text from adding another
+        count = 1 if self.whole_cell else -1
+        return series.str.replace(self.pattern(), repl, n=count, regex=True).to_numpy(dtype=object)
+
+    def sub(self, text: str, new: str) -> str:
+        """
+        Replaces the matching part of one cell text with `new`.
+        A whole-cell match replaces the entire text.
+        """
+        if self.regex:
+            return self.pattern().sub(new, text, count=1 if self.whole_cell else 0)
+        if self.whole_cell:
+            return new
+        return self.pattern().sub(lambda _: new, text)
+
+
+def search_columns(query: SearchQuery, columns: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Runs a query over a whole table synchronously.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Row and column of every match, ordered row by row.
+    """
+    rows, cols = [], []
+    for col, texts in enumerate(columns):
+        hits = np.flatnonzero(query.match(texts))
+        rows.append(hits)
+        cols.append(np.full(len(hits), col, dtype=np.int64))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rows, cols = np.concatenate(rows).astype(np.int64), np.concatenate(cols)
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order]
+
+
+def replacements(query: SearchQuery, new: str, columns: Iterable[tuple[int, np.ndarray]],
+                 mask: Callable[[int], np.ndarray] = None) -> tuple[np.ndarray, np.ndarray, list[str], list[str]]:
+    """
+    Computes a Replace All one column at a time with vectorized string operations.
+
+    Args:
+        query (SearchQuery): What to replace.
+        new (str): Replacement text; backreferences are honoured in regex mode.
+        columns (Iterable[tuple[int, np.ndarray]]): Column index and cell texts of
+                                                    every column to search.
+        mask (callable, optional): Called with a column index, returns the mask
+                                   of the cells that may be replaced.
+
+    Returns:
+        tuple: Row and column of every changed cell, with its old and new text.
+    """
+    rows, cols, old_texts, new_texts = [], [], [], []
+    for col, texts in columns:
+        hits = query.match(texts)
+        if mask is not None:
+            hits &= mask(col)
+        hits = np.flatnonzero(hits)
+        if not len(hits):
+            continue
+        before = texts[hits]
+        after = query.replace(before, new)
+        changed = before != after
+        rows.append(hits[changed])
+        cols.append(np.full(int(changed.sum()), col, dtype=np.int64))
+        old_texts.extend(before[changed].tolist())
+        new_texts.extend(after[changed].tolist())
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), [], []
+    return np.concatenate(rows), np.concatenate(cols), old_texts, new_texts
@@ -0,0 +1,451 @@
+"""
+Paged access to SQLite tables.
+
+A SqliteSource opens one table, or a query with an integer key column, of a
+SQLite file. Only the keys are read up front. Cells are fetched in blocks of
+`block_rows` consecutive keys (keyset paging, `WHERE key BETWEEN ? AND ?`)
+the first time one of them is read, and the blocks are kept in an LRU cache
+of `max_blocks` entries, so memory stays bounded however large the table is.
+
+`source.frame()` returns a DataFrame of SqliteArray columns that the loader
+hands to the tables like any other file. TableView reads its visible cells
+through the block cache; whole-column operations (sort, find, save) read the
+column in one query instead. Edited cells are kept in an overlay on the
+source until SqliteWriteBack (blackbox.app.table.writeback) has written
+them to the file.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+from pathlib import Path
+
+from loguru import logger
+# The extension base classes need pandas as soon as this module runs; the
+# loader and write-back import it only once a SQLite file is opened
+from pandas.api.extensions import ExtensionArray, ExtensionDtype
+
+from blackbox.core import telemetry
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+def quote(name: str) -> str:
+    """
+    Quotes an SQL identifier.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _same(first: np.ndarray, second: np.ndarray) -> bool:
+    if first is second:
+        return True
+    if first.shape != second.shape:
+        return False
+    interface = first.__array_interface__, second.__array_interface__
+    if interface[0]['data'] == interface[1]['data'] and interface[0]['strides'] == interface[1]['strides']:
+        return True
+    return bool(np.array_equal(first, second))
+
+
+class SqliteSource:
+    """
+    A table or keyed query of a SQLite file, read in keyset-paged blocks.
+
+    Args:
+        path (str): The SQLite file.
+        table (str, optional): The table to open. Defaults to the first table
+                               of the file, unless `query` is given.
+        query (str, optional): A SELECT to open instead of a table; read-only.
+        key (str, optional): Integer column identifying the rows. Defaults to
+                             the rowid of a table and is required for a query.
+
+    Raises:
+        ValueError: If the file has no table, or a query has no key.
+    """
+
+    # Rows per block and blocks kept in the cache
+    block_rows: int = 4096
+    max_blocks: int = 64
+
+    def __init__(self, path: str, table: str = None, query: str = None, key: str = None):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        # Held while changes are written to the file, see read_frame()
+        self.write_lock = threading.Lock()
+
+        if query is None:
+            if table is None:
+                tables = self.tables()
+                if not tables:
+                    raise ValueError(f"{path} contains no table")
+                table = tables[0]
+            self.table = table
+            self.key = key or 'rowid'
+            self._from = quote(self.table)
+        else:
+            if key is None:
+                raise ValueError("A query needs the name of its integer key column")
+            self.table = None
+            self.key = key
+            self._from = f'({query})'
+        self.writable = self.table is not None
+
+        connection = self.connection()
+        cursor = connection.execute(f'SELECT * FROM {self._from} LIMIT 0')
+        self.columns: list[str] = [description[0] for description in cursor.description]
+        cursor = connection.execute(f'SELECT {quote(self.key)} FROM {self._from} ORDER BY 1')
+        self.keys: np.ndarray = np.fromiter((row[0] for row in cursor), dtype=np.int64)
+        self._next_key = int(self.keys[-1]) + 1 if len(self.keys) else 1
+
+        self._blocks: OrderedDict[int, list[np.ndarray]] = OrderedDict()
+        # Edited cells not written to the file yet, by (key, column)
+        self.overlay: dict[tuple[int, str], object] = {}
+        self._memo: tuple = None
+        logger.debug("Opened {} with {} rows and {} columns", self.name, len(self.keys), len(self.columns))
+
+    @property
+    def name(self) -> str:
+        return f'{self.path}:{self.table or "query"}'
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Returns the read-only connection of the calling thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            uri = Path(self.path).absolute().as_uri() + '?mode=ro'
+            connection = self._local.connection = sqlite3.connect(uri, uri=True, timeout=30,
+                                                                  check_same_thread=False)
+        return connection
+
+    def tables(self) -> list[str]:
+        rows = self.connection().execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                         "AND name NOT LIKE 'sqlite_%' ORDER BY rowid")
+        return [row[0] for row in rows]
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Returns the rows as a DataFrame of SqliteArray columns; nothing but the keys is read.
+        """
+        columns = {j: pd.Series(SqliteArray(self, name, self.keys), copy=False)
+                   for j, name in enumerate(self.columns)}
+        df = pd.concat(columns, axis=1, copy=False) if columns else pd.DataFrame(index=range(len(self.keys)))
+        df.columns = self.columns
+        return df
+
+    # --- Reading ---
+
+    def value(self, key: int, column: str):
+        """
+        Returns one cell, from the overlay or the block holding its key.
+        """
+        if self.overlay:
+            value = self.overlay.get((key, column), self)
+            if value is not self:
+                return value
+        position = int(np.searchsorted(self.keys, key))
+        if position >= len(self.keys) or self.keys[position] != key:
+            return None
+        block = self.__block(position // self.block_rows)
+        return block[self._column_index(column)][position % self.block_rows]
+
+    def column(self, column: str, keys: np.ndarray) -> np.ndarray:
+        """
+        Reads the cells of `keys` in a column with one query, bypassing the block cache.
+        """
+        rows = self.connection().execute(
+            f'SELECT {quote(self.key)}, {quote(column)} FROM {self._from} ORDER BY 1').fetchall()
+        found = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        stored = np.empty(len(rows), dtype=object)
+        stored[:] = [row[1] for row in rows]
+
+        values = np.full(len(keys), None, dtype=object)
+        positions = np.minimum(np.searchsorted(found, keys), max(len(found) - 1, 0))
+        hit = found[positions] == keys if len(found) else np.zeros(len(keys), dtype=bool)
+        values[hit] = stored[positions[hit]]
+
+        edited = {key: value for (key, name), value in self.overlay.items() if name == column}
+        if edited:
+            for i in np.flatnonzero(np.isin(keys, np.fromiter(edited, dtype=np.int64))).tolist():
+                values[i] = edited[int(keys[i])]
+        telemetry.count('sqlite.column_reads')
+        return values
+
+    def __block(self, index: int) -> list[np.ndarray]:
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+                return block
+
+        keys = self.keys[index * self.block_rows:(index + 1) * self.block_rows]
+        names = ', '.join(quote(name) for name in self.columns)
+        try:
+            rows = self.connection().execute(
+                f'SELECT {quote(self.key)}, {names} FROM {self._from} '
+                f'WHERE {quote(self.key)} BETWEEN ? AND ? ORDER BY 1',
+                (int(keys[0]), int(keys[-1]))).fetchall()
+        except sqlite3.Error as e:
+            # Shown empty and read again next time, e.g. while a write holds the file
+            logger.warning("Could not read rows {} to {} of {}: {}", keys[0], keys[-1], self.name, e)
+            return [np.full(len(keys), None, dtype=object) for _ in self.columns]
+
+        found = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        positions = np.searchsorted(keys, found)
+        valid = positions < len(keys)
+        valid[valid] = keys[positions[valid]] == found[valid]
+        block = []
+        for j, stored in enumerate(zip(*rows) if rows else [() for _ in range(len(self.columns) + 1)]):
+            if j == 0:
+                continue
+            values = np.full(len(keys), None, dtype=object)
+            cells = np.empty(len(stored), dtype=object)
+            cells[:] = stored
+            values[positions[valid]] = cells[valid]
+            block.append(values)
+        telemetry.count('sqlite.blocks')
+
+        with self._lock:
+            self._blocks[index] = block
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def _column_index(self, column: str) -> int:
+        return self.columns.index(column)
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached blocks, e.g. after the file was written.
+        """
+        with self._lock:
+            self._blocks.clear()
+
+    # --- Changes ---
+
+    def new_keys(self, count: int) -> np.ndarray:
+        """
+        Reserves keys for rows about to be inserted.
+        """
+        keys = np.arange(self._next_key, self._next_key + count, dtype=np.int64)
+        self._next_key += count
+        return keys
+
+    def set_value(self, key: int, column: str, value) -> None:
+        self.overlay[(key, column)] = value
+
+    def rekey(self, keys: dict[int, int]) -> None:
+        """
+        Moves the overlay cells of placeholder keys (see SqliteArray.take) to real keys.
+        """
+        for (key, column) in [cell for cell in self.overlay if cell[0] in keys]:
+            self.overlay[(keys[key], column)] = self.overlay.pop((key, column))
+
+    def committed(self, inserted: np.ndarray, deleted: np.ndarray, cells: list[tuple[int, str, object]],
+                  added: list[str], dropped: list[str]) -> None:
+        """
+        Brings the keys, columns and overlay up to date after a batch of changes was written.
+
+        Args:
+            inserted (np.ndarray): Keys of the inserted rows.
+            deleted (np.ndarray): Keys of the deleted rows.
+            cells (list[tuple[int, str, object]]): (key, column, value) of the written cells.
+            added (list[str]): Columns added to the table.
+            dropped (list[str]): Columns dropped from the table.
+        """
+        if len(inserted):
+            self.keys = np.union1d(self.keys, inserted)
+        if len(deleted):
+            self.keys = self.keys[~np.isin(self.keys, deleted)]
+        self.columns = [name for name in self.columns if name not in dropped] + list(added)
+        for key, column, value in cells:
+            if self.overlay.get((key, column), self) == value:
+                del self.overlay[(key, column)]
+        self.invalidate()
+
+    def shared(self, operation: str, inputs: tuple, build) -> np.ndarray:
+        """
+        Returns `build()`, or the result of the previous call if it had the same
+        operation and inputs. pandas reorders a frame one column at a time, so
+        this lets all columns share one key array instead of a copy each.
+        """
+        with self._lock:
+            memo = self._memo
+        if (memo is not None and memo[0] == operation and len(memo[1]) == len(inputs)
+                and all(_same(*pair) for pair in zip(memo[1], inputs))):
+            return memo[2]
+        result = build()
+        with self._lock:
+            self._memo = (operation, inputs, result)
+        return result
+
+    def forget_shared(self) -> None:
+        with self._lock:
+            self._memo = None
+
+
+def read_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of `df` with its SqliteArray columns read into memory.
+
+    The columns are read while holding the `write_lock` of their sources, so
+    the copy has every file as it was either before or after a batch of changes
+    written back to it, together with the overlay edits not written yet. The
+    overlay itself changes only on the thread the table lives in.
+    """
+    arrays = {j: df.iloc[:, j].array for j in range(df.shape[1])}
+    arrays = {j: array for j, array in arrays.items() if isinstance(array, SqliteArray)}
+    df = df.copy()
+    with ExitStack() as stack:
+        for source in {id(array.source): array.source for array in arrays.values()}.values():
+            stack.enter_context(source.write_lock)
+        for j, array in arrays.items():
+            df.isetitem(j, np.asarray(array, dtype=object))
+    return df
+
+
+class SqliteDtype(ExtensionDtype):
+    """
+    The dtype of SqliteArray.
+    """
+    name = 'sqlite'
+    type = object
+    kind = 'O'
+    na_value = None
+
+    @classmethod
+    def construct_array_type(cls):
+        return SqliteArray
+
+
+class SqliteArray(ExtensionArray):
+    """
+    A column of a SqliteSource, as the keys of its rows.
+
+    Cells are read through the source when accessed. Slicing, taking and
+    concatenating only build new key arrays. Rows inserted by the table get
+    negative placeholder keys until SqliteWriteBack gives them real ones.
+    Writing a cell stores it in the overlay of the source instead of
+    converting the column (`writes_in_place`, see DataFrameModel.setData).
+
+    Args:
+        source (SqliteSource): The source the rows come from.
+        column (str): The column of the source.
+        keys (np.ndarray): Key of every row.
+    """
+    writes_in_place = True
+
+    def __init__(self, source: SqliteSource, column: str, keys: np.ndarray):
+        self._source = source
+        self._column = column
+        self._keys = keys
+
+    @property
+    def source(self) -> SqliteSource:
+        return self._source
+
+    @property
+    def column(self) -> str:
+        return self._column
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys
+
+    # --- Construction ---
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        raise TypeError("SqliteArray can only be created by a SqliteSource")
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return np.asarray(values, dtype=object)
+
+    # --- Access ---
+
+    @property
+    def dtype(self) -> SqliteDtype:
+        return SqliteDtype()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._source.value(int(self._keys[key]), self._column)
+        if isinstance(key, tuple) and len(key) == 1:
+            key = key[0]
+        if not isinstance(key, slice):
+            key = pd.api.indexers.check_array_indexer(self, key)
+        return type(self)(self._source, self._column, self._keys[key])
+
+    def __setitem__(self, key, value) -> None:
+        keys = self._keys[key]
+        if np.ndim(keys) == 0:
+            self._source.set_value(int(keys), self._column, value)
+            return
+        values = value if np.ndim(value) else [value] * len(keys)
+        for cell_key, cell_value in zip(keys.tolist(), values):
+            self._source.set_value(cell_key, self._column, cell_value)
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        values = self._source.column(self._column, self._keys)
+        return values if dtype is None or dtype == object else values.astype(dtype)
+
+    def __eq__(self, other):
+        return np.asarray(self, dtype=object) == other
+
+    @property
+    def nbytes(self) -> int:
+        return self._keys.nbytes
+
+    def isna(self) -> np.ndarray:
+        return pd.isna(np.asarray(self, dtype=object))
+
+    # --- Reordering ---
+
+    def take(self, indices, *, allow_fill: bool = False, fill_value=None) -> SqliteArray:
+        indices = np.asarray(indices, dtype=np.int64)
+
+        def build() -> np.ndarray:
+            if not allow_fill:
+                return self._keys[indices]
+            fill = indices < 0
+            keys = np.zeros(len(indices), dtype=np.int64)
+            keys[~fill] = self._keys[indices[~fill]]
+            # Placeholders of new rows, the same for every column of the frame
+            keys[fill] = -1 - np.arange(int(fill.sum()))
+            return keys
+
+        keys = self._source.shared(f'take{allow_fill}', (self._keys, indices), build)
+        return type(self)(self._source, self._column, keys)
+
+    def assign_keys(self, at: int, keys: np.ndarray) -> None:
+        """
+        Replaces the placeholder keys of inserted rows `at` to `at + len(keys)`.
+        """
+        span = self._keys[at:at + len(keys)]
+        placeholder = span < 0
+        if placeholder.any():
+            span[placeholder] = keys[placeholder]
+            self._source.forget_shared()
+
+    def copy(self) -> SqliteArray:
+        return type(self)(self._source, self._column, self._keys.copy())
+
+    @classmethod
+    def _concat_same_type(cls, to_concat) -> SqliteArray:
+        first = to_concat[0]
+        inputs = tuple(array._keys for array in to_concat)
+        keys = first._source.shared('concat', inputs, lambda: np.concatenate(inputs))
+        return cls(first._source, first._column, keys)
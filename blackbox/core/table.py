@@ -0,0 +1,173 @@
+"""
+A table without a widget: load, find, replace, row and column operations and save.
+
+Table runs the same column-at-a-time search, replacement and structural
+operations as the table widgets, on a DataFrame alone, so scripts and the
+batch command line in blackbox.cli need neither Qt nor a display.
+"""
+from __future__ import annotations
+
+from loguru import logger
+
+from blackbox.core import frame, typed
+from blackbox.core.changes import index_spans, move_order
+from blackbox.core.io import TableReader, TableWriter
+from blackbox.core.lazy import lazy_import
+from blackbox.core.search import SearchQuery, replacements, search_columns
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class Table:
+    """
+    Cell texts and structure of one DataFrame.
+
+    Args:
+        df (pd.DataFrame): The data, edited in place where possible.
+        writer (TableWriter, optional): Writes the table on save(), see
+                                        TableReader.writer_for. Defaults to
+                                        a TableWriter with default options.
+    """
+
+    def __init__(self, df: pd.DataFrame, writer: TableWriter = None):
+        self.df = df
+        self.writer = writer if writer is not None else TableWriter()
+
+    @classmethod
+    def read(cls, path: str, typed: bool = False) -> Table:
+        """
+        Reads a file into a table, see blackbox.core.io.TableReader.
+
+        Args:
+            path (str): Path to the file; the extension selects the format.
+            typed (bool, optional): Read typed columns, see blackbox.core.typed.
+                                    Defaults to False.
+        """
+        reader = TableReader(typed)
+        return cls(reader.read(path), reader.writer_for(path))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the table to `path` atomically, see blackbox.core.io.TableWriter.
+        A table read from a delimited text file is written in its layout.
+        """
+        self.writer.write(self.df, path)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.df.shape
+
+    def column_texts(self, col: int) -> np.ndarray:
+        """
+        Returns the text of every cell of a column, top to bottom.
+        """
+        return typed.column_texts(self.df.iloc[:, col])
+
+    def set_cells(self, rows, cols, values) -> None:
+        """
+        Writes many cells at once; written typed columns become text columns.
+        """
+        frame.write_cells(self.df, rows, cols, values)
+
+    def find(self, query: SearchQuery) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the row and column of every match, ordered row by row.
+        """
+        return search_columns(query, [self.column_texts(col) for col in range(self.df.shape[1])])
+
+    def replace(self, query: SearchQuery, new: str, columns: list[int] = None) -> int:
+        """
+        Replaces every match of `query` with `new`, one column at a time.
+
+        Args:
+            query (SearchQuery): What to replace.
+            new (str): Replacement text; backreferences are honoured in regex mode.
+            columns (list[int], optional): Columns to search. Defaults to all.
+
+        Returns:
+            int: The number of cells changed.
+        """
+        columns = range(self.df.shape[1]) if columns is None else columns
+        rows, cols, _, new_texts = replacements(query, new, ((col, self.column_texts(col)) for col in columns))
+        if len(rows):
+            frame.write_cells(self.df, rows, cols, new_texts)
+        logger.debug("Replaced {} cells", len(rows))
+        return len(rows)
+
+    def insert_rows(self, rows, after: bool = False) -> int:
+        """
+        Inserts blank rows next to the given rows, one per given row; every run
+        of consecutive rows gets a single insert of its length in front of it.
+
+        Args:
+            rows (array-like): Rows; the row count appends at the end.
+            after (bool, optional): Insert behind every run instead. Defaults to False.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        count = self.df.shape[0]
+        spans = [(first, n) for first, n in index_spans(rows)
+                 if first >= 0 and first + n <= count + (not after)]
+        # Bottom-up, so the runs above keep their indices
+        for first, n in reversed(spans):
+            self.df = frame.insert_rows(self.df, first + n if after else first, n)
+        return sum(n for _, n in spans)
+
+    def remove_rows(self, rows) -> int:
+        """
+        Removes the given rows.
+
+        Returns:
+            int: The number of rows removed.
+        """
+        spans = [(first, n) for first, n in index_spans(rows)
+                 if first >= 0 and first + n <= self.df.shape[0]]
+        for first, n in reversed(spans):
+            self.df = frame.remove_rows(self.df, first, n)
+        return sum(n for _, n in spans)
+
+    def insert_columns(self, cols, after: bool = False) -> int:
+        """
+        Inserts blank columns with unique names next to the given columns, like insert_rows().
+
+        Returns:
+            int: The number of columns inserted.
+        """
+        count = self.df.shape[1]
+        spans = [(first, n) for first, n in index_spans(cols)
+                 if first >= 0 and first + n <= count + (not after)]
+        labels = frame.new_column_labels([str(c) for c in self.df.columns], sum(n for _, n in spans))
+        for first, n in reversed(spans):
+            frame.insert_columns(self.df, first + n if after else first, labels[-n:])
+            del labels[-n:]
+        return sum(n for _, n in spans)
+
+    def remove_columns(self, cols) -> int:
+        """
+        Removes the given columns.
+
+        Returns:
+            int: The number of columns removed.
+        """
+        spans = [(first, n) for first, n in index_spans(cols)
+                 if first >= 0 and first + n <= self.df.shape[1]]
+        for first, n in reversed(spans):
+            self.df = frame.remove_columns(self.df, first, n)
+        return sum(n for _, n in spans)
+
+    def move_rows(self, rows, target: int) -> np.ndarray:
+        """
+        Moves rows so they are placed before `target`, as one permutation.
+
+        Args:
+            rows (array-like): Source rows, in the order they should land.
+            target (int): Insertion point expressed in pre-move row indices.
+
+        Returns:
+            np.ndarray: The applied permutation, `order[i]` being the old index of new row `i`.
+        """
+        order = move_order(self.df.shape[0], rows, target)
+        self.df = frame.permute_rows(self.df, order)
+        return order
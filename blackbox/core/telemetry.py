@@ -0,0 +1,315 @@
+"""
+Timing spans, latency histograms and counters of the table hot paths.
+
+Operations are wrapped in named spans:
+
+    load        reading a whole file on the loader thread
+    parse       reading one block of a file
+    populate    showing one block of rows in a table
+    find        a search, from the request to its last match
+    replace     a Replace All
+    move        a row move
+    copy        copying the selected cells to the clipboard
+    paste       pasting a block of cells
+    sort        sorting the rows by their sort keys
+    filter      applying the column filters
+    stats       computing column or selection aggregates
+    save        writing a file on the saver thread
+    journal     writing and syncing a batch of journaled changes
+    checkpoint  writing a journal checkpoint
+    writeback   writing a batch of changes back to a SQLite file
+
+Every finished span adds its duration to the histogram of its name and is
+announced through `signals().span_finished`. Counters hold totals such as
+rows loaded or cells replaced. Everything is kept in memory and can be read
+back with `stats()`.
+
+`start_profiling()` and `stop_profiling()` additionally capture a cProfile
+profile of the GUI thread and, optionally, a tracemalloc snapshot.
+"""
+from __future__ import annotations
+
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from loguru import logger
+
+__all__ = ['span', 'count', 'record', 'stats', 'reset', 'set_enabled', 'signals',
+           'start_profiling', 'stop_profiling', 'Histogram', 'Span', 'ProfileReport']
+
+_lock = threading.Lock()
+_histograms: dict[str, Histogram] = {}
+_counters: dict[str, int] = {}
+_enabled: bool = True
+_signals: TelemetrySignals = None
+_profiler: cProfile.Profile = None
+
+
+class Histogram:
+    """
+    Latency histogram with logarithmic buckets from 1 µs to about a minute.
+
+    Each bucket counts the durations up to its bound and above the previous
+    one, so percentiles are exact to a factor of two at constant memory.
+    """
+
+    BOUNDS: tuple[float, ...] = tuple(1e-6 * 2 ** i for i in range(27))
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket holding the `q` quantile, 0 <= q <= 1.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(self.BOUNDS[i] if i < len(self.BOUNDS) else self.max, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            # Upper bound of every non-empty bucket and its count
+            'buckets': [[self.BOUNDS[i] if i < len(self.BOUNDS) else None, n]
+                        for i, n in enumerate(self.buckets) if n],
+        }
+
+
+def _signals_type() -> type:
+    # Qt is imported with the first signals() call, so headless users of blackbox.core never load it
+    from PyQt6.QtCore import QObject, pyqtSignal
+
+    class TelemetrySignals(QObject):
+        """
+        Signals:
+            span_finished (str, float): Name of a span and its duration in seconds.
+            counter_changed (str, int): Name of a counter and its new total.
+        """
+        span_finished = pyqtSignal(str, float)
+        counter_changed = pyqtSignal(str, int)
+
+    return TelemetrySignals
+
+
+def signals() -> TelemetrySignals:
+    """
+    Returns the object emitting telemetry signals. Spans finished on worker
+    threads are delivered through the event loop of the receiver's thread.
+    Nothing is emitted before the first call, when nobody can be connected yet.
+    """
+    global _signals
+    if _signals is None:
+        with _lock:
+            if _signals is None:
+                _signals = _signals_type()()
+    return _signals
+
+
+class Span:
+    """
+    Measures one run of an operation.
+
+    Use it as a context manager, or call start() and finish() for operations
+    that end in a later callback, such as a search running on a thread pool.
+    A span left by an exception is counted in `<name>.failed` instead.
+
+    Attributes:
+        name (str): Name of the histogram the duration is added to.
+        elapsed (float): Duration in seconds once finished.
+    """
+    __slots__ = ('name', 'started', 'elapsed')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> Span:
+        self.started = time.perf_counter()
+        return self
+
+    def finish(self) -> float:
+        self.elapsed = time.perf_counter() - self.started
+        record(self.name, self.elapsed)
+        return self.elapsed
+
+    def __enter__(self) -> Span:
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.finish()
+        else:
+            self.elapsed = time.perf_counter() - self.started
+            count(f'{self.name}.failed')
+
+
+def span(name: str) -> Span:
+    """
+    Returns a not yet started span of the operation `name`.
+    """
+    return Span(name)
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Adds a duration to the histogram of `name`.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds)
+    logger.trace("{} took {:.6f}s", name, seconds)
+    if _signals is not None:
+        _signals.span_finished.emit(name, seconds)
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Adds `n` to the counter `name`.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + n
+    if _signals is not None:
+        _signals.counter_changed.emit(name, total)
+
+
+def stats() -> dict:
+    """
+    Returns a snapshot of all histograms and counters.
+
+    Returns:
+        dict: {'spans': {name: histogram as dict}, 'counters': {name: total}}.
+    """
+    with _lock:
+        return {
+            'spans': {name: h.as_dict() for name, h in _histograms.items()},
+            'counters': dict(_counters),
+        }
+
+
+def reset() -> None:
+    """
+    Drops all recorded durations and counters.
+    """
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def set_enabled(enabled: bool) -> None:
+    """
+    Turns recording on or off. Spans still measure their duration while it is off.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+@dataclass
+class ProfileReport:
+    """
+    What was captured between start_profiling() and stop_profiling().
+
+    Attributes:
+        stats (pstats.Stats): Call statistics of the GUI thread.
+        memory (tracemalloc.Snapshot): Python allocations still alive at the end,
+                                       None if memory was not traced.
+        peak_bytes (int): Peak of traced Python memory, 0 if memory was not traced.
+    """
+    stats: pstats.Stats
+    memory: tracemalloc.Snapshot = None
+    peak_bytes: int = 0
+
+    def summary(self, limit: int = 25) -> str:
+        """
+        Returns the slowest functions by cumulative time and, when traced,
+        the lines holding the most memory.
+        """
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats('cumulative').print_stats(limit)
+        if self.memory is not None:
+            out.write(f'Peak traced memory: {self.peak_bytes / 2 ** 20:.1f} MB\n')
+            for line in self.memory.statistics('lineno')[:limit]:
+                out.write(f'{line}\n')
+        return out.getvalue()
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the call statistics to `path`, readable by pstats and snakeviz.
+        """
+        self.stats.dump_stats(path)
+
+
+def start_profiling(memory: bool = False) -> None:
+    """
+    Starts a cProfile capture of the calling thread, normally the GUI thread.
+
+    Args:
+        memory (bool, optional): Also trace Python allocations with tracemalloc,
+                                 which slows everything down noticeably. Defaults to False.
+    """
+    global _profiler
+    if _profiler is not None:
+        return
+    if memory:
+        tracemalloc.start()
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    logger.info("Profiling started")
+
+
+def stop_profiling() -> ProfileReport:
+    """
+    Stops the capture started by start_profiling().
+
+    Returns:
+        ProfileReport: The captured data, None if no capture was running.
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    _profiler.disable()
+    report = ProfileReport(pstats.Stats(_profiler))
+    _profiler = None
+    if tracemalloc.is_tracing():
+        report.memory = tracemalloc.take_snapshot()
+        report.peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    logger.info("Profiling stopped")
+    return report
@@ -0,0 +1,232 @@
+"""
+Typed column storage and the display text of any column.
+
+The default loading mode keeps every cell as its own Python string. The typed
+mode converts the columns of a frame read with `dtype=str` into compact
+storage where that keeps the displayed text of every cell the same:
+
+    integers          int64, or nullable Int64 with empty cells
+    decimals          float64, empty cells as NaN
+    dates             datetime64, written as YYYY-MM-DD or YYYY-MM-DD HH:MM:SS
+    repeated text     categorical, i.e. dictionary-encoded
+    mostly empty      sparse text that stores the filled cells only
+    other text        strings, empty cells as nulls
+
+A conversion is kept only if `column_texts` of the converted column gives
+back the original text of every cell, so the table, find/replace and saving
+see exactly what the string mode would show.
+"""
+from __future__ import annotations
+
+import re
+
+from blackbox.core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# A column is dictionary-encoded if it has at most this many distinct values per filled cell
+CATEGORY_RATIO: float = 0.5
+# A text column is stored sparse if at least this share of its cells is empty
+SPARSE_RATIO: float = 0.5
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+_DATE_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def format_value(value) -> str:
+    """
+    Converts a stored value to the text shown in the table.
+    """
+    if isinstance(value, str):
+        return value
+    if value is None or pd.isna(value):
+        return ''
+    return str(value)
+
+
+def datetime_format(values) -> str:
+    """
+    Returns the format the dates of a column are shown with: date only if
+    every value is at midnight, to the second if there are no fractions of
+    a second, and to the microsecond otherwise. This matches pandas' own
+    CSV output, so a saved file shows the same text as the table.
+    """
+    stamps = pd.DatetimeIndex(values)
+    stamps = stamps[stamps.notna()]
+    if (stamps == stamps.normalize()).all():
+        return DATE_FORMAT
+    if (stamps == stamps.floor('s')).all():
+        return DATETIME_FORMAT
+    return DATETIME_FORMAT + '.%f'
+
+
+def column_texts(values, date_format: str = None) -> np.ndarray:
+    """
+    Returns the display text of every cell of a column.
+
+    Args:
+        values: The column, as a Series, an ExtensionArray or a NumPy array.
+        date_format (str, optional): Format of a datetime column. Defaults to
+                                     datetime_format() of `values`, pass it when
+                                     `values` is only a slice of the column.
+
+    Returns:
+        np.ndarray: An object array of strings; string columns are returned
+                    as they are stored, without copying.
+    """
+    array = values.array if isinstance(values, pd.Series) else values
+    dtype = array.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Format every category once, then look the cells up by code
+        categories = column_texts(array.categories.to_numpy())
+        return np.append(categories, '').astype(object)[array.codes]
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        stamps = pd.DatetimeIndex(array)
+        texts = stamps.strftime(date_format or datetime_format(stamps)).to_numpy(dtype=object)
+        texts[stamps.isna()] = ''
+        return texts
+    if isinstance(array, np.ndarray) and dtype.kind in 'iufb':
+        texts = array.astype(str).astype(object)
+        if dtype.kind == 'f':
+            texts[np.isnan(array)] = ''
+        return texts
+
+    if not isinstance(array, np.ndarray):
+        array = np.asarray(array, dtype=object)
+    if array.dtype == object and pd.api.types.infer_dtype(array, skipna=False) == 'string':
+        return array
+    return np.array([format_value(v) for v in array], dtype=object)
+
+
+def encode_frame(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO,
+                 sparse_ratio: float = SPARSE_RATIO) -> pd.DataFrame:
+    """
+    Converts the text columns of `df` in place, see encode_column.
+
+    Returns:
+        pd.DataFrame: `df` itself.
+    """
+    for j in range(df.shape[1]):
+        column = df.iloc[:, j]
+        if column.dtype == object:
+            df.isetitem(j, encode_column(column.to_numpy(), category_ratio, sparse_ratio))
+    return df
+
+
+def encode_column(texts: np.ndarray, category_ratio: float = CATEGORY_RATIO,
+                  sparse_ratio: float = SPARSE_RATIO):
+    """
+    Picks the most compact storage of a text column that shows the same text.
+
+    Args:
+        texts (np.ndarray): Cell texts, empty cells as '' or NaN.
+        category_ratio (float, optional): See CATEGORY_RATIO.
+        sparse_ratio (float, optional): See SPARSE_RATIO.
+
+    Returns:
+        np.ndarray or ExtensionArray: The converted column.
+    """
+    empty = pd.isna(texts) | (texts == '')
+    filled = texts[~empty]
+    if not len(filled):
+        return pd.arrays.SparseArray(np.full(len(texts), np.nan, dtype=object), fill_value=np.nan)
+    if pd.api.types.infer_dtype(filled, skipna=False) != 'string':
+        return texts
+
+    for convert in (_as_number, _as_datetime):
+        values = convert(filled, empty)
+        if values is not None:
+            return values
+
+    codes, categories = pd.factorize(filled)
+    if len(categories) <= category_ratio * len(filled):
+        all_codes = np.full(len(texts), -1, dtype=codes.dtype)
+        all_codes[~empty] = codes
+        return pd.Categorical.from_codes(all_codes, categories=pd.Index(categories, dtype=object))
+
+    texts = texts.copy()
+    texts[empty] = np.nan
+    if empty.mean() >= sparse_ratio:
+        return pd.arrays.SparseArray(texts, fill_value=np.nan)
+    return texts
+
+
+def _as_number(filled: np.ndarray, empty: np.ndarray):
+    numbers = pd.to_numeric(filled, errors='coerce')
+    if numbers.dtype.kind not in 'iuf' or numbers.dtype.kind == 'f' and np.isnan(numbers).any():
+        return None
+    # '007', '1.50' or '1e3' would be shown differently after the conversion
+    if not (column_texts(numbers) == filled).all():
+        return None
+
+    if numbers.dtype.kind == 'f':
+        values = np.full(len(empty), np.nan)
+        values[~empty] = numbers
+        return values
+    if not empty.any():
+        return numbers
+    values = np.zeros(len(empty), dtype=numbers.dtype)
+    values[~empty] = numbers
+    return pd.arrays.IntegerArray(values, empty.copy())
+
+
+def _as_datetime(filled: np.ndarray, empty: np.ndarray):
+    if not _DATE_PREFIX.match(filled[0]):
+        return None
+    for date_format in (DATE_FORMAT, DATETIME_FORMAT):
+        stamps = pd.to_datetime(filled, format=date_format, errors='coerce')
+        if stamps.isna().any():
+            continue
+        if not (column_texts(stamps.array) == filled).all():
+            continue
+        values = np.full(len(empty), 'NaT', dtype=stamps.dtype)
+        values[~empty] = stamps.to_numpy()
+        return values
+    return None
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates row blocks like pd.concat, but keeps every cell's text.
+
+    Categorical columns stay categorical when the blocks saw different
+    categories. A column stored differently in different blocks, such as
+    integers in one and decimals in the next, or dates shown with and
+    without a time, is encoded again from the text of all blocks, since
+    pd.concat would show 1 as 1.0 or add a time to every date.
+    """
+    df = pd.concat(frames)
+    for j in range(df.shape[1]):
+        parts = [frame.iloc[:, j].array for frame in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            if df.iloc[:, j].dtype == object:
+                df.isetitem(j, pd.api.types.union_categoricals(parts, ignore_order=True))
+        elif not _same_storage(parts):
+            texts = np.concatenate([column_texts(p) for p in parts])
+            df.isetitem(j, encode_column(texts))
+    return df
+
+
+def _same_storage(parts: list) -> bool:
+    dtype = parts[0].dtype
+    if any(p.dtype != dtype for p in parts[1:]):
+        return False
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return len({datetime_format(p) for p in parts if not p.isna().all()}) <= 1
+    return True
+
+
+def dense_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns `df` with sparse columns made dense, for writers that do not support them.
+    """
+    sparse = [j for j in range(df.shape[1]) if isinstance(df.iloc[:, j].dtype, pd.SparseDtype)]
+    if not sparse:
+        return df
+    df = df.copy(deep=False)
+    for j in sparse:
+        df.isetitem(j, df.iloc[:, j].array.to_dense())
+    return df
@@ -0,0 +1,219 @@
+"""
+Sheets of xlsx/xlsm workbooks: listing them from the workbook metadata and
+writing a copy of a workbook with some sheets regenerated.
+
+Both work on the zip package directly. blackbox.app.table.workbook builds the
+sheet tabs on them, the batch command line in blackbox.cli rewrites the
+edited sheets of the files it processes.
+"""
+from __future__ import annotations
+
+import posixpath
+import re
+import sys
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from blackbox.core.lazy import lazy_import
+from blackbox.core.typed import column_texts
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+
+_OFFICE_DOCUMENT = '/officeDocument'
+_CALC_CHAIN = '/calcChain'
+_SHEET_HEADER = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                 '<sheetData>')
+_SHEET_FOOTER = '</sheetData></worksheet>'
+# Characters XML 1.0 does not allow, openpyxl refuses them as well
+_ILLEGAL_CHARACTERS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Cells sampled per column to estimate the size of its strings
+_SAMPLE_CELLS = 1_000
+
+
+def is_workbook(path: str) -> bool:
+    """
+    Tells whether `path` is an xlsx/xlsm workbook whose sheets can be listed and replaced.
+    """
+    return path.lower().endswith(WORKBOOK_EXTENSIONS) and zipfile.is_zipfile(path)
+
+
+def sheet_names(path: str) -> list[str]:
+    """
+    Lists the sheets of a workbook in tab order, from its metadata only.
+
+    Args:
+        path (str): Path to an xlsx/xlsm file.
+
+    Returns:
+        list[str]: The sheet names.
+    """
+    with zipfile.ZipFile(path) as archive:
+        return [name for name, _ in _sheet_parts(archive)]
+
+
+def _local(tag: str) -> str:
+    # Transitional and strict workbooks use different namespaces for the same elements
+    return tag.rsplit('}', 1)[-1]
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    """
+    Reads the relationships of a package part.
+
+    Returns:
+        dict[str, tuple[str, str]]: Relationship id to its type and target part name.
+    """
+    folder, name = posixpath.split(part)
+    rels_part = posixpath.join(folder, '_rels', f'{name}.rels')
+    if rels_part not in archive.namelist():
+        return {}
+
+    relationships = {}
+    for element in ElementTree.fromstring(archive.read(rels_part)):
+        target = element.get('Target', '')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        relationships[element.get('Id')] = (element.get('Type', ''), target)
+    return relationships
+
+
+def _sheet_parts(archive: zipfile.ZipFile) -> list[tuple[str, str]]:
+    """
+    Maps the worksheets of a workbook to the zip members holding them.
+
+    Returns:
+        list[tuple[str, str]]: (sheet name, member name) pairs in tab order.
+    """
+    workbook_part = next((target for kind, target in _relationships(archive, '').values()
+                          if kind.endswith(_OFFICE_DOCUMENT)), 'xl/workbook.xml')
+    relationships = _relationships(archive, workbook_part)
+
+    parts = []
+    for element in ElementTree.fromstring(archive.read(workbook_part)).iter():
+        if _local(element.tag) != 'sheet':
+            continue
+        rel_id = next((value for key, value in element.attrib.items() if _local(key) == 'id'), None)
+        if rel_id in relationships:
+            parts.append((element.get('name'), relationships[rel_id][1]))
+    return parts
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """
+    Estimates the memory held by a DataFrame. The strings of object columns are
+    measured on a sample of their cells, so this stays cheap for large frames.
+    """
+    total = 0
+    for j in range(df.shape[1]):
+        values = df.iloc[:, j].array
+        try:
+            total += values.nbytes
+        except (AttributeError, TypeError):
+            continue
+        if values.dtype == object and len(values):
+            values = np.asarray(values, dtype=object)
+            sample = values[::max(len(values) // _SAMPLE_CELLS, 1)]
+            total += sum(sys.getsizeof(value) for value in sample) * len(values) // len(sample)
+    return total
+
+
+def _column_letter(col: int) -> str:
+    letters = ''
+    col += 1
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _text_cell(ref: str, text: str) -> str:
+    text = escape(_ILLEGAL_CHARACTERS.sub('', text))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _column_cells(values, letter: str) -> list:
+    """
+    Builds the XML of every cell in a column, None for empty cells.
+    Integers and booleans are written as numbers, everything else as the text
+    the table shows, like TableWriter.write_excel.
+    """
+    rows = range(2, len(values) + 2)
+    empty = np.asarray(pd.isna(values), dtype=bool)
+    kind = values.dtype.kind
+    if kind in 'iub':
+        numbers = np.asarray(values.astype(object))
+        kind_attr = ' t="b"' if kind == 'b' else ''
+        return [None if empty[i] else f'<c r="{letter}{row}"{kind_attr}><v>{int(numbers[i])}</v></c>'
+                for i, row in enumerate(rows)]
+
+    texts = column_texts(values)
+    return [None if empty[i] or not texts[i] else _text_cell(f'{letter}{row}', texts[i])
+            for i, row in enumerate(rows)]
+
+
+def sheet_xml(df: pd.DataFrame) -> bytes:
+    """
+    Serializes a DataFrame as a worksheet part: the column labels in the first
+    row, then the data. Strings are stored inline, so the part does not depend
+    on the shared strings of the workbook it is put into.
+    """
+    letters = [_column_letter(j) for j in range(df.shape[1])]
+    header = ''.join(_text_cell(f'{letter}1', str(label)) for letter, label in zip(letters, df.columns))
+    columns = [_column_cells(df.iloc[:, j].array, letter) for j, letter in enumerate(letters)]
+
+    lines = [_SHEET_HEADER, f'<row r="1">{header}</row>']
+    for i, cells in enumerate(zip(*columns)):
+        lines.append(f'<row r="{i + 2}">{"".join(cell for cell in cells if cell)}</row>')
+    lines.append(_SHEET_FOOTER)
+    return ''.join(lines).encode('utf-8')
+
+
+def replace_sheets(source: str, frames: dict[str, pd.DataFrame], path: str) -> None:
+    """
+    Writes a copy of the workbook `source` to `path` in which only the sheets
+    named in `frames` are regenerated from their DataFrames.
+
+    Every other part of the zip (untouched sheets, styles, shared strings,
+    charts, ...) is copied as it is. A replaced sheet holds plain values: its
+    formatting, formulas and drawings are dropped, and so is the calculation
+    chain, which Excel rebuilds on open.
+
+    Args:
+        source (str): The original xlsx/xlsm file.
+        frames (dict[str, pd.DataFrame]): Sheet name to its new content.
+        path (str): Destination; may be a temporary file next to `source`.
+
+    Raises:
+        KeyError: If a sheet of `frames` is not in the workbook.
+    """
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        parts = dict(_sheet_parts(src))
+        replaced = {parts[name]: df for name, df in frames.items()}
+        dropped = {posixpath.join(posixpath.dirname(part), '_rels', f'{posixpath.basename(part)}.rels')
+                   for part in replaced}
+
+        for info in src.infolist():
+            member = info.filename
+            if member in dropped or (replaced and member.endswith('calcChain.xml')):
+                continue
+            if member in replaced:
+                data = sheet_xml(replaced[member])
+            else:
+                data = src.read(member)
+                if replaced and (member == '[Content_Types].xml' or member.endswith('workbook.xml.rels')):
+                    data = _without_calc_chain(data)
+            dst.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+
+
+def _without_calc_chain(data: bytes) -> bytes:
+    text = data.decode('utf-8')
+    text = re.sub(r'<Override[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', '', text)
+    text = re.sub(r'<Relationship[^>]*Type="[^"]*' + _CALC_CHAIN + r'"[^>]*/>', '', text)
+    return text.encode('utf-8')
@@ -1,11 +1,26 @@
+import os
 import sys
+import time
 
+_IMPORT_STARTED = time.perf_counter()
+
+from loguru import logger
+from PyQt6.QtCore import QEvent, QObject, QTimer
 from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QVBoxLayout, QWidget
 
 from blackbox.app.bar import FileMenuBar
-from blackbox.app.static import LOGO, label
-from blackbox.app.table import LoaderFromMenuWidget, TableWidget
+from blackbox.app.static import LOGO, label, watch_namespaces
+from blackbox.app.table import EditJournal, LoaderFromMenuWidget, SheetTabBar, SqliteWriteBack, StatsBar, TableWidget
+from blackbox.core import telemetry
+
+_IMPORT_FINISHED = time.perf_counter()
+
+# Startup budget in seconds, from importing this module to the first painted frame.
+# pandas and openpyxl are imported on first load/save and do not count towards it.
+STARTUP_BUDGET: float = 0.5
+# Edits are journaled here, one session per running instance, and recovered after a crash
+JOURNAL_DIR: str = os.environ.get('BLACKBOX_JOURNAL', os.path.join(os.path.expanduser('~'), '.blackbox', 'journal'))
 
 
 class MainWindow(QMainWindow):
@@ -30,11 +45,107 @@ class MainWindow(QMainWindow):
 
         self.loader_menu_widget = LoaderFromMenuWidget()
         self.loader_menu_widget.data_loaded.connect(self.table_widget.handle_data_loaded)
+        self.loader_menu_widget.data_appended.connect(self.table_widget.handle_data_appended)
+        self.loader_menu_widget.load_failed.connect(self.show_load_error)
+
+        self.sheet_tabs = SheetTabBar(self.table_widget, self.loader_menu_widget)
+        self.sheet_tabs.sheet_failed.connect(lambda name, message: self.show_load_error(f'{name}\n{message}'))
+        layout.addWidget(self.sheet_tabs)
+
+        self.journal = EditJournal(self.table_widget, JOURNAL_DIR, parent=self)
+        # Edits of an opened SQLite table are written back to the file
+        self.sqlite_writeback = SqliteWriteBack(self.table_widget, self.loader_menu_widget, parent=self)
+        self.sqlite_writeback.write_failed.connect(self.show_write_error)
+
+        self.statusBar().addPermanentWidget(StatsBar(self.table_widget))
+
+    def closeEvent(self, event):
+        # Changes that could not be written back to a SQLite file are lost on exit
+        if not self.sqlite_writeback.close():
+            answer = QMessageBox.question(self, label('main_window.title'), label('main_window.unwritten_changes'))
+            if answer != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+        super().closeEvent(event)
+
+    def show_load_error(self, message: str):
+        QMessageBox.critical(self, label('table_loader.error'), message)
+
+    def show_write_error(self, message: str):
+        QMessageBox.critical(self, label('bar.file_menu.save_error'), message)
+
+
+class _FirstPaintProbe(QObject):
+    """
+    Measures the startup time up to the first painted frame and checks it
+    against STARTUP_BUDGET.
+    """
+
+    def __init__(self, app: QApplication, quit_after_paint: bool = False):
+        super().__init__(app)
+        self.app = app
+        self.quit_after_paint = quit_after_paint
+        self.timings: dict[str, float] = {}
+        app.installEventFilter(self)
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() == QEvent.Type.Paint and not self.timings:
+            self.app.removeEventFilter(self)
+            QTimer.singleShot(0, self.__report)
+        return False
+
+    def __report(self) -> None:
+        painted = time.perf_counter()
+        self.timings = {
+            'import': _IMPORT_FINISHED - _IMPORT_STARTED,
+            'first_paint': painted - _IMPORT_STARTED,
+        }
+        message = (f"Startup: imports {self.timings['import'] * 1000:.0f} ms, "
+                   f"first paint {self.timings['first_paint'] * 1000:.0f} ms "
+                   f"(budget {STARTUP_BUDGET * 1000:.0f} ms)")
+        if self.timings['first_paint'] > STARTUP_BUDGET:
+            logger.warning(message)
+        else:
+            logger.info(message)
+        if self.quit_after_paint:
+            self.app.quit()
+
+
+def _dump_profile(path: str) -> None:
+    report = telemetry.stop_profiling()
+    if report is not None:
+        report.dump(path)
+        logger.info("Profile written to {}\n{}", path, report.summary())
+
+
+def openApp(quit_after_paint: bool = False):
+    """
+    Starts the example application.
 
+    Setting BLACKBOX_PROFILE to a file path profiles the whole session with
+    cProfile and writes the result there on exit; BLACKBOX_PROFILE_MEMORY=1
+    also traces memory allocations.
 
-def openApp():
+    Args:
+        quit_after_paint (bool, optional): Exit right after the first frame is
+                                           painted, to measure the startup time.
+                                           Defaults to False.
+    """
     app = QApplication(sys.argv)
+    profile_path = os.environ.get('BLACKBOX_PROFILE')
+    if profile_path:
+        telemetry.start_profiling(memory=os.environ.get('BLACKBOX_PROFILE_MEMORY') == '1')
+        app.aboutToQuit.connect(lambda: _dump_profile(profile_path))
+    probe = _FirstPaintProbe(app, quit_after_paint)
+    watch_namespaces()
     window = MainWindow()
+    window.journal.recover()
+    # Closing normally loses unsaved edits as before, only a crash leaves the journal behind
+    app.aboutToQuit.connect(window.journal.close)
+    app.aboutToQuit.connect(lambda: window.loader_menu_widget.cancel(wait=True))
+    app.aboutToQuit.connect(window.menuBar().saver.wait)
+    app.aboutToQuit.connect(window.sheet_tabs.wait)
+    app.aboutToQuit.connect(window.sqlite_writeback.close)
     window.show()
     sys.exit(app.exec())
 
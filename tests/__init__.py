@@ -0,0 +1,14 @@
+"""
+Behavioural tests of the table core and the table widgets.
+
+Run with `python -m unittest discover tests` from the repository root; pytest
+collects them as well. Qt tests use the offscreen platform, so no display is needed.
+"""
+import os
+import sys
+
+from loguru import logger
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+logger.remove()
+logger.add(sys.stderr, level='WARNING')
@@ -0,0 +1,36 @@
+"""
+Helpers for tests that need a QApplication and its event loop.
+"""
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+# Kept for the whole run, Qt destroys an application without references
+_application: QApplication = None
+
+
+def application() -> QApplication:
+    """
+    Returns the QApplication of the test run, creating it on first use.
+    """
+    global _application
+    if _application is None:
+        _application = QApplication.instance() or QApplication([])
+    return _application
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    """
+    Processes events until `condition()` is true or `timeout` seconds passed.
+
+    Returns:
+        bool: The last result of `condition()`.
+    """
+    app = application()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.005)
+    return True
@@ -0,0 +1,135 @@
+import codecs
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from blackbox import cli
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, data: bytes, name: str = 'table.csv') -> str:
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    @staticmethod
+    def read(path: str) -> bytes:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def run_cli(self, *args: str) -> tuple[int, list[dict]]:
+        """
+        Runs the command line in this process and returns its exit status
+        and the printed JSON objects, the summary last.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = cli.main([*args, '--json', '-j', '1'])
+        return status, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_find_counts_and_lists_matches(self):
+        path = self.write(b'name,city\nACME,paris\nacme,ACME\nother,rome\n')
+        status, (result, summary) = self.run_cli('find', 'ACME', path)
+        self.assertEqual(status, 0)
+        self.assertEqual(result['matches'], 2)
+        self.assertEqual((result['rows'], result['columns']), (3, 2))
+        self.assertEqual(summary['summary']['matches'], 2)
+
+        _, (result, _) = self.run_cli('find', 'acme', path, '-i', '--list')
+        self.assertEqual(result['matches'], 3)
+        self.assertEqual([cell[1:] for cell in result['cells']],
+                         [[0, 0, 'ACME'], [1, 0, 'acme'], [1, 1, 'ACME']])
+
+    def test_find_searches_directories_recursively(self):
+        self.write(b'a\nx\n', 'one.csv')
+        self.write(b'a\nx\nx\n', 'nested/two.csv')
+        self.write(b'not a table', 'notes.txt')
+        status, results = self.run_cli('find', 'x', self.directory.name)
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(r['matches'] for r in results[:-1]), [1, 2])
+        self.assertEqual(results[-1]['summary']['files'], 2)
+
+    def test_replace_in_place(self):
+        path = self.write(b'name,city\nACME,paris\nother,ACME\n')
+        status, (result, _) = self.run_cli('replace', 'ACME', 'Acme', path)
+        self.assertEqual(status, 0)
+        self.assertEqual(result['matches'], 2)
+        self.assertEqual(self.read(path), b'name,city\nAcme,paris\nother,Acme\n')
+        self.assertFalse(os.path.exists(path + '.part'))
+
+    def test_replace_keeps_the_csv_layout(self):
+        cases = [
+            ('delimiter', 'name;city\nACME;paris\nbob;rome\n'.encode(), []),
+            ('numbers only', b'1,2\n3,ACME\n', []),
+            ('--no-header', b'ACME,paris\nbob,rome\n', ['--no-header']),
+            ('latin-1', 'name,city\nACME,Zürich\nbob,Genève\n'.encode('latin-1'), []),
+            ('byte order mark', codecs.BOM_UTF8 + 'name,city\nACME,Zürich\n'.encode('utf-8'), []),
+        ]
+        for case, data, options in cases:
+            with self.subTest(case):
+                path = self.write(data)
+                status, (result, _) = self.run_cli('replace', 'ACME', 'Acme', path, *options)
+                self.assertEqual(status, 0, result['error'])
+                self.assertEqual(self.read(path), data.replace(b'ACME', b'Acme'))
+
+    def test_replace_with_an_unencodable_text_leaves_the_file(self):
+        data = 'name,city\nACME,Zürich\n'.encode('latin-1')
+        path = self.write(data)
+        status, (result, _) = self.run_cli('replace', 'ACME', 'Ωmega', path)
+        self.assertEqual(status, 1)
+        self.assertIn('UnicodeEncodeError', result['error'])
+        self.assertEqual(self.read(path), data)
+        self.assertFalse(os.path.exists(path + '.part'))
+
+    def test_replace_without_matches_leaves_the_file(self):
+        path = self.write(b'name;city\nann;paris\n')
+        before = os.stat(path).st_mtime_ns
+        status, (result, _) = self.run_cli('replace', 'ACME', 'Acme', path)
+        self.assertEqual((status, result['matches']), (0, 0))
+        self.assertEqual(os.stat(path).st_mtime_ns, before)
+
+    def test_replace_into_an_output_directory(self):
+        source = self.write(b'name\nACME\n', 'in/sub/table.csv')
+        output = os.path.join(self.directory.name, 'out')
+        status, (result, _) = self.run_cli('replace', 'ACME', 'Acme', os.path.dirname(os.path.dirname(source)),
+                                           '-o', output, '--format', '.parquet')
+        self.assertEqual(status, 0)
+        self.assertEqual(result['destination'], os.path.join(output, 'sub', 'table.parquet'))
+        self.assertEqual(pd.read_parquet(result['destination'])['name'].tolist(), ['Acme'])
+        self.assertEqual(self.read(source), b'name\nACME\n')
+
+    def test_regex_replace_with_backreferences(self):
+        path = self.write(b'code\nAB-12\nCD-34\n')
+        self.run_cli('replace', r'(\w+)-(\d+)', r'\2-\1', path, '-E')
+        self.assertEqual(self.read(path), b'code\n12-AB\n34-CD\n')
+
+    def test_convert(self):
+        path = self.write(b'a,b\n1,x\n2,y\n')
+        status, (result, _) = self.run_cli('convert', path, '--format', '.xlsx')
+        self.assertEqual(status, 0)
+        self.assertEqual(result['destination'], path[:-len('.csv')] + '.xlsx')
+        df = pd.read_excel(result['destination'], dtype=str)
+        self.assertEqual(df.values.tolist(), [['1', 'x'], ['2', 'y']])
+
+    def test_failed_files_set_the_exit_status(self):
+        good = self.write(b'a\nx\n', 'good.csv')
+        status, results = self.run_cli('find', 'x', good, os.path.join(self.directory.name, 'missing.csv'))
+        self.assertEqual(status, 1)
+        self.assertEqual(results[-1]['summary']['failed'], 1)
+        self.assertEqual(sorted(r['error'] is None for r in results[:-1]), [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
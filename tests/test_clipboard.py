@@ -0,0 +1,50 @@
+import unittest
+
+import pandas as pd
+
+from blackbox.app.table import TableView, TableWidget
+from tests.qt import application, wait_until
+
+
+class PasteTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def table(self, table_type):
+        table = table_type()
+        self.addCleanup(table.deleteLater)
+        df = pd.DataFrame({'a': ['keep 0', 'skip 1', 'keep 2', 'skip 3', 'keep 4'],
+                           'b': ['0', '1', '2', '3', '4']}, dtype=object)
+        table.set_dataframe(df)
+        self.assertTrue(wait_until(lambda: table.get_dataframe().shape == df.shape))
+        return table
+
+    def test_paste_skips_filtered_rows(self):
+        for table_type in (TableView, TableWidget):
+            with self.subTest(table=table_type.__name__):
+                table = self.table(table_type)
+                table.logic.set_filter(0, 'keep')
+                table.setCurrentCell(0, 1)
+                self.assertEqual(table.logic.paste('x\ny\nz\nw'), 4)
+
+                table.logic.clear_filters()
+                df = table.get_dataframe()
+                self.assertEqual(df['b'].tolist(), ['x', '1', 'y', '3', 'z', 'w'])
+                self.assertEqual(df.shape, (6, 2))
+
+                # One undo step restores the hidden and the shown rows alike
+                self.assertTrue(table.undo())
+                self.assertEqual(table.get_dataframe()['b'].tolist(), ['0', '1', '2', '3', '4'])
+
+    def test_paste_block(self):
+        table = self.table(TableView)
+        table.setCurrentCell(3, 1)
+        self.assertEqual(table.logic.paste('x\ty\nz\tw'), 4)
+        df = table.get_dataframe()
+        self.assertEqual(df.shape, (5, 3))
+        self.assertEqual(df.iloc[3:, 1:].values.tolist(), [['x', 'y'], ['z', 'w']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blackbox.app.table import TableView
+from blackbox.core.columnar import ColumnarStore, MappedStringArray
+from tests.qt import application
+
+
+class ColumnarStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.df = pd.DataFrame({
+            'id': np.arange(4, dtype=np.int64),
+            'ratio': [0.5, 1.5, np.nan, 3.0],
+            'name': ['a', 'Äpfel', None, 'd'],
+        })
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def test_bundle_columns_are_mapped(self):
+        ColumnarStore().write(self.df, self.path('table.npz'))
+        df = ColumnarStore().read(self.path('table.npz'))
+        self.assertEqual(df.columns.tolist(), ['id', 'ratio', 'name'])
+        # Mapped columns are read-only views of the file
+        self.assertFalse(df['id'].to_numpy().flags.writeable)
+        self.assertIsInstance(df['name'].array, MappedStringArray)
+        self.assertEqual(df['id'].tolist(), [0, 1, 2, 3])
+        np.testing.assert_array_equal(df['ratio'].to_numpy(), self.df['ratio'].to_numpy())
+        self.assertEqual(df['name'].tolist(), ['a', 'Äpfel', '', 'd'])
+
+    def test_moved_rows_are_written_back(self):
+        ColumnarStore().write(self.df, self.path('table.npz'))
+        df = ColumnarStore().read(self.path('table.npz')).take([3, 1, 0])
+        self.assertIsInstance(df['name'].array, MappedStringArray)
+        ColumnarStore().write(df, self.path('moved.npz'))
+        moved = ColumnarStore().read(self.path('moved.npz'))
+        self.assertEqual(moved['name'].tolist(), ['d', 'Äpfel', 'a'])
+        self.assertEqual(moved['id'].tolist(), [3, 1, 0])
+
+    def test_arrow_round_trip(self):
+        ColumnarStore().write(self.df, self.path('table.arrow'))
+        df = ColumnarStore().read(self.path('table.arrow'))
+        self.assertIsInstance(df['id'].dtype, pd.ArrowDtype)
+        self.assertEqual(df['id'].tolist(), [0, 1, 2, 3])
+        self.assertEqual(df['name'].tolist()[:2], ['a', 'Äpfel'])
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            ColumnarStore().write(self.df, self.path('table.txt'))
+        with self.assertRaises(ValueError):
+            ColumnarStore().read(self.path('table.txt'))
+
+
+class MappedTableViewTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'table.npz')
+        ColumnarStore().write(pd.DataFrame({'id': [1, 2], 'name': ['x', 'y']}), self.path)
+
+    def test_mapped_columns_are_shown_and_edited(self):
+        view = TableView()
+        self.addCleanup(view.deleteLater)
+        view.set_dataframe(ColumnarStore().read(self.path), copy=False)
+        self.assertEqual(view.logic.cell_text(1, 1), 'y')
+        # Read-only mapped columns become object columns on the first edit
+        view.logic.set_cell_text(0, 1, 'edited')
+        view.logic.set_cell_text(0, 0, 'text')
+        self.assertEqual(view.get_dataframe()['name'].tolist(), ['edited', 'y'])
+        self.assertEqual(view.get_dataframe()['id'].tolist(), ['text', 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+from PyQt6.QtWidgets import QMainWindow
+
+from blackbox.app.bar import FileMenuBar
+from blackbox.app.table import TableWidget
+from tests.qt import application, wait_until
+
+
+class _Window(QMainWindow):
+    """
+    An embedding window with a table but no sheet tabs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.table_widget = TableWidget()
+        self.setCentralWidget(self.table_widget)
+        self.bar = FileMenuBar(self)
+        self.setMenuBar(self.bar)
+
+
+class FileMenuBarWithoutSheetTabsTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        self.window = _Window()
+        self.addCleanup(self.window.deleteLater)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'table.csv')
+
+    def test_save_writes_the_single_table(self):
+        self.window.table_widget.set_dataframe(pd.DataFrame({'a': ['1', '2']}, dtype=object))
+        with mock.patch('blackbox.app.bar.filebar.QFileDialog.getSaveFileName', return_value=(self.path, '')):
+            self.window.bar._FileMenuBar__save()
+        # The saver handles its finished thread before the window is deleted
+        self.assertTrue(wait_until(lambda: not self.window.bar.saver.is_saving()))
+        self.assertEqual(pd.read_csv(self.path, dtype=str)['a'].tolist(), ['1', '2'])
+
+    def test_new_table(self):
+        self.window.table_widget.set_dataframe(pd.DataFrame({'a': ['1', '2']}, dtype=object))
+        self.window.bar._FileMenuBar__create_new_table()
+        df = self.window.table_widget.get_dataframe()
+        self.assertEqual(df.columns.tolist(), ['Column 1', 'Column 2', 'Column 3'])
+        self.assertEqual(df.shape, (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from blackbox.app.table import TableView, TableWidget
+from tests.qt import application, wait_until
+
+
+class FindDialogTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def for_each_table(self, df: pd.DataFrame, check) -> None:
+        """
+        Runs `check(table_logic, finder_logic)` with the find dialog of a
+        TableView and a TableWidget showing `df`.
+        """
+        for table_type in (TableView, TableWidget):
+            with self.subTest(table=table_type.__name__):
+                table = table_type()
+                self.addCleanup(table.deleteLater)
+                # TableView keeps the arrays of the frame, so each table edits its own copy
+                table.set_dataframe(df.copy())
+                self.assertTrue(wait_until(lambda: table.get_dataframe().shape == df.shape))
+                dialog = table.logic.finder_dialog
+                # Partial matches are searched by SearchEngine rather than the find index
+                dialog.search_options.whole_cell.setChecked(False)
+                dialog.show()
+                self.addCleanup(dialog.close)
+                check(table.logic, table.logic.finder_logic)
+
+    def search(self, finder, text: str) -> list[tuple[int, int]]:
+        finder.dialog.search_value.setText(text)
+        finder._find_text()
+        self.assertTrue(wait_until(lambda: not finder._searching))
+        return sorted(zip(finder.matches.rows.tolist(), finder.matches.cols.tolist()))
+
+    def test_texts_are_collected_once_for_every_keystroke(self):
+        df = pd.DataFrame({'a': ['apple', 'pear', 'apricot'], 'b': ['grape', 'plum', 'apple']}, dtype=object)
+        def check(logic, finder):
+            logic.column_texts = mock.Mock(wraps=logic.column_texts)
+            self.assertEqual(self.search(finder, 'a'), [(0, 0), (0, 1), (1, 0), (2, 0), (2, 1)])
+            calls = logic.column_texts.call_count
+            self.assertEqual(self.search(finder, 'ap'), [(0, 0), (0, 1), (2, 0), (2, 1)])
+            self.assertEqual(self.search(finder, 'app'), [(0, 0), (2, 1)])
+            self.assertEqual(logic.column_texts.call_count, calls)
+        self.for_each_table(df, check)
+
+    def test_texts_are_collected_again_after_a_change(self):
+        df = pd.DataFrame({'a': ['apple', 'pear']}, dtype=object)
+        def check(logic, finder):
+            self.assertEqual(self.search(finder, 'pea'), [(1, 0)])
+            logic.set_cell_text(0, 0, 'peach')
+            self.assertIsNone(finder.column_texts.columns())
+            self.assertEqual(self.search(finder, 'pea'), [(0, 0), (1, 0)])
+        self.for_each_table(df, check)
+
+    def test_texts_are_collected_in_slices(self):
+        df = pd.DataFrame({'a': [str(i) for i in range(7)], 'b': ['x1'] * 7}, dtype=object)
+        def check(_, finder):
+            finder.column_texts.slice_cells = 3
+            self.assertEqual(self.search(finder, '1'), [(0, 1), (1, 0)] + [(row, 1) for row in range(1, 7)])
+            self.assertEqual([len(texts) for texts in finder.column_texts.columns()], [7, 7])
+        self.for_each_table(df, check)
+
+    def test_a_change_while_collecting_searches_the_new_table(self):
+        df = pd.DataFrame({'a': ['apple', 'pear', 'plum', 'fig']}, dtype=object)
+        def check(logic, finder):
+            finder.column_texts.slice_cells = 1
+            finder.dialog.search_value.setText('pea')
+            finder._find_text()
+            logic.set_cell_text(3, 0, 'peach')
+            self.assertTrue(wait_until(lambda: not finder._searching))
+            self.assertEqual(sorted(finder.matches.rows.tolist()), [1, 3])
+        self.for_each_table(df, check)
+
+    def test_closing_the_dialog_drops_the_texts(self):
+        df = pd.DataFrame({'a': ['apple']}, dtype=object)
+        def check(logic, finder):
+            self.search(finder, 'pp')
+            self.assertIsNotNone(finder.column_texts.columns())
+            logic.finder_dialog.close()
+            self.assertIsNone(finder.column_texts.columns())
+        self.for_each_table(df, check)
+
+
+if __name__ == '__main__':
+    unittest.main()
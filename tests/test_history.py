@@ -0,0 +1,97 @@
+import unittest
+
+import numpy as np
+
+from blackbox.app.table.history import UndoHistory, change_size
+from blackbox.core.changes import CellsChanged, ChangeGroup, RowsMoved, RowsRemoved, TableReset
+
+
+def edit(row: int, old: str, new: str) -> CellsChanged:
+    return CellsChanged([row], [0], [old], [new])
+
+
+class UndoHistoryTest(unittest.TestCase):
+
+    def test_undo_returns_the_inverse_and_redo_the_change(self):
+        history = UndoHistory()
+        history.record(edit(0, 'a', 'b'))
+
+        undo = history.undo()
+        self.assertEqual((undo.old, undo.new), (['b'], ['a']))
+        self.assertFalse(history.can_undo())
+        self.assertTrue(history.can_redo())
+
+        redo = history.redo()
+        self.assertEqual((redo.old, redo.new), (['a'], ['b']))
+        self.assertTrue(history.can_undo())
+        self.assertFalse(history.can_redo())
+
+    def test_nothing_to_undo_or_redo(self):
+        history = UndoHistory()
+        self.assertIsNone(history.undo())
+        self.assertIsNone(history.redo())
+
+    def test_a_new_change_clears_redo(self):
+        history = UndoHistory()
+        history.record(edit(0, 'a', 'b'))
+        history.undo()
+        history.record(edit(1, 'c', 'd'))
+        self.assertFalse(history.can_redo())
+        self.assertEqual(history.memory_usage(), change_size(edit(1, 'c', 'd')))
+
+    def test_reset_clears_history(self):
+        history = UndoHistory()
+        history.record(edit(0, 'a', 'b'))
+        history.record(TableReset())
+        self.assertFalse(history.can_undo())
+        self.assertEqual(history.memory_usage(), 0)
+
+    def test_groups_are_one_step(self):
+        history = UndoHistory()
+        history.begin_group()
+        history.record(RowsRemoved(3, 2, [np.array(['x', 'y'], dtype=object)]))
+        history.begin_group()
+        history.record(RowsRemoved(0, 1, [np.array(['z'], dtype=object)]))
+        history.end_group()
+        history.end_group()
+
+        undo = history.undo()
+        self.assertIsInstance(undo, ChangeGroup)
+        self.assertFalse(history.can_undo())
+        # Reverted last change first
+        self.assertEqual([change.at for change in undo.changes], [0, 3])
+
+    def test_move_is_inverted_by_the_inverse_permutation(self):
+        history = UndoHistory()
+        history.record(RowsMoved([2, 0, 1]))
+        np.testing.assert_array_equal(history.undo().order, [1, 2, 0])
+
+    def test_cap_evicts_oldest_changes(self):
+        size = change_size(edit(0, 'a', 'b'))
+        history = UndoHistory(max_bytes=size * 2)
+        for row in range(3):
+            history.record(edit(row, 'a', 'b'))
+
+        self.assertLessEqual(history.memory_usage(), history.max_bytes)
+        self.assertEqual(history.undo().rows.tolist(), [2])
+        self.assertEqual(history.undo().rows.tolist(), [1])
+        self.assertIsNone(history.undo())
+
+    def test_change_larger_than_the_cap_clears_history(self):
+        history = UndoHistory(max_bytes=change_size(edit(0, 'a', 'b')))
+        history.record(edit(0, 'a', 'b'))
+        history.record(CellsChanged(np.arange(100), np.zeros(100), ['a'] * 100, ['b'] * 100))
+        self.assertFalse(history.can_undo())
+        self.assertEqual(history.memory_usage(), 0)
+
+    def test_lowering_the_cap_drops_oldest_changes(self):
+        history = UndoHistory()
+        for row in range(4):
+            history.record(edit(row, 'a', 'b'))
+        history.set_max_bytes(change_size(edit(0, 'a', 'b')))
+        self.assertEqual(history.undo().rows.tolist(), [3])
+        self.assertFalse(history.can_undo())
+
+
+if __name__ == '__main__':
+    unittest.main()
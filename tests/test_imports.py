@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import unittest
+
+from blackbox.app.table import TableView, TableWidget
+from tests.qt import application
+
+
+class StartupImportTest(unittest.TestCase):
+
+    def loaded_modules(self, module: str) -> dict[str, str]:
+        """
+        Imports `module` in a fresh interpreter and returns how the heavy
+        dependencies ended up in sys.modules: 'lazy', 'loaded' or 'absent'.
+        """
+        code = (
+            'import sys, importlib.util; import ' + module + '\n'
+            'for name in ("numpy", "pandas", "openpyxl", "pyarrow"):\n'
+            '    found = sys.modules.get(name)\n'
+            '    state = "absent" if found is None else "lazy" if type(found) is importlib.util._LazyModule else "loaded"\n'
+            '    print(name, state)\n'
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        return dict(line.split() for line in output.splitlines())
+
+    def test_importing_the_app_loads_no_heavy_dependency(self):
+        for module in ('blackbox.example', 'blackbox.app.table'):
+            with self.subTest(module=module):
+                self.assertEqual(self.loaded_modules(module), {
+                    'numpy': 'lazy',
+                    'pandas': 'lazy',
+                    'openpyxl': 'absent',
+                    'pyarrow': 'absent',
+                })
+
+
+class LazyDialogTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def test_dialogs_are_built_on_first_use(self):
+        for table_type in (TableView, TableWidget):
+            with self.subTest(table=table_type.__name__):
+                table = table_type()
+                self.addCleanup(table.deleteLater)
+                self.assertIsNone(table.logic._finder_dialog)
+                self.assertIsNone(table.logic._replace_dialog)
+                self.assertIs(table.logic.finder_dialog, table.logic.finder_dialog)
+                self.assertIsNotNone(table.logic._finder_dialog)
+                self.assertIsNone(table.logic._replace_dialog)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from blackbox.app.table.index import CellIndex
+from blackbox.core.changes import (
+    CellsChanged,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+)
+
+
+def texts(*values) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+class CellIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        # a | x
+        # b | a
+        # a | ''
+        self.index = CellIndex()
+        self.index.build([texts('a', 'b', 'a'), texts('x', 'a', '')])
+
+    def cells(self, text: str) -> list[tuple[int, int]]:
+        rows, cols = self.index.lookup(text)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def test_lookup_orders_matches_row_by_row(self):
+        self.assertEqual(self.cells('a'), [(0, 0), (1, 1), (2, 0)])
+        self.assertEqual(self.index.count('x'), 1)
+        self.assertEqual(self.cells('missing'), [])
+
+    def test_empty_cells_are_not_indexed(self):
+        self.assertEqual(self.cells(''), [])
+
+    def test_edits(self):
+        self.index.apply(CellsChanged([0, 2], [0, 1], ['a', ''], ['x', 'a']))
+        self.assertEqual(self.cells('a'), [(1, 1), (2, 0), (2, 1)])
+        self.assertEqual(self.cells('x'), [(0, 0), (0, 1)])
+        # Reverting an edit cancels it out of the overlays
+        self.index.apply(CellsChanged([0], [0], ['x'], ['a']))
+        self.assertEqual(self.cells('x'), [(0, 1)])
+        self.assertIn((0, 0), self.cells('a'))
+
+    def test_inserted_rows_shift_matches_and_are_indexed(self):
+        self.index.apply(RowsInserted(1, 2, [texts('a', ''), texts('', 'y')]))
+        self.assertEqual(self.cells('a'), [(0, 0), (1, 0), (3, 1), (4, 0)])
+        self.assertEqual(self.cells('y'), [(2, 1)])
+
+    def test_removed_rows(self):
+        self.index.apply(RowsRemoved(0, 2))
+        self.assertEqual(self.cells('a'), [(0, 0)])
+        self.assertEqual(self.cells('x'), [])
+
+    def test_inserted_and_removed_columns(self):
+        self.index.apply(ColumnsInserted(0, 1, ['new'], [texts('', 'a', 'z')]))
+        self.assertEqual(self.cells('a'), [(0, 1), (1, 0), (1, 2), (2, 1)])
+        self.index.apply(ColumnsRemoved(1, 1))
+        self.assertEqual(self.cells('a'), [(1, 0), (1, 1)])
+        self.assertEqual(self.cells('z'), [(2, 0)])
+
+    def test_moved_rows(self):
+        # New row i was row order[i]
+        self.index.apply(RowsMoved([2, 0, 1]))
+        self.assertEqual(self.cells('a'), [(0, 0), (1, 0), (2, 1)])
+        self.assertEqual(self.cells('b'), [(2, 0)])
+
+    def test_edits_follow_moved_rows(self):
+        self.index.apply(RowsMoved([1, 2, 0]))
+        self.index.apply(CellsChanged([2], [0], ['a'], ['c']))
+        self.assertEqual(self.cells('c'), [(2, 0)])
+        self.assertEqual(self.cells('a'), [(0, 1), (1, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import codecs
+import os
+import tempfile
+import unittest
+
+from blackbox.core.io import TableReader
+
+
+class SniffCsvTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, data: bytes, name: str = 'table.csv') -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_delimiters(self):
+        for delimiter in ',;\t|':
+            with self.subTest(delimiter=delimiter):
+                rows = ['name', 'amount'], ['x', '1'], ['y', '22'], ['z', '333']
+                path = self.write('\n'.join(delimiter.join(row) for row in rows).encode() + b'\n')
+                self.assertEqual(TableReader().sniff_csv(path)[1], delimiter)
+
+    def test_encodings(self):
+        text = 'name,amount\nÄpfel,1\nBirnen,2\n'
+        cases = [
+            (text.encode('utf-8'), 'utf-8'),
+            (codecs.BOM_UTF8 + text.encode('utf-8'), 'utf-8-sig'),
+            (text.encode('utf-16'), 'utf-16'),
+            (text.encode('latin-1'), 'latin-1'),
+        ]
+        for data, encoding in cases:
+            with self.subTest(encoding=encoding):
+                self.assertEqual(TableReader().sniff_csv(self.write(data))[0], encoding)
+
+    def test_header(self):
+        cases = [
+            ('name,city\nann,paris\nbob,rome\n', True),
+            ('name,amount\nx,1\ny,2\n', True),
+            ('name,2023\nx,1\ny,2\n', True),
+            ('1,2\n3,4\n5,6\n', False),
+        ]
+        for data, header in cases:
+            with self.subTest(data=data):
+                self.assertEqual(TableReader().sniff_csv(self.write(data.encode()))[2], header)
+
+    def test_text_columns_keep_their_header(self):
+        df = TableReader().read(self.write(b'name,city\nann,paris\nbob,rome\n'))
+        self.assertEqual(df.columns.tolist(), ['name', 'city'])
+        self.assertEqual(df.values.tolist(), [['ann', 'paris'], ['bob', 'rome']])
+
+    def test_explicit_header_option(self):
+        path = self.write(b'name,city\nann,paris\n')
+        df = TableReader(header=False).read(path)
+        self.assertEqual(df.columns.tolist(), ['Column 1', 'Column 2'])
+        self.assertEqual(df.shape, (2, 2))
+        self.assertTrue(TableReader(header=True).sniff_csv(self.write(b'1,2\n3,4\n'))[2])
+
+    def test_character_cut_at_the_end_of_the_sample(self):
+        reader = TableReader()
+        reader.sniff_bytes = 16
+        # The 16th byte is the first half of a two-byte character
+        path = self.write('a,b\n1,2\n3,45678ä\n'.encode('utf-8'))
+        self.assertEqual(reader.sniff_csv(path)[:2], ('utf-8', ','))
+
+    def test_chunks_double_in_size(self):
+        reader = TableReader()
+        reader.first_chunk_rows = 2
+        reader.max_chunk_rows = 4
+        rows = '\n'.join(f'{i},row {i}' for i in range(11))
+        chunks = list(reader.read_csv_chunks(self.write(f'id,text\n{rows}\n'.encode())))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 4, 4, 1])
+
+    def test_read_streams_every_row(self):
+        reader = TableReader()
+        reader.first_chunk_rows = 2
+        rows = '\n'.join(f'{i},row {i}' for i in range(10))
+        df = reader.read(self.write(f'id,text\n{rows}\n'.encode()))
+        self.assertEqual(df.shape, (10, 2))
+        self.assertEqual(df.iloc[9].tolist(), ['9', 'row 9'])
+
+
+if __name__ == '__main__':
+    unittest.main()
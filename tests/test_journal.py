@@ -0,0 +1,225 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from blackbox.app.table import EditJournal, TableView
+from blackbox.app.table.journal import _lock_session, encode_record, read_records
+from blackbox.core.changes import CellsChanged
+from tests.qt import application, wait_until
+
+
+class ReadRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'journal-000000000001.log')
+
+    def test_stops_at_a_truncated_record(self):
+        records = [encode_record(seq, CellsChanged([seq], [0], [''], [str(seq)])) for seq in (1, 2, 3)]
+        with open(self.path, 'wb') as file:
+            file.write(b''.join(records)[:-5])
+        self.assertEqual([seq for seq, _ in read_records(self.path)], [1, 2])
+
+    def test_stops_at_a_corrupted_record(self):
+        records = [encode_record(seq, CellsChanged([seq], [0], [''], [str(seq)])) for seq in (1, 2, 3)]
+        data = bytearray(b''.join(records))
+        data[len(records[0]) + len(records[1]) - 1] ^= 0xFF
+        with open(self.path, 'wb') as file:
+            file.write(data)
+        self.assertEqual([seq for seq, _ in read_records(self.path)], [1])
+
+
+class EditJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = os.path.join(directory.name, 'journal')
+
+    def session(self) -> tuple[TableView, EditJournal]:
+        table = TableView()
+        journal = EditJournal(table, self.directory, sync_interval=0.001)
+        self.addCleanup(table.deleteLater)
+        return table, journal
+
+    def test_replay_up_to_a_truncated_record(self):
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 0)
+        written = []
+        journal.checkpoint_written.connect(written.append)
+        table.handle_data_loaded(pd.DataFrame({'a': ['1', '2', '3']}, dtype=object))
+        self.assertTrue(wait_until(lambda: written))
+
+        table.logic.set_cell_text(0, 0, 'first')
+        table.logic.remove_rows([2])
+        table.logic.set_cell_text(1, 0, 'torn')
+        journal.flush()
+        # Crash: the files stay and the last record is cut short
+        journal.close(discard=False)
+        session = journal.session_directory
+        segment = max(name for name in os.listdir(session) if name.endswith('.log'))
+        path = os.path.join(session, segment)
+        os.truncate(path, os.path.getsize(path) - 3)
+
+        table, journal = self.session()
+        recovered, written = [], []
+        journal.recovered.connect(recovered.append)
+        journal.checkpoint_written.connect(written.append)
+        self.assertEqual(journal.recover(), 2)
+        self.assertEqual(journal.session_directory, session)
+        self.assertEqual(recovered, [2])
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['first', '2'])
+        # The recovered table replaces the files of the crashed session
+        self.assertTrue(wait_until(lambda: written))
+        files = os.listdir(session)
+        self.assertEqual(len([name for name in files if name.startswith('checkpoint-')]), 1)
+        self.assertNotIn(segment, files)
+        # Replayed changes can be undone
+        self.assertTrue(table.undo())
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['first', '2', '3'])
+        journal.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_checkpoint_keeps_the_journal(self):
+        table, journal = self.session()
+        journal.recover()
+        written, failed = [], []
+        journal.checkpoint_written.connect(written.append)
+        journal.checkpoint_failed.connect(failed.append)
+        table.handle_data_loaded(pd.DataFrame({'a': ['1', '2']}, dtype=object))
+        self.assertTrue(wait_until(lambda: written))
+
+        table.logic.set_cell_text(0, 0, 'before')
+        with mock.patch('blackbox.core.columnar.ColumnarStore.write_bundle', side_effect=OSError('disk full')):
+            journal.checkpoint()
+            self.assertTrue(wait_until(lambda: failed))
+        self.assertEqual(failed, ['disk full'])
+        table.logic.set_cell_text(1, 0, 'after')
+        journal.flush()
+        journal.close(discard=False)
+
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 2)
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['before', 'after'])
+        journal.close()
+
+    def test_first_checkpoint_is_retried(self):
+        table, journal = self.session()
+        journal.recover()
+        written, failed = [], []
+        journal.checkpoint_written.connect(written.append)
+        journal.checkpoint_failed.connect(failed.append)
+        with mock.patch('blackbox.core.columnar.ColumnarStore.write_bundle', side_effect=OSError('disk full')):
+            table.handle_data_loaded(pd.DataFrame({'a': ['1']}, dtype=object))
+            self.assertTrue(wait_until(lambda: failed))
+        table.logic.set_cell_text(0, 0, 'edited')
+        self.assertTrue(wait_until(lambda: written))
+        journal.close(discard=False)
+
+        table, journal = self.session()
+        journal.recover()
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['edited'])
+        journal.close()
+
+    def load(self, table: TableView, journal: EditJournal, values: list[str]) -> None:
+        written = []
+        journal.checkpoint_written.connect(written.append)
+        table.handle_data_loaded(pd.DataFrame({'a': values}, dtype=object))
+        self.assertTrue(wait_until(lambda: written))
+        journal.checkpoint_written.disconnect(written.append)
+
+    def test_instances_keep_their_own_sessions(self):
+        first, first_journal = self.session()
+        first_journal.recover()
+        self.load(first, first_journal, ['1', '2'])
+        first.logic.set_cell_text(0, 0, 'first')
+        first_journal.flush()
+        files = sorted(os.listdir(first_journal.session_directory))
+
+        second, second_journal = self.session()
+        self.assertEqual(second_journal.recover(), 0)
+        self.assertNotEqual(second_journal.session_directory, first_journal.session_directory)
+        # A checkpoint and a clean close of the second instance leave the first one's files alone
+        self.load(second, second_journal, ['x'])
+        second.logic.set_cell_text(0, 0, 'second')
+        second_journal.checkpoint()
+        self.assertTrue(wait_until(lambda: second_journal._checkpoint_thread is None))
+        second_journal.close()
+        self.assertEqual(sorted(os.listdir(first_journal.session_directory)), files)
+
+        # The first instance crashes, the next one recovers its edits
+        first_journal.close(discard=False)
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 1)
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['first', '2'])
+        journal.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_sessions_of_running_instances_are_not_recovered(self):
+        running, running_journal = self.session()
+        running_journal.recover()
+        self.load(running, running_journal, ['1'])
+        running.logic.set_cell_text(0, 0, 'running')
+
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 0)
+        self.assertEqual(table.get_dataframe().shape, (0, 0))
+        journal.close()
+        running_journal.close()
+
+    def test_lock_of_a_killed_instance_is_free(self):
+        table, journal = self.session()
+        journal.recover()
+        self.load(table, journal, ['1'])
+        table.logic.set_cell_text(0, 0, 'edited')
+        journal.flush()
+        journal.close(discard=False)
+        # Another process takes the lock and dies without releasing it
+        code = ('import os, sys; from blackbox.app.table.journal import _lock_session; '
+                'lock = _lock_session(sys.argv[1]); assert lock is not None; os._exit(0)')
+        subprocess.run([sys.executable, '-c', code, journal.session_directory], check=True)
+        self.assertTrue(os.path.exists(journal.session_directory + '.lock'))
+
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 1)
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['edited'])
+        journal.close()
+
+    def test_empty_sessions_of_crashed_instances_are_removed(self):
+        table, journal = self.session()
+        journal.recover()
+        journal.close(discard=False)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        table, journal = self.session()
+        journal.recover()
+        name = os.path.basename(journal.session_directory)
+        self.assertEqual(sorted(os.listdir(self.directory)), [name, f'{name}.lock'])
+        journal.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_clean_close_leaves_nothing_to_recover(self):
+        table, journal = self.session()
+        journal.recover()
+        written = []
+        journal.checkpoint_written.connect(written.append)
+        table.handle_data_loaded(pd.DataFrame({'a': ['1']}, dtype=object))
+        self.assertTrue(wait_until(lambda: written))
+        table.logic.set_cell_text(0, 0, 'x')
+        journal.close()
+
+        table, journal = self.session()
+        self.assertEqual(journal.recover(), 0)
+        self.assertEqual(table.get_dataframe().shape, (0, 0))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from loguru import logger
+
+from blackbox.app.table.loader import LoaderWidgetBase
+from tests.qt import application, wait_until
+
+
+class BackgroundLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.loader = LoaderWidgetBase()
+        self.addCleanup(self.loader.deleteLater)
+        # The finished threads are handed back on the event loop before the loader goes
+        self.addCleanup(application().processEvents)
+        self.addCleanup(self.loader.cancel, True)
+        self.loader.excel_loader.first_chunk_rows = 2
+        self.loader.excel_loader.max_chunk_rows = 4
+        self.events = []
+        self.loader.data_loaded.connect(lambda df: self.events.append(('loaded', df['id'].tolist())))
+        self.loader.data_appended.connect(lambda df: self.events.append(('appended', df['id'].tolist())))
+        self.loader.load_finished.connect(lambda rows: self.events.append(('finished', rows)))
+        self.loader.load_failed.connect(lambda message: self.events.append(('failed', message)))
+
+    def write(self, rows: int, name: str = 'table.csv') -> str:
+        path = os.path.join(self.directory.name, name)
+        pd.DataFrame({'id': [str(i) for i in range(rows)]}).to_csv(path, index=False)
+        return path
+
+    def test_blocks_stream_to_the_gui_thread(self):
+        self.loader.load_path(self.write(7))
+        self.assertTrue(wait_until(lambda: not self.loader.is_loading()))
+        self.assertEqual(self.events, [
+            ('loaded', ['0', '1']),
+            ('appended', ['2', '3', '4', '5']),
+            ('appended', ['6']),
+            ('finished', 7),
+        ])
+
+    def test_a_new_load_drops_the_previous_one(self):
+        self.loader.load_path(self.write(100, 'first.csv'))
+        self.loader.load_path(self.write(3, 'second.csv'))
+        self.assertTrue(wait_until(lambda: not self.loader.is_loading()))
+        self.loader.cancel(wait=True)
+        application().processEvents()
+        self.assertEqual(self.events, [('loaded', ['0', '1']), ('appended', ['2']), ('finished', 3)])
+
+    def test_cancel_stops_the_signals(self):
+        self.loader.load_path(self.write(100))
+        self.loader.cancel(wait=True)
+        application().processEvents()
+        self.assertFalse(self.loader.is_loading())
+        self.assertEqual(self.events, [])
+
+    def test_errors_are_reported(self):
+        # The traceback is logged on purpose
+        logger.disable('blackbox')
+        self.addCleanup(logger.enable, 'blackbox')
+        self.loader.load_path(os.path.join(self.directory.name, 'missing.csv'))
+        self.assertTrue(wait_until(lambda: not self.loader.is_loading()))
+        self.assertEqual([event for event, _ in self.events], ['failed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
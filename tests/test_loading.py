@@ -0,0 +1,73 @@
+import unittest
+
+import pandas as pd
+
+from blackbox.app.table import TableView, TableWidget
+from tests.qt import application, wait_until
+
+
+def frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({'id': range(rows), 'text': [f'row {i}' for i in range(rows)]})
+
+
+class ChunkedLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        self.table = TableWidget()
+        self.addCleanup(self.table.deleteLater)
+        self.table.logic.load_chunk_rows = 3
+        self.progress = []
+        self.table.load_progress.connect(lambda done, total, _: self.progress.append((done, total)))
+
+    def texts(self, col: int) -> list[str]:
+        return [self.table.item(row, col).text() for row in range(self.table.rowCount())]
+
+    def test_rows_arrive_in_chunks_on_the_event_loop(self):
+        self.table.handle_data_loaded(frame(10))
+        # The first chunk is filled right away, the others on later events
+        self.assertEqual(self.progress, [(3, 10)])
+        self.assertIsNone(self.table.item(3, 0))
+
+        self.assertTrue(wait_until(lambda: self.progress[-1] == (10, 10)))
+        self.assertEqual(self.progress, [(3, 10), (6, 10), (9, 10), (10, 10)])
+        self.assertEqual(self.texts(0), [str(i) for i in range(10)])
+        self.assertEqual(self.table.horizontalHeaderItem(1).text(), 'text')
+
+    def test_finish_loading_fills_the_remaining_rows(self):
+        self.table.handle_data_loaded(frame(8))
+        self.table.logic.finish_loading()
+        self.assertEqual(self.texts(1), [f'row {i}' for i in range(8)])
+        self.assertEqual(self.progress[-1], (8, 8))
+
+    def test_a_new_load_replaces_the_pending_one(self):
+        self.table.handle_data_loaded(frame(10))
+        self.table.handle_data_loaded(frame(4))
+        self.assertTrue(wait_until(lambda: self.progress[-1] == (4, 4)))
+        application().processEvents()
+        self.assertEqual(self.table.rowCount(), 4)
+        self.assertNotIn((6, 10), self.progress)
+        self.assertEqual(self.texts(1), [f'row {i}' for i in range(4)])
+
+    def test_appended_rows_queue_behind_the_pending_load(self):
+        self.table.handle_data_loaded(frame(5))
+        self.table.handle_data_appended(frame(4))
+        self.assertEqual(self.table.rowCount(), 9)
+        self.table.logic.finish_loading()
+        self.assertEqual(self.texts(0), [str(i) for i in range(5)] + [str(i) for i in range(4)])
+
+    def test_table_view_reports_the_whole_frame_at_once(self):
+        view = TableView()
+        self.addCleanup(view.deleteLater)
+        progress = []
+        view.load_progress.connect(lambda done, total, _: progress.append((done, total)))
+        view.handle_data_loaded(frame(10))
+        self.assertEqual(progress, [(10, 10)])
+        self.assertEqual(view.logic.cell_text(9, 1), 'row 9')
+        view.handle_data_appended(frame(2))
+        self.assertEqual(view.rowCount(), 12)
+        self.assertEqual(view.logic.cell_text(11, 1), 'row 1')
+
+
+if __name__ == '__main__':
+    unittest.main()
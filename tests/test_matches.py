@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+
+from blackbox.app.table.search import Matches
+from blackbox.core.changes import (
+    CellsChanged,
+    ColumnsInserted,
+    ColumnsRemoved,
+    RowsInserted,
+    RowsMoved,
+    RowsRemoved,
+    TableReset,
+)
+from blackbox.core.search import SearchQuery
+
+
+def texts(*values) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+class MatchesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matches = Matches(SearchQuery('a'))
+        self.matches.extend(np.array([0, 2]), np.array([0, 0]))
+        self.matches.extend(np.array([1]), np.array([1]))
+
+    def cells(self) -> list[tuple[int, int]]:
+        return sorted(zip(self.matches.rows.tolist(), self.matches.cols.tolist()))
+
+    def test_batches_and_lookup(self):
+        self.assertEqual(len(self.matches), 3)
+        self.assertTrue(self.matches.contains(1, 1))
+        self.assertFalse(self.matches.contains(1, 0))
+
+    def test_sort_keeps_the_current_match(self):
+        self.matches.current = 2
+        self.matches.sort(self.matches.rows)
+        self.assertEqual(self.matches.cell(self.matches.current), (1, 1))
+        self.assertEqual(self.matches.rows.tolist(), [0, 1, 2])
+
+    def test_edits_are_matched_again(self):
+        self.assertTrue(self.matches.apply(CellsChanged([0, 1], [0, 0], ['a', 'b'], ['c', 'a'])))
+        self.assertEqual(self.cells(), [(1, 0), (1, 1), (2, 0)])
+
+    def test_inserted_rows(self):
+        self.matches.apply(RowsInserted(1, 2, [texts('a', ''), texts('', 'x')]))
+        self.assertEqual(self.cells(), [(0, 0), (1, 0), (3, 1), (4, 0)])
+
+    def test_removed_rows_keep_the_current_match_in_place(self):
+        self.matches.sort(self.matches.rows)
+        self.matches.current = 2
+        self.matches.apply(RowsRemoved(1, 1))
+        self.assertEqual(self.cells(), [(0, 0), (1, 0)])
+        self.assertEqual(self.matches.cell(self.matches.current), (1, 0))
+        # The removed current match makes the previous one current
+        self.matches.current = 1
+        self.matches.apply(RowsRemoved(1, 1))
+        self.assertEqual(self.matches.current, 0)
+
+    def test_inserted_and_removed_columns(self):
+        self.matches.apply(ColumnsInserted(1, 1, ['new'], [texts('', '', 'a')]))
+        self.assertEqual(self.cells(), [(0, 0), (1, 2), (2, 0), (2, 1)])
+        self.matches.apply(ColumnsRemoved(0, 1))
+        self.assertEqual(self.cells(), [(1, 1), (2, 0)])
+
+    def test_moved_rows(self):
+        # New row i was row order[i]
+        self.matches.apply(RowsMoved([2, 0, 1]))
+        self.assertEqual(self.cells(), [(0, 0), (1, 0), (2, 1)])
+        self.assertFalse(self.matches.ordered)
+        self.assertTrue(self.matches.contains(2, 1))
+
+    def test_reset_asks_for_a_new_search(self):
+        self.assertFalse(self.matches.apply(TableReset()))
+
+
+if __name__ == '__main__':
+    unittest.main()
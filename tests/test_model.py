@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import Qt
+
+from blackbox.app.table import TableView
+from blackbox.app.table.model import DataFrameModel
+from tests.qt import application
+
+
+class DataFrameModelTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        self.df = pd.DataFrame({'name': ['a', 'b', None], 'count': [1, 2, 3], 'ratio': [0.5, np.nan, 2.5]})
+        self.model = DataFrameModel(self.df)
+
+    def text(self, row: int, col: int) -> str:
+        return self.model.data(self.model.index(row, col))
+
+    def test_cells_are_formatted_on_request(self):
+        self.assertEqual((self.model.rowCount(), self.model.columnCount()), (3, 3))
+        self.assertEqual([self.text(row, 0) for row in range(3)], ['a', 'b', ''])
+        self.assertEqual([self.text(row, 1) for row in range(3)], ['1', '2', '3'])
+        self.assertEqual(self.text(1, 2), '')
+        self.assertIsNone(self.model.data(self.model.index(0, 0), Qt.ItemDataRole.ToolTipRole))
+
+    def test_headers(self):
+        self.assertEqual(self.model.header_labels(), ['name', 'count', 'ratio'])
+        self.assertEqual(self.model.headerData(1, Qt.Orientation.Horizontal), 'count')
+        self.assertEqual(self.model.headerData(0, Qt.Orientation.Vertical), '1')
+
+    def test_text_written_to_a_number_column(self):
+        self.assertTrue(self.model.setData(self.model.index(0, 1), 'many'))
+        self.assertEqual(self.text(0, 1), 'many')
+        self.assertEqual(self.model.get_dataframe()['count'].tolist(), ['many', 2, 3])
+
+    def test_rows_and_columns(self):
+        self.model.insertRows(1, 2)
+        self.assertEqual([self.text(row, 0) for row in range(5)], ['a', '', '', 'b', ''])
+        self.model.removeRows(0, 3)
+        self.assertEqual([self.text(row, 1) for row in range(2)], ['2', '3'])
+        self.model.insertColumns(0, 1)
+        self.assertEqual(self.model.columnCount(), 4)
+        self.model.removeColumns(0, 2)
+        self.assertEqual(self.model.header_labels(), ['count', 'ratio'])
+
+
+class TableViewTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def test_set_dataframe_copies_only_on_request(self):
+        df = pd.DataFrame({'a': ['1', '2']}, dtype=object)
+        for copy, expected in ((True, '1'), (False, 'x')):
+            with self.subTest(copy=copy):
+                view = TableView()
+                self.addCleanup(view.deleteLater)
+                view.set_dataframe(df, copy=copy)
+                view.logic.set_cell_text(0, 0, 'x')
+                self.assertEqual(view.get_dataframe()['a'].tolist(), ['x', '2'])
+                self.assertEqual(df['a'].tolist()[0], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
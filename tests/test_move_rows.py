@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QItemSelection, QItemSelectionModel
+
+from blackbox.app.table import TableView, TableWidget
+from blackbox.core.changes import RowsMoved, move_order
+from tests.qt import application, wait_until
+
+
+class MoveOrderTest(unittest.TestCase):
+
+    def test_scattered_rows_land_together(self):
+        self.assertEqual(move_order(6, [1, 4], 3).tolist(), [0, 2, 1, 4, 3, 5])
+        self.assertEqual(move_order(6, [0, 5], 6).tolist(), [1, 2, 3, 4, 0, 5])
+        self.assertEqual(move_order(6, [3, 4], 0).tolist(), [3, 4, 0, 1, 2, 5])
+
+
+class MoveRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def for_each_table(self, check) -> None:
+        """
+        Runs `check(table)` on a TableView and a TableWidget with rows '0' to '5'.
+        """
+        for table_type in (TableView, TableWidget):
+            with self.subTest(table=table_type.__name__):
+                table = table_type()
+                self.addCleanup(table.deleteLater)
+                table.set_dataframe(pd.DataFrame({'a': [str(i) for i in range(6)], 'b': list('uvwxyz')}, dtype=object))
+                self.assertTrue(wait_until(lambda: table.get_dataframe().shape == (6, 2)))
+                check(table)
+
+    def select(self, table, *rows: int) -> None:
+        model = table.model()
+        flags = QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows
+        for row in rows:
+            table.selectionModel().select(QItemSelection(model.index(row, 0), model.index(row, 1)), flags)
+
+    def test_rows_are_moved_with_one_change(self):
+        def check(table):
+            changes = []
+            table.table_changed.connect(changes.append)
+            order = table.logic.move_rows([1, 4], 3)
+            self.assertEqual(table.get_dataframe()['a'].tolist(), ['0', '2', '1', '4', '3', '5'])
+            self.assertEqual(table.get_dataframe()['b'].tolist(), list('uwvyxz'))
+            self.assertEqual(len(changes), 1)
+            self.assertIsInstance(changes[0], RowsMoved)
+            np.testing.assert_array_equal(changes[0].order, order)
+        self.for_each_table(check)
+
+    def test_selected_rows(self):
+        def check(table):
+            self.select(table, 4, 1, 2)
+            self.assertEqual(table.logic.selected_rows().tolist(), [1, 2, 4])
+        self.for_each_table(check)
+
+    def test_current_cell_follows_its_row(self):
+        # Only the model remaps persistent indexes; the widget re-seats its items
+        view = TableView()
+        self.addCleanup(view.deleteLater)
+        view.set_dataframe(pd.DataFrame({'a': [str(i) for i in range(6)]}, dtype=object))
+        view.setCurrentIndex(view.model().index(4, 0))
+        view.logic.move_rows([4], 0)
+        self.assertEqual(view.currentIndex().row(), 0)
+        self.assertEqual(view.logic.cell_text(0, 0), '4')
+
+if __name__ == '__main__':
+    unittest.main()
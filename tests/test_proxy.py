@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blackbox.app.table.proxy import EMPTY_RANK, ColumnFilter, parse_numbers, sort_ranks, sort_rows
+from blackbox.core import typed
+
+
+def texts(*values: str) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+class SortTest(unittest.TestCase):
+
+    def test_numbers_before_text_and_empty_cells_last(self):
+        ranks = sort_ranks(texts('b', '10', '', 'A', '9', 'a'))
+        order = sort_rows([ranks], [True]).tolist()
+        self.assertEqual(order, [4, 1, 3, 5, 0, 2])
+        self.assertEqual(ranks[2], EMPTY_RANK)
+        # Case-insensitive text compares equal and keeps its order
+        self.assertEqual(ranks[3], ranks[5])
+
+    def test_descending_keeps_empty_cells_last(self):
+        ranks = sort_ranks(texts('1', '', '3', '2'))
+        self.assertEqual(sort_rows([ranks], [False]).tolist(), [2, 3, 0, 1])
+
+    def test_several_keys_and_stability(self):
+        first = sort_ranks(texts('x', 'y', 'x', 'y'))
+        second = sort_ranks(texts('2', '1', '1', '1'))
+        self.assertEqual(sort_rows([first, second], [True, False]).tolist(), [0, 2, 1, 3])
+        self.assertEqual(sort_rows([first], [True], np.array([3, 2, 1, 0])).tolist(), [2, 0, 3, 1])
+
+    def test_typed_columns_sort_by_value(self):
+        df = typed.encode_frame(pd.DataFrame({'n': ['10', '9', '', '-1'],
+                                              'd': ['2024-02-01', '', '2023-12-31', '2024-01-15']}, dtype=object))
+        self.assertEqual(sort_rows([sort_ranks(df['n'])], [True]).tolist(), [3, 1, 0, 2])
+        self.assertEqual(sort_rows([sort_ranks(df['d'])], [True]).tolist(), [2, 3, 0, 1])
+
+    def test_parse_numbers(self):
+        numbers = parse_numbers(texts('1.5', ' 2', 'x', '-3e2', '.5', 'inf?'))
+        self.assertEqual(numbers[[0, 1, 3, 4]].tolist(), [1.5, 2.0, -300.0, 0.5])
+        self.assertTrue(np.isnan(numbers[[2, 5]]).all())
+
+
+class ColumnFilterTest(unittest.TestCase):
+
+    values = texts('Apple', 'banana', '', '10', '9.5', 'apple pie')
+
+    def matches(self, expression: str) -> list[int]:
+        return np.flatnonzero(ColumnFilter(expression).match(self.values)).tolist()
+
+    def test_expressions(self):
+        cases = [
+            ('', [0, 1, 2, 3, 4, 5]),
+            ('APP', [0, 5]),
+            ('=apple', [0]),
+            ('=', [2]),
+            ('!=', [0, 1, 3, 4, 5]),
+            ('!=apple', [1, 2, 3, 4, 5]),
+            ('>9.5', [3]),
+            ('<=10', [3, 4]),
+            ('>b', [1]),
+            ('~^a.*e$', [0, 5]),
+            ('!~p', [1, 2, 3, 4]),
+            ('=10.0', [3]),
+        ]
+        for expression, rows in cases:
+            with self.subTest(expression=expression):
+                self.assertEqual(self.matches(expression), rows)
+
+    def test_invalid_regex(self):
+        with self.assertRaises(ValueError):
+            ColumnFilter('~(')
+
+
+class ImportTest(unittest.TestCase):
+
+    def test_importing_the_module_leaves_numpy_unloaded(self):
+        code = ('import sys, importlib.util; import blackbox.app.table.proxy; '
+                'print(type(sys.modules.get("numpy")) is importlib.util._LazyModule)')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), 'True')
+
+
+if __name__ == '__main__':
+    unittest.main()
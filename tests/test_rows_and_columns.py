@@ -0,0 +1,62 @@
+import unittest
+
+import pandas as pd
+
+from blackbox.app.table import TableView, TableWidget
+from blackbox.core.changes import index_spans
+from tests.qt import application
+
+
+class IndexSpansTest(unittest.TestCase):
+
+    def test_runs_of_consecutive_indices(self):
+        self.assertEqual(index_spans([7, 1, 2, 2, 3, 5]), [(1, 3), (5, 1), (7, 1)])
+        self.assertEqual(index_spans([]), [])
+
+
+class InsertRemoveTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def tables(self):
+        for table_type in (TableView, TableWidget):
+            table = table_type()
+            self.addCleanup(table.deleteLater)
+            table.handle_data_loaded(pd.DataFrame({'a': ['1', '2', '3', '4'], 'b': ['w', 'x', 'y', 'z']},
+                                                  dtype=object))
+            yield table
+
+    def test_scattered_rows_are_removed_and_restored_in_one_step(self):
+        for table in self.tables():
+            with self.subTest(table=type(table).__name__):
+                self.assertEqual(table.logic.remove_rows([3, 0, 2]), 3)
+                self.assertEqual(table.get_dataframe().values.tolist(), [['2', 'x']])
+                self.assertTrue(table.undo())
+                self.assertEqual(table.get_dataframe()['a'].tolist(), ['1', '2', '3', '4'])
+                self.assertFalse(table.logic.history.can_undo())
+
+    def test_rows_are_inserted_in_front_of_every_run(self):
+        for table in self.tables():
+            with self.subTest(table=type(table).__name__):
+                self.assertEqual(table.logic.insert_rows([0, 2, 3]), 3)
+                self.assertEqual(table.get_dataframe()['a'].tolist(), ['', '1', '2', '', '', '3', '4'])
+                self.assertEqual(table.logic.insert_rows([4], after=True), 1)
+                self.assertEqual(table.get_dataframe()['a'].tolist(), ['', '1', '2', '', '', '', '3', '4'])
+
+    def test_columns_get_unique_names_and_removed_ones_come_back(self):
+        for table in self.tables():
+            with self.subTest(table=type(table).__name__):
+                table.logic.insert_columns([0, 1], after=True)
+                self.assertEqual(table.get_dataframe().columns.tolist(), ['a', 'b', 'Column 1', 'Column 2'])
+                table.logic.remove_columns([0, 2])
+                df = table.get_dataframe()
+                self.assertEqual(df.columns.tolist(), ['b', 'Column 2'])
+                self.assertTrue(table.undo())
+                df = table.get_dataframe()
+                self.assertEqual(df.columns.tolist(), ['a', 'b', 'Column 1', 'Column 2'])
+                self.assertEqual(df['a'].tolist(), ['1', '2', '3', '4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
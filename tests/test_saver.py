@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from loguru import logger
+from openpyxl import load_workbook
+
+from blackbox.app.table import TableView, TableWidget
+from blackbox.app.table.saver import BackgroundSaver
+from blackbox.core.io import TableWriter
+from tests.qt import application, wait_until
+
+
+class TableWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.df = pd.DataFrame({'name': ['a', 'b', None], 'amount': ['1', '22', '333']}, dtype=object)
+
+    def test_formats_round_trip(self):
+        readers = {
+            'csv': lambda path: pd.read_csv(path, dtype=str, keep_default_na=False),
+            'parquet': pd.read_parquet,
+        }
+        for ext, read in readers.items():
+            with self.subTest(ext=ext):
+                path = os.path.join(self.directory, f'table.{ext}')
+                TableWriter().write(self.df, path)
+                self.assertEqual(read(path)['amount'].tolist(), ['1', '22', '333'])
+                self.assertNotIn(f'table.{ext}.part', os.listdir(self.directory))
+
+    def test_excel_keeps_missing_cells_empty(self):
+        path = os.path.join(self.directory, 'table.xlsx')
+        TableWriter().write(self.df, path)
+        rows = list(load_workbook(path).active.iter_rows(values_only=True))
+        self.assertEqual(rows, [('name', 'amount'), ('a', '1'), ('b', '22'), (None, '333')])
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            TableWriter().write(self.df, os.path.join(self.directory, 'table.txt'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_write_leaves_no_partial_file(self):
+        saver = TableWriter()
+        def fail(df, path):
+            with open(path, 'w') as file:
+                file.write('half')
+            raise OSError('disk full')
+        saver.write_csv = fail
+        with self.assertRaises(OSError):
+            saver.write(self.df, os.path.join(self.directory, 'table.csv'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class BackgroundSaverTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.saver = BackgroundSaver()
+        self.addCleanup(self.saver.deleteLater)
+        self.events = []
+        self.saver.save_finished.connect(lambda path: self.events.append(('finished', path)))
+        self.saver.save_failed.connect(lambda path, _: self.events.append(('failed', path)))
+
+    def test_snapshots_are_written_after_later_edits(self):
+        for table_type in (TableView, TableWidget):
+            with self.subTest(table=table_type.__name__):
+                table = table_type()
+                self.addCleanup(table.deleteLater)
+                table.set_dataframe(pd.DataFrame({'a': ['1', '2']}, dtype=object))
+                self.assertTrue(wait_until(lambda: table.get_dataframe().shape == (2, 1)))
+                path = os.path.join(self.directory, f'{table_type.__name__}.csv')
+                self.saver.save(table.snapshot_dataframe(), path)
+                table.logic.set_cell_text(0, 0, 'edited')
+                self.assertTrue(wait_until(lambda: not self.saver.is_saving()))
+                self.assertEqual(pd.read_csv(path, dtype=str)['a'].tolist(), ['1', '2'])
+                self.assertEqual(self.events[-1], ('finished', path))
+
+    def test_errors_are_reported(self):
+        # The traceback is logged on purpose
+        logger.disable('blackbox')
+        self.addCleanup(logger.enable, 'blackbox')
+        path = os.path.join(self.directory, 'table.txt')
+        self.saver.save(pd.DataFrame({'a': ['1']}), path)
+        self.assertTrue(wait_until(lambda: not self.saver.is_saving()))
+        self.assertEqual(self.events, [('failed', path)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blackbox.core.search import SearchQuery
+from blackbox.core.table import Table
+
+
+def texts(*values) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+class SearchQueryTest(unittest.TestCase):
+
+    def test_modes(self):
+        cells = texts('Apple', 'apple pie', 'pineapple', 'apple')
+        cases = [
+            (SearchQuery('apple'), [False, False, False, True]),
+            (SearchQuery('apple', match_case=False), [True, False, False, True]),
+            (SearchQuery('apple', whole_cell=False), [False, True, True, True]),
+            (SearchQuery('apple', whole_cell=False, whole_word=True), [False, True, False, True]),
+            (SearchQuery('^a.*e$', regex=True, whole_cell=False), [False, True, False, True]),
+        ]
+        for query, expected in cases:
+            with self.subTest(text=query.text):
+                self.assertEqual(query.match(cells).tolist(), expected)
+
+    def test_exact_match_of_a_list(self):
+        self.assertEqual(SearchQuery('a').match(['a', 'b']).tolist(), [True, False])
+
+    def test_whole_cell_regex_replacement_expands_backreferences(self):
+        query = SearchQuery(r'(\d+)-(\d+)', regex=True)
+        self.assertEqual(query.replace(texts('12-34'), r'\2-\1').tolist(), ['34-12'])
+        self.assertEqual(query.sub('12-34', r'\2-\1'), '34-12')
+
+    def test_whole_cell_regex_replaces_once(self):
+        query = SearchQuery('.*', regex=True)
+        self.assertEqual(query.replace(texts('abc'), 'x').tolist(), ['x'])
+        self.assertEqual(query.sub('abc', 'x'), 'x')
+
+    def test_plain_replacement_is_literal(self):
+        self.assertEqual(SearchQuery('a').replace(texts('a'), r'\1').tolist(), [r'\1'])
+        self.assertEqual(SearchQuery('a', whole_cell=False).replace(texts('banana'), r'\o').tolist(),
+                         [r'b\on\on\o'])
+
+    def test_table_replace(self):
+        table = Table(pd.DataFrame({'a': ['1-2', 'x'], 'b': ['3-4', '1-2']}, dtype=object))
+        count = table.replace(SearchQuery(r'(\d)-(\d)', regex=True), r'\2-\1', columns=[0])
+        self.assertEqual(count, 1)
+        self.assertEqual(table.df.values.tolist(), [['2-1', '3-4'], ['x', '1-2']])
+
+
+if __name__ == '__main__':
+    unittest.main()
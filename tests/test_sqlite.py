@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from blackbox.app.table import SqliteWriteBack, TableView
+from blackbox.app.table.writeback import _Batch
+from blackbox.core import frame
+from blackbox.core import sqlite as sqlite_frame
+from blackbox.core.sqlite import SqliteSource
+from tests.qt import application, wait_until
+
+
+class _Loader(QObject):
+    """
+    Stands in for the loader widget: SqliteWriteBack only listens to data_loaded.
+    """
+    data_loaded = pyqtSignal(object)
+
+
+class SqliteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'data.sqlite')
+        with sqlite3.connect(self.path) as connection:
+            connection.execute('CREATE TABLE items (name TEXT, amount TEXT)')
+            connection.executemany('INSERT INTO items VALUES (?, ?)',
+                                   [(f'item {i}', str(i)) for i in range(10)])
+        connection.close()
+
+    def stored(self, sql: str = 'SELECT rowid, name, amount FROM items ORDER BY rowid') -> list[tuple]:
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(sql).fetchall()
+        finally:
+            connection.close()
+
+
+class SqliteSourceTest(SqliteTestCase):
+
+    def test_reads_in_blocks(self):
+        source = SqliteSource(self.path)
+        source.block_rows = 4
+        df = source.frame()
+        self.assertEqual(df.shape, (10, 2))
+        self.assertEqual(df.iloc[9, 0], 'item 9')
+        self.assertEqual(df['amount'].to_numpy(dtype=object).tolist(), [str(i) for i in range(10)])
+
+    def test_overlay_until_committed(self):
+        source = SqliteSource(self.path)
+        df = source.frame()
+        frame.write_cells(df, [1, 2], [0, 1], ['edited', '20'])
+
+        # Written to the source's overlay, the columns stay SQLite columns
+        self.assertEqual(source.overlay, {(2, 'name'): 'edited', (3, 'amount'): '20'})
+        self.assertEqual(df.iloc[1, 0], 'edited')
+        self.assertEqual(df['amount'].to_numpy(dtype=object)[2], '20')
+        self.assertEqual(self.stored()[1], (2, 'item 1', '1'))
+
+        source.committed([], [], [(2, 'name', 'edited')], [], [])
+        self.assertEqual(source.overlay, {(3, 'amount'): '20'})
+
+
+class SqliteWriteBackTest(SqliteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        application()
+        self.table = TableView()
+        self.addCleanup(self.table.deleteLater)
+        self.loader = _Loader()
+        self.writeback = SqliteWriteBack(self.table, self.loader, flush_delay=10, retry_delay=20)
+        self.source = SqliteSource(self.path)
+        df = self.source.frame()
+        self.loader.data_loaded.emit(df)
+        self.table.handle_data_loaded(df)
+        self.assertTrue(wait_until(lambda: self.writeback.source is self.source))
+
+    def test_round_trip(self):
+        logic = self.table.logic
+        logic.set_cell_text(0, 0, 'renamed')
+        logic.remove_rows([1, 2])
+        logic.insert_rows([0])
+        logic.set_cell_text(0, 1, '99')
+        self.assertTrue(self.source.overlay)
+        self.writeback.close()
+
+        self.assertEqual(self.source.overlay, {})
+        stored = self.stored()
+        self.assertEqual(len(stored), 9)
+        self.assertEqual(stored[0], (1, 'renamed', '0'))
+        self.assertNotIn(2, [row[0] for row in stored])
+        # The inserted row got a key after the largest one and keeps its edit
+        self.assertEqual(stored[-1], (11, None, '99'))
+        self.assertEqual([logic.cell_text(0, col) for col in range(2)], ['', '99'])
+
+        # Read back from a fresh source, the file holds what the table shows
+        reread = SqliteSource(self.path).frame()
+        self.assertEqual(sorted(map(str, reread['name'].to_numpy(dtype=object))),
+                         sorted(map(str, self.table.get_dataframe()['name'].to_numpy(dtype=object))))
+
+    def test_flushed_in_the_background(self):
+        written = []
+        self.writeback.written.connect(written.append)
+        self.table.logic.set_cell_text(3, 1, 'x')
+        self.assertTrue(wait_until(lambda: written))
+        self.assertEqual(self.stored('SELECT amount FROM items WHERE rowid = 4'), [('x',)])
+        self.assertEqual(self.source.overlay, {})
+
+    def test_failed_batches_are_kept_and_retried(self):
+        written, failed = [], []
+        self.writeback.written.connect(written.append)
+        self.writeback.write_failed.connect(failed.append)
+        logic = self.table.logic
+        locked = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(_Batch, 'write', side_effect=locked) as write:
+            logic.set_cell_text(0, 0, 'first')
+            self.assertTrue(wait_until(lambda: write.call_count >= 3))
+            logic.set_cell_text(0, 0, 'second')
+            logic.set_cell_text(1, 0, 'other')
+            self.assertFalse(self.writeback.close())
+        # Reported once, the edits stay visible and queued
+        self.assertEqual(failed, ['database is locked'])
+        self.assertEqual(written, [])
+        self.assertEqual(self.writeback.pending_rows(), 3)
+        self.assertEqual(logic.cell_text(0, 0), 'second')
+        self.assertEqual(self.stored()[0], (1, 'item 0', '0'))
+
+        self.assertTrue(wait_until(lambda: not self.writeback.pending_rows()))
+        self.assertEqual(self.stored()[:2], [(1, 'second', '0'), (2, 'other', '1')])
+        self.assertEqual(self.source.overlay, {})
+        self.assertTrue(self.writeback.close())
+
+    def test_snapshot_is_read_into_memory(self):
+        logic = self.table.logic
+        logic.set_cell_text(0, 0, 'edited')
+        snapshot = self.table.snapshot_dataframe()
+        self.assertTrue(all(dtype == object for dtype in snapshot.dtypes))
+        self.assertEqual(snapshot.iloc[0].tolist(), ['edited', '0'])
+
+        # Neither later edits nor their write-back reach the snapshot
+        logic.set_cell_text(0, 0, 'later')
+        self.writeback.close()
+        self.assertEqual(self.source.overlay, {})
+        self.assertEqual(snapshot.iloc[0].tolist(), ['edited', '0'])
+        self.assertEqual(snapshot['name'].tolist()[1:], [f'item {i}' for i in range(1, 10)])
+
+    def test_snapshot_waits_for_a_running_write(self):
+        self.table.logic.set_cell_text(0, 0, 'edited')
+        with self.source.write_lock:
+            snapshot = []
+            thread = threading.Thread(target=lambda: snapshot.append(sqlite_frame.read_frame(self.source.frame())))
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(snapshot[0].iloc[0].tolist(), ['edited', '0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
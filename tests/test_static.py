@@ -0,0 +1,50 @@
+import json
+import unittest
+from unittest import mock
+
+from loguru import logger
+
+from blackbox.app import static
+
+
+class NamespaceTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(static._NAMESPACES, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_files_are_parsed_once(self):
+        with mock.patch('blackbox.app.static.load', wraps=json.load) as load:
+            self.assertEqual(static.label('main_window.title'), 'OpenEditor')
+            self.assertEqual(static.label('table_loader.button'), 'Load File')
+            self.assertEqual(load.call_count, 1)
+
+    def test_unknown_key(self):
+        with self.assertRaises(KeyError):
+            static.label('main_window.missing')
+
+    def test_reload_replaces_the_cached_values(self):
+        fname = './namespace/en_labels.json'
+        static._NAMESPACES[fname] = {'main_window.title': 'Stale'}
+        self.assertTrue(static.reload_namespace('en_labels.json'))
+        self.assertEqual(static.label('main_window.title'), 'OpenEditor')
+
+    def test_unreadable_files_keep_their_values(self):
+        fname = './namespace/en_labels.json'
+        static._NAMESPACES[fname] = {'main_window.title': 'Kept'}
+        logger.disable('blackbox')
+        self.addCleanup(logger.enable, 'blackbox')
+        with mock.patch('blackbox.app.static.load', side_effect=json.JSONDecodeError('half written', '', 0)):
+            self.assertFalse(static.reload_namespace('en_labels.json'))
+        self.assertEqual(static.label('main_window.title'), 'Kept')
+
+    def test_locales(self):
+        self.assertIn('en', static.available_locales())
+        with self.assertRaises(ValueError):
+            static.set_locale('xx')
+        self.assertEqual(static.get_locale(), 'en')
+
+
+if __name__ == '__main__':
+    unittest.main()
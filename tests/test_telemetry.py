@@ -0,0 +1,74 @@
+import unittest
+
+import pandas as pd
+
+from blackbox.core import telemetry
+from blackbox.app.table import TableView
+from tests.qt import application
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = telemetry.Histogram()
+        for seconds in [0.001] * 90 + [0.1] * 10:
+            histogram.add(seconds)
+        self.assertEqual(histogram.count, 100)
+        self.assertTrue(0.001 <= histogram.percentile(0.5) < 0.002)
+        self.assertTrue(0.1 <= histogram.percentile(0.99) <= 0.1 * 2)
+        self.assertEqual(histogram.as_dict()['max'], 0.1)
+        self.assertEqual(sum(n for _, n in histogram.as_dict()['buckets']), 100)
+
+    def test_empty(self):
+        self.assertEqual(telemetry.Histogram().as_dict()['p50'], 0.0)
+
+
+class TelemetryTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        telemetry.reset()
+        self.addCleanup(telemetry.reset)
+
+    def test_spans_and_counters(self):
+        finished = []
+        def on_finished(name, _):
+            finished.append(name)
+        telemetry.signals().span_finished.connect(on_finished)
+        self.addCleanup(telemetry.signals().span_finished.disconnect, on_finished)
+        with telemetry.span('work'):
+            telemetry.count('work.items', 3)
+        with self.assertRaises(RuntimeError), telemetry.span('work'):
+            raise RuntimeError
+        stats = telemetry.stats()
+        self.assertEqual(stats['spans']['work']['count'], 1)
+        self.assertEqual(stats['counters'], {'work.items': 3, 'work.failed': 1})
+        self.assertEqual(finished, ['work'])
+
+    def test_disabled_recording(self):
+        telemetry.set_enabled(False)
+        self.addCleanup(telemetry.set_enabled, True)
+        with telemetry.span('work') as span:
+            pass
+        self.assertGreaterEqual(span.elapsed, 0.0)
+        self.assertEqual(telemetry.stats(), {'spans': {}, 'counters': {}})
+
+    def test_table_loads_are_measured(self):
+        view = TableView()
+        self.addCleanup(view.deleteLater)
+        view.handle_data_loaded(pd.DataFrame({'a': ['1', '2', '3']}))
+        stats = telemetry.stats()
+        self.assertEqual(stats['spans']['populate']['count'], 1)
+        self.assertEqual(stats['counters']['populate.rows'], 3)
+
+    def test_profiling(self):
+        telemetry.start_profiling()
+        sorted(range(1000), key=str)
+        report = telemetry.stop_profiling()
+        self.assertIn('sorted', report.summary())
+        self.assertIsNone(report.memory)
+        self.assertIsNone(telemetry.stop_profiling())
+
+
+if __name__ == '__main__':
+    unittest.main()
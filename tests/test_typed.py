@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from blackbox.app.table import TableView
+from blackbox.core import typed
+from blackbox.core.io import TableReader
+from tests.qt import application
+
+
+def texts(*values) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+class EncodeColumnTest(unittest.TestCase):
+
+    def test_storage(self):
+        cases = [
+            (texts('1', '2', '3'), np.dtype('int64')),
+            (texts('1', '', '3'), pd.Int64Dtype()),
+            (texts('0.5', '', '2.25'), np.dtype('float64')),
+            (texts('2024-01-31', '2024-02-01', ''), np.dtype('<M8[ns]')),
+            (texts('a', 'b', 'a', 'a', 'b', 'a'), pd.CategoricalDtype),
+            (texts('x', '', '', '', 'y'), pd.SparseDtype),
+            (texts('x', 'y', 'z'), np.dtype(object)),
+        ]
+        for values, dtype in cases:
+            with self.subTest(values=values.tolist()):
+                column = typed.encode_column(values)
+                if isinstance(dtype, type):
+                    self.assertIsInstance(column.dtype, dtype)
+                else:
+                    self.assertEqual(column.dtype, dtype)
+                self.assertEqual(typed.column_texts(column).tolist(), values.tolist())
+
+    def test_text_that_would_change_stays_text(self):
+        for values in (texts('007', '1'), texts('1.50', '2'), texts('1e3', '2'), texts('2024-01-31 00:00:00', 'x')):
+            with self.subTest(values=values.tolist()):
+                column = typed.encode_column(values)
+                self.assertFalse(pd.api.types.is_numeric_dtype(column.dtype))
+                self.assertEqual(typed.column_texts(column).tolist(), values.tolist())
+
+    def test_dates_are_shown_like_csv(self):
+        stamps = pd.DatetimeIndex([pd.Timestamp('2024-01-31 10:00'), pd.Timestamp('2024-02-01')])
+        self.assertEqual(typed.column_texts(stamps.to_numpy()).tolist(), ['2024-01-31 10:00:00', '2024-02-01 00:00:00'])
+
+    def test_blocks_stored_differently_are_encoded_again(self):
+        first = pd.DataFrame({'n': typed.encode_column(texts('1', '2')), 'c': pd.Categorical(['a', 'a'])})
+        second = pd.DataFrame({'n': typed.encode_column(texts('2.5', '3')), 'c': pd.Categorical(['b', 'b'])})
+        df = typed.concat_frames([first, second])
+        self.assertEqual(typed.column_texts(df['n']).tolist(), ['1', '2', '2.5', '3'])
+        self.assertIsInstance(df['c'].dtype, pd.CategoricalDtype)
+        self.assertEqual(typed.column_texts(df['c']).tolist(), ['a', 'a', 'b', 'b'])
+
+
+class TypedLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'table.csv')
+        with open(self.path, 'w') as file:
+            file.write('id,price,day,note\n1,0.5,2024-01-31,007\n2,,2024-02-01,\n3,1.25,,x\n')
+
+    def test_columns_are_typed_and_shown_as_in_the_file(self):
+        df = TableReader(typed=True).read(self.path)
+        self.assertEqual([str(dtype) for dtype in df.dtypes[:3]], ['int64', 'float64', 'datetime64[ns]'])
+        view = TableView()
+        self.addCleanup(view.deleteLater)
+        view.set_dataframe(df)
+        rows = [[view.logic.cell_text(row, col) for col in range(4)] for row in range(3)]
+        self.assertEqual(rows, [['1', '0.5', '2024-01-31', '007'], ['2', '', '2024-02-01', ''], ['3', '1.25', '', 'x']])
+        # A typed column becomes text on its first edit
+        view.logic.set_cell_text(0, 0, 'one')
+        self.assertEqual(view.get_dataframe()['id'].tolist(), ['one', 2, 3])
+
+    def test_string_mode_is_the_default(self):
+        df = TableReader().read(self.path)
+        self.assertTrue((df.dtypes == object).all())
+        self.assertEqual(df['price'].tolist(), ['0.5', '', '1.25'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import pandas as pd
+
+from blackbox.app.table import TableView, TableWidget
+from tests.qt import application, wait_until
+
+
+def frame(*values) -> pd.DataFrame:
+    return pd.DataFrame({'a': list(values)}, dtype=object)
+
+
+class SetDataFrameTest(unittest.TestCase):
+
+    def setUp(self):
+        application()
+
+    def tables(self):
+        for table_type in (TableView, TableWidget):
+            table = table_type()
+            self.addCleanup(table.deleteLater)
+            yield table
+
+    def load(self, table, df: pd.DataFrame) -> None:
+        table.set_dataframe(df)
+        # TableWidget fills its items on the event loop
+        self.assertTrue(wait_until(lambda: table.get_dataframe().shape == df.shape))
+
+    def test_replacing_the_frame_clears_the_undo_history(self):
+        for table in self.tables():
+            with self.subTest(table=type(table).__name__):
+                self.load(table, frame('1', '2', '3'))
+                table.logic.set_cell_text(0, 0, 'edited')
+                self.assertTrue(table.logic.history.can_undo())
+
+                self.load(table, frame('100', '200'))
+                self.assertFalse(table.logic.history.can_undo())
+                self.assertFalse(table.undo())
+                self.assertEqual(table.get_dataframe()['a'].tolist(), ['100', '200'])
+
+    def test_replacing_the_frame_recomputes_column_stats(self):
+        for table in self.tables():
+            with self.subTest(table=type(table).__name__):
+                self.load(table, frame('4', '5', '6'))
+                stats = table.column_stats(0)
+                self.assertEqual((stats.count, stats.sum), (3, 15.0))
+
+                self.load(table, frame('100', '200'))
+                stats = table.column_stats(0)
+                self.assertEqual((stats.count, stats.sum, stats.min, stats.max), (2, 300.0, 100.0, 200.0))
+
+    def test_copy_leaves_the_frame_untouched(self):
+        df = frame('1')
+        table = TableView()
+        self.addCleanup(table.deleteLater)
+        table.set_dataframe(df, copy=True)
+        table.logic.set_cell_text(0, 0, 'edited')
+        self.assertEqual(df['a'].tolist(), ['1'])
+        self.assertEqual(table.get_dataframe()['a'].tolist(), ['edited'])
+
+
+if __name__ == '__main__':
+    unittest.main()
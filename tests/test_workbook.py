@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+import pandas as pd
+
+from blackbox.core.io import TableReader, TableWriter
+from blackbox.core.workbook import sheet_names
+
+
+class ReplaceSheetsTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'book.xlsx')
+        self.target = os.path.join(directory.name, 'edited.xlsx')
+        with pd.ExcelWriter(self.source, engine='openpyxl') as writer:
+            pd.DataFrame({'a': ['1', '2'], 'b': ['x', 'y']}).to_excel(writer, sheet_name='first', index=False)
+            pd.DataFrame({'c': ['keep', 'me']}).to_excel(writer, sheet_name='second', index=False)
+            pd.DataFrame({'d': ['3']}).to_excel(writer, sheet_name='third', index=False)
+
+    @staticmethod
+    def members(path: str) -> dict[str, bytes]:
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_untouched_sheets_are_byte_identical(self):
+        edited = pd.DataFrame({'a': ['10'], 'b': ['changed']})
+        TableWriter().write_sheets(self.source, {'first': edited}, self.target)
+
+        before, after = self.members(self.source), self.members(self.target)
+        self.assertEqual(before['xl/worksheets/sheet2.xml'], after['xl/worksheets/sheet2.xml'])
+        self.assertEqual(before['xl/worksheets/sheet3.xml'], after['xl/worksheets/sheet3.xml'])
+        self.assertEqual(before['xl/workbook.xml'], after['xl/workbook.xml'])
+        self.assertNotEqual(before['xl/worksheets/sheet1.xml'], after['xl/worksheets/sheet1.xml'])
+
+        self.assertEqual(sheet_names(self.target), ['first', 'second', 'third'])
+        reader = TableReader()
+        self.assertEqual(reader.read_excel(self.target, 'first').values.tolist(), [['10', 'changed']])
+        self.assertEqual(reader.read_excel(self.target, 'second').values.tolist(), [['keep'], ['me']])
+
+    def test_in_place(self):
+        TableWriter().write_sheets(self.source, {'third': pd.DataFrame({'d': ['4']})}, self.source)
+        self.assertEqual(TableReader().read_excel(self.source, 'third').values.tolist(), [['4']])
+        self.assertFalse(os.path.exists(f'{self.source}.part'))
+
+    def test_unknown_sheet_leaves_no_file(self):
+        with self.assertRaises(KeyError):
+            TableWriter().write_sheets(self.source, {'missing': pd.DataFrame()}, self.target)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertFalse(os.path.exists(f'{self.target}.part'))
+
+
+if __name__ == '__main__':
+    unittest.main()